@@ -0,0 +1,241 @@
+"""Benchmark: watermark-based CandleSync vs. the updaters' full-window refetch.
+
+A fake exchange serves GetCandles-style responses (bars with open time in
+[from, to), the forming bar included, period limits enforced) from synthetic
+1m candles, and a simulated clock drives the updater schedules:
+
+* initial load on Monday morning;
+* a trading session: 1m every 5 minutes, 1h hourly, 1d after the close;
+* Tuesday-Friday missed, caught up on Friday evening, then Saturday and
+  Sunday runs;
+* a trading day deleted from every table, then the Monday morning run.
+
+For every phase the API calls, candles fetched and rows written are counted
+for both approaches. At the end the stored closed bars are checked against
+the exchange.
+
+Usage:
+    python benchmarks/benchmark_candle_sync.py --symbols 10
+"""
+
+import argparse
+import gc
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.candle_sync import CandleSync, SyncReport  # noqa: E402
+from core.multi_timeframe_db import get_timeframe_table_name  # noqa: E402
+from core.timeframe_resampler import aggregate  # noqa: E402
+
+TIMEFRAMES = ("1m", "1h", "1d")
+MINUTES = {"1m": 1, "1h": 60, "1d": 1440}
+# Legacy updater window and truncation (TinkoffDataProvider.data_periods)
+LEGACY_PERIODS = {"1d": (365, 365), "1h": (7, 168), "1m": (1, 1440)}
+REQUEST_LIMIT_DAYS = {"1d": 365, "1h": 7, "1m": 1}
+
+
+class FakeExchange:
+    """GetCandles over synthetic minutes; the clock hides everything after 'now'."""
+
+    def __init__(self, symbols, start: str, end: str, rng):
+        self.clock = None
+        self.minutes = {}
+        days = pd.bdate_range(start, end, tz="UTC")
+        for symbol in symbols:
+            times = np.concatenate([(day + pd.Timedelta(hours=7) + pd.to_timedelta(np.arange(520), unit="min"))
+                                    .as_unit("ns").asi8 for day in days])
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0008, len(times))))
+            spread = np.abs(rng.normal(0, 0.0005, len(times))) * close
+            values = np.column_stack([np.r_[close[0], close[:-1]], close + spread, close - spread, close,
+                                      rng.integers(1, 500, len(times)).astype(float)])
+            values[:, 1] = np.maximum(values[:, 1], values[:, 0])
+            values[:, 2] = np.minimum(values[:, 2], values[:, 0])
+            self.minutes[f"FIGI_{symbol}"] = (times, values)
+
+    def bars(self, figi: str, timeframe: str, lo=None, hi=None) -> pd.DataFrame:
+        """Bars opened in [lo, hi) as of the clock; the forming bar has is_complete False."""
+        times, values = self.minutes[figi]
+        now = self.clock.value
+        visible = times <= now  # Minutes that have started
+        bar_times, bars, _ = aggregate(times[visible], values[visible], MINUTES[timeframe])
+        keep = np.ones(len(bar_times), dtype=bool)
+        if lo is not None:
+            keep &= (bar_times >= pd.Timestamp(lo).value) & (bar_times < pd.Timestamp(hi).value)
+        step = MINUTES[timeframe] * 60 * 10**9
+        frame = pd.DataFrame(bars[keep], columns=["open", "high", "low", "close", "volume"])
+        frame.insert(0, "time", pd.DatetimeIndex(bar_times[keep].view("datetime64[ns]")).tz_localize("UTC"))
+        frame["volume"] = frame["volume"].astype("int64")
+        frame["is_complete"] = bar_times[keep] + step <= now
+        return frame
+
+    def fetch(self, figi, timeframe, from_date, to_date) -> pd.DataFrame:
+        if pd.Timestamp(to_date) - pd.Timestamp(from_date) > pd.Timedelta(days=REQUEST_LIMIT_DAYS[timeframe]):
+            raise ValueError("30014: maximum request period exceeded")
+        return self.bars(figi, timeframe, from_date, to_date)
+
+
+class Counted:
+    def __init__(self, fetch):
+        self.fetch, self.stats = fetch, Counter()
+
+    def __call__(self, figi, timeframe, from_date, to_date):
+        data = self.fetch(figi, timeframe, from_date, to_date)
+        self.stats["api_calls"] += 1
+        self.stats["candles_fetched"] += len(data)
+        return data
+
+
+def legacy_run(conn, exchange: FakeExchange, fetch: Counted, symbols, timeframe: str) -> None:
+    """What the updaters did before: the whole default window, every row rewritten."""
+    days, max_candles = LEGACY_PERIODS[timeframe]
+    table = get_timeframe_table_name(timeframe)
+    for symbol in symbols:
+        data = fetch(f"FIGI_{symbol}", timeframe, exchange.clock - pd.Timedelta(days=days), exchange.clock)
+        data = data.tail(max_candles)
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (symbol, datetime, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, row.time.isoformat(), row.open, row.high, row.low, row.close, int(row.volume))
+                 for row in data.itertuples()])
+        fetch.stats["rows_written"] += len(data)
+
+
+def sync_run(conn, sync: CandleSync, exchange: FakeExchange, symbols, timeframe: str) -> SyncReport:
+    report = SyncReport(timeframe)
+    for symbol in symbols:
+        sync.sync_symbol(conn, symbol, f"FIGI_{symbol}", timeframe, report, now=exchange.clock)
+    return report
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    for timeframe in TIMEFRAMES:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {get_timeframe_table_name(timeframe)} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                datetime TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(symbol, datetime)
+            )
+        """)
+
+
+def check_parity(conn, exchange: FakeExchange, symbols, timeframe: str):
+    """Closed exchange bars inside the stored range: (missing, mismatched, expected)."""
+    table = get_timeframe_table_name(timeframe)
+    missing = mismatched = expected_total = 0
+    for symbol in symbols:
+        stored = pd.read_sql(f"SELECT datetime, open, high, low, close, volume FROM {table} WHERE symbol = ?",
+                             conn, params=(symbol,))
+        if stored.empty:
+            continue
+        stored["datetime"] = pd.to_datetime(stored["datetime"], utc=True)
+        expected = exchange.bars(f"FIGI_{symbol}", timeframe)
+        expected = expected[expected["is_complete"] & (expected["time"] >= stored["datetime"].min())]
+        merged = expected.merge(stored, left_on="time", right_on="datetime", how="left", suffixes=("", "_db"))
+        found = merged["datetime"].notna()
+        same = np.isclose(merged[["open", "high", "low", "close", "volume"]].to_numpy(float),
+                          merged[["open_db", "high_db", "low_db", "close_db", "volume_db"]].to_numpy(float)).all(axis=1)
+        missing += int((~found).sum())
+        mismatched += int((found & ~same).sum())
+        expected_total += len(expected)
+    return missing, mismatched, expected_total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    symbols = [f"T{k:02d}" for k in range(args.symbols)]
+    exchange = FakeExchange(symbols, "2025-02-17", "2025-03-17", np.random.default_rng(0))
+    legacy_fetch = Counted(exchange.fetch)
+    sync_fetch = Counted(exchange.fetch)
+    sync = CandleSync(sync_fetch)
+
+    monday = pd.Timestamp("2025-03-10", tz="UTC")
+    session = [(monday + pd.Timedelta(hours=7, minutes=m), "1m") for m in range(5, 525, 5)]
+    session += [(monday + pd.Timedelta(hours=h), "1h") for h in range(8, 17)]
+    session += [(monday + pd.Timedelta(hours=16, minutes=30), "1d")]
+    friday = pd.Timestamp("2025-03-14 16:30", tz="UTC")
+    phases = [
+        ("initial load", [(monday + pd.Timedelta(hours=6), tf) for tf in TIMEFRAMES]),
+        ("session day", sorted(session)),
+        ("Friday catch-up", [(friday, tf) for tf in TIMEFRAMES]),
+        ("weekend", [(friday + pd.Timedelta(days=d), tf) for d in (1, 2) for tf in TIMEFRAMES]),
+        ("after deleted day", [(pd.Timestamp("2025-03-17 07:30", tz="UTC"), tf) for tf in TIMEFRAMES]),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = sqlite3.connect(Path(tmp) / "legacy.db", isolation_level=None)
+        sync_db = sqlite3.connect(Path(tmp) / "sync.db", isolation_level=None)
+        for conn in (legacy_db, sync_db):
+            create_tables(conn)
+
+        print(f"{args.symbols} symbols, timeframes {', '.join(TIMEFRAMES)}")
+        print(f"{'phase':<18}{'runs':>5} | {'legacy: calls':>14}{'candles':>10}{'rows':>9}{'ms/run':>8} | "
+              f"{'sync: calls':>12}{'candles':>10}{'rows':>9}{'ms/run':>8}")
+        for name, runs in phases:
+            if name == "after deleted day":
+                for conn in (legacy_db, sync_db):
+                    for timeframe in TIMEFRAMES:
+                        conn.execute(f"DELETE FROM {get_timeframe_table_name(timeframe)} "
+                                     "WHERE datetime >= '2025-03-12' AND datetime < '2025-03-13'")
+            before = {"legacy": Counter(legacy_fetch.stats), "sync": Counter(sync_fetch.stats)}
+            times = {"legacy": [], "sync": []}
+            gc.collect()
+            gc.disable()
+            try:
+                for clock, timeframe in runs:
+                    exchange.clock = clock
+                    started = time.perf_counter()
+                    legacy_run(legacy_db, exchange, legacy_fetch, symbols, timeframe)
+                    times["legacy"].append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    report = sync_run(sync_db, sync, exchange, symbols, timeframe)
+                    times["sync"].append(time.perf_counter() - started)
+                    sync_fetch.stats["rows_written"] += report.rows_written
+            finally:
+                gc.enable()
+            legacy = legacy_fetch.stats - before["legacy"]
+            synced = sync_fetch.stats - before["sync"]
+            print(f"{name:<18}{len(runs):>5} | {legacy['api_calls']:>14}{legacy['candles_fetched']:>10}"
+                  f"{legacy['rows_written']:>9}{np.median(times['legacy']) * 1e3:>8.1f} | "
+                  f"{synced['api_calls']:>12}{synced['candles_fetched']:>10}{synced['rows_written']:>9}"
+                  f"{np.median(times['sync']) * 1e3:>8.1f}")
+
+        total_legacy, total_sync = legacy_fetch.stats, sync_fetch.stats
+        print(f"{'total':<18}{'':>5} | {total_legacy['api_calls']:>14}{total_legacy['candles_fetched']:>10}"
+              f"{total_legacy['rows_written']:>9}{'':>8} | {total_sync['api_calls']:>12}"
+              f"{total_sync['candles_fetched']:>10}{total_sync['rows_written']:>9}")
+        print(f"sync vs legacy: API calls {total_legacy['api_calls']} -> {total_sync['api_calls']}, "
+              f"candles fetched {100 * (1 - total_sync['candles_fetched'] / total_legacy['candles_fetched']):4.1f}% fewer, "
+              f"rows written {100 * (1 - total_sync['rows_written'] / total_legacy['rows_written']):4.1f}% fewer")
+
+        for timeframe in TIMEFRAMES:
+            results = []
+            for conn in (legacy_db, sync_db):
+                missing, mismatched, expected = check_parity(conn, exchange, symbols, timeframe)
+                results.append(f"{expected - missing - mismatched}/{expected} closed bars match"
+                               f" ({missing} missing, {mismatched} differ)")
+            print(f"{timeframe:>3} stored vs exchange: legacy {results[0]}; sync {results[1]}")
+        legacy_db.close()
+        sync_db.close()
+
+
+if __name__ == "__main__":
+    main()
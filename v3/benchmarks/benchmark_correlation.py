@@ -0,0 +1,136 @@
+"""Benchmark: incremental EWMA correlation matrix vs. recomputing from history.
+
+Builds a synthetic liquid universe (sector factor returns) and measures:
+
+* the per-bar O(N^2) update of CorrelationService;
+* recomputing the EWMA correlation matrix from the full return history with
+  pandas ``ewm(adjust=False).corr`` on every new bar, as a periodic batch
+  job would; the final matrices are checked to match;
+* pairwise and portfolio exposure lookups as used by AdvancedRiskManager;
+* restart cost: loading the persisted state from SQLite vs. warming up a
+  fresh service from ``warmup_bars`` of daily_data.
+
+Usage:
+    python benchmarks/benchmark_correlation.py --symbols 100 --days 500 --repeat 5
+"""
+
+import argparse
+import copy
+import gc
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core import database  # noqa: E402
+from core.analytics import AdvancedRiskManager, CorrelationConfig, CorrelationService, RiskProfile  # noqa: E402
+
+
+def make_closes(symbols: int, days: int, rng) -> pd.DataFrame:
+    dates = pd.bdate_range("2022-01-03", periods=days).strftime("%Y-%m-%d")
+    factors = rng.normal(0, 0.01, (days, 8))
+    returns = factors[:, np.arange(symbols) % 8] + rng.normal(0, 0.007, (days, symbols))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(closes, index=dates, columns=[f"T{k:03d}" for k in range(symbols)])
+
+
+def timed(func, repeat: int):
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - started)
+        return float(np.median(times)), result
+    finally:
+        gc.enable()
+
+
+def recompute_matrix(returns: pd.DataFrame, alpha: float) -> np.ndarray:
+    """EWMA correlation of the latest bar recomputed from the whole history."""
+    corr = returns.ewm(alpha=alpha, adjust=False).corr()
+    return corr.loc[returns.index[-1]].to_numpy()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    closes = make_closes(args.symbols, args.days, rng)
+    config = CorrelationConfig(universe_size=args.symbols, warmup_bars=args.days)
+    alpha = 1 - config.decay
+
+    history, last_bar = closes.iloc[:-1], closes.iloc[-1]
+    service = CorrelationService(closes.columns, config)
+    service.update_frame(history)
+
+    def one_bar():
+        warm = copy.deepcopy(service)
+        warm.update(closes.index[-1], last_bar.to_dict())
+        return warm
+
+    update_time, updated = timed(one_bar, args.repeat)
+    returns = closes.pct_change().iloc[1:]
+    recompute_time, expected = timed(lambda: recompute_matrix(returns, alpha), max(1, args.repeat // 2))
+    incremental = updated.correlation_matrix().to_numpy()
+    print(f"universe: {args.symbols} symbols x {args.days} bars, halflife {config.halflife:g} bars")
+    print(f"incremental update, one bar     {update_time * 1e3:9.3f} ms")
+    print(f"pandas ewm recompute, one bar   {recompute_time * 1e3:9.3f} ms  (x{recompute_time / update_time:7.1f})")
+    print(f"matrix parity with pandas ewm(adjust=False).corr: max |diff| "
+          f"{np.nanmax(np.abs(incremental - expected)):.2e}")
+
+    symbols = list(closes.columns)
+    book = {symbol: ("long" if k % 2 else "short", 10000.0) for k, symbol in enumerate(symbols[1:11])}
+    pair_time, _ = timed(lambda: [updated.correlation(symbols[0], other) for other in symbols], args.repeat)
+    exposure_time, exposure = timed(lambda: updated.exposure(symbols[0], "long", book), args.repeat)
+    print(f"pairwise lookups                {pair_time / len(symbols) * 1e6:9.3f} us each")
+    print(f"exposure vs {len(book)} positions       {exposure_time * 1e6:9.3f} us  "
+          f"(max {exposure.max_correlation:.2f} with {exposure.max_symbol}, "
+          f"portfolio {exposure.portfolio_correlation:.2f})")
+
+    manager = AdvancedRiskManager(RiskProfile(max_correlation=0.5, max_positions=20,
+                                              max_position_size=1e6, max_portfolio_risk=1.0),
+                                  correlation_service=updated)
+    for symbol in symbols[1:4]:
+        manager.add_position(symbol, "long", 10, float(last_bar[symbol]), closes.index[-1], 1.0)
+    same_sector = symbols[1 + 8]
+    print(f"can_open_position {same_sector} (same sector as {symbols[1]}): "
+          f"{manager.can_open_position(same_sector, 'long', 10, float(last_bar[same_sector]), 1.0)}")
+    print(f"can_open_position {same_sector} short:                  "
+          f"{manager.can_open_position(same_sector, 'short', 10, float(last_bar[same_sector]), 1.0)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.get_connection(Path(tmp) / "correlation.db")
+        database.create_tables(conn)
+        for symbol in symbols:
+            company_id = database.get_or_create_company_id(conn, symbol)
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO daily_data (company_id, date, close, volume) VALUES (?, ?, ?, 1000)",
+                    [(company_id, date, float(close)) for date, close in closes[symbol].items()])
+
+        warmup_time, built = timed(lambda: CorrelationService.from_database(conn, config, rebuild=True), 1)
+        load_time, loaded = timed(lambda: CorrelationService.from_database(conn, config), args.repeat)
+        same = np.allclose(built.correlation_matrix().to_numpy(), loaded.correlation_matrix().to_numpy(),
+                           equal_nan=True)
+        print(f"restart: warm-up from daily_data {warmup_time * 1e3:9.1f} ms, "
+              f"load persisted state {load_time * 1e3:7.1f} ms (x{warmup_time / load_time:5.1f}), same matrix: {same}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark: demo position valuation, one latest-price query vs. a query per position.
+
+Builds a file database with daily candles and demo positions, then values the
+positions the previous way (a JOIN + ORDER BY lookup of the latest close for
+each position, then row-by-row arithmetic) and through demo_trading, which
+fetches all latest closes in one query and merges price cache quotes.
+Market values are checked to match.
+
+Usage:
+    python benchmarks/benchmark_demo_snapshot.py --companies 300 --rows 2500 --positions 10 50 200
+"""
+
+import argparse
+import gc
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core import database, demo_trading  # noqa: E402
+from core.price_cache import get_price_cache  # noqa: E402
+
+
+def legacy_latest_price(conn, contract_code):
+    row = conn.execute(
+        """
+        SELECT dd.close
+        FROM daily_data dd
+        JOIN companies c ON dd.company_id = c.id
+        WHERE c.contract_code = ?
+        ORDER BY dd.date DESC
+        LIMIT 1
+        """,
+        (contract_code,),
+    ).fetchone()
+    return float(row[0]) if row and row[0] is not None else None
+
+
+def legacy_positions(conn):
+    """Previous get_positions body: one latest-price query per position."""
+    df = pd.read_sql_query(
+        "SELECT contract_code, quantity, avg_price, realized_pl, updated_at FROM demo_positions ORDER BY contract_code",
+        conn,
+    )
+    if df.empty:
+        return df
+    df["quantity"] = df["quantity"].astype(float)
+    df["avg_price"] = df["avg_price"].astype(float)
+    df["invested_value"] = df["quantity"] * df["avg_price"]
+    market_prices, market_values = [], []
+    for ticker, qty in zip(df["contract_code"], df["quantity"]):
+        price = legacy_latest_price(conn, ticker)
+        market_prices.append(price)
+        market_values.append(price * qty if price is not None else None)
+    df["market_price"] = market_prices
+    df["market_value"] = market_values
+    df["unrealized_pl"] = df["market_value"] - df["invested_value"]
+    return df
+
+
+def timed(func, conn, repeat):
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(conn)
+            times.append(time.perf_counter() - started)
+        return float(np.median(times)), result
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=2500)
+    parser.add_argument("--positions", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2015-01-01", periods=args.rows).strftime("%Y-%m-%d")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = database.get_connection(Path(tmp) / "demo.db")
+        database.create_tables(conn)
+        for k in range(args.companies):
+            company_id = database.get_or_create_company_id(conn, f"T{k:03d}")
+            conn.execute("UPDATE companies SET figi = ? WHERE id = ?", (f"FIGI{k:03d}", company_id))
+            closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, args.rows)))
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT INTO daily_data (company_id, date, close) VALUES (?, ?, ?)",
+                                 [(company_id, date, float(close)) for date, close in zip(dates, closes)])
+
+        held = 0
+        for count in sorted(args.positions):
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO demo_positions (contract_code, quantity, avg_price) VALUES (?, 10, 50.0)",
+                    [(f"T{k:03d}",) for k in range(held, min(count, args.companies))])
+            held = min(count, args.companies)
+            legacy_time, legacy = timed(legacy_positions, conn, args.repeat)
+            single_time, current = timed(demo_trading._positions_frame, conn, args.repeat)
+            same = np.allclose(legacy["market_value"].astype(float), current["market_value"], equal_nan=True)
+            print(f"{held:4d} positions: per-position queries {legacy_time * 1e3:7.2f} ms  "
+                  f"single query {single_time * 1e3:7.2f} ms (x{legacy_time / single_time:4.1f})  "
+                  f"same market values: {same}")
+
+        # Ticks for every held contract: valuation reads them without touching daily_data again
+        now = pd.Timestamp.now(tz="UTC")
+        for k in range(held):
+            get_price_cache().update(f"FIGI{k:03d}", 1.0, now, "tick")
+        tick_time, marked = timed(demo_trading._positions_frame, conn, args.repeat)
+        print(f"{held:4d} positions with cached ticks: {tick_time * 1e3:7.2f} ms, "
+              f"{int((marked['price_source'] == 'tick').sum())} marked from ticks")
+        snapshot_time, _ = timed(demo_trading.get_account_snapshot, conn, args.repeat)
+        print(f"get_account_snapshot: {snapshot_time * 1e3:7.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: ML inputs from SQLite + pandas indicators vs. the feature store.
+
+Builds a throw-away SQLite database with synthetic daily candles and compares,
+per symbol:
+
+* the previous path — ``SELECT`` from ``data_1d`` and recompute
+  ``sma_20``/``rsi``/``macd``/``bb_*`` in pandas;
+* a memory-mapped ``FeatureView`` from the feature store;
+* an incremental append of one new bar after a data update.
+
+Usage:
+    python benchmarks/benchmark_feature_store.py --symbols 200 --rows 2500
+"""
+
+import argparse
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Loaded by path: the module only needs numpy/pandas and core, unlike the core.ml package
+_spec = importlib.util.spec_from_file_location("feature_store", ROOT / "core" / "ml" / "feature_store.py")
+fs = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fs)
+
+
+def synthetic_db(path: Path, symbols: int, rows: int) -> pd.DatetimeIndex:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2010-01-01", periods=rows, freq="D")
+    frames = []
+    for k in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        frames.append(pd.DataFrame({
+            "symbol": f"S{k:04d}",
+            "datetime": dates.strftime("%Y-%m-%dT%H:%M:%S"),
+            "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+            "volume": rng.integers(1, 10_000, rows),
+        }))
+    with sqlite3.connect(path) as conn:
+        pd.concat(frames).to_sql("data_1d", conn, index=False)
+        conn.execute("CREATE UNIQUE INDEX idx_data_1d ON data_1d(symbol, datetime)")
+    return dates
+
+
+def read_from_db(conn, symbol: str) -> pd.DataFrame:
+    df = pd.read_sql_query(
+        "SELECT datetime as date, open, high, low, close, volume FROM data_1d "
+        "WHERE symbol = ? ORDER BY datetime", conn, params=(symbol,))
+    df["date"] = pd.to_datetime(df["date"])
+    return fs.compute_ml_features(df.set_index("date")).ffill().fillna(0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=2500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "stock_data.db"
+        dates = synthetic_db(db_path, args.symbols, args.rows)
+        symbols = [f"S{k:04d}" for k in range(args.symbols)]
+        store = fs.FeatureStore(fs.FeatureStoreConfig(root=Path(tmp) / "feature_store", db_path=str(db_path)))
+
+        started = time.perf_counter()
+        store.refresh(symbols)
+        build = time.perf_counter() - started
+
+        conn = sqlite3.connect(db_path)
+        started = time.perf_counter()
+        for symbol in symbols:
+            read_from_db(conn, symbol)
+        sqlite_read = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for symbol in symbols:
+            view = store.get_view(symbol)
+            view.matrix(fs.STORE_COLUMNS)
+        view_read = time.perf_counter() - started
+
+        # One new bar per symbol, then an incremental refresh
+        next_day = (dates[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S")
+        conn.executemany(
+            "INSERT INTO data_1d (symbol, datetime, open, high, low, close, volume) VALUES (?, ?, 1, 1, 1, 1, 1)",
+            [(symbol, next_day) for symbol in symbols])
+        conn.commit()
+        started = time.perf_counter()
+        store.refresh(symbols, conn=conn)
+        append = time.perf_counter() - started
+        conn.close()
+
+    n = args.symbols
+    print(f"initial materialisation   {build / n * 1e3:8.2f} ms/symbol")
+    print(f"sqlite + pandas features  {sqlite_read / n * 1e3:8.2f} ms/symbol")
+    print(f"feature store view+matrix {view_read / n * 1e3:8.2f} ms/symbol  (x{sqlite_read / view_read:5.1f})")
+    print(f"incremental append (1 bar){append / n * 1e3:8.2f} ms/symbol")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark: technical_indicators materialisation, per-row vs. bulk and full vs. incremental.
+
+Builds a file database with synthetic daily candles and measures:
+
+* writing the same indicator rows with update_technical_indicators (SELECT
+  then UPDATE/INSERT and a commit per row) vs. one upsert_technical_indicators
+  call;
+* a full materialisation run, a no-op run and incremental runs after one new
+  bar per company, checking that incremental rows match a full recompute.
+
+Usage:
+    python benchmarks/benchmark_indicator_materialization.py --companies 50 --rows 2000 --cycles 3
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core import database  # noqa: E402
+from core.indicators import materialize  # noqa: E402
+
+
+def insert_bars(conn, tickers, dates, rng, last_close):
+    rows = []
+    for ticker in tickers:
+        company_id = database.get_or_create_company_id(conn, ticker)
+        close = last_close.get(ticker, 100.0) * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        volume = rng.integers(1_000, 100_000, len(dates)).astype(float)
+        rows.extend(
+            (company_id, date.strftime("%Y-%m-%d"), c * 0.995, c * 0.97, c * 1.03, c, v)
+            for date, c, v in zip(dates, close, volume)
+        )
+        last_close[ticker] = close[-1]
+    conn.executemany(
+        "INSERT INTO daily_data (company_id, date, open, low, high, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows)
+    conn.commit()
+
+
+def indicator_rows(conn):
+    rows = []
+    for (company_id,) in conn.execute("SELECT id FROM companies ORDER BY id").fetchall():
+        data = pd.read_sql_query(
+            "SELECT date, open, high, low, close, volume FROM daily_data WHERE company_id = ? ORDER BY date",
+            conn, params=[company_id])
+        rows.extend(materialize.compute_indicator_rows(company_id, data, materialize.indicator_parameters(None)))
+    return rows
+
+
+def bench_writes(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM technical_indicators")
+    conn.commit()
+    started = time.perf_counter()
+    for row in rows:
+        database.update_technical_indicators(
+            conn, dict(zip(database.TECHNICAL_INDICATOR_COLUMNS, row[2:])), company_id=row[0], date=row[1])
+    per_row = time.perf_counter() - started
+
+    conn.execute("DELETE FROM technical_indicators")
+    conn.commit()
+    started = time.perf_counter()
+    database.upsert_technical_indicators(conn, rows)
+    bulk = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rewritten = database.upsert_technical_indicators(conn, rows)
+    unchanged = time.perf_counter() - started
+    conn.close()
+    return per_row, bulk, unchanged, rewritten
+
+
+def compare_with_full(conn):
+    incremental = pd.read_sql_query("SELECT * FROM technical_indicators ORDER BY company_id, date", conn)
+    materialize.materialize_technical_indicators(conn, full=True)
+    full = pd.read_sql_query("SELECT * FROM technical_indicators ORDER BY company_id, date", conn)
+    columns = list(database.TECHNICAL_INDICATOR_COLUMNS)
+    assert len(incremental) == len(full)
+    return np.nanmax(np.abs(incremental[columns].to_numpy(float) - full[columns].to_numpy(float))
+                     / np.maximum(np.abs(full[columns].to_numpy(float)), 1.0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{k:03d}" for k in range(args.companies)]
+    dates = pd.bdate_range("2010-01-04", periods=args.rows)
+    last_close = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "indicators.db"
+        conn = database.get_connection(db_path)
+        database.create_tables(conn)
+        insert_bars(conn, tickers, dates, rng, last_close)
+
+        rows = indicator_rows(conn)
+        per_row, bulk, unchanged, rewritten = bench_writes(db_path, rows)
+        print(f"write {len(rows)} rows: per-row {per_row * 1e3:9.1f} ms  "
+              f"bulk upsert {bulk * 1e3:7.1f} ms (x{per_row / bulk:5.1f})  "
+              f"re-upsert unchanged {unchanged * 1e3:7.1f} ms ({rewritten} rows rewritten)")
+
+        conn.execute("DELETE FROM technical_indicators")
+        full = materialize.materialize_technical_indicators(conn)
+        noop = materialize.materialize_technical_indicators(conn)
+        print(f"full run         {full.elapsed * 1e3:8.1f} ms  {full.bars_read:7d} bars read  "
+              f"{full.rows_written:7d} rows written")
+        print(f"no new bars      {noop.elapsed * 1e3:8.1f} ms  {noop.bars_read:7d} bars read  "
+              f"{noop.rows_written:7d} rows written")
+
+        elapsed = []
+        for k in range(args.cycles):
+            insert_bars(conn, tickers, pd.DatetimeIndex([dates[-1] + pd.offsets.BDay(k + 1)]), rng, last_close)
+            stats = materialize.materialize_technical_indicators(conn)
+            elapsed.append(stats.elapsed)
+        print(f"incremental run  {np.mean(elapsed) * 1e3:8.1f} ms  {stats.bars_read:7d} bars read  "
+              f"{stats.rows_written:7d} rows written  (x{full.elapsed / np.mean(elapsed):5.1f} vs full)")
+        print(f"max relative difference incremental vs full recompute: {compare_with_full(conn):.2e}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark: TradingEngine full-history cycles vs. live (new bars only) cycles.
+
+Builds an in-memory database with synthetic daily candles, runs one warm-up
+cycle per mode, then appends one bar per ticker before each further cycle.
+Reports cycle latency from ``get_engine_status`` and checks that both modes
+take the same filter decisions for the new bars.
+
+Usage:
+    python benchmarks/benchmark_live_trading_cycle.py --tickers 20 --rows 5000 --cycles 5
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core import database  # noqa: E402
+from core.analytics.auto_trader import TradingSession  # noqa: E402
+from core.analytics.trading_engine import TradingEngine  # noqa: E402
+
+DECISION_COLUMNS = ["final_filter", "filtered_long_signal", "filtered_short_signal"]
+
+
+def insert_bars(conn, tickers, dates, rng, last_close=None):
+    rows = []
+    for ticker in tickers:
+        company_id = database.get_or_create_company_id(conn, ticker)
+        start = 100.0 if last_close is None else last_close[ticker]
+        close = start * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        volume = rng.integers(1_000, 100_000, len(dates)).astype(float)
+        rows.extend(
+            (company_id, date.strftime("%Y-%m-%d"), c * 0.995, c * 0.97, c * 1.03, c, v)
+            for date, c, v in zip(dates, close, volume)
+        )
+        if last_close is not None:
+            last_close[ticker] = close[-1]
+    conn.executemany(
+        "INSERT INTO daily_data (company_id, date, open, low, high, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows)
+    conn.commit()
+
+
+def make_engine(conn, live_mode):
+    engine = TradingEngine(None, conn, live_mode=live_mode)
+    engine.is_running = True
+    engine.auto_trader.current_session = TradingSession(
+        session_id="benchmark", start_time=pd.Timestamp.now(), settings={},
+        daily_order_count=0, active_positions={})
+    decisions = {}
+    generate = engine.auto_trader._generate_signals
+
+    def capture(data, contract_code, new_bars=None):
+        decisions[contract_code] = data.tail(new_bars or 1)[DECISION_COLUMNS].to_numpy()
+        return generate(data, contract_code, new_bars)
+
+    engine.auto_trader._generate_signals = capture
+    return engine, decisions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{k:03d}" for k in range(args.tickers)]
+    conn = sqlite3.connect(":memory:")
+    database.create_tables(conn)
+    dates = pd.bdate_range("2000-01-03", periods=args.rows)
+    insert_bars(conn, tickers, dates, rng)
+    last_close = {
+        ticker: conn.execute(
+            "SELECT close FROM daily_data d JOIN companies c ON c.id = d.company_id "
+            "WHERE c.contract_code = ? ORDER BY date DESC LIMIT 1", (ticker,)).fetchone()[0]
+        for ticker in tickers
+    }
+
+    full, full_decisions = make_engine(conn, live_mode=False)
+    live, live_decisions = make_engine(conn, live_mode=True)
+    full.run_cycle()
+    live.run_cycle()
+    full.cycle_latencies.clear()
+    live.cycle_latencies.clear()
+
+    mismatches = 0
+    for k in range(args.cycles):
+        new_dates = pd.DatetimeIndex([dates[-1] + pd.offsets.BDay(k + 1)])
+        insert_bars(conn, tickers, new_dates, rng, last_close)
+        full.run_cycle()
+        live.run_cycle()
+        mismatches += sum(
+            not np.array_equal(full_decisions[ticker], live_decisions[ticker]) for ticker in tickers)
+
+    for label, engine in (("full history", full), ("live", live)):
+        latency = engine.get_engine_status()["cycle_latency"]
+        print(f"{label:12s} cycle latency mean {latency['mean'] * 1e3:8.1f} ms  "
+              f"p95 {latency['p95'] * 1e3:8.1f} ms  "
+              f"({latency['mean'] / args.tickers * 1e3:6.1f} ms/ticker)")
+    print(f"filter decisions differing on new bars: {mismatches} of {args.cycles * args.tickers}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Benchmark: vectorised portfolio backtest vs. a per-position replay loop.
+
+Builds a synthetic universe (sector factor returns, ATR, random long/short
+signals) and measures:
+
+* PortfolioBacktester on the (dates x symbols) panel;
+* a reference replay with the same rules that walks every open position and
+  every candidate in Python, bar by bar, the way AdvancedRiskManager handles
+  positions live; equity curves and trade logs are checked to match;
+* isolated per-contract simulate_trades for all contracts (no shared
+  capital); with portfolio limits switched off the engine must produce the
+  same trades.
+
+Usage:
+    python benchmarks/benchmark_portfolio_backtest.py --symbols 200 --days 252 --repeat 3
+"""
+
+import argparse
+import logging
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.analytics import RiskProfile, TradingCosts, simulate_trades  # noqa: E402
+from core.analytics.portfolio_backtest import (  # noqa: E402
+    CORRELATION_MIN_PERIODS,
+    PortfolioBacktester,
+    PortfolioPanel,
+)
+from core.indicators.calculations import ATR_COL  # noqa: E402
+
+
+def make_universe(symbols: int, days: int, rng) -> pd.DataFrame:
+    dates = pd.bdate_range("2024-01-01", periods=days)
+    factors = rng.normal(0, 0.01, (days, 8))
+    frames = []
+    for k in range(symbols):
+        close = 100 * np.exp(np.cumsum(factors[:, k % 8] + rng.normal(0, 0.015, days)))
+        high = close * (1 + np.abs(rng.normal(0, 0.01, days)))
+        low = close * (1 - np.abs(rng.normal(0, 0.01, days)))
+        frames.append(pd.DataFrame({
+            "date": dates, "contract_code": f"T{k:03d}", "close": close, "high": high, "low": low,
+            ATR_COL: pd.Series(high - low).rolling(14, min_periods=1).mean(),
+            "long_signal": (rng.random(days) < 0.03).astype(int),
+            "short_signal": (rng.random(days) < 0.02).astype(int),
+            "long_probability": rng.random(days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def reference_backtest(panel: PortfolioPanel, profile: RiskProfile, costs: TradingCosts,
+                       initial_capital: float, correlation_window: int):
+    """Same rules as PortfolioBacktester, one position and one candidate at a time."""
+    n_dates, n_symbols = panel.shape
+    mark = pd.DataFrame(panel.close).ffill().to_numpy()
+    returns = np.zeros_like(mark)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = mark[1:] / mark[:-1] - 1
+    returns[~np.isfinite(returns)] = 0.0
+
+    positions = {}
+    last_exit = {}
+    cash = peak = previous_equity = initial_capital
+    equity_curve, trades, rejections = [], [], Counter()
+    for t in range(n_dates):
+        for symbol, pos in list(positions.items()):
+            high, low, close = panel.high[t, symbol], panel.low[t, symbol], panel.close[t, symbol]
+            side, entry = pos["side"], pos["entry"]
+            reason = None
+            if pos["index"] < t and not (np.isnan(high) or np.isnan(low)):
+                favorable = (high - entry) / entry if side > 0 else (entry - low) / entry
+                adverse = (low - entry) / entry if side > 0 else (entry - high) / entry
+                pos["mfe"], pos["mae"] = max(pos["mfe"], favorable), min(pos["mae"], adverse)
+                if (low <= pos["stop"]) if side > 0 else (high >= pos["stop"]):
+                    reason, price = "stop", pos["stop"]
+                elif (high >= pos["target"]) if side > 0 else (low <= pos["target"]):
+                    reason, price = "target", pos["target"]
+                else:
+                    atr = panel.atr[t, symbol]
+                    atr = pos["atr"] if np.isnan(atr) else atr
+                    if side > 0:
+                        pos["stop"] = max(pos["stop"], high - profile.trailing_stop_multiplier * atr)
+                    else:
+                        pos["stop"] = min(pos["stop"], low + profile.trailing_stop_multiplier * atr)
+                    if t - pos["index"] >= profile.max_holding_days and not np.isnan(close):
+                        reason, price = "time", mark[t, symbol]
+            if reason is None and t == n_dates - 1:
+                reason, price = "end", mark[t, symbol]
+            if reason is None:
+                continue
+            holding = max(1, t - pos["index"])
+            gross = side * (price - entry) / entry
+            net = gross - costs.round_trip_cost(holding) - max(gross, 0.0) * costs.tax_pct
+            notional = pos["units"] * entry
+            cash += notional + notional * net
+            trades.append((panel.symbols[symbol], pos["index"], t, price, net, reason))
+            del positions[symbol]
+            last_exit[symbol] = t
+
+        equity = cash + sum(p["units"] * p["entry"] + p["side"] * p["units"] * (mark[t, s] - p["entry"])
+                            for s, p in positions.items())
+        peak = max(peak, equity)
+        open_risk = sum(max(p["side"] * (mark[t, s] - p["stop"]), 0.0) * p["units"]
+                        for s, p in positions.items())
+        if t < n_dates - 1:
+            candidates = [s for s in range(n_symbols)
+                          if s not in positions and last_exit.get(s, -1) < t
+                          and panel.long_signal[t, s] != panel.short_signal[t, s]
+                          and panel.close[t, s] > 0 and not np.isnan(panel.atr[t, s])]
+            candidates.sort(key=lambda s: -panel.score[t, s])
+            blocked = None
+            if equity - previous_equity < -profile.max_daily_loss * previous_equity:
+                blocked = "daily_loss"
+            elif (peak - equity) / peak > profile.max_drawdown:
+                blocked = "max_drawdown"
+            for k, symbol in enumerate(candidates):
+                if blocked:
+                    rejections[blocked] += 1
+                    continue
+                if len(positions) >= profile.max_positions:
+                    rejections["max_positions"] += 1
+                    continue
+                side = 1 if panel.long_signal[t, symbol] else -1
+                price, atr = panel.close[t, symbol], panel.atr[t, symbol]
+                units = np.floor(min(profile.max_position_size, cash) / price)
+                if units < 1:
+                    rejections["insufficient_cash"] += 1
+                    continue
+                risk = units * atr * profile.stop_loss_atr_multiplier
+                if open_risk + risk > profile.max_portfolio_risk * equity:
+                    rejections["portfolio_risk"] += 1
+                    continue
+                window = returns[max(1, t - correlation_window + 1):t + 1]
+                if positions and len(window) >= CORRELATION_MIN_PERIODS:
+                    correlated = False
+                    for other, pos in positions.items():
+                        pair = np.corrcoef(window[:, symbol], window[:, other])[0, 1]
+                        if np.nan_to_num(pair) * side * pos["side"] > profile.max_correlation:
+                            correlated = True
+                            break
+                    if correlated:
+                        rejections["correlation"] += 1
+                        continue
+                positions[symbol] = {
+                    "side": side, "entry": price, "units": units, "index": t, "atr": atr, "mfe": 0.0, "mae": 0.0,
+                    "stop": price - side * atr * profile.stop_loss_atr_multiplier,
+                    "target": price + side * atr * profile.take_profit_atr_multiplier,
+                }
+                cash -= units * price
+                open_risk += risk
+        equity_curve.append(equity)
+        previous_equity = equity
+    return np.array(equity_curve), trades, rejections
+
+
+def isolated_trades(data: pd.DataFrame, profile: RiskProfile, costs: TradingCosts, direction: str):
+    params = SimpleNamespace(
+        atr_stop_multiplier=profile.stop_loss_atr_multiplier,
+        atr_target_multiplier=profile.take_profit_atr_multiplier,
+        trailing_stop_multiplier=profile.trailing_stop_multiplier,
+        max_holding_days=profile.max_holding_days,
+    )
+    trades = []
+    for code, frame in data.groupby("contract_code", sort=True):
+        for trade in simulate_trades(frame, signal_col=f"{direction}_signal", direction=direction,
+                                     atr_col=ATR_COL, risk_params=params, costs=costs):
+            trades.append((code, trade.entry_date, trade.exit_date, trade.net_return))
+    return trades
+
+
+def median_time(func, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return float(np.median(times)), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    data = make_universe(args.symbols, args.days, rng)
+    costs = TradingCosts(commission_pct=0.0005, slippage_pct=0.0005, tax_pct=0.13)
+    profile = RiskProfile(max_positions=20, max_position_size=50000, max_correlation=0.5)
+    engine = PortfolioBacktester(profile, costs)
+
+    panel_time, panel = median_time(lambda: PortfolioPanel.from_frame(data, score_col="long_probability"),
+                                    args.repeat)
+    engine_time, result = median_time(lambda: engine.run(panel), args.repeat)
+    reference_time, (ref_equity, ref_trades, ref_rejections) = median_time(
+        lambda: reference_backtest(panel, profile, costs, engine.initial_capital, engine.correlation_window),
+        args.repeat)
+
+    summary = result.summary()
+    print(f"universe: {args.symbols} symbols x {args.days} bars, {int(panel.long_signal.sum() + panel.short_signal.sum())} signals")
+    print(f"panel build                 {panel_time * 1e3:8.1f} ms")
+    print(f"vectorised portfolio run    {engine_time * 1e3:8.1f} ms")
+    print(f"per-position replay         {reference_time * 1e3:8.1f} ms  (x{reference_time / engine_time:5.1f})")
+    print(f"trades {summary['total_trades']}, final equity {summary['final_equity']:,.0f}, "
+          f"max drawdown {summary['max_drawdown']:.2%}, rejections {result.rejections}")
+
+    trades = list(zip(result.trades["contract_code"], result.trades["entry_date"].map(panel.dates.get_loc),
+                      result.trades["exit_date"].map(panel.dates.get_loc)))
+    same_trades = sorted(trades) == sorted((code, entry, exit_) for code, entry, exit_, *_ in ref_trades)
+    print(f"reference parity: equity max |diff| {np.abs(result.equity['equity'].to_numpy() - ref_equity).max():.2e}, "
+          f"same trades {same_trades}, same rejections {dict(ref_rejections) == result.rejections}")
+
+    # Without portfolio limits every signal trades as in the per-contract simulation
+    unconstrained = RiskProfile(max_positions=args.symbols, max_position_size=10000, max_portfolio_risk=np.inf,
+                                max_daily_loss=np.inf, max_drawdown=np.inf, max_correlation=np.inf)
+    for direction in ("long", "short"):
+        subset = data.assign(**{f"{other}_signal": 0 for other in ("long", "short") if other != direction})
+        isolated_time, isolated = median_time(lambda: isolated_trades(subset, unconstrained, costs, direction),
+                                              args.repeat)
+        open_ended = PortfolioBacktester(unconstrained, costs, initial_capital=1e12).run(
+            PortfolioPanel.from_frame(subset)).trades
+        # simulate_trades books a trade cut off by the end of data at its entry price; compare completed ones
+        completed = open_ended[open_ended["exit_reason"] != "end"]
+        engine_trades = sorted(zip(completed["contract_code"], completed["entry_date"], completed["exit_date"],
+                                   completed["net_return"].round(12)))
+        isolated = sorted((code, entry, exit_, round(net, 12)) for code, entry, exit_, net in isolated
+                          if (exit_ != entry))
+        print(f"per-contract simulate_trades ({direction:5s}) {isolated_time * 1e3:8.1f} ms, "
+              f"{len(isolated)} trades, identical to unconstrained portfolio run: {engine_trades == isolated}")
+
+
+if __name__ == "__main__":
+    main()
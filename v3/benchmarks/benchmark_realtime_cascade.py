@@ -0,0 +1,193 @@
+"""Benchmark: event-driven cascade re-evaluation vs. a full cascade per closed bar.
+
+Simulates a trading session: synthetic trades are aggregated into 1s and 1m
+bar-close events with BarAggregator, the way EnhancedRealTimeDataManager
+does for the live stream. Measures:
+
+* RealtimeCascade.on_bar_close, which re-runs only the stage of the bar's
+  timeframe and the stages after it on in-memory windows;
+* CascadeAnalyzer.analyze_symbol_cascade after the same bars are written to
+  the database (three 1000-row reads and all stages per bar), on a sample
+  of the events; decisions are checked to match.
+
+Bar close → decision latency percentiles come from RealtimeCascade's metric,
+replayed as if every close were reported at the bar's close time; hourly
+bars are closed by the first minute of the next hour, so their latency
+includes that minute.
+
+Usage:
+    python benchmarks/benchmark_realtime_cascade.py --symbols 5 --minutes 30 --sample 25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+TIMEFRAME_TABLES = {"1h": "data_1hour", "1m": "data_1min", "1s": "data_1s"}
+
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    for table in TIMEFRAME_TABLES.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                datetime TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                UNIQUE(symbol, datetime)
+            )
+        """)
+
+
+def insert_bars(conn: sqlite3.Connection, symbol: str, timeframe: str, rows) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TIMEFRAME_TABLES[timeframe]} (symbol, datetime, open, high, low, close, volume) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(symbol, stamp.isoformat(), *values) for stamp, *values in rows])
+
+
+def make_history(start: pd.Timestamp, rng):
+    """Closed bars before the session: 48 hours, 120 minutes, 120 seconds."""
+    history = {}
+    for timeframe, freq, count in (("1h", "h", 48), ("1m", "min", 120), ("1s", "s", 120)):
+        times = pd.date_range(end=start - pd.Timedelta(1, freq), periods=count, freq=freq)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+        spread = np.abs(rng.normal(0, 0.001, count)) * close
+        volume = rng.integers(100, 1000, count).astype(float)
+        volume[-4:] *= 2  # Rising volume confirms the hourly trend
+        history[timeframe] = [(t, c, c + s, c - s, c, v) for t, c, s, v in zip(times, close, spread, volume)]
+    return history
+
+
+def decision(result):
+    return (result.rejected_at_stage, result.final_signal, round(result.confidence, 9),
+            round(result.entry_price, 9), round(result.stop_loss, 9))
+
+
+async def run(args) -> None:
+    from core.bar_events import BarAggregator
+    from core.cascade_analyzer import CascadeAnalyzer
+    from core.cascade_realtime import RealtimeCascade
+
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(os.environ["STOCKS_DB_PATH"], isolation_level=None)
+    create_tables(conn)
+
+    symbols = [f"T{k:02d}" for k in range(args.symbols)]
+    multi_analyzer = SimpleNamespace(get_figi_for_symbol=lambda symbol: f"FIGI_{symbol}", base_analyzer=None)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        analyzer = CascadeAnalyzer(multi_analyzer)
+    ml_results = {symbol: {"ml_ensemble_signal": "BUY" if k % 3 else "SELL", "ml_price_confidence": 0.8}
+                  for k, symbol in enumerate(symbols)}
+
+    start = pd.Timestamp("2025-03-03 10:00:00")
+    replay = {"offset": 0.0}
+    cascade = RealtimeCascade(analyzer, clock=lambda: time.time() - replay["offset"])
+    for symbol in symbols:
+        history = make_history(start, rng)
+        with conn:
+            conn.execute("BEGIN")
+            for timeframe, rows in history.items():
+                insert_bars(conn, symbol, timeframe, rows)
+        windows = {tf: pd.DataFrame(rows, columns=["time", "open", "high", "low", "close", "volume"])
+                   for tf, rows in history.items()}
+        await cascade.add_symbol(symbol, ml_results[symbol], windows=windows)
+
+    # Trades -> 1s and 1m bar closes, a few trades per second per symbol
+    aggregator = BarAggregator()
+    events = []
+    seconds = args.minutes * 60 + 1
+    for symbol in symbols:
+        price = 100 * np.exp(np.cumsum(rng.normal(0, 0.0004, seconds * 3)))
+        stamps = start + pd.to_timedelta(np.sort(rng.uniform(0, seconds, seconds * 3)), unit="s")
+        for stamp, trade_price in zip(stamps, price):
+            for timeframe in ("1s", "1m"):
+                closed = aggregator.add_tick(symbol, timeframe, stamp, trade_price, 10)
+                if closed is not None:
+                    events.append(closed)
+    events.sort(key=lambda event: (event.close_time, event.timeframe == "1m"))
+
+    # Event-driven pass; hourly bars are closed by the cascade from the minute stream
+    gc.collect()
+    gc.disable()
+    decisions = []
+    started = time.perf_counter()
+    for event in events:
+        replay["offset"] = time.time() - event.close_time.timestamp()
+        decisions.append(decision(await cascade.on_bar_close(event)))
+    incremental_time = time.perf_counter() - started
+    gc.enable()
+
+    # Full cascade per sampled bar, reading the database as analyze_symbol_cascade does
+    sample = set(range(0, len(events), args.sample))
+    mismatches, full_times = 0, []
+    forming_hours = {}
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        for k, event in enumerate(events):
+            insert_bars(conn, event.symbol, event.timeframe, [event.as_row()])
+            if event.timeframe == "1m":
+                hour = event.time.floor("h")
+                forming = forming_hours.get(event.symbol)
+                if forming is not None and hour > forming[0]:
+                    insert_bars(conn, event.symbol, "1h", [tuple(forming)])
+                    forming = None
+                if forming is None:
+                    forming = forming_hours[event.symbol] = [hour, event.open, event.high, event.low,
+                                                             event.close, event.volume]
+                else:
+                    forming[2:] = [max(forming[2], event.high), min(forming[3], event.low),
+                                   event.close, forming[5] + event.volume]
+            if k not in sample:
+                continue
+            started = time.perf_counter()
+            result = await analyzer.analyze_symbol_cascade(event.symbol, ml_results[event.symbol])
+            full_times.append(time.perf_counter() - started)
+            mismatches += decision(result) != decisions[k]
+
+    latency = cascade.get_latency_stats()
+    runs = cascade.get_stage_runs()
+    outcomes = pd.Series([d[0] or "signal" for d in decisions]).value_counts().to_dict()
+    print(f"session: {args.symbols} symbols x {args.minutes} min, {len(events)} bar closes "
+          f"({sum(e.timeframe == '1m' for e in events)} minute, {sum(e.timeframe == '1s' for e in events)} second)")
+    print(f"event-driven cascade        {incremental_time / len(events) * 1e3:8.3f} ms per bar, "
+          f"stage runs {runs}, decisions {outcomes}")
+    full = float(np.median(full_times))
+    print(f"full cascade from database  {full * 1e3:8.3f} ms per bar (median of {len(full_times)}, "
+          f"x{full / (incremental_time / len(events)):5.1f})")
+    print(f"sampled decisions identical: {mismatches == 0} ({len(full_times) - mismatches}/{len(full_times)})")
+    for timeframe, stats in latency.items():
+        if stats["events"]:
+            print(f"bar close -> decision ({timeframe}): p50 {stats['p50'] * 1e3:6.3f} ms  "
+                  f"p95 {stats['p95'] * 1e3:6.3f} ms  max {stats['max'] * 1e3:6.3f} ms  over {stats['events']} bars")
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--sample", type=int, default=25, help="run the full cascade on every N-th bar")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STOCKS_DB_PATH"] = str(Path(tmp) / "cascade.db")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark: scalar vs. vectorised RL trading environment and replay buffer.
+
+Steps the iloc-free ``TradingEnvironment`` one symbol at a time and
+``VectorizedTradingEnvironment`` over K symbols in lockstep with random
+actions, then compares the array-backed ``ReplayBuffer`` against the old
+deque-of-tuples buffer. Only numpy/pandas are needed; the module is loaded
+without the torch-dependent DQN parts when torch is missing.
+
+Usage:
+    python benchmarks/benchmark_rl_environment.py --envs 64 --rows 500
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def load_rl_module() -> dict:
+    try:
+        import core.ml.reinforcement_learning as rl
+        return vars(rl)
+    except Exception:
+        # Without torch the module stops at the DQN classes; the environment
+        # and the buffer are plain numpy and can be exercised on their own.
+        import importlib.util
+        spec = importlib.util.spec_from_file_location("feature_store", ROOT / "core" / "ml" / "feature_store.py")
+        feature_store = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(feature_store)
+        source = (ROOT / "core" / "ml" / "reinforcement_learning.py").read_text(encoding="utf-8")
+        source = source.replace("from .feature_store import FeatureView\n", "")
+        namespace: dict = {"FeatureView": feature_store.FeatureView}
+        env_part = source[:source.index("class DQNNetwork")]
+        buffer_part = source[source.index("class ReplayBuffer"):source.index("class TradingAgent")]
+        exec(env_part + "\n" + buffer_part, namespace)
+        return namespace
+
+
+class DequeReplayBuffer:
+    """The previous buffer: tuples in a deque, re-stacked on every sample."""
+
+    def __init__(self, capacity: int):
+        self.buffer = deque(maxlen=capacity)
+
+    def push(self, state, action, reward, next_state, done):
+        self.buffer.append((state, action, reward, next_state, done))
+
+    def sample(self, batch_size: int):
+        batch = random.sample(self.buffer, batch_size)
+        state, action, reward, next_state, done = map(np.stack, zip(*batch))
+        return state, action, reward, next_state, done
+
+    def __len__(self):
+        return len(self.buffer)
+
+
+def synthetic_frame(rng: np.random.Generator, rows: int) -> pd.DataFrame:
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    frame = pd.DataFrame({
+        'open': close * 0.999, 'high': close * 1.01, 'low': close * 0.99,
+        'close': close, 'volume': rng.integers(1_000, 100_000, rows).astype(float),
+        'rsi': rng.uniform(20, 80, rows),
+    })
+    frame['sma_20'] = frame['close'].rolling(20).mean().bfill()
+    return frame
+
+
+def bench_scalar(rl: dict, frames, rng) -> float:
+    steps = 0
+    started = time.perf_counter()
+    for frame in frames:
+        env = rl['TradingEnvironment'](frame)
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(int(rng.integers(3)))
+            steps += 1
+    return steps / (time.perf_counter() - started)
+
+
+def bench_vectorized(rl: dict, frames, rng) -> float:
+    env = rl['VectorizedTradingEnvironment'](frames)
+    env.reset()
+    steps = 0
+    started = time.perf_counter()
+    while not env.done.all():
+        active = int((~env.done).sum())
+        env.step(rng.integers(3, size=env.num_envs))
+        steps += active
+    return steps / (time.perf_counter() - started)
+
+
+def bench_buffer(buffer, pushes: int, batch_size: int) -> float:
+    state = np.zeros(10, dtype=np.float32)
+    started = time.perf_counter()
+    for i in range(pushes):
+        buffer.push(state, i % 3, 0.0, state, False)
+        if len(buffer) >= batch_size:
+            buffer.sample(batch_size)
+    return pushes / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--pushes", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    rl = load_rl_module()
+    rng = np.random.default_rng(0)
+    frames = [synthetic_frame(rng, args.rows) for _ in range(args.envs)]
+
+    scalar = bench_scalar(rl, frames, rng)
+    vectorized = bench_vectorized(rl, frames, rng)
+    print(f"{'scalar env':<24} {scalar:12.0f} steps/s")
+    print(f"{'vectorized env':<24} {vectorized:12.0f} steps/s  (x{vectorized / scalar:.1f})")
+
+    legacy = bench_buffer(DequeReplayBuffer(10_000), args.pushes, args.batch_size)
+    ring = bench_buffer(rl['ReplayBuffer'](10_000), args.pushes, args.batch_size)
+    print(f"{'deque replay buffer':<24} {legacy:12.0f} push+sample/s")
+    print(f"{'array replay buffer':<24} {ring:12.0f} push+sample/s  (x{ring / legacy:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark: event-driven scheduler wakeups vs. the previous 1-second polling.
+
+Runs a TaskScheduler with a set of idle tasks (next run an hour away) and
+measures, for the current heap-based loop and for a polling variant that
+wakes every second and is not woken by triggers (the previous behaviour):
+
+* loop wakeups and process CPU time while idle;
+* latency from ``trigger_task`` until the task actually starts.
+
+Usage:
+    python benchmarks/benchmark_scheduler_wakeups.py --tasks 50 --idle 5 --triggers 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.scheduler.scheduler import TaskScheduler  # noqa: E402
+
+
+class PollingScheduler(TaskScheduler):
+    """Scheduler that re-checks tasks every second, like before."""
+
+    def _seconds_until_next_event(self) -> float:
+        return min(super()._seconds_until_next_event(), 1.0)
+
+    def _wake(self) -> None:
+        # Triggers are only noticed on the next poll
+        if self._stop_event.is_set():
+            super()._wake()
+
+
+async def run(scheduler_cls, tasks: int, idle: float, triggers: int):
+    scheduler = scheduler_cls(metrics_interval=3600)
+    started_at = {}
+
+    def make_job(name):
+        async def job():
+            started_at[name] = time.perf_counter()
+        return job
+
+    for k in range(tasks):
+        name = f"task_{k}"
+        scheduler.add_task(name, make_job(name), timedelta(hours=1))
+        scheduler.tasks[name].next_run = datetime.now() + timedelta(hours=1)
+
+    runner = asyncio.create_task(scheduler.start())
+    await asyncio.sleep(0.1)
+
+    wakeups = scheduler.wakeups
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    idle_wakeups = scheduler.wakeups - wakeups
+    idle_cpu = time.process_time() - cpu
+
+    latencies = []
+    for k in range(triggers):
+        name = f"task_{k % tasks}"
+        # Stagger triggers relative to the polling phase
+        await asyncio.sleep(0.137)
+        triggered = time.perf_counter()
+        scheduler.trigger_task(name)
+        while started_at.get(name, 0) < triggered:
+            await asyncio.sleep(0.001)
+        latencies.append(started_at[name] - triggered)
+
+    await scheduler.stop()
+    await runner
+    return idle_wakeups, idle_cpu, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=5.0, help="idle period in seconds")
+    parser.add_argument("--triggers", type=int, default=10)
+    args = parser.parse_args()
+
+    for label, cls in (("polling (1 s)", PollingScheduler), ("event-driven", TaskScheduler)):
+        wakeups, cpu, latencies = asyncio.run(run(cls, args.tasks, args.idle, args.triggers))
+        print(f"{label:14s} idle wakeups {wakeups / args.idle:6.2f}/s  "
+              f"idle cpu {cpu / args.idle * 1e3:7.3f} ms/s  "
+              f"trigger latency p50 {statistics.median(latencies) * 1e3:8.2f} ms  "
+              f"max {max(latencies) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
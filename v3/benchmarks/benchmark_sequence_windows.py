@@ -0,0 +1,73 @@
+"""Benchmark: legacy loop-built training sequences vs. zero-copy windows.
+
+Usage:
+    python benchmarks/benchmark_sequence_windows.py --rows 5000 --sequence-length 1440
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.ml.predictive_models import make_sequence_windows  # noqa: E402
+
+
+def legacy_windows(features: np.ndarray, sequence_length: int) -> np.ndarray:
+    X = []
+    for i in range(sequence_length, len(features)):
+        X.append(features[i - sequence_length:i])
+    return np.array(X)
+
+
+def measure(label: str, func, *args) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} shape={result.shape} dtype={result.dtype} "
+          f"time={elapsed * 1000:9.1f} ms peak_alloc={peak / 1024 ** 2:9.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--features", type=int, default=13)
+    parser.add_argument("--sequence-length", type=int, default=1440)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    features64 = rng.random((args.rows, args.features))
+    features32 = features64.astype(np.float32)
+
+    measure("legacy loop (float64)", legacy_windows, features64, args.sequence_length)
+    measure("sliding view (float32)", make_sequence_windows, features32, args.sequence_length)
+
+    try:
+        import torch  # noqa: F401
+        from torch.utils.data import DataLoader
+        from core.ml.predictive_models import SequenceWindowDataset
+    except ImportError:
+        print("torch not installed: skipping lazy dataset iteration benchmark")
+        return
+
+    target = features32[:, 3].copy()
+    dataset = SequenceWindowDataset(features32, target, args.sequence_length)
+    tracemalloc.start()
+    started = time.perf_counter()
+    batches = sum(1 for _ in DataLoader(dataset, batch_size=128, shuffle=True))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'lazy dataset epoch':<28} batches={batches} time={elapsed * 1000:9.1f} ms "
+          f"peak_alloc={peak / 1024 ** 2:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
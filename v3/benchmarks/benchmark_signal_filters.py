@@ -0,0 +1,160 @@
+"""Benchmark: fused SignalFilter with shared rolling statistics vs. the previous per-filter path.
+
+Runs the indicator pipeline for a synthetic universe, then filters every
+ticker the way AutoTrader does. The legacy filter below reproduces the
+previous implementation: each ``_apply_*`` step recomputes its rolling
+windows and inserts a column into a copy of the signals frame. The fused
+filter evaluates a boolean mask matrix in one pass and takes the volume
+average from the cache the pipeline filled. Outputs are checked to match.
+
+Usage:
+    python benchmarks/benchmark_signal_filters.py --tickers 100 --rows 2500 --repeat 5
+"""
+
+import argparse
+import gc
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.analytics.signal_filters import FILTER_NAMES, SignalFilter  # noqa: E402
+from core.indicators import calculate_technical_indicators  # noqa: E402
+from core.indicators.calculations import ATR_COL, BB_MID_COL, BB_STD_COL, RSI_COL  # noqa: E402
+from core.indicators.rolling import ROLLING_STATS_ATTR  # noqa: E402
+
+
+class LegacySignalFilter(SignalFilter):
+    """Previous implementation: independent windows, one column insert per step."""
+
+    def filter_signals(self, data, signals):
+        config = self.config
+        signals = signals.copy()
+        volume_ma = data['volume'].rolling(window=20, min_periods=5).mean()
+        signals['volume_filter'] = data['volume'] / (volume_ma + 1e-9) >= config.min_volume_ratio
+        atr_percentiles = data[ATR_COL].rolling(window=50, min_periods=10).quantile(
+            config.max_volatility_percentile)
+        signals['volatility_filter'] = data[ATR_COL] <= atr_percentiles
+        signals['price_filter'] = (data['close'] >= config.min_price) & (data['close'] <= config.max_price)
+
+        signals['technical_filter'] = True
+        signals['technical_filter'] = signals['technical_filter'] & (
+            (signals['long_signal'] == 0) | (data[RSI_COL] <= config.rsi_overbought))
+        signals['technical_filter'] = signals['technical_filter'] & (
+            (signals['short_signal'] == 0) | (data[RSI_COL] >= config.rsi_oversold))
+        bb_position = (data['close'] - data[BB_MID_COL]) / (data[BB_STD_COL] + 1e-9)
+        signals['technical_filter'] = (
+            signals['technical_filter']
+            & ((signals.get('long_signal', 0) == 0) | (bb_position >= config.bb_oversold))
+            & ((signals.get('short_signal', 0) == 0) | (bb_position <= config.bb_overbought))
+        )
+
+        signals['strength_filter'] = True
+        for col in ['long_probability', 'short_probability', 'composite_signal']:
+            if col in signals.columns:
+                values = signals[col] if 'probability' in col else np.abs(signals[col])
+                signals['strength_filter'] = signals['strength_filter'] & (
+                    (values >= config.min_signal_strength) | signals[col].isna())
+
+        atr_ratio = data[ATR_COL] / (data['close'] + 1e-9)
+        signals['atr_filter'] = (atr_ratio >= config.min_atr_ratio) & (atr_ratio <= config.max_atr_ratio)
+
+        filter_columns = [col for col in signals.columns if col.endswith('_filter')]
+        signals['final_filter'] = signals[filter_columns].all(axis=1)
+        for col in ['long_signal', 'short_signal', 'long_probability', 'short_probability']:
+            if col in signals.columns:
+                signals[f'filtered_{col}'] = signals[col].where(signals['final_filter'], 0)
+        return signals
+
+
+def make_universe(tickers: int, rows: int, rng) -> dict:
+    frames = {}
+    dates = pd.bdate_range("2010-01-04", periods=rows)
+    for k in range(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+        frames[f"T{k:03d}"] = pd.DataFrame({
+            "date": dates.strftime("%Y-%m-%d"),
+            "open": close * 0.995, "low": close * 0.97, "high": close * 1.03, "close": close,
+            "volume": rng.integers(1_000, 100_000, rows).astype(float),
+        })
+    return frames
+
+
+def with_attrs(frame: pd.DataFrame, keep: bool) -> pd.DataFrame:
+    """Frame as AutoTrader hands it to the filter (rolling statistics kept or not).
+
+    The statistics are copied so that a repeat does not reuse the ATR
+    quantiles the fused filter cached on the previous one.
+    """
+    stripped = frame.copy(deep=False)
+    stripped.attrs = {ROLLING_STATS_ATTR: frame.attrs[ROLLING_STATS_ATTR].copy()} if keep else {}
+    return stripped
+
+
+def timed(filter_, frames: dict, keep: bool):
+    inputs = [with_attrs(frame, keep) for frame in frames.values()]
+    # Like timeit: keep collections of earlier passes' garbage out of the timing
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        outputs = [filter_.filter_signals(frame, frame) for frame in inputs]
+        return time.perf_counter() - started, outputs
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    frames = {
+        ticker: calculate_technical_indicators(frame, contract_code=ticker, risk_management=False)
+        for ticker, frame in make_universe(args.tickers, args.rows, rng).items()
+    }
+    print(f"indicator pipeline: {time.perf_counter() - started:6.2f} s for {args.tickers} tickers")
+
+    variants = {
+        "legacy": (LegacySignalFilter(), False),
+        "cold": (SignalFilter(), False),
+        "shared": (SignalFilter(), True),
+    }
+    times = {name: [] for name in variants}
+    outputs = {}
+    # Interleave the variants so that machine noise hits all of them alike
+    for _ in range(args.repeat):
+        for name, (filter_, keep) in variants.items():
+            elapsed, outputs[name] = timed(filter_, frames, keep)
+            times[name].append(elapsed)
+    legacy_time, cold_time, shared_time = (float(np.median(times[name])) for name in variants)
+    legacy, cold, shared = (outputs[name] for name in variants)
+
+    columns = list(FILTER_NAMES) + ["final_filter", "filtered_long_signal", "filtered_short_signal",
+                                    "filtered_long_probability", "filtered_short_probability"]
+    mismatches = sum(
+        not np.array_equal(old[col].to_numpy(float), new[col].to_numpy(float), equal_nan=True)
+        for outputs in (cold, shared) for old, new in zip(legacy, outputs) for col in columns)
+
+    print(f"median of {args.repeat} passes")
+    print(f"legacy filter                 {legacy_time * 1e3:8.1f} ms  ({legacy_time / args.tickers * 1e3:5.2f} ms/ticker)")
+    print(f"fused filter, cold cache      {cold_time * 1e3:8.1f} ms  (x{legacy_time / cold_time:4.1f})")
+    print(f"fused filter, pipeline cache  {shared_time * 1e3:8.1f} ms  (x{legacy_time / shared_time:4.1f})")
+    stats = [frame.attrs[ROLLING_STATS_ATTR] for frame in frames.values()]
+    print(f"rolling statistics per ticker: {sum(s.misses for s in stats) / len(stats):.1f} computed, "
+          f"{sum(s.hits for s in stats) / len(stats):.1f} reused")
+    print(f"mismatching filter columns: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark: 5m/15m/1h bars resampled from data_1min vs. downloaded and stored per timeframe.
+
+Synthetic trades are turned into candles the way the broker API builds them
+(trades grouped by interval start) for 1m, 5m, 15m and 1h. Measures:
+
+* parity: bars served by get_timeframe_data from the 1m table against the
+  API-sourced 5m/15m/1h candles of every symbol;
+* read latency of get_timeframe_data: stored table, first (cold) resample,
+  warm cache after one new minute, and a pandas resample of the 1m rows on
+  every call;
+* database size with and without the 5m/15m tables, and candle downloads
+  per symbol and day with the updater schedules.
+
+Usage:
+    python benchmarks/benchmark_timeframe_resampling.py --symbols 20 --days 15 --repeat 20
+"""
+
+import argparse
+import gc
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.multi_timeframe_db import _read_timeframe_table, add_multi_timeframe_tables, get_timeframe_data  # noqa: E402
+from core.timeframe_resampler import DERIVED_ONLY_TIMEFRAMES, get_resampler  # noqa: E402
+
+FREQ = {"1m": "min", "5m": "5min", "15m": "15min", "1h": "h"}
+TABLES = {"1m": "data_1min", "5m": "data_5min", "15m": "data_15min", "1h": "data_1hour"}
+
+# Downloads per trading day (07:00-15:40 UTC) with the updaters' schedules
+DOWNLOADS_PER_DAY = {"1m": 520, "5m": 104, "15m": 35, "1h": 9}
+
+
+def make_trades(days: int, rng) -> pd.DataFrame:
+    chunks = []
+    for day in pd.bdate_range("2025-03-03", periods=days, tz="UTC"):
+        offsets = np.sort(rng.uniform(0, 520 * 60, 4000))
+        chunks.append(day + pd.Timedelta(hours=7) + pd.to_timedelta(offsets, unit="s"))
+    times = pd.DatetimeIndex(np.concatenate(chunks))
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(times))))
+    return pd.DataFrame({"price": price, "qty": rng.integers(1, 50, len(times))}, index=times)
+
+
+def api_candles(trades: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    grouped = trades.groupby(trades.index.floor(FREQ[timeframe]))
+    return pd.DataFrame({
+        "open": grouped["price"].first(), "high": grouped["price"].max(), "low": grouped["price"].min(),
+        "close": grouped["price"].last(), "volume": grouped["qty"].sum(),
+    }).rename_axis("time").reset_index()
+
+
+def save(conn: sqlite3.Connection, symbol: str, timeframe: str, candles: pd.DataFrame) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLES[timeframe]} (symbol, datetime, open, high, low, close, volume) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(symbol, row.time.isoformat(), row.open, row.high, row.low, row.close, int(row.volume))
+         for row in candles.itertuples()])
+
+
+def pandas_resample(conn: sqlite3.Connection, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+    """Resample all 1m rows on every read, without a cache."""
+    minutes = _read_timeframe_table(conn, symbol, "1m", 10**9).set_index("datetime")
+    bars = minutes.resample(FREQ[timeframe]).agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}).dropna()
+    return bars.tail(limit).reset_index()
+
+
+def timed(func, repeat: int) -> float:
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+        return float(np.median(times))
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=15)
+    parser.add_argument("--limit", type=int, default=1000, help="bars per read, as CascadeAnalyzer requests")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(0)
+    symbols = [f"T{k:02d}" for k in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as tmp:
+        full = sqlite3.connect(Path(tmp) / "all_timeframes.db")
+        base = sqlite3.connect(Path(tmp) / "resampled.db")
+        for conn in (full, base):
+            add_multi_timeframe_tables(conn)
+
+        candles = {}
+        for symbol in symbols:
+            trades = make_trades(args.days, rng)
+            candles[symbol] = {tf: api_candles(trades, tf) for tf in FREQ}
+            for timeframe, frame in candles[symbol].items():
+                save(full, symbol, timeframe, frame)
+                if timeframe not in DERIVED_ONLY_TIMEFRAMES:
+                    save(base, symbol, timeframe, frame)
+        for conn in (full, base):
+            conn.commit()
+            conn.execute("VACUUM")
+
+        # Parity with the API candles, full history
+        mismatches = 0
+        for symbol in symbols:
+            for timeframe in ("5m", "15m", "1h"):
+                expected = candles[symbol][timeframe]
+                served = get_timeframe_data(base, symbol, timeframe, limit=len(expected))
+                same = (len(served) == len(expected)
+                        and (served["datetime"].to_numpy() == expected["time"].to_numpy()).all()
+                        and np.allclose(served[["open", "high", "low", "close", "volume"]].to_numpy(float),
+                                        expected[["open", "high", "low", "close", "volume"]].to_numpy(float)))
+                mismatches += not same
+        print(f"data: {args.symbols} symbols x {args.days} days, "
+              f"{sum(len(c['1m']) for c in candles.values())} minute bars")
+        print(f"resampled 5m/15m/1h identical to API candles: {mismatches == 0} "
+              f"({3 * args.symbols - mismatches}/{3 * args.symbols} series)")
+
+        symbol = symbols[0]
+        resampler = get_resampler()
+        for timeframe in ("5m", "15m", "1h"):
+            stored = timed(lambda: _read_timeframe_table(full, symbol, timeframe, args.limit), args.repeat)
+
+            def cold():
+                resampler.clear()
+                get_timeframe_data(base, symbol, timeframe, limit=args.limit)
+
+            cold_time = timed(cold, max(1, args.repeat // 4))
+            get_timeframe_data(base, symbol, timeframe, limit=args.limit)
+            last = candles[symbol]["1m"].iloc[-1]
+            warm_times = []
+            for step in range(1, args.repeat + 1):
+                # One new minute bar before every read, as the 1m updater writes it
+                save(base, symbol, "1m", pd.DataFrame([{**last, "time": last["time"] + pd.Timedelta(minutes=step)}]))
+                base.commit()
+                warm_times.append(timed(lambda: get_timeframe_data(base, symbol, timeframe, limit=args.limit), 1))
+            warm_time = float(np.median(warm_times))
+            naive = timed(lambda: pandas_resample(base, symbol, timeframe, args.limit), max(1, args.repeat // 4))
+            print(f"{timeframe:>3} read of {args.limit} bars: stored table {stored * 1e3:7.2f} ms, "
+                  f"resampled cold {cold_time * 1e3:7.2f} ms, warm {warm_time * 1e3:6.2f} ms, "
+                  f"pandas resample per read {naive * 1e3:7.2f} ms (x{naive / warm_time:5.1f} vs warm)")
+            base.execute(f"DELETE FROM data_1min WHERE symbol = ? AND datetime > ?",
+                         (symbol, last["time"].isoformat()))
+            base.commit()
+            resampler.clear()
+
+        full_size = (Path(tmp) / "all_timeframes.db").stat().st_size
+        base_size = (Path(tmp) / "resampled.db").stat().st_size
+        print(f"database size: all timeframes {full_size / 2**20:6.1f} MiB, without 5m/15m "
+              f"{base_size / 2**20:6.1f} MiB ({100 * (1 - base_size / full_size):4.1f}% smaller)")
+        before = sum(DOWNLOADS_PER_DAY.values())
+        after = sum(n for tf, n in DOWNLOADS_PER_DAY.items() if tf not in DERIVED_ONLY_TIMEFRAMES)
+        print(f"candle downloads per symbol and trading day: {before} -> {after} "
+              f"({100 * (1 - after / before):4.1f}% fewer GetCandles calls)")
+        full.close()
+        base.close()
+
+
+if __name__ == "__main__":
+    main()
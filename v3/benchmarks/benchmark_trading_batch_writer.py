@@ -0,0 +1,108 @@
+"""Benchmark: per-row commits vs. TradingBatchWriter for auto-trading writes.
+
+Simulates the writes of one trading cycle on a file database: N signals,
+an order per signal, a status update, a processed mark and a trade history
+record. The per-row path uses the save_*/update_* helpers, each of which
+commits; the batch path stages everything and flushes once.
+
+Usage:
+    python benchmarks/benchmark_trading_batch_writer.py --signals 500
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core import database  # noqa: E402
+
+
+def make_signal(k: int) -> dict:
+    return {
+        'contract_code': f"T{k:04d}", 'date': '2024-01-02', 'signal_type': 'long',
+        'signal_strength': 0.8, 'signal_score': 0.5, 'price': 100.0, 'volume': 1000,
+        'atr': 2.0, 'stop_loss': 96.0, 'take_profit': 106.0, 'processed': False,
+    }
+
+
+def make_order(signal: dict, company_id: int) -> dict:
+    return {
+        'signal_id': signal['signal_id'], 'company_id': company_id,
+        'contract_code': signal['contract_code'], 'order_type': 'market',
+        'side': 'BUY', 'quantity': 10, 'price': signal['price'], 'status': 'pending',
+    }
+
+
+def make_trade(order: dict) -> dict:
+    return {
+        'signal_id': order['signal_id'], 'order_id': order['order_id'],
+        'company_id': order['company_id'], 'contract_code': order['contract_code'],
+        'side': order['side'], 'quantity': order['quantity'],
+        'entry_price': order['price'], 'entry_date': '2024-01-02',
+    }
+
+
+def per_row(conn, n: int) -> None:
+    for k in range(n):
+        signal = make_signal(k)
+        signal['signal_id'] = database.save_trading_signal(conn, signal)
+        order = make_order(signal, database.get_or_create_company_id(conn, signal['contract_code']))
+        order['order_id'] = database.save_auto_order(conn, order)
+        database.mark_signal_processed(conn, signal['signal_id'])
+        database.update_order_status(conn, order['order_id'], 'submitted')
+        database.save_trade_history(conn, make_trade(order))
+
+
+def batched(conn, n: int) -> None:
+    batch = database.TradingBatchWriter(conn)
+    signals = [make_signal(k) for k in range(n)]
+    for signal in signals:
+        batch.add_signal(signal)
+    batch.flush()
+
+    company_ids = dict(conn.execute("SELECT contract_code, id FROM companies").fetchall())
+    orders = [make_order(signal, company_ids[signal['contract_code']]) for signal in signals]
+    for signal, order in zip(signals, orders):
+        batch.add_order(order)
+        batch.mark_signal_processed(signal['signal_id'])
+    batch.flush()
+
+    for order in orders:
+        batch.update_order_status(order['order_id'], 'submitted')
+        batch.add_trade(make_trade(order))
+    batch.flush()
+
+
+def run(func, n: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "trading.db")
+        database.create_tables(conn)
+        started = time.perf_counter()
+        func(conn, n)
+        elapsed = time.perf_counter() - started
+        counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("trading_signals", "auto_orders", "auto_trade_history")]
+        assert counts == [n, n, n], counts
+        conn.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--signals", type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    row_time = run(per_row, args.signals)
+    batch_time = run(batched, args.signals)
+    print(f"per-row commits ({6 * args.signals:5d} commits) {row_time * 1e3:9.1f} ms")
+    print(f"batch writer    (    3 commits) {batch_time * 1e3:9.1f} ms  (x{row_time / batch_time:5.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: serial per-symbol training vs. the cost-ordered process pool.
+
+Builds a throwaway database with synthetic daily candles for N symbols and
+trains one LSTM per symbol twice: inline in one process (torch using all
+cores) and through ``TrainingPool`` with pinned worker threads.
+
+Usage:
+    python benchmarks/benchmark_training_pool.py --symbols 50 --epochs 5 --workers 4
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def build_database(db_path: Path, symbols: int, max_rows: int) -> list:
+    rng = np.random.default_rng(0)
+    names = [f"SYM{i:03d}" for i in range(symbols)]
+    conn = sqlite3.connect(db_path)
+    try:
+        from core.database import create_tables
+        create_tables(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS data_1d (
+                symbol TEXT, datetime TEXT, open REAL, high REAL,
+                low REAL, close REAL, volume REAL
+            )
+        """)
+        for name in names:
+            # Разная длина истории, чтобы упорядочивание по стоимости имело смысл
+            rows = int(rng.integers(max_rows // 4, max_rows + 1))
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+            dates = pd.date_range("2020-01-01", periods=rows, freq="D").strftime("%Y-%m-%d")
+            conn.executemany(
+                "INSERT INTO data_1d VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (name, d, c * 0.999, c * 1.01, c * 0.99, c, float(v))
+                    for d, c, v in zip(dates, close, rng.integers(1_000, 100_000, rows))
+                ],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1)))
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        print("torch not installed: nothing to benchmark")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="training_pool_bench_")
+    # MLModelManager и MLModelStorage используют относительные пути stock_data.db и models/
+    os.chdir(workdir)
+    symbols = build_database(Path(workdir) / "stock_data.db", args.symbols, args.rows)
+
+    from core.ml.training_pool import TrainingPool, TrainingPoolConfig
+
+    for label, config in (
+        ("serial (inline)", TrainingPoolConfig(max_workers=1)),
+        (f"pool {args.workers}x{args.threads_per_worker} threads",
+         TrainingPoolConfig(max_workers=args.workers, threads_per_worker=args.threads_per_worker)),
+    ):
+        pool = TrainingPool(config)
+        jobs = pool.build_jobs(symbols, epochs=args.epochs)
+        report = pool.run(jobs)
+        summary = report.summary()
+        peak = max((r.get("peak_rss_mb") or 0.0 for r in report.results), default=0.0)
+        print(f"{label:<24} jobs={summary['jobs']} ok={summary['successful']} "
+              f"wall={summary['wall_seconds']:8.1f}s cpu={summary['cpu_seconds']:8.1f}s "
+              f"throughput={summary['jobs_per_minute']:6.1f} jobs/min peak_rss={peak:7.1f} MiB")
+
+    print(f"artifacts left in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
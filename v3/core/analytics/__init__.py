@@ -15,7 +15,9 @@ from .scoring import ScoringConfig, ScoreWeights, compute_signal_scores
 from .risk import TradeRecord, apply_risk_management, simulate_trades
 from .signal_filters import SignalFilter, FilterConfig, create_adaptive_filter
 from .auto_trader import AutoTrader, TradingSession
+from .correlation import CorrelationConfig, CorrelationExposure, CorrelationService
 from .advanced_risk import AdvancedRiskManager, RiskProfile, Position
+from .portfolio_backtest import PortfolioBacktester, PortfolioBacktestResult, PortfolioPanel
 from .trading_engine import TradingEngine
 from .workflows import (
     run_cross_validation_workflow,
@@ -50,8 +52,14 @@ __all__ = [
     "create_adaptive_filter",
     "AutoTrader",
     "TradingSession",
+    "CorrelationConfig",
+    "CorrelationExposure",
+    "CorrelationService",
     "AdvancedRiskManager",
     "RiskProfile",
     "Position",
+    "PortfolioBacktester",
+    "PortfolioBacktestResult",
+    "PortfolioPanel",
     "TradingEngine",
 ]
@@ -11,6 +11,7 @@ import pandas as pd
 
 from core.analytics.risk import TradeRecord, simulate_trades
 from core.analytics.metrics import TradingCosts
+from core.analytics.correlation import CorrelationExposure, CorrelationService
 
 logger = logging.getLogger(__name__)
 
@@ -51,9 +52,11 @@ class AdvancedRiskManager:
     """Advanced risk management system."""
     
     def __init__(self, risk_profile: Optional[RiskProfile] = None, 
-                 trading_costs: Optional[TradingCosts] = None):
+                 trading_costs: Optional[TradingCosts] = None,
+                 correlation_service: Optional[CorrelationService] = None):
         self.risk_profile = risk_profile or RiskProfile()
         self.trading_costs = trading_costs or TradingCosts()
+        self.correlation_service = correlation_service
         self.positions: Dict[str, Position] = {}
         self.daily_pnl: float = 0.0
         self.portfolio_value: float = 1000000.0  # Default portfolio value
@@ -101,7 +104,11 @@ class AdvancedRiskManager:
             return False, f"Maximum drawdown {current_drawdown:.2%} exceeded"
         
         # Check correlation with existing positions
-        if not self._check_correlation(contract_code):
+        if not self._check_correlation(contract_code, side):
+            exposure = self.correlation_exposure(contract_code, side)
+            if exposure is not None and exposure.max_symbol is not None:
+                return False, (f"High correlation with existing positions: {exposure.max_correlation:.2f} "
+                               f"with {exposure.max_symbol}, {exposure.portfolio_correlation:.2f} with portfolio")
             return False, "High correlation with existing positions"
         
         return True, "Position approved"
@@ -115,16 +122,47 @@ class AdvancedRiskManager:
         
         return abs(entry_price - stop_loss)
     
-    def _check_correlation(self, contract_code: str) -> bool:
-        """Check correlation with existing positions (simplified)."""
-        # In a real implementation, this would calculate actual correlation
-        # For now, we'll use a simple rule: no more than 2 positions in same sector
-        if len(self.positions) < 2:
+    def correlation_exposure(self, contract_code: str, side: str = 'long') -> Optional[CorrelationExposure]:
+        """
+        Return-based correlation of a candidate with the open positions.
+        
+        Returns
+        -------
+        Optional[CorrelationExposure]
+            Signed pairwise and portfolio-level correlation, or None without
+            a correlation service
+        """
+        if self.correlation_service is None:
+            return None
+        book = {
+            code: (pos.side, pos.quantity * pos.current_price)
+            for code, pos in self.positions.items()
+        }
+        return self.correlation_service.exposure(contract_code, side, book)
+    
+    def _check_correlation(self, contract_code: str, side: str = 'long') -> bool:
+        """
+        Check correlation with existing positions.
+        
+        Positions with enough return history in the correlation service are
+        checked pairwise and as a portfolio against ``max_correlation``;
+        the rest fall back to the sector heuristic.
+        """
+        unknown = list(self.positions)
+        exposure = self.correlation_exposure(contract_code, side)
+        if exposure is not None:
+            limit = self.risk_profile.max_correlation
+            if exposure.max_correlation > limit or exposure.portfolio_correlation > limit:
+                return False
+            unknown = [code for code in unknown if code not in exposure.pairwise]
+        
+        # Without return data: no more than 2 positions in the same sector
+        if len(unknown) < 2:
             return True
         
         # Simple heuristic: limit positions in similar contracts
         similar_contracts = 0
-        for pos_contract in self.positions:
+        for pos_contract in unknown:
             if self._are_contracts_similar(contract_code, pos_contract):
                 similar_contracts += 1
         
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -12,17 +13,21 @@ import pandas as pd
 from core.analytics.signal_filters import SignalFilter, FilterConfig
 from core.analytics.scoring import compute_signal_scores, ScoringConfig
 from core.analytics.risk import apply_risk_management
+from core.indicators.rolling import ROLLING_STATS_ATTR
 from core.database import (
     get_auto_trading_settings, update_auto_trading_settings,
-    save_trading_signal, get_pending_signals, save_auto_order,
-    update_order_status, mark_signal_processed, get_daily_order_count,
-    save_trade_history, get_trade_history
+    get_pending_signals, get_daily_order_count, get_trade_history,
+    TradingBatchWriter
 )
 from core.orders.service import create_order
 from core.analyzer import StockAnalyzer
 
 logger = logging.getLogger(__name__)
 
+# Attempts to save order statuses once the orders were sent to the broker
+STATUS_FLUSH_ATTEMPTS = 3
+STATUS_FLUSH_RETRY_DELAY = 0.5  # Seconds, multiplied by the attempt number
+
 
 @dataclass
 class TradingSession:
@@ -44,6 +49,10 @@ class AutoTrader:
         self.db_conn = db_conn
         self.signal_filter = signal_filter or SignalFilter()
         self.current_session: Optional[TradingSession] = None
+        # Statuses of orders already sent to the broker that could not be saved;
+        # written before any new order is submitted
+        self.unsaved_batch: Optional[TradingBatchWriter] = None
+        self.orders_to_reconcile: List[int] = []
     
     def start_trading_session(self) -> TradingSession:
         """Start a new trading session."""
@@ -62,7 +71,9 @@ class AutoTrader:
         logger.info(f"Started trading session: {session_id}")
         return self.current_session
     
-    def process_signals(self, data: pd.DataFrame, contract_code: str) -> List[Dict]:
+    def process_signals(self, data: pd.DataFrame, contract_code: str,
+                        new_bars: Optional[int] = None,
+                        batch: Optional[TradingBatchWriter] = None) -> List[Dict]:
         """
         Process trading signals for a given contract.
         
@@ -72,6 +83,13 @@ class AutoTrader:
             Market data with technical indicators
         contract_code : str
             Contract code to process
+        new_bars : int, optional
+            Emit signals for this many trailing bars, dated by the bar.
+            By default only the latest bar is evaluated, dated today.
+        batch : TradingBatchWriter, optional
+            Stage the signals in the caller's batch (their 'signal_id' is set
+            when the caller flushes it). By default the signals are written
+            in one transaction before returning.
             
         Returns
         -------
@@ -95,24 +113,38 @@ class AutoTrader:
                 logger.info(f"Calculating technical indicators for {contract_code}")
                 data = self._calculate_technical_indicators(data, contract_code)
             
-            # Compute signal scores
-            scoring_config = ScoringConfig()
-            scored_data = compute_signal_scores(data, config=scoring_config)
+            # Compute signal scores unless the indicator pipeline already did
+            # (it scores with the contract's resolved profile)
+            if self._has_signal_scores(data):
+                scored_data = data
+            else:
+                scoring_config = ScoringConfig()
+                scored_data = compute_signal_scores(data, config=scoring_config)
+            
+            # Frame attrs (indicator profile, simulated trades) are deep-copied
+            # by every pandas operation; the filters only need the rolling
+            # statistics the indicator pipeline already computed
+            data = self._without_attrs(data)
+            scored_data = self._without_attrs(scored_data)
             
             # Apply smart filters
             filtered_data = self.signal_filter.filter_signals(data, scored_data)
             
             # Generate signals
-            signals = self._generate_signals(filtered_data, contract_code)
+            signals = self._generate_signals(filtered_data, contract_code, new_bars)
             
             # Save signals to database
-            for signal in signals:
+            if batch is not None:
+                for signal in signals:
+                    batch.add_signal(signal)
+            elif signals:
                 try:
-                    signal_id = save_trading_signal(self.db_conn, signal)
-                    signal['signal_id'] = signal_id
-                    logger.info(f"Saved signal for {contract_code}: {signal['signal_type']}")
+                    with TradingBatchWriter(self.db_conn) as own_batch:
+                        for signal in signals:
+                            own_batch.add_signal(signal)
+                    logger.info(f"Saved {len(signals)} signals for {contract_code}")
                 except Exception as e:
-                    logger.error(f"Failed to save signal for {contract_code}: {e}")
+                    logger.error(f"Failed to save signals for {contract_code}: {e}")
             
             return signals
             
@@ -125,6 +157,22 @@ class AutoTrader:
         required_indicators = ['SMA_FAST', 'SMA_SLOW', 'EMA_FAST', 'EMA_SLOW', 'RSI', 'MACD', 'MACD_SIGNAL', 'ATR']
         return all(indicator in data.columns for indicator in required_indicators)
     
+    def _has_signal_scores(self, data: pd.DataFrame) -> bool:
+        """Check if data was scored by calculate_technical_indicators."""
+        score_columns = ['long_score', 'short_score', 'long_probability', 'short_probability',
+                         'long_signal', 'short_signal']
+        return ('scoring_config' in data.attrs and
+                all(column in data.columns for column in score_columns))
+    
+    @staticmethod
+    def _without_attrs(data: pd.DataFrame) -> pd.DataFrame:
+        """Shallow copy of a frame without attrs, except the shared rolling statistics."""
+        if not data.attrs or list(data.attrs) == [ROLLING_STATS_ATTR]:
+            return data
+        stripped = data.copy(deep=False)
+        stripped.attrs = {key: value for key, value in data.attrs.items() if key == ROLLING_STATS_ATTR}
+        return stripped
+    
     def _calculate_technical_indicators(self, data: pd.DataFrame, contract_code: str) -> pd.DataFrame:
         """Calculate technical indicators for the data."""
         try:
@@ -134,54 +182,62 @@ class AutoTrader:
             logger.error(f"Failed to calculate technical indicators for {contract_code}: {e}")
             return data
     
-    def _generate_signals(self, data: pd.DataFrame, contract_code: str) -> List[Dict]:
+    def _generate_signals(self, data: pd.DataFrame, contract_code: str,
+                          new_bars: Optional[int] = None) -> List[Dict]:
         """Generate trading signals from filtered data."""
         signals = []
-        current_date = datetime.now().strftime('%Y-%m-%d')
         
-        # Get the latest row (most recent data)
         if data.empty:
             return signals
         
-        latest = data.iloc[-1]
-        
-        # Check for long signals
-        if (latest.get('filtered_long_signal', 0) == 1 and 
-            latest.get('final_filter', False)):
-            
-            signal = {
-                'contract_code': contract_code,
-                'date': current_date,
-                'signal_type': 'long',
-                'signal_strength': latest.get('long_probability', 0.0),
-                'signal_score': latest.get('long_score', 0.0),
-                'price': latest['close'],
-                'volume': latest.get('volume', 0),
-                'atr': latest.get('ATR', 0),
-                'stop_loss': self._calculate_stop_loss(latest, 'long'),
-                'take_profit': self._calculate_take_profit(latest, 'long'),
-                'processed': False
-            }
-            signals.append(signal)
-        
-        # Check for short signals
-        if (latest.get('filtered_short_signal', 0) == 1 and 
-            latest.get('final_filter', False)):
+        if new_bars is None:
+            # Get the latest row (most recent data)
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            rows = [(current_date, data.iloc[-1])]
+        else:
+            # Each new bar gets its own date: signals are unique per day and type
+            tail = data.tail(new_bars)
+            dates = pd.to_datetime(tail['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+            rows = list(zip(dates, (row for _, row in tail.iterrows())))
+        
+        for signal_date, latest in rows:
+            # Check for long signals
+            if (latest.get('filtered_long_signal', 0) == 1 and 
+                latest.get('final_filter', False)):
+                
+                signal = {
+                    'contract_code': contract_code,
+                    'date': signal_date,
+                    'signal_type': 'long',
+                    'signal_strength': latest.get('long_probability', 0.0),
+                    'signal_score': latest.get('long_score', 0.0),
+                    'price': latest['close'],
+                    'volume': latest.get('volume', 0),
+                    'atr': latest.get('ATR', 0),
+                    'stop_loss': self._calculate_stop_loss(latest, 'long'),
+                    'take_profit': self._calculate_take_profit(latest, 'long'),
+                    'processed': False
+                }
+                signals.append(signal)
             
-            signal = {
-                'contract_code': contract_code,
-                'date': current_date,
-                'signal_type': 'short',
-                'signal_strength': latest.get('short_probability', 0.0),
-                'signal_score': latest.get('short_score', 0.0),
-                'price': latest['close'],
-                'volume': latest.get('volume', 0),
-                'atr': latest.get('ATR', 0),
-                'stop_loss': self._calculate_stop_loss(latest, 'short'),
-                'take_profit': self._calculate_take_profit(latest, 'short'),
-                'processed': False
-            }
-            signals.append(signal)
+            # Check for short signals
+            if (latest.get('filtered_short_signal', 0) == 1 and 
+                latest.get('final_filter', False)):
+                
+                signal = {
+                    'contract_code': contract_code,
+                    'date': signal_date,
+                    'signal_type': 'short',
+                    'signal_strength': latest.get('short_probability', 0.0),
+                    'signal_score': latest.get('short_score', 0.0),
+                    'price': latest['close'],
+                    'volume': latest.get('volume', 0),
+                    'atr': latest.get('ATR', 0),
+                    'stop_loss': self._calculate_stop_loss(latest, 'short'),
+                    'take_profit': self._calculate_take_profit(latest, 'short'),
+                    'processed': False
+                }
+                signals.append(signal)
         
         return signals
     
@@ -203,6 +259,18 @@ class AutoTrader:
         """
         Execute pending orders from the database.
         
+        Writes happen in two transactions per call: the first claims the
+        signals (marks them processed) and records the orders as 'pending'
+        before anything is sent to the broker; the second stores the order
+        statuses and trade history once all orders were submitted. A crash
+        in between leaves 'pending' orders for reconciliation and does not
+        re-submit the signals.
+        
+        If the second transaction keeps failing, its staged items are kept
+        and the order ids are listed in ``orders_to_reconcile``; the next call
+        saves them before submitting anything new, and submits nothing while
+        they stay unsaved.
+        
         Returns
         -------
         List[Dict]
@@ -212,6 +280,10 @@ class AutoTrader:
             logger.warning("No active trading session")
             return []
         
+        if not self._flush_unsaved_statuses():
+            logger.warning("Statuses of submitted orders are still unsaved, not submitting new orders")
+            return []
+        
         # Get pending signals
         pending_signals = get_pending_signals(self.db_conn, limit=50)
         
@@ -220,6 +292,8 @@ class AutoTrader:
             return []
         
         execution_results = []
+        claimed = []
+        batch = TradingBatchWriter(self.db_conn)
         
         for _, signal in pending_signals.iterrows():
             try:
@@ -231,15 +305,23 @@ class AutoTrader:
                 # Check signal strength
                 if signal['signal_strength'] < self.current_session.settings.get('min_signal_strength', 0.6):
                     logger.info(f"Signal {signal['id']} below minimum strength threshold")
-                    mark_signal_processed(self.db_conn, signal['id'])
+                    batch.mark_signal_processed(signal['id'])
                     continue
                 
-                # Execute order
-                result = self._execute_signal_order(signal)
-                execution_results.append(result)
+                # Prepare order
+                order_data = self._prepare_signal_order(signal)
+                if order_data is None:
+                    execution_results.append({
+                        'signal_id': signal['id'],
+                        'status': 'skipped',
+                        'reason': 'Position size too small'
+                    })
+                else:
+                    batch.add_order(order_data)
+                    claimed.append((signal, order_data))
                 
                 # Mark signal as processed
-                mark_signal_processed(self.db_conn, signal['id'])
+                batch.mark_signal_processed(signal['id'])
                 
                 # Update session counters
                 self.current_session.daily_order_count += 1
@@ -253,22 +335,70 @@ class AutoTrader:
                     'error': str(e)
                 })
         
+        # Claim signals and record pending orders before submitting them
+        try:
+            batch.flush()
+        except Exception as e:
+            logger.error(f"Failed to record pending orders: {e}")
+            return execution_results + [
+                {'signal_id': signal['id'], 'status': 'error', 'error': str(e)}
+                for signal, _ in claimed
+            ]
+        
+        for signal, order_data in claimed:
+            execution_results.append(self._submit_signal_order(signal, order_data, batch))
+        
+        order_ids = [order_data['order_id'] for _, order_data in claimed]
+        if not self._save_order_statuses(batch, order_ids):
+            for result in execution_results:
+                if result.get('order_id') in order_ids:
+                    result['reconcile'] = True
+        
         return execution_results
     
-    def _execute_signal_order(self, signal: pd.Series) -> Dict:
-        """Execute a single signal order."""
+    def _save_order_statuses(self, batch: TradingBatchWriter, order_ids: List[int]) -> bool:
+        """Save statuses of submitted orders, keeping them for reconciliation on failure."""
+        for attempt in range(1, STATUS_FLUSH_ATTEMPTS + 1):
+            try:
+                batch.flush()
+                return True
+            except Exception as e:
+                logger.error(f"Failed to save order statuses (attempt {attempt}/{STATUS_FLUSH_ATTEMPTS}): {e}")
+                if attempt < STATUS_FLUSH_ATTEMPTS:
+                    time.sleep(STATUS_FLUSH_RETRY_DELAY * attempt)
+        
+        # The orders were sent but are still 'pending' in the database; the
+        # failed flush rolled back and kept the staged statuses and trades
+        self.unsaved_batch = batch
+        self.orders_to_reconcile.extend(order_ids)
+        logger.critical(f"Orders {order_ids} were submitted but their statuses are not saved; "
+                        f"marked for reconciliation")
+        return False
+    
+    def _flush_unsaved_statuses(self) -> bool:
+        """Retry saving statuses left over from a previous call."""
+        if self.unsaved_batch is None:
+            return True
+        try:
+            self.unsaved_batch.flush()
+        except Exception as e:
+            logger.error(f"Orders {self.orders_to_reconcile} still need reconciliation: {e}")
+            return False
+        
+        logger.info(f"Saved statuses of orders {self.orders_to_reconcile} on retry")
+        self.unsaved_batch = None
+        self.orders_to_reconcile = []
+        return True
+    
+    def _prepare_signal_order(self, signal: pd.Series) -> Optional[Dict]:
+        """Build the order for a signal, or None if the position is too small."""
         # Calculate position size based on risk management
         position_size = self._calculate_position_size(signal)
         
         if position_size <= 0:
-            return {
-                'signal_id': signal['id'],
-                'status': 'skipped',
-                'reason': 'Position size too small'
-            }
+            return None
         
-        # Create order data
-        order_data = {
+        return {
             'signal_id': signal['id'],
             'company_id': signal['company_id'],
             'contract_code': signal['contract_code'],
@@ -278,15 +408,17 @@ class AutoTrader:
             'price': signal['price'],
             'status': 'pending'
         }
-        
-        # Save order to database
-        order_id = save_auto_order(self.db_conn, order_data)
+    
+    def _submit_signal_order(self, signal: pd.Series, order_data: Dict,
+                             batch: TradingBatchWriter) -> Dict:
+        """Submit a recorded order and stage its status and trade history."""
+        order_id = order_data['order_id']
         
         try:
             # Execute order via Tinkoff API
             order_result = create_order(
                 ticker=signal['contract_code'],
-                volume=int(position_size),
+                volume=order_data['quantity'],
                 order_price=signal['price'],
                 order_direction=order_data['side'],
                 analyzer=self.analyzer
@@ -294,8 +426,8 @@ class AutoTrader:
             
             # Update order status
             if order_result.get('status') == 'success':
-                update_order_status(
-                    self.db_conn, order_id, 'submitted',
+                batch.update_order_status(
+                    order_id, 'submitted',
                     tinkoff_order_id=str(order_result.get('response', {}))
                 )
                 
@@ -306,19 +438,19 @@ class AutoTrader:
                     'company_id': signal['company_id'],
                     'contract_code': signal['contract_code'],
                     'side': order_data['side'],
-                    'quantity': position_size,
+                    'quantity': order_data['quantity'],
                     'entry_price': signal['price'],
                     'stop_loss': signal.get('stop_loss'),
                     'take_profit': signal.get('take_profit'),
                     'entry_date': signal['date']
                 }
-                save_trade_history(self.db_conn, trade_data)
+                batch.add_trade(trade_data)
                 
                 logger.info(f"Successfully executed order {order_id} for {signal['contract_code']}")
                 
             else:
-                update_order_status(
-                    self.db_conn, order_id, 'rejected',
+                batch.update_order_status(
+                    order_id, 'rejected',
                     error_message=order_result.get('message', 'Unknown error')
                 )
                 logger.warning(f"Order {order_id} rejected: {order_result.get('message')}")
@@ -332,8 +464,8 @@ class AutoTrader:
             }
             
         except Exception as e:
-            update_order_status(
-                self.db_conn, order_id, 'error',
+            batch.update_order_status(
+                order_id, 'error',
                 error_message=str(e)
             )
             logger.error(f"Failed to execute order {order_id}: {e}")
@@ -388,7 +520,8 @@ class AutoTrader:
             'daily_orders': self.current_session.daily_order_count,
             'total_trades': self.current_session.total_trades,
             'total_pnl': self.current_session.total_pnl,
-            'active_positions': len(self.current_session.active_positions)
+            'active_positions': len(self.current_session.active_positions),
+            'orders_to_reconcile': len(self.orders_to_reconcile)
         }
         
         if not trade_history.empty:
@@ -0,0 +1,413 @@
+"""Rolling return correlation of the liquid universe, updated bar by bar.
+
+``CorrelationService`` keeps an exponentially weighted mean and covariance
+matrix of daily close-to-close returns for the most liquid contracts. Each
+new bar updates them in place in O(N^2), so a pairwise correlation is an
+O(1) lookup and nothing is recomputed from history. The state is persisted
+in ``correlation_state`` after every update: a restart resumes from the last
+processed bar instead of replaying a warm-up window.
+
+A date is added once and never revisited, so ``catch_up`` stops short of
+dates that may still change: the newest date in daily_data (a forming
+session, or a sync that has written only part of the contracts) and any date
+a lagging contract has not reached yet.
+
+The recursion is the one pandas uses for ``ewm(alpha=1 - decay,
+adjust=False).cov(bias=True)``; a symbol's mean starts at its first return.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core import database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_NAME = "daily"
+
+_STATE_UPSERT = """
+    INSERT INTO correlation_state (name, symbols, last_date, params_key, state, updated_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(name) DO UPDATE SET
+        symbols = excluded.symbols,
+        last_date = excluded.last_date,
+        params_key = excluded.params_key,
+        state = excluded.state,
+        updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class CorrelationConfig:
+    """Parameters of the rolling correlation estimate."""
+    halflife: float = 30.0  # Bars for a return's weight to halve
+    min_periods: int = 20  # Common observations before a pair's correlation is trusted
+    universe_size: int = 100  # Most liquid contracts tracked
+    liquidity_window: int = 60  # Bars of average turnover used to rank liquidity
+    warmup_bars: int = 250  # History replayed when no persisted state exists
+    stale_bars: int = 5  # Dates without a bar after which a contract stops holding back updates
+
+    @property
+    def decay(self) -> float:
+        return 0.5 ** (1.0 / self.halflife)
+
+    def params_key(self) -> str:
+        """Parameters the stored state depends on; a change forces a rebuild."""
+        return json.dumps({"halflife": self.halflife, "universe_size": self.universe_size}, sort_keys=True)
+
+
+@dataclass
+class CorrelationExposure:
+    """Correlation of a candidate position with the open book.
+
+    Correlations are signed by direction: a long and a short in two
+    positively correlated contracts hedge each other and count negative.
+    """
+    pairwise: Dict[str, float] = field(default_factory=dict)  # Positions with enough common history
+    max_correlation: float = np.nan
+    max_symbol: Optional[str] = None
+    portfolio_correlation: float = np.nan  # With the value-weighted book of those positions
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _direction(side: str) -> float:
+    return -1.0 if str(side).lower() in ("short", "sell") else 1.0
+
+
+class CorrelationService:
+    """Incrementally updated EWMA covariance/correlation matrix of returns."""
+
+    def __init__(self, symbols: Sequence[str], config: Optional[CorrelationConfig] = None):
+        self.config = config or CorrelationConfig()
+        self.symbols: List[str] = list(dict.fromkeys(symbols))
+        self._index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self._mean = np.zeros(n)
+        self._cov = np.zeros((n, n))
+        self._count = np.zeros((n, n), dtype=np.int32)
+        self._last_price = np.full(n, np.nan)
+        self.last_date: Optional[str] = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def update(self, date: str, closes: Mapping[str, float]) -> int:
+        """
+        Add one bar of closes and update the matrix.
+
+        Symbols missing from ``closes`` keep their last price; their next
+        return spans the gap.
+
+        Returns
+        -------
+        int
+            Number of returns added
+        """
+        prices = np.full(len(self.symbols), np.nan)
+        for symbol, close in closes.items():
+            i = self._index.get(symbol)
+            if i is not None and close is not None:
+                prices[i] = close
+        return self._update_prices(str(date), prices)
+
+    def update_frame(self, closes: pd.DataFrame) -> int:
+        """Add bars from a (dates x symbols) close frame, oldest first; returns bars added."""
+        if closes.empty:
+            return 0
+        aligned = closes.reindex(columns=self.symbols).to_numpy(dtype=float)
+        for date, prices in zip(closes.index, aligned):
+            self._update_prices(str(date), prices)
+        return len(aligned)
+
+    def _update_prices(self, date: str, prices: np.ndarray) -> int:
+        traded = prices > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = prices / self._last_price - 1.0
+        returns[~(traded & (self._last_price > 0))] = np.nan
+        self._last_price = np.where(traded, prices, self._last_price)
+        self.last_date = date
+        return self.update_returns(returns)
+
+    def update_returns(self, returns: np.ndarray) -> int:
+        """Add one vector of returns aligned with ``symbols``; NaN marks a missing return."""
+        valid = np.isfinite(returns)
+        observed = np.flatnonzero(valid)
+        if not len(observed):
+            return 0
+        decay = self.config.decay
+        first = observed[self._count[observed, observed] == 0]
+        self._mean[first] = returns[first]
+
+        if len(observed) == len(returns):
+            diff = returns - self._mean
+            self._mean += (1.0 - decay) * diff
+            self._cov += (1.0 - decay) * np.outer(diff, diff)
+            self._cov *= decay
+            self._count += 1
+        else:
+            block = np.ix_(observed, observed)
+            diff = returns[observed] - self._mean[observed]
+            self._mean[observed] += (1.0 - decay) * diff
+            self._cov[block] = decay * (self._cov[block] + (1.0 - decay) * np.outer(diff, diff))
+            self._count[block] += 1
+        return len(observed)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def correlation(self, first: str, second: str) -> float:
+        """Correlation of two symbols; NaN if either is untracked or history is short."""
+        i = self._index.get(first)
+        j = self._index.get(second)
+        if i is None or j is None or self._count[i, j] < self.config.min_periods:
+            return np.nan
+        variance = self._cov[i, i] * self._cov[j, j]
+        return float(self._cov[i, j] / np.sqrt(variance)) if variance > 0 else np.nan
+
+    def correlation_matrix(self, symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Correlation matrix for ``symbols`` (default: the whole universe)."""
+        symbols = [s for s in (symbols if symbols is not None else self.symbols) if s in self._index]
+        idx = np.array([self._index[s] for s in symbols], dtype=int)
+        cov = self._cov[np.ix_(idx, idx)]
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        corr[self._count[np.ix_(idx, idx)] < self.config.min_periods] = np.nan
+        return pd.DataFrame(corr, index=symbols, columns=symbols)
+
+    def exposure(self, contract_code: str, side: str,
+                 positions: Mapping[str, Tuple[str, float]]) -> CorrelationExposure:
+        """
+        Correlation of a candidate with open positions.
+
+        Parameters
+        ----------
+        contract_code : str
+            Candidate contract
+        side : str
+            'long' or 'short'
+        positions : Mapping[str, Tuple[str, float]]
+            Open positions as contract_code -> (side, market value)
+
+        Returns
+        -------
+        CorrelationExposure
+            Signed pairwise correlations with every position that has enough
+            common history, the largest of them, and the correlation with the
+            value-weighted book of those positions
+        """
+        result = CorrelationExposure()
+        c = self._index.get(contract_code)
+        if c is None or self._cov[c, c] <= 0:
+            return result
+        direction = _direction(side)
+        held, weights = [], []
+        for symbol, (position_side, value) in positions.items():
+            pair = self.correlation(contract_code, symbol)
+            if np.isnan(pair):
+                continue
+            signed = direction * _direction(position_side) * pair
+            result.pairwise[symbol] = signed
+            if np.isnan(result.max_correlation) or signed > result.max_correlation:
+                result.max_correlation, result.max_symbol = signed, symbol
+            held.append(self._index[symbol])
+            weights.append(_direction(position_side) * abs(float(value)))
+        if not held:
+            return result
+
+        idx = np.array(held)
+        weights = np.array(weights)
+        book_variance = weights @ self._cov[np.ix_(idx, idx)] @ weights
+        if book_variance > 0:
+            covariance = direction * (self._cov[c, idx] @ weights)
+            result.portfolio_correlation = float(covariance / np.sqrt(self._cov[c, c] * book_variance))
+        return result
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, conn: sqlite3.Connection, name: str = DEFAULT_STATE_NAME) -> None:
+        """Store the state in ``correlation_state``."""
+        if self.last_date is None:
+            return
+        buffer = io.BytesIO()
+        np.savez(buffer, mean=self._mean, cov=self._cov, count=self._count, last_price=self._last_price)
+        with conn:
+            conn.execute(_STATE_UPSERT, (name, json.dumps(self.symbols), self.last_date,
+                                         self.config.params_key(), buffer.getvalue()))
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, config: Optional[CorrelationConfig] = None,
+             name: str = DEFAULT_STATE_NAME) -> Optional["CorrelationService"]:
+        """Restore a stored state; None if there is none or it was built with other parameters."""
+        config = config or CorrelationConfig()
+        row = conn.execute(
+            "SELECT symbols, last_date, params_key, state FROM correlation_state WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None or row[2] != config.params_key():
+            return None
+        service = cls(json.loads(row[0]), config)
+        with np.load(io.BytesIO(row[3]), allow_pickle=False) as arrays:
+            service._mean = arrays["mean"]
+            service._cov = arrays["cov"]
+            service._count = arrays["count"]
+            service._last_price = arrays["last_price"]
+        service.last_date = row[1]
+        return service
+
+    def catch_up(self, conn: sqlite3.Connection, name: Optional[str] = DEFAULT_STATE_NAME) -> int:
+        """
+        Add daily_data bars after ``last_date`` and persist the state.
+
+        Only dates up to :func:`complete_through` are added, so a bar
+        written late for one contract is not skipped. A fresh service starts
+        ``warmup_bars`` bars back. Pass ``name=None`` to skip saving.
+
+        Returns
+        -------
+        int
+            Number of bars added
+        """
+        since = self.last_date
+        if since is None:
+            since = _nth_latest_date(conn, self.config.warmup_bars + 1)
+        until = complete_through(conn, self.symbols, self.config.stale_bars)
+        if until is None or (since is not None and until <= since):
+            return 0
+        closes = load_closes(conn, self.symbols, since=since, until=until)
+        added = self.update_frame(closes)
+        if added and name is not None:
+            self.save(conn, name)
+        return added
+
+    @classmethod
+    def from_database(cls, conn: sqlite3.Connection, config: Optional[CorrelationConfig] = None,
+                      name: str = DEFAULT_STATE_NAME, rebuild: bool = False) -> "CorrelationService":
+        """
+        Restore the persisted state and catch up on new bars.
+
+        Without a usable state (or with ``rebuild``) the universe is ranked
+        by liquidity and warmed up from ``warmup_bars`` of history.
+        """
+        config = config or CorrelationConfig()
+        database.create_correlation_state_table(conn)
+        service = None if rebuild else cls.load(conn, config, name)
+        if service is None:
+            symbols = liquid_universe(conn, config.universe_size, config.liquidity_window)
+            service = cls(symbols, config)
+            logger.info(f"Building correlation state for {len(symbols)} contracts")
+        service.catch_up(conn, name)
+        return service
+
+
+def _nth_latest_date(conn: sqlite3.Connection, n: int) -> Optional[str]:
+    """The date ``n`` distinct dates before the newest one in daily_data, None if history is shorter."""
+    row = conn.execute(
+        "SELECT date FROM (SELECT DISTINCT date FROM daily_data ORDER BY date DESC LIMIT 1 OFFSET ?)",
+        (n,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def complete_through(conn: sqlite3.Connection, symbols: Sequence[str], stale_bars: int) -> Optional[str]:
+    """
+    Newest date whose bars are final for every tracked contract.
+
+    The newest date in daily_data is always held back. Earlier dates count
+    up to the newest bar of the most lagging contract; a contract without
+    bars for ``stale_bars`` dates (suspended or delisted) no longer holds
+    the others back and its next bar spans the gap. None if there is no
+    complete date yet.
+    """
+    held = _nth_latest_date(conn, 1)
+    if held is None or not len(symbols):
+        return held
+    stale_before = _nth_latest_date(conn, stale_bars)
+    rows = conn.execute(
+        f"""
+        SELECT MAX(dd.date)
+        FROM daily_data dd
+        JOIN companies c ON c.id = dd.company_id
+        WHERE c.contract_code IN ({', '.join('?' * len(symbols))}) AND dd.close > 0
+        GROUP BY c.contract_code
+        """,
+        list(symbols),
+    ).fetchall()
+    active = [row[0] for row in rows if stale_before is None or row[0] > stale_before]
+    return min([held, *active])
+
+
+def liquid_universe(conn: sqlite3.Connection, size: int, window: int) -> List[str]:
+    """Contracts with the highest average turnover (close x volume) over the last ``window`` bars."""
+    since = _nth_latest_date(conn, window)
+    rows = conn.execute(
+        """
+        SELECT c.contract_code
+        FROM daily_data dd
+        JOIN companies c ON c.id = dd.company_id
+        WHERE dd.date > COALESCE(?, '') AND dd.close > 0 AND c.contract_code IS NOT NULL
+        GROUP BY c.contract_code
+        ORDER BY AVG(dd.close * COALESCE(dd.volume, 0)) DESC, c.contract_code
+        LIMIT ?
+        """,
+        (since, size),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def load_closes(conn: sqlite3.Connection, symbols: Sequence[str],
+                since: Optional[str] = None, until: Optional[str] = None) -> pd.DataFrame:
+    """Daily closes after ``since`` and up to ``until`` as a (dates x symbols) frame, oldest first."""
+    if not len(symbols):
+        return pd.DataFrame()
+    rows = conn.execute(
+        f"""
+        SELECT dd.date, c.contract_code, dd.close
+        FROM daily_data dd
+        JOIN companies c ON c.id = dd.company_id
+        WHERE c.contract_code IN ({', '.join('?' * len(symbols))}) AND dd.date > COALESCE(?, '')
+          AND (? IS NULL OR dd.date <= ?)
+        """,
+        [*symbols, since, until, until],
+    ).fetchall()
+    if not rows:
+        return pd.DataFrame(columns=list(symbols))
+    frame = pd.DataFrame(rows, columns=["date", "contract_code", "close"])
+    return frame.pivot_table(index="date", columns="contract_code", values="close",
+                             aggfunc="last").sort_index()
+
+
+def run_correlation_update(db_path: Optional[Union[str, Path]] = None,
+                           config: Optional[CorrelationConfig] = None) -> Dict[str, Any]:
+    """Scheduler task: bring the persisted correlation state up to date."""
+    conn = database.get_connection(db_path)
+    try:
+        config = config or CorrelationConfig()
+        database.create_correlation_state_table(conn)
+        service = CorrelationService.load(conn, config)
+        rebuilt = service is None
+        if rebuilt:
+            service = CorrelationService(liquid_universe(conn, config.universe_size, config.liquidity_window),
+                                         config)
+        added = service.catch_up(conn)
+        return {"symbols": len(service), "bars_added": added, "rebuilt": rebuilt, "last_date": service.last_date}
+    finally:
+        conn.close()
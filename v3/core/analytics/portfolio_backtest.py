@@ -0,0 +1,424 @@
+"""Multi-symbol portfolio backtest over a (dates x symbols) array layout.
+
+Signals of all contracts are replayed against one pool of capital. On each
+bar the engine marks every open position to market, resolves stop, target,
+trailing and time exits for all of them at once, and then admits new
+entries subject to the RiskProfile limits (position count and size, open
+risk, daily loss, drawdown and return correlation). Exit rules follow
+``risk.simulate_trades``: entries fill at the signal bar's close, a bar
+that touches both stop and target exits at the stop, trailing stops
+tighten after the bar is checked, and a position still open after
+``max_holding_days`` bars exits at the close.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.analytics.advanced_risk import RiskProfile
+from core.analytics.metrics import TradingCosts
+from core.indicators.calculations import ATR_COL
+
+logger = logging.getLogger(__name__)
+
+CORRELATION_MIN_PERIODS = 20  # Fewer return observations skip the correlation rule
+
+
+@dataclass
+class PortfolioPanel:
+    """Market data and signals aligned on (dates x symbols)."""
+    dates: pd.DatetimeIndex
+    symbols: pd.Index
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    atr: np.ndarray
+    long_signal: np.ndarray
+    short_signal: np.ndarray
+    score: np.ndarray  # Entry priority when more signals than free slots
+
+    @classmethod
+    def from_frame(
+        cls,
+        data: pd.DataFrame,
+        *,
+        symbol_col: str = "contract_code",
+        date_col: str = "date",
+        price_col: str = "close",
+        high_col: str = "high",
+        low_col: str = "low",
+        atr_col: str = ATR_COL,
+        long_signal_col: str = "long_signal",
+        short_signal_col: str = "short_signal",
+        score_col: Optional[str] = None,
+    ) -> "PortfolioPanel":
+        """
+        Build a panel from a long frame with one row per (date, contract).
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Output of the indicator pipeline for several contracts
+        score_col : str, optional
+            Column ranking simultaneous entries (e.g. long_probability);
+            without it entries are taken in symbol order
+
+        Returns
+        -------
+        PortfolioPanel
+            Arrays of shape (len(dates), len(symbols))
+        """
+        columns = [price_col, high_col, low_col, atr_col, long_signal_col, short_signal_col]
+        if score_col is not None:
+            columns.append(score_col)
+        frame = data[[date_col, symbol_col] + columns].copy()
+        frame[date_col] = pd.to_datetime(frame[date_col], errors="coerce")
+        frame = frame.dropna(subset=[date_col]).drop_duplicates([date_col, symbol_col], keep="last")
+        wide = frame.pivot(index=date_col, columns=symbol_col).sort_index()
+        symbols = wide[price_col].columns
+
+        def field_values(column: str) -> pd.DataFrame:
+            return wide[column].reindex(columns=symbols).astype(float)
+
+        return cls(
+            dates=pd.DatetimeIndex(wide.index),
+            symbols=pd.Index(symbols),
+            close=field_values(price_col).to_numpy(),
+            high=field_values(high_col).to_numpy(),
+            low=field_values(low_col).to_numpy(),
+            atr=field_values(atr_col).ffill().bfill().to_numpy(),
+            long_signal=field_values(long_signal_col).fillna(0).to_numpy() > 0,
+            short_signal=field_values(short_signal_col).fillna(0).to_numpy() > 0,
+            score=(field_values(score_col).fillna(0).to_numpy() if score_col is not None
+                   else np.zeros((len(wide), len(symbols)))),
+        )
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+
+@dataclass
+class PortfolioBacktestResult:
+    """Equity curve, trade log and rejected entries of a portfolio backtest."""
+    equity: pd.DataFrame
+    trades: pd.DataFrame
+    rejections: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, float]:
+        """Headline statistics of the run."""
+        if self.equity.empty:
+            return {}
+        equity = self.equity["equity"]
+        trades = self.trades
+        initial_capital = self.equity.attrs.get("initial_capital", equity.iloc[0])
+        return {
+            "initial_capital": float(initial_capital),
+            "final_equity": float(equity.iloc[-1]),
+            "total_return": float(equity.iloc[-1] / initial_capital - 1),
+            "max_drawdown": float(self.equity["drawdown"].min()),
+            "total_trades": int(len(trades)),
+            "win_rate": float((trades["net_return"] > 0).mean()) if len(trades) else 0.0,
+            "avg_positions": float(self.equity["positions"].mean()),
+            "avg_exposure": float(self.equity["exposure"].mean()),
+            "rejected_entries": int(sum(self.rejections.values())),
+        }
+
+
+class PortfolioBacktester:
+    """Replay signals of many contracts with shared capital and portfolio limits."""
+
+    def __init__(self, risk_profile: Optional[RiskProfile] = None,
+                 trading_costs: Optional[TradingCosts] = None,
+                 initial_capital: float = 1000000.0,
+                 correlation_window: int = 60):
+        """
+        Parameters
+        ----------
+        risk_profile : RiskProfile, optional
+            Exit multipliers and portfolio limits, as used by AdvancedRiskManager
+        trading_costs : TradingCosts, optional
+            Costs charged on exit, as in simulate_trades
+        initial_capital : float
+            Starting cash
+        correlation_window : int
+            Bars of returns used by the correlation rule
+        """
+        self.risk_profile = risk_profile or RiskProfile()
+        self.trading_costs = trading_costs or TradingCosts()
+        self.initial_capital = float(initial_capital)
+        self.correlation_window = correlation_window
+
+    def run(self, panel: PortfolioPanel) -> PortfolioBacktestResult:
+        """
+        Run the backtest.
+
+        Positions are sized to ``max_position_size`` (whole units, limited
+        by free cash) and hold their notional as cash collateral for both
+        sides. Open risk is the distance from the mark to the stop.
+
+        Parameters
+        ----------
+        panel : PortfolioPanel
+            Aligned market data and signals
+
+        Returns
+        -------
+        PortfolioBacktestResult
+            Per-bar equity curve, per-trade log and rejection counts
+        """
+        profile = self.risk_profile
+        costs = self.trading_costs
+        n_dates, n_symbols = panel.shape
+
+        # Valuation price: last known close for bars a contract did not trade
+        mark = pd.DataFrame(panel.close).ffill().to_numpy()
+        returns = np.zeros_like(mark)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = mark[1:] / mark[:-1] - 1
+        returns[~np.isfinite(returns)] = 0.0
+
+        direction = np.zeros(n_symbols, dtype=np.int8)  # 1 long, -1 short, 0 flat
+        quantity = np.zeros(n_symbols)
+        entry_price = np.zeros(n_symbols)
+        stop = np.zeros(n_symbols)
+        target = np.zeros(n_symbols)
+        entry_atr = np.zeros(n_symbols)
+        entry_index = np.full(n_symbols, -1)
+        last_exit = np.full(n_symbols, -1)
+        mfe = np.zeros(n_symbols)
+        mae = np.zeros(n_symbols)
+
+        trailing = profile.trailing_stop_multiplier
+        risk_reward_ok = (profile.take_profit_atr_multiplier
+                          >= profile.min_risk_reward_ratio * profile.stop_loss_atr_multiplier)
+
+        cash = self.initial_capital
+        peak = self.initial_capital
+        previous_equity = self.initial_capital
+        rejections: Counter = Counter()
+        trade_chunks: List[Dict[str, np.ndarray]] = []
+        records = np.zeros((n_dates, 5))  # equity, cash, market value, positions, gross exposure
+
+        for t in range(n_dates):
+            high, low, close = panel.high[t], panel.low[t], panel.close[t]
+            is_long = direction == 1
+
+            # Exits of positions opened on earlier bars
+            active = (direction != 0) & (entry_index < t) & ~np.isnan(high) & ~np.isnan(low)
+            with np.errstate(invalid="ignore"):
+                favorable = np.where(is_long, high - entry_price, entry_price - low) / np.where(active, entry_price, 1.0)
+                adverse = np.where(is_long, low - entry_price, entry_price - high) / np.where(active, entry_price, 1.0)
+                mfe = np.where(active, np.maximum(mfe, favorable), mfe)
+                mae = np.where(active, np.minimum(mae, adverse), mae)
+                hit_stop = active & np.where(is_long, low <= stop, high >= stop)
+                hit_target = active & ~hit_stop & np.where(is_long, high >= target, low <= target)
+            survivors = active & ~hit_stop & ~hit_target
+            if trailing:
+                atr_step = np.where(np.isnan(panel.atr[t]), entry_atr, panel.atr[t])
+                stop = np.where(survivors & is_long, np.maximum(stop, high - trailing * atr_step), stop)
+                stop = np.where(survivors & ~is_long, np.minimum(stop, low + trailing * atr_step), stop)
+            time_exit = survivors & (t - entry_index >= profile.max_holding_days) & ~np.isnan(close)
+            exiting = hit_stop | hit_target | time_exit
+            if t == n_dates - 1:
+                exiting |= direction != 0  # Close the rest at the last mark
+            if exiting.any():
+                exit_price = np.where(hit_stop, stop, np.where(hit_target, target, mark[t]))
+                cash += self._close_positions(
+                    np.flatnonzero(exiting), t, panel, exit_price, direction, quantity, entry_price,
+                    entry_index, mfe, mae, costs, trade_chunks,
+                    np.where(hit_stop, "stop", np.where(hit_target, "target",
+                                                        np.where(time_exit, "time", "end"))),
+                )
+                direction[exiting] = 0
+                last_exit[exiting] = t
+
+            # Mark to market
+            open_mask = direction != 0
+            position_value = quantity * entry_price + direction * quantity * (mark[t] - entry_price)
+            market_value = float(position_value[open_mask].sum())
+            equity = cash + market_value
+            peak = max(peak, equity)
+            open_risk = float(np.maximum(direction * (mark[t] - stop), 0.0)[open_mask]
+                              @ quantity[open_mask]) if open_mask.any() else 0.0
+
+            # Entries at this bar's close
+            if t < n_dates - 1:
+                candidates = self._entry_candidates(panel, t, direction, last_exit)
+                if candidates.size:
+                    cash = self._open_positions(
+                        candidates, t, panel, returns, equity, previous_equity, peak, cash, open_risk,
+                        risk_reward_ok, direction, quantity, entry_price, stop, target, entry_atr,
+                        entry_index, mfe, mae, rejections,
+                    )
+                    open_mask = direction != 0
+
+            records[t] = (equity, cash, equity - cash, open_mask.sum(),
+                          float(quantity[open_mask] @ mark[t][open_mask]) if open_mask.any() else 0.0)
+            previous_equity = equity
+
+        return PortfolioBacktestResult(
+            equity=self._equity_frame(panel.dates, records),
+            trades=self._trade_frame(panel, trade_chunks),
+            rejections=dict(rejections),
+        )
+
+    @staticmethod
+    def _entry_candidates(panel: PortfolioPanel, t: int, direction: np.ndarray,
+                          last_exit: np.ndarray) -> np.ndarray:
+        """Flat symbols with a signal at bar t, best score first."""
+        long_signal, short_signal = panel.long_signal[t], panel.short_signal[t]
+        ready = ((direction == 0) & (last_exit < t) & (long_signal ^ short_signal)
+                 & (panel.close[t] > 0) & ~np.isnan(panel.atr[t]))
+        candidates = np.flatnonzero(ready)
+        return candidates[np.argsort(-panel.score[t][candidates], kind="stable")]
+
+    def _open_positions(self, candidates, t, panel, returns, equity, previous_equity, peak, cash,
+                        open_risk, risk_reward_ok, direction, quantity, entry_price, stop, target,
+                        entry_atr, entry_index, mfe, mae, rejections) -> float:
+        """Admit candidates one by one under the portfolio limits; returns remaining cash."""
+        profile = self.risk_profile
+
+        # Portfolio-wide rules reject every entry of the bar
+        if not risk_reward_ok:
+            rejections["risk_reward"] += candidates.size
+            return cash
+        if equity - previous_equity < -profile.max_daily_loss * previous_equity:
+            rejections["daily_loss"] += candidates.size
+            return cash
+        if peak > 0 and (peak - equity) / peak > profile.max_drawdown:
+            rejections["max_drawdown"] += candidates.size
+            return cash
+
+        open_symbols = list(np.flatnonzero(direction != 0))
+        window = returns[max(1, t - self.correlation_window + 1):t + 1]
+        for k, symbol in enumerate(candidates):
+            if len(open_symbols) >= profile.max_positions:
+                rejections["max_positions"] += candidates.size - k
+                break
+
+            side = 1 if panel.long_signal[t, symbol] else -1
+            price = float(panel.close[t, symbol])
+            atr = float(panel.atr[t, symbol])
+            units = np.floor(min(profile.max_position_size, cash) / price)
+            if units < 1:
+                rejections["insufficient_cash"] += 1
+                continue
+            risk = units * atr * profile.stop_loss_atr_multiplier
+            if open_risk + risk > profile.max_portfolio_risk * equity:
+                rejections["portfolio_risk"] += 1
+                continue
+            if open_symbols and len(window) >= CORRELATION_MIN_PERIODS:
+                if self._max_correlation(window, symbol, side, open_symbols, direction) > profile.max_correlation:
+                    rejections["correlation"] += 1
+                    continue
+
+            direction[symbol] = side
+            quantity[symbol] = units
+            entry_price[symbol] = price
+            stop[symbol] = price - side * atr * profile.stop_loss_atr_multiplier
+            target[symbol] = price + side * atr * profile.take_profit_atr_multiplier
+            entry_atr[symbol] = atr
+            entry_index[symbol] = t
+            mfe[symbol] = 0.0
+            mae[symbol] = 0.0
+            cash -= units * price
+            open_risk += risk
+            open_symbols.append(symbol)
+        return cash
+
+    @staticmethod
+    def _max_correlation(window: np.ndarray, symbol: int, side: int, open_symbols: List[int],
+                         direction: np.ndarray) -> float:
+        """Largest return correlation with open positions, signed by exposure.
+
+        A long and a short in co-moving contracts offset each other and
+        count as negatively correlated exposure.
+        """
+        columns = window[:, [symbol] + open_symbols]
+        centered = columns - columns.mean(axis=0)
+        norms = np.sqrt((centered ** 2).sum(axis=0))
+        if norms[0] == 0:
+            return 0.0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = (centered[:, 0] @ centered[:, 1:]) / (norms[0] * norms[1:])
+        correlation = np.nan_to_num(correlation) * side * direction[open_symbols]
+        return float(correlation.max())
+
+    @staticmethod
+    def _close_positions(symbols, t, panel, exit_price, direction, quantity, entry_price,
+                         entry_index, mfe, mae, costs, trade_chunks, reasons) -> float:
+        """Record exits of the given symbols; returns cash released."""
+        side = direction[symbols].astype(float)
+        price_out = exit_price[symbols]
+        price_in = entry_price[symbols]
+        units = quantity[symbols]
+        holding_days = np.maximum(1, t - entry_index[symbols])
+        gross_return = side * (price_out - price_in) / price_in
+        net_return = (gross_return - costs.round_trip_cost(holding_days)
+                      - np.maximum(gross_return, 0.0) * costs.tax_pct)
+        notional = units * price_in
+        pnl = notional * net_return
+        trade_chunks.append({
+            "symbol": symbols,
+            "direction": side,
+            "entry_index": entry_index[symbols].copy(),
+            "exit_index": np.full(symbols.size, t),
+            "entry_price": price_in.copy(),
+            "exit_price": price_out,
+            "quantity": units.copy(),
+            "gross_return": gross_return,
+            "net_return": net_return,
+            "pnl": pnl,
+            "holding_days": holding_days,
+            "exit_reason": reasons[symbols],
+            "mfe": mfe[symbols].copy(),
+            "mae": mae[symbols].copy(),
+        })
+        return float((notional + pnl).sum())
+
+    def _equity_frame(self, dates: pd.DatetimeIndex, records: np.ndarray) -> pd.DataFrame:
+        equity = pd.DataFrame(records, index=dates,
+                              columns=["equity", "cash", "market_value", "positions", "exposure"])
+        equity.index.name = "date"
+        equity["positions"] = equity["positions"].astype(int)
+        equity["exposure"] = equity["exposure"] / equity["equity"]
+        equity["return"] = equity["equity"].pct_change()
+        equity.iloc[0, equity.columns.get_loc("return")] = equity["equity"].iloc[0] / self.initial_capital - 1
+        equity["drawdown"] = equity["equity"] / equity["equity"].cummax().clip(lower=self.initial_capital) - 1
+        equity.attrs["initial_capital"] = self.initial_capital
+        return equity
+
+    @staticmethod
+    def _trade_frame(panel: PortfolioPanel, trade_chunks: List[Dict[str, np.ndarray]]) -> pd.DataFrame:
+        """Trade log; pnl_pct is the gross return in percent, as compute_strategy_metrics expects."""
+        columns = ["contract_code", "direction", "entry_date", "exit_date", "entry_price", "exit_price",
+                   "quantity", "gross_return", "net_return", "pnl", "pnl_pct", "holding_days",
+                   "exit_reason", "mfe", "mae"]
+        if not trade_chunks:
+            return pd.DataFrame(columns=columns)
+        merged = {key: np.concatenate([chunk[key] for chunk in trade_chunks]) for key in trade_chunks[0]}
+        trades = pd.DataFrame({
+            "contract_code": panel.symbols[merged["symbol"]],
+            "direction": np.where(merged["direction"] > 0, "long", "short"),
+            "entry_date": panel.dates[merged["entry_index"]],
+            "exit_date": panel.dates[merged["exit_index"]],
+            "entry_price": merged["entry_price"],
+            "exit_price": merged["exit_price"],
+            "quantity": merged["quantity"],
+            "gross_return": merged["gross_return"],
+            "net_return": merged["net_return"],
+            "pnl": merged["pnl"],
+            "pnl_pct": merged["gross_return"] * 100,
+            "holding_days": merged["holding_days"],
+            "exit_reason": merged["exit_reason"],
+            "mfe": merged["mfe"],
+            "mae": merged["mae"],
+        }, columns=columns)
+        return trades.sort_values(["exit_date", "entry_date", "contract_code"], kind="stable").reset_index(drop=True)
@@ -10,9 +10,20 @@ import numpy as np
 import pandas as pd
 
 from core.indicators.calculations import ATR_COL, RSI_COL, BB_STD_COL, BB_MID_COL
+from core.indicators.rolling import rolling_stats
 
 logger = logging.getLogger(__name__)
 
+# Columns of the mask returned by SignalFilter.filter_mask
+FILTER_NAMES = (
+    'volume_filter',
+    'volatility_filter',
+    'price_filter',
+    'technical_filter',
+    'strength_filter',
+    'atr_filter',
+)
+
 
 @dataclass
 class FilterConfig:
@@ -55,180 +66,115 @@ class SignalFilter:
         if data.empty or signals.empty:
             return signals
         
-        # Ensure we have the same index
-        filtered_signals = signals.copy()
-        
-        # Apply volume filter
-        filtered_signals = self._apply_volume_filter(data, filtered_signals)
-        
-        # Apply volatility filter
-        filtered_signals = self._apply_volatility_filter(data, filtered_signals)
-        
-        # Apply price filter
-        filtered_signals = self._apply_price_filter(data, filtered_signals)
-        
-        # Apply technical indicator filters
-        filtered_signals = self._apply_technical_filters(data, filtered_signals)
-        
-        # Apply signal strength filter
-        filtered_signals = self._apply_strength_filter(data, filtered_signals)
-        
-        # Apply ATR filter
-        filtered_signals = self._apply_atr_filter(data, filtered_signals)
-        
-        # Combine all filters
-        filtered_signals = self._combine_filters(filtered_signals)
-        
-        return filtered_signals
+        mask = self.filter_mask(data, signals)
+        return self._combine_filters(signals, mask)
     
-    def _apply_volume_filter(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Filter based on volume relative to average."""
-        if 'volume' not in data.columns:
-            signals['volume_filter'] = True
-            return signals
-        
-        # Calculate volume ratio (current volume / average volume)
-        volume_ma = data['volume'].rolling(window=20, min_periods=5).mean()
-        volume_ratio = data['volume'] / (volume_ma + 1e-9)
-        
-        # Apply filter
-        signals['volume_filter'] = volume_ratio >= self.config.min_volume_ratio
-        
-        return signals
-    
-    def _apply_volatility_filter(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Filter based on volatility (ATR) percentiles."""
-        if ATR_COL not in data.columns:
-            signals['volatility_filter'] = True
-            return signals
-        
-        # Calculate ATR percentiles
-        atr_percentiles = data[ATR_COL].rolling(window=50, min_periods=10).quantile(
-            self.config.max_volatility_percentile
-        )
-        
-        # Apply filter (reject high volatility)
-        signals['volatility_filter'] = data[ATR_COL] <= atr_percentiles
-        
-        return signals
-    
-    def _apply_price_filter(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Filter based on price range."""
-        if 'close' not in data.columns:
-            signals['price_filter'] = True
-            return signals
-        
-        # Apply price range filter
-        signals['price_filter'] = (
-            (data['close'] >= self.config.min_price) & 
-            (data['close'] <= self.config.max_price)
-        )
-        
-        return signals
-    
-    def _apply_technical_filters(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Apply technical indicator filters."""
-        signals['technical_filter'] = True
-        
-        # RSI filter for long signals
-        if RSI_COL in data.columns and 'long_signal' in signals.columns:
-            rsi_long_filter = (
-                (signals['long_signal'] == 0) |  # No long signal
-                (data[RSI_COL] <= self.config.rsi_overbought)  # RSI not overbought
-            )
-            signals['technical_filter'] = signals['technical_filter'] & rsi_long_filter
+    def filter_mask(self, data: pd.DataFrame, signals: pd.DataFrame) -> np.ndarray:
+        """
+        Evaluate all filters in a single pass.
         
-        # RSI filter for short signals
-        if RSI_COL in data.columns and 'short_signal' in signals.columns:
-            rsi_short_filter = (
-                (signals['short_signal'] == 0) |  # No short signal
-                (data[RSI_COL] >= self.config.rsi_oversold)  # RSI not oversold
-            )
-            signals['technical_filter'] = signals['technical_filter'] & rsi_short_filter
+        Rolling statistics come from the frame's shared RollingStats cache,
+        so windows already computed by the indicator pipeline are reused.
         
-        # Bollinger Bands filter
-        if BB_MID_COL in data.columns and BB_STD_COL in data.columns:
-            bb_position = (data['close'] - data[BB_MID_COL]) / (data[BB_STD_COL] + 1e-9)
-            
-            bb_long_filter = (
-                (signals.get('long_signal', 0) == 0) |  # No long signal
-                (bb_position >= self.config.bb_oversold)  # Not too oversold
-            )
-            
-            bb_short_filter = (
-                (signals.get('short_signal', 0) == 0) |  # No short signal
-                (bb_position <= self.config.bb_overbought)  # Not too overbought
-            )
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Market data with technical indicators
+        signals : pd.DataFrame
+            DataFrame with signal columns (long_signal, short_signal, etc.)
             
-            signals['technical_filter'] = (
-                signals['technical_filter'] & bb_long_filter & bb_short_filter
-            )
-        
-        return signals
-    
-    def _apply_strength_filter(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Filter based on signal strength."""
-        # Check for signal strength columns
-        strength_columns = ['long_probability', 'short_probability', 'composite_signal']
-        
-        signals['strength_filter'] = True
-        
-        for col in strength_columns:
-            if col in signals.columns:
-                if 'probability' in col:
-                    # For probability columns, check minimum threshold
-                    strength_filter = (
-                        (signals[col] >= self.config.min_signal_strength) |
-                        (signals[col].isna())
-                    )
-                else:
-                    # For composite signal, check absolute value
-                    strength_filter = (
-                        (np.abs(signals[col]) >= self.config.min_signal_strength) |
-                        (signals[col].isna())
-                    )
-                
-                signals['strength_filter'] = signals['strength_filter'] & strength_filter
-        
-        return signals
-    
-    def _apply_atr_filter(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
-        """Filter based on ATR relative to price."""
-        if ATR_COL not in data.columns or 'close' not in data.columns:
-            signals['atr_filter'] = True
-            return signals
-        
-        # Calculate ATR as percentage of price
-        atr_ratio = data[ATR_COL] / (data['close'] + 1e-9)
-        
-        # Apply ATR range filter
-        signals['atr_filter'] = (
-            (atr_ratio >= self.config.min_atr_ratio) &
-            (atr_ratio <= self.config.max_atr_ratio)
+        Returns
+        -------
+        np.ndarray
+            Boolean matrix of shape (len(signals), len(FILTER_NAMES));
+            column k holds FILTER_NAMES[k]
+        """
+        if not data.index.equals(signals.index):
+            data = data.reindex(signals.index)
+        
+        config = self.config
+        stats = rolling_stats(data)
+        mask = np.ones((len(signals), len(FILTER_NAMES)), dtype=bool)
+        volume_f, volatility_f, price_f, technical_f, strength_f, atr_f = (
+            mask[:, k] for k in range(len(FILTER_NAMES))
         )
         
-        return signals
-    
-    def _combine_filters(self, signals: pd.DataFrame) -> pd.DataFrame:
+        def values(frame: pd.DataFrame, column: str) -> np.ndarray:
+            return frame[column].to_numpy(dtype=float, na_value=np.nan)
+        
+        def no_signal(column: str) -> np.ndarray:
+            if column not in signals.columns:
+                return np.ones(len(signals), dtype=bool)
+            return values(signals, column) == 0
+        
+        close = values(data, 'close') if 'close' in data.columns else None
+        atr = values(data, ATR_COL) if ATR_COL in data.columns else None
+        
+        # Volume relative to its 20-bar average
+        if 'volume' in data.columns:
+            volume_ma = stats.mean(data, 'volume', 20, min_periods=5)
+            volume_f[:] = values(data, 'volume') / (volume_ma + 1e-9) >= config.min_volume_ratio
+        
+        # Reject the most volatile bars (ATR above its rolling percentile)
+        if atr is not None:
+            atr_percentiles = stats.quantile(data, ATR_COL, 50, config.max_volatility_percentile, min_periods=10)
+            volatility_f[:] = atr <= atr_percentiles
+        
+        # Price range
+        if close is not None:
+            price_f[:] = (close >= config.min_price) & (close <= config.max_price)
+        
+        # RSI and Bollinger Bands must not contradict the signal direction
+        if RSI_COL in data.columns:
+            rsi = values(data, RSI_COL)
+            if 'long_signal' in signals.columns:
+                technical_f &= no_signal('long_signal') | (rsi <= config.rsi_overbought)
+            if 'short_signal' in signals.columns:
+                technical_f &= no_signal('short_signal') | (rsi >= config.rsi_oversold)
+        if close is not None and BB_MID_COL in data.columns and BB_STD_COL in data.columns:
+            bb_position = (close - values(data, BB_MID_COL)) / (values(data, BB_STD_COL) + 1e-9)
+            technical_f &= no_signal('long_signal') | (bb_position >= config.bb_oversold)
+            technical_f &= no_signal('short_signal') | (bb_position <= config.bb_overbought)
+        
+        # Signal strength: probabilities and |composite| above the threshold
+        for column in ('long_probability', 'short_probability', 'composite_signal'):
+            if column in signals.columns:
+                strength = values(signals, column)
+                if column == 'composite_signal':
+                    strength = np.abs(strength)
+                strength_f &= (strength >= config.min_signal_strength) | np.isnan(strength)
+        
+        # ATR relative to price
+        if atr is not None and close is not None:
+            atr_ratio = atr / (close + 1e-9)
+            atr_f[:] = (atr_ratio >= config.min_atr_ratio) & (atr_ratio <= config.max_atr_ratio)
+        
+        return mask
+    
+    def _combine_filters(self, signals: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
         """Combine all filters into final signal."""
-        # Get all filter columns
-        filter_columns = [col for col in signals.columns if col.endswith('_filter')]
+        columns = {name: mask[:, k] for k, name in enumerate(FILTER_NAMES)}
+        final_filter = mask.all(axis=1)
         
-        if not filter_columns:
-            signals['final_filter'] = True
-        else:
-            # All filters must pass
-            signals['final_filter'] = signals[filter_columns].all(axis=1)
+        # Filter columns the caller already had must pass too
+        extra_columns = [col for col in signals.columns
+                         if col.endswith('_filter') and col not in FILTER_NAMES and col != 'final_filter']
+        if extra_columns:
+            final_filter &= signals[extra_columns].all(axis=1).to_numpy()
+        columns['final_filter'] = final_filter
         
         # Apply final filter to signals
         signal_columns = ['long_signal', 'short_signal', 'long_probability', 'short_probability']
         for col in signal_columns:
             if col in signals.columns:
-                signals[f'filtered_{col}'] = signals[col].where(
-                    signals['final_filter'], 0
-                )
+                columns[f'filtered_{col}'] = signals[col].where(final_filter, 0).to_numpy()
         
-        return signals
+        # One concat instead of inserting the columns one by one
+        existing = [col for col in columns if col in signals.columns]
+        base = signals.drop(columns=existing) if existing else signals
+        filtered_signals = pd.concat([base, pd.DataFrame(columns, index=signals.index)], axis=1)
+        filtered_signals.attrs = signals.attrs
+        return filtered_signals
     
     def get_filter_stats(self, signals: pd.DataFrame) -> Dict[str, float]:
         """Get statistics about filter performance."""
@@ -287,13 +233,9 @@ def create_adaptive_filter(data: pd.DataFrame, lookback_days: int = 30) -> Signa
     # Use recent data for adaptive parameters
     recent_data = data.tail(lookback_days)
     
-    # Calculate adaptive volatility threshold (80th percentile of recent ATR)
-    if ATR_COL in recent_data.columns:
-        volatility_threshold = recent_data[ATR_COL].quantile(0.8)
-    else:
-        volatility_threshold = 0.1  # Default
-    
-    # Calculate adaptive volume threshold (median of recent volume ratios)
+    # Calculate adaptive volume threshold (median of recent volume ratios);
+    # the moving average warms up inside the window, so it is not shared
+    # with the full-history statistics of the frame
     if 'volume' in recent_data.columns:
         volume_ma = recent_data['volume'].rolling(window=10, min_periods=5).mean()
         volume_ratios = recent_data['volume'] / (volume_ma + 1e-9)
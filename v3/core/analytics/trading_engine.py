@@ -3,44 +3,80 @@
 from __future__ import annotations
 
 import logging
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from core.analytics.auto_trader import AutoTrader
 from core.analytics.signal_filters import SignalFilter, FilterConfig, create_adaptive_filter
 from core.analytics.advanced_risk import AdvancedRiskManager, RiskProfile
+from core.analytics.correlation import CorrelationService
 from core.analytics.scoring import compute_signal_scores, ScoringConfig
 from core.analytics.risk import apply_risk_management
 from core.database import (
     get_auto_trading_settings, update_auto_trading_settings,
-    save_trading_signal, get_pending_signals, save_auto_order,
-    update_order_status, mark_signal_processed, get_daily_order_count,
-    save_trade_history, get_trade_history, mergeMetrDaily
+    get_pending_signals, get_daily_order_count, get_trade_history,
+    mergeMetrDaily, TradingBatchWriter
 )
 from core.analyzer import StockAnalyzer
 
 logger = logging.getLogger(__name__)
 
+# Bars kept per ticker in live mode: covers the longest indicator and filter
+# windows (50-bar ATR percentile, EMA warm-up) with a wide margin
+LIVE_WINDOW_BARS = 300
+
+# Number of recent cycle durations kept for latency reporting
+CYCLE_LATENCY_HISTORY = 100
+
+
+@dataclass
+class LiveTickerState:
+    """Warm per-ticker state kept between live-mode cycles."""
+    bars: pd.DataFrame  # Tail window of raw mergeMetrDaily rows, oldest first
+    watermark: str  # Date of the newest bar already evaluated, as stored in daily_data
+
 
 class TradingEngine:
     """Integrated trading engine that orchestrates all automated trading components."""
     
-    def __init__(self, analyzer: StockAnalyzer, db_conn):
+    def __init__(self, analyzer: StockAnalyzer, db_conn, live_mode: bool = False,
+                 live_window: int = LIVE_WINDOW_BARS):
+        """
+        Parameters
+        ----------
+        analyzer : StockAnalyzer
+            Stock analyzer instance
+        db_conn : sqlite3.Connection
+            Database connection
+        live_mode : bool
+            Evaluate only bars newer than the last cycle's watermark, keeping a
+            warm tail window per ticker, instead of reloading the full history
+        live_window : int
+            Number of bars kept per ticker in live mode
+        """
         self.analyzer = analyzer
         self.db_conn = db_conn
         self.settings = get_auto_trading_settings(db_conn)
+        self.live_mode = live_mode
+        self.live_window = live_window
         
         # Initialize components
         self.signal_filter = self._create_signal_filter()
         self.auto_trader = AutoTrader(analyzer, db_conn, self.signal_filter)
+        self.correlation_service = self._create_correlation_service()
         self.risk_manager = self._create_risk_manager()
         
         # Session state
         self.is_running = False
         self.last_update = None
         self.processed_tickers = set()
+        self.live_state: Dict[str, LiveTickerState] = {}
+        self.cycle_latencies: Deque[float] = deque(maxlen=CYCLE_LATENCY_HISTORY)
     
     def _create_signal_filter(self) -> SignalFilter:
         """Create signal filter with current settings."""
@@ -65,7 +101,27 @@ class TradingEngine:
             take_profit_atr_multiplier=self.settings.get('take_profit_atr_multiplier', 3.0),
             max_holding_days=self.settings.get('max_holding_days', 5)
         )
-        return AdvancedRiskManager(profile)
+        return AdvancedRiskManager(profile, correlation_service=self.correlation_service)
+    
+    def _create_correlation_service(self) -> Optional[CorrelationService]:
+        """Restore the persisted return correlation matrix and catch up on new bars."""
+        try:
+            return CorrelationService.from_database(self.db_conn)
+        except Exception as e:
+            # The risk manager falls back to sector rules
+            logger.warning(f"Correlation service unavailable: {e}")
+            return None
+    
+    def _update_correlations(self) -> None:
+        """Add bars that arrived since the last cycle to the correlation matrix."""
+        if self.correlation_service is None:
+            return
+        try:
+            added = self.correlation_service.catch_up(self.db_conn)
+            if added:
+                logger.info(f"Correlation matrix updated with {added} bars")
+        except Exception as e:
+            logger.error(f"Failed to update correlations: {e}")
     
     def start_engine(self) -> bool:
         """Start the trading engine."""
@@ -80,6 +136,8 @@ class TradingEngine:
         self.is_running = True
         self.last_update = datetime.now()
         self.processed_tickers.clear()
+        # The first cycle of a session warms the live state up again
+        self.live_state.clear()
         
         logger.info("Trading engine started")
         return True
@@ -107,42 +165,119 @@ class TradingEngine:
             logger.warning("Trading engine is not running")
             return {}
         
+        self._update_correlations()
+        
+        if self.live_mode:
+            return self._process_new_bars()
+        
         # Get all available data
         source = mergeMetrDaily(self.db_conn)
         if source.empty:
             logger.warning("No data available for processing")
             return {}
         
-        # Get unique tickers
-        tickers = source["contract_code"].dropna().unique()
         results = {}
+        batch = TradingBatchWriter(self.db_conn)
         
-        for ticker in tickers:
+        # One pass over the frame instead of a boolean mask per ticker
+        for ticker, ticker_data in source.groupby("contract_code", sort=False):
             try:
-                # Get data for this ticker
-                ticker_data = source[source["contract_code"] == ticker].copy()
-                ticker_data["date"] = pd.to_datetime(ticker_data["date"], errors="coerce")
-                ticker_data = ticker_data.sort_values("date")
+                signals = self._evaluate_ticker(ticker, ticker_data, batch=batch)
+                results[ticker] = signals
                 
-                # Calculate technical indicators
-                from core.indicators import calculate_technical_indicators
-                calculated_data = calculate_technical_indicators(ticker_data, contract_code=ticker)
+                self.processed_tickers.add(ticker)
                 
-                # Process signals
-                signals = self.auto_trader.process_signals(calculated_data, ticker)
+                logger.info(f"Processed {ticker}: {len(signals)} signals")
+                
+            except Exception as e:
+                logger.error(f"Error processing {ticker}: {e}")
+                results[ticker] = []
+        
+        self._flush_signals(batch)
+        self.last_update = datetime.now()
+        return results
+    
+    def _process_new_bars(self) -> Dict[str, List[Dict]]:
+        """
+        Live mode: evaluate only bars newer than each ticker's watermark.
+        
+        Only rows after the oldest watermark are read. Indicators, scores
+        and filters are recomputed over the warm tail window plus the new
+        bars, and signals are emitted for the new bars only. A ticker seen
+        for the first time is warmed up from its tail window and only its
+        latest bar is evaluated, like in full-history mode.
+        
+        Returns
+        -------
+        Dict[str, List[Dict]]
+            Dictionary mapping ticker to signals for its new bars; tickers
+            without new bars are omitted
+        """
+        since = min((state.watermark for state in self.live_state.values()), default=None)
+        source = mergeMetrDaily(self.db_conn, since=since)
+        results = {}
+        batch = TradingBatchWriter(self.db_conn)
+        
+        for ticker, rows in source.groupby("contract_code", sort=False):
+            state = self.live_state.get(ticker)
+            if state is None:
+                window = rows.tail(self.live_window)
+                new_bars = 1
+            else:
+                rows = rows[rows["date"] > state.watermark]
+                if rows.empty:
+                    continue
+                window = pd.concat([state.bars, rows], ignore_index=True)
+                new_bars = len(rows)
+            
+            try:
+                signals = self._evaluate_ticker(ticker, window, new_bars, batch)
                 results[ticker] = signals
                 
                 self.processed_tickers.add(ticker)
                 
-                logger.info(f"Processed {ticker}: {len(signals)} signals")
+                logger.info(f"Processed {ticker}: {new_bars} new bars, {len(signals)} signals")
                 
             except Exception as e:
                 logger.error(f"Error processing {ticker}: {e}")
                 results[ticker] = []
+            
+            # Advance even on errors so a bad bar is not retried every cycle
+            self.live_state[ticker] = LiveTickerState(
+                bars=window.tail(self.live_window).reset_index(drop=True),
+                watermark=window["date"].iloc[-1]
+            )
         
+        self._flush_signals(batch)
         self.last_update = datetime.now()
         return results
     
+    def _flush_signals(self, batch: TradingBatchWriter) -> None:
+        """Save the cycle's signals in one transaction."""
+        try:
+            result = batch.flush()
+            if result.signal_ids:
+                logger.info(f"Saved {len(result.signal_ids)} signals")
+        except Exception as e:
+            logger.error(f"Failed to save signals: {e}")
+    
+    def _evaluate_ticker(self, ticker: str, bars: pd.DataFrame,
+                         new_bars: Optional[int] = None,
+                         batch: Optional[TradingBatchWriter] = None) -> List[Dict]:
+        """Calculate indicators for one ticker's bars and process its signals."""
+        from core.indicators import calculate_technical_indicators
+        
+        ticker_data = bars.copy()
+        ticker_data["date"] = pd.to_datetime(ticker_data["date"], errors="coerce")
+        ticker_data = ticker_data.sort_values("date")
+        
+        # Trade simulation only matters for historical evaluation
+        calculated_data = calculate_technical_indicators(
+            ticker_data, contract_code=ticker, risk_management=new_bars is None
+        )
+        
+        return self.auto_trader.process_signals(calculated_data, ticker, new_bars, batch)
+    
     def execute_pending_orders(self) -> List[Dict]:
         """Execute all pending orders."""
         if not self.is_running:
@@ -177,6 +312,7 @@ class TradingEngine:
         
         # Check for exit signals
         exit_signals = self.risk_manager.check_exit_signals()
+        batch = TradingBatchWriter(self.db_conn)
         
         for ticker, exit_reason in exit_signals:
             try:
@@ -193,13 +329,18 @@ class TradingEngine:
                     closed_positions.append(trade_summary)
                     
                     # Save to trade history
-                    save_trade_history(self.db_conn, trade_summary)
+                    batch.add_trade(trade_summary)
                     
                     logger.info(f"Closed position {ticker}: {exit_reason}")
                 
             except Exception as e:
                 logger.error(f"Error closing position {ticker}: {e}")
         
+        try:
+            batch.flush()
+        except Exception as e:
+            logger.error(f"Error saving trade history: {e}")
+        
         return closed_positions
     
     def get_engine_status(self) -> Dict:
@@ -208,11 +349,28 @@ class TradingEngine:
             'is_running': self.is_running,
             'last_update': self.last_update.isoformat() if self.last_update else None,
             'processed_tickers': len(self.processed_tickers),
+            'live_mode': self.live_mode,
+            'live_watermark': max((state.watermark for state in self.live_state.values()), default=None),
+            'cycle_latency': self.get_cycle_latency(),
             'settings': self.settings,
             'risk_summary': self.risk_manager.get_portfolio_summary(),
             'trading_stats': self.auto_trader.get_trading_stats() if self.auto_trader.current_session else {}
         }
     
+    def get_cycle_latency(self) -> Dict:
+        """Get trading cycle latency statistics in seconds over recent cycles."""
+        if not self.cycle_latencies:
+            return {'cycles': 0, 'last': None, 'mean': None, 'p95': None, 'max': None}
+        
+        latencies = np.fromiter(self.cycle_latencies, dtype=float)
+        return {
+            'cycles': len(latencies),
+            'last': float(latencies[-1]),
+            'mean': float(latencies.mean()),
+            'p95': float(np.percentile(latencies, 95)),
+            'max': float(latencies.max())
+        }
+    
     def get_performance_metrics(self) -> Dict:
         """Get comprehensive performance metrics."""
         # Get trade history
@@ -301,6 +459,7 @@ class TradingEngine:
             results['errors'].append(str(e))
         
         results['cycle_duration'] = (datetime.now() - cycle_start).total_seconds()
+        self.cycle_latencies.append(results['cycle_duration'])
         return results
     
     def update_settings(self, new_settings: Dict) -> bool:
@@ -0,0 +1,95 @@
+"""Bar-close events built from streamed candles and ticks.
+
+The real-time provider sends repeated updates of the forming candle and
+individual trades. ``BarAggregator`` keeps the forming bar per (symbol,
+timeframe) and returns a ``BarCloseEvent`` once an update for a later bar
+arrives, so consumers only react to completed bars. A bar closes at
+``BarCloseEvent.close_time``, its open time plus the timeframe length; the
+event itself is detected later, when the next update arrives.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+# Bar length per streamed timeframe (pandas offset aliases)
+TIMEFRAME_FREQ = {"1s": "s", "1m": "min", "1h": "h"}
+
+
+def _timestamp(value) -> pd.Timestamp:
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert("UTC").tz_localize(None)
+    return stamp
+
+
+@dataclass(frozen=True)
+class BarCloseEvent:
+    symbol: str
+    timeframe: str
+    time: pd.Timestamp  # Bar open time, UTC, tz-naive
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+    @property
+    def close_time(self) -> pd.Timestamp:
+        """End of the bar, UTC, tz-naive."""
+        return self.time + pd.Timedelta(1, TIMEFRAME_FREQ[self.timeframe])
+
+    def as_row(self) -> Tuple[pd.Timestamp, float, float, float, float, float]:
+        return self.time, self.open, self.high, self.low, self.close, self.volume
+
+
+class BarAggregator:
+    """Forming bar per (symbol, timeframe); emits the bar when a later one starts.
+
+    Not thread-safe: feed it from the event loop that receives the stream.
+    """
+
+    def __init__(self):
+        self._forming: Dict[Tuple[str, str], list] = {}
+
+    def add_candle(self, symbol: str, timeframe: str, candle: Mapping) -> Optional[BarCloseEvent]:
+        """Apply a streamed candle update; returns the previous bar if this one is newer."""
+        stamp = _timestamp(candle["time"])
+        key = (symbol, timeframe)
+        forming = self._forming.get(key)
+        if forming is not None and stamp < forming[0]:
+            return None  # Late update of an already closed bar
+        closed = self._close(key) if forming is not None and stamp > forming[0] else None
+        self._forming[key] = [stamp, float(candle["open"]), float(candle["high"]), float(candle["low"]),
+                              float(candle["close"]), float(candle.get("volume") or 0)]
+        return closed
+
+    def add_tick(self, symbol: str, timeframe: str, when, price, volume=0) -> Optional[BarCloseEvent]:
+        """Add a trade to the forming bar; returns the previous bar if the trade starts a new one."""
+        stamp = _timestamp(when).floor(TIMEFRAME_FREQ[timeframe])
+        price = float(price)
+        volume = float(volume or 0)
+        key = (symbol, timeframe)
+        forming = self._forming.get(key)
+        if forming is not None and stamp < forming[0]:
+            return None
+        if forming is not None and stamp == forming[0]:
+            forming[2] = max(forming[2], price)
+            forming[3] = min(forming[3], price)
+            forming[4] = price
+            forming[5] += volume
+            return None
+        closed = self._close(key) if forming is not None else None
+        self._forming[key] = [stamp, price, price, price, price, volume]
+        return closed
+
+    def flush(self, symbol: Optional[str] = None) -> List[BarCloseEvent]:
+        """Close the forming bars (of one symbol or all), e.g. at the end of a session."""
+        keys = [key for key in self._forming if symbol is None or key[0] == symbol]
+        return [self._close(key) for key in keys]
+
+    def _close(self, key: Tuple[str, str]) -> BarCloseEvent:
+        stamp, open_, high, low, close, volume = self._forming.pop(key)
+        return BarCloseEvent(key[0], key[1], stamp, open_, high, low, close, volume)
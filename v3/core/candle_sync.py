@@ -0,0 +1,340 @@
+"""
+Инкрементальная синхронизация свечей с watermark по (symbol, timeframe).
+
+Раньше DataUpdater'ы на каждом запуске перезапрашивали фиксированное окно
+(год дневных свечей, сутки минутных) и перезаписывали его целиком через
+INSERT OR REPLACE. CandleSync:
+
+* хранит в ``data_update_stats.watermark`` время открытия последнего
+  завершенного бара, уже полученного из API;
+* запрашивает только диапазон после watermark, укладывая его в окна в
+  пределах лимита GetCandles и пропуская неторговые дни (TradingCalendar);
+* раз в сутки ищет в недавней истории торговые дни без баров и догружает их;
+* пишет только новые и изменившиеся бары.
+
+Вызовы API, полученные свечи и записанные строки за запуск собираются
+в :class:`SyncReport`.
+"""
+
+import logging
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .multi_timeframe_db import ensure_data_update_stats_table, get_timeframe_table_name, update_data_stats
+from .price_cache import get_price_cache
+from .scheduler.trading_calendar import TradingCalendar
+from .timeframe_resampler import BASE_TIMEFRAME, get_resampler
+
+logger = logging.getLogger(__name__)
+
+# Длительность бара синхронизируемых таймфреймов
+TIMEFRAME_STEPS: Dict[str, pd.Timedelta] = {
+    '1d': pd.Timedelta(days=1),
+    '1h': pd.Timedelta(hours=1),
+    '15m': pd.Timedelta(minutes=15),
+    '5m': pd.Timedelta(minutes=5),
+    '1m': pd.Timedelta(minutes=1),
+}
+SYNC_TIMEFRAMES = tuple(TIMEFRAME_STEPS)
+
+# fetch(figi, timeframe, from_date, to_date) -> свечи с колонками time/open/high/low/close/volume
+CandleFetcher = Callable[[str, str, datetime, datetime], pd.DataFrame]
+
+
+@dataclass
+class CandleSyncConfig:
+    """Параметры синхронизации."""
+    # Глубина первой загрузки символа без watermark и без истории в БД, дни
+    initial_days: Dict[str, float] = field(default_factory=lambda: {
+        '1d': 365, '1h': 7, '15m': 1, '5m': 1, '1m': 1})
+    # Максимальный период одного запроса GetCandles (ограничения Tinkoff API), дни
+    max_request_days: Dict[str, float] = field(default_factory=lambda: {
+        '1d': 365, '1h': 7, '15m': 1, '5m': 1, '1m': 1})
+    # Насколько глубоко до watermark искать торговые дни без баров, дни
+    backfill_days: int = 14
+
+
+@dataclass
+class SyncReport:
+    """Итоги одного запуска синхронизации таймфрейма."""
+    timeframe: str
+    symbols: int = 0
+    api_calls: int = 0
+    candles_fetched: int = 0
+    rows_written: int = 0
+    rows_unchanged: int = 0      # Полученные бары, совпавшие с БД (не перезаписывались)
+    gap_days: int = 0            # Торговых дней догружено из пропусков
+    non_trading_days: int = 0    # Дней диапазона, не запрошенных как неторговые
+    errors: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def as_dict(self) -> Dict[str, float]:
+        data = asdict(self)
+        data['seconds'] = round(time.perf_counter() - data.pop('started_at'), 3)
+        return data
+
+    def summary(self) -> str:
+        return (f"Candle sync {self.timeframe}: {self.symbols} symbols, {self.api_calls} API calls, "
+                f"{self.candles_fetched} candles fetched, {self.rows_written} rows written, "
+                f"{self.rows_unchanged} unchanged, {self.gap_days} gap days backfilled, {self.errors} errors")
+
+
+def _utc(value) -> pd.Timestamp:
+    stamp = pd.Timestamp(value)
+    return stamp.tz_localize('UTC') if stamp.tzinfo is None else stamp.tz_convert('UTC')
+
+
+class CandleSync:
+    """Синхронизация свечей из API в таблицы data_{timeframe} по watermark."""
+
+    def __init__(self, fetch: CandleFetcher, config: Optional[CandleSyncConfig] = None,
+                 calendar: Optional[TradingCalendar] = None):
+        """
+        Args:
+            fetch: Запрос свечей FIGI за диапазон; ошибки API должны пробрасываться,
+                иначе пустой ответ сдвинет watermark через непроверенный диапазон
+            config: Параметры синхронизации
+            calendar: Торговый календарь для пропуска неторговых дней
+        """
+        self.fetch = fetch
+        self.config = config or CandleSyncConfig()
+        self.calendar = calendar or TradingCalendar()
+        self._prepared: Set[Tuple[str, str]] = set()
+        self._gap_scans: Dict[Tuple[str, str], date] = {}
+        self._empty_days: Set[Tuple[str, str, date]] = set()  # Пропуски, для которых API вернул пустоту
+
+    def sync(self, conn: sqlite3.Connection, assets: Iterable[Tuple[str, str]], timeframe: str,
+             now: Optional[datetime] = None) -> SyncReport:
+        """Синхронизировать пары (symbol, figi); ошибки символов логируются и считаются в отчете."""
+        report = SyncReport(timeframe)
+        for symbol, figi in assets:
+            try:
+                self.sync_symbol(conn, symbol, figi, timeframe, report, now=now)
+            except Exception as e:
+                logger.error(f"Candle sync failed for {symbol} ({timeframe}): {e}")
+        logger.info(report.summary())
+        return report
+
+    def sync_symbol(self, conn: sqlite3.Connection, symbol: str, figi: str, timeframe: str,
+                    report: Optional[SyncReport] = None, now: Optional[datetime] = None) -> int:
+        """
+        Догрузить недостающие свечи символа.
+
+        Возвращает число записанных строк. Ошибка запроса пробрасывается после
+        сохранения watermark по успешно полученным окнам.
+        """
+        report = report if report is not None else SyncReport(timeframe)
+        step = TIMEFRAME_STEPS[timeframe]
+        table = get_timeframe_table_name(timeframe)
+        now = _utc(now if now is not None else datetime.now(timezone.utc))
+        self._prepare(conn, table)
+        report.symbols += 1
+
+        watermark = self._read_watermark(conn, symbol, timeframe)
+        horizon = now - pd.Timedelta(days=max(self.config.initial_days[timeframe], self.config.backfill_days))
+        if watermark is not None:
+            start = watermark + step
+        else:
+            last_stored = conn.execute(f"SELECT MAX(datetime) FROM {table} WHERE symbol = ?",
+                                       (symbol,)).fetchone()[0]
+            # Последний сохраненный бар мог быть незавершенным - запрашиваем его заново
+            start = (_utc(last_stored) if last_stored
+                     else now - pd.Timedelta(days=self.config.initial_days[timeframe]))
+        start = max(start, horizon)
+
+        days = self._trading_days(start, now, report)
+        written, synced_to, first_incomplete, error = 0, now, None, None
+        for lo, hi in self._windows(days, start, now, timeframe):
+            try:
+                data = self._request(figi, timeframe, lo, hi, report)
+            except Exception as e:
+                synced_to, error = lo, e
+                report.errors += 1
+                break
+            written += self._store(conn, symbol, timeframe, table, data, report)
+            incomplete = self._first_incomplete(data, hi, step)
+            if incomplete is not None and first_incomplete is None:
+                first_incomplete = incomplete
+
+        # Watermark - последний бар, закрытый к моменту, до которого диапазон получен
+        new_watermark = synced_to.floor(step) - step
+        if first_incomplete is not None:
+            new_watermark = min(new_watermark, first_incomplete - step)
+        if watermark is not None:
+            new_watermark = max(new_watermark, watermark)
+        progressed = synced_to > start and (watermark is None or new_watermark > watermark)
+        update_data_stats(conn, symbol, timeframe, success=error is None,
+                          error_message=None if error is None else str(error),
+                          watermark=new_watermark.isoformat() if progressed else None)
+        if error is not None:
+            raise error
+
+        try:
+            written += self._backfill_gaps(conn, symbol, figi, timeframe, table, new_watermark, now, report)
+        except Exception as e:
+            self._gap_scans.pop((symbol, timeframe), None)  # Повторить на следующем запуске
+            report.errors += 1
+            logger.warning(f"Gap backfill failed for {symbol} ({timeframe}): {e}")
+        return written
+
+    # ------------------------------------------------------------------ диапазоны
+
+    def _trading_days(self, start: pd.Timestamp, end: pd.Timestamp,
+                      report: Optional[SyncReport] = None) -> List[pd.Timestamp]:
+        """Торговые дни (полночь UTC), пересекающиеся с [start, end)."""
+        days = []
+        day = start.normalize()
+        while day < end:
+            if self.calendar.is_trading_day(day.tz_localize(None).to_pydatetime()):
+                days.append(day)
+            elif report is not None:
+                report.non_trading_days += 1
+            day += pd.Timedelta(days=1)
+        return days
+
+    def _windows(self, days: List[pd.Timestamp], start: pd.Timestamp, end: pd.Timestamp,
+                 timeframe: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Уложить торговые дни в окна запросов не длиннее max_request_days."""
+        max_span = pd.Timedelta(days=self.config.max_request_days[timeframe])
+        windows: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+        for day in days:
+            lo, hi = max(start, day), min(end, day + pd.Timedelta(days=1))
+            if lo >= hi:
+                continue
+            if windows and hi - windows[-1][0] <= max_span:
+                windows[-1] = (windows[-1][0], hi)
+            else:
+                windows.append((lo, hi))
+        return windows
+
+    # ------------------------------------------------------------------ запросы и запись
+
+    def _request(self, figi: str, timeframe: str, lo: pd.Timestamp, hi: pd.Timestamp,
+                 report: SyncReport) -> pd.DataFrame:
+        report.api_calls += 1
+        data = self.fetch(figi, timeframe, lo.to_pydatetime(), hi.to_pydatetime())
+        if data is None or data.empty:
+            return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+        report.candles_fetched += len(data)
+        return data
+
+    def _store(self, conn: sqlite3.Connection, symbol: str, timeframe: str, table: str,
+               data: pd.DataFrame, report: SyncReport) -> int:
+        """Записать новые и изменившиеся бары; совпадающие с БД пропускаются."""
+        if data.empty:
+            return 0
+        times = pd.to_datetime(data['time'], utc=True)
+        rows = sorted(
+            (stamp.isoformat(), float(o), float(h), float(l), float(c), int(v))
+            for stamp, o, h, l, c, v in zip(times, data['open'], data['high'], data['low'],
+                                            data['close'], data['volume'].fillna(0))
+        )
+        existing = {
+            row[0]: row[1:] for row in conn.execute(
+                f"SELECT datetime, open, high, low, close, volume FROM {table} "
+                "WHERE symbol = ? AND datetime >= ? AND datetime <= ?",
+                (symbol, rows[0][0], rows[-1][0]))
+        }
+        changed = [row for row in rows if existing.get(row[0]) != row[1:]]
+        report.rows_unchanged += len(rows) - len(changed)
+        get_price_cache().update_from_candles(symbol, data, source=timeframe)
+        if not changed:
+            return 0
+
+        with conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (symbol, datetime, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, *row) for row in changed])
+        report.rows_written += len(changed)
+        if timeframe == BASE_TIMEFRAME:
+            get_resampler().invalidate(symbol, changed[0][0])
+        return len(changed)
+
+    @staticmethod
+    def _first_incomplete(data: pd.DataFrame, hi: pd.Timestamp, step: pd.Timedelta) -> Optional[pd.Timestamp]:
+        """Время первого незавершенного бара ответа (по is_complete или по концу бара)."""
+        if data.empty:
+            return None
+        times = pd.to_datetime(data['time'], utc=True)
+        incomplete = times + step > hi
+        if 'is_complete' in data.columns:
+            incomplete |= ~data['is_complete'].fillna(True).astype(bool).to_numpy()
+        return times[incomplete].min() if incomplete.any() else None
+
+    # ------------------------------------------------------------------ пропуски
+
+    def _backfill_gaps(self, conn: sqlite3.Connection, symbol: str, figi: str, timeframe: str,
+                       table: str, watermark: pd.Timestamp, now: pd.Timestamp, report: SyncReport) -> int:
+        """Раз в сутки догрузить торговые дни без баров между началом истории и watermark."""
+        key = (symbol, timeframe)
+        if self._gap_scans.get(key) == now.date():
+            return 0
+        self._gap_scans[key] = now.date()
+
+        since = (watermark - pd.Timedelta(days=self.config.backfill_days)).normalize()
+        until = watermark.normalize()  # День watermark догружается основным диапазоном
+        present = {row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr(datetime, 1, 10) FROM {table} "
+            "WHERE symbol = ? AND datetime >= ? AND datetime < ?",
+            (symbol, since.isoformat(), until.isoformat()))}
+        if not present:
+            return 0
+        first = _utc(min(present))
+        gaps = [day for day in self._trading_days(first, until)
+                if day.strftime('%Y-%m-%d') not in present
+                and (symbol, timeframe, day.date()) not in self._empty_days]
+        if not gaps:
+            return 0
+
+        written = 0
+        for lo, hi in self._windows(gaps, gaps[0], gaps[-1] + pd.Timedelta(days=1), timeframe):
+            data = self._request(figi, timeframe, lo, hi, report)
+            written += self._store(conn, symbol, timeframe, table, data, report)
+            filled = set(pd.to_datetime(data['time'], utc=True).dt.strftime('%Y-%m-%d')) if not data.empty else set()
+            for day in gaps:
+                if lo <= day < hi:
+                    if day.strftime('%Y-%m-%d') in filled:
+                        report.gap_days += 1
+                    else:
+                        # Неучтенный календарем выходной или день без сделок
+                        self._empty_days.add((symbol, timeframe, day.date()))
+        if written:
+            logger.info(f"Backfilled {report.gap_days} gap days for {symbol} ({timeframe})")
+        return written
+
+    # ------------------------------------------------------------------ служебное
+
+    def _prepare(self, conn: sqlite3.Connection, table: str) -> None:
+        database = conn.execute("PRAGMA database_list").fetchone()[2] or f"memory:{id(conn)}"
+        if (database, table) in self._prepared:
+            return
+        ensure_data_update_stats_table(conn)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                datetime TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(symbol, datetime)
+            )
+        """)
+        self._prepared.add((database, table))
+
+    @staticmethod
+    def _read_watermark(conn: sqlite3.Connection, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        row = conn.execute("SELECT watermark FROM data_update_stats WHERE timeframe = ? AND symbol = ?",
+                           (timeframe, symbol)).fetchone()
+        return _utc(row[0]) if row and row[0] else None
@@ -297,46 +297,21 @@ class CascadeAnalyzer:
                 initial_ml_result = self.initial_ml_cache.get(symbol, {})
                 print(f"🔍 [CASCADE_SYMBOL] {symbol}: Результат из кэша: {initial_ml_result}")
             
-            if not initial_ml_result:
-                print(f"❌ [CASCADE_SYMBOL] {symbol}: Нет ML результата")
-                result.rejected_at_stage = '1d'
-                result.rejection_reason = 'No initial ML result available'
-                logger.warning(f"{symbol} rejected: No initial ML result")
-                return result
-            
-            # Проверяем, что ML сигнал достаточно сильный для каскадного анализа
-            ensemble_signal = initial_ml_result.get('ml_ensemble_signal', 'HOLD')
-            confidence = initial_ml_result.get('ml_price_confidence', 0.0)
-            
-            print(f"📊 [CASCADE_SYMBOL] {symbol}: ML сигнал = {ensemble_signal}, уверенность = {confidence:.1%}")
-            
-            if ensemble_signal not in ['BUY', 'STRONG_BUY', 'SELL', 'STRONG_SELL']:
-                print(f"❌ [CASCADE_SYMBOL] {symbol}: Слабый ML сигнал {ensemble_signal}")
-                result.rejected_at_stage = '1d'
-                result.rejection_reason = f'Weak ML signal: {ensemble_signal}'
-                logger.info(f"{symbol} rejected: Weak ML signal {ensemble_signal}")
-                return result
+            stage_1d = self._evaluate_stage_1d(initial_ml_result)
+            if stage_1d.get('signal'):
+                print(f"📊 [CASCADE_SYMBOL] {symbol}: ML сигнал = {stage_1d['signal']}, уверенность = {stage_1d['confidence']:.1%}")
             
-            if confidence < 0.5:  # Минимальная уверенность для каскадного анализа
-                print(f"❌ [CASCADE_SYMBOL] {symbol}: Низкая уверенность {confidence:.1%}")
+            if not stage_1d['proceed']:
+                print(f"❌ [CASCADE_SYMBOL] {symbol}: Отклонен на этапе 1d - {stage_1d['reason']}")
                 result.rejected_at_stage = '1d'
-                result.rejection_reason = f'Low ML confidence: {confidence:.2f}'
-                logger.info(f"{symbol} rejected: Low ML confidence {confidence:.2f}")
+                result.rejection_reason = stage_1d['reason']
+                logger.info(f"{symbol} rejected at stage 1d: {result.rejection_reason}")
                 return result
             
             print(f"✅ [CASCADE_SYMBOL] {symbol}: Этап 1d пройден")
             
             # Сохраняем результат 1d этапа
-            result.stages['1d'] = {
-                'proceed': True,
-                'signal': ensemble_signal,
-                'confidence': confidence,
-                'ensemble_signal': ensemble_signal,
-                'price_signal': initial_ml_result.get('ml_price_signal', 'HOLD'),
-                'sentiment_signal': initial_ml_result.get('ml_sentiment_signal', 'HOLD'),
-                'technical_signal': initial_ml_result.get('ml_technical_signal', 'HOLD'),
-                'reason': 'Initial ML analysis passed'
-            }
+            result.stages['1d'] = stage_1d
             
             # Этап 1: Подтверждение на часовых данных (1h)
             print(f"⏰ [CASCADE_SYMBOL] {symbol}: Этап 1h - анализ часовых данных...")
@@ -381,21 +356,7 @@ class CascadeAnalyzer:
             print(f"✅ [CASCADE_SYMBOL] {symbol}: Этап 1s пройден")
             
             # Формируем финальный сигнал
-            result.final_signal = ensemble_signal  # Используем сигнал из ML анализа
-            result.confidence = self._calculate_final_confidence(
-                result.stages['1d'], stage1_result, stage2_result, stage3_result
-            )
-            result.entry_price = stage3_result['entry_price']
-            result.stop_loss = stage2_result['stop_loss']
-            result.take_profit = stage2_result['take_profit']
-            result.risk_reward = stage2_result['risk_reward']
-            
-            # Проверяем, можно ли включить автоматическую торговлю
-            result.auto_trade_enabled = (
-                self.auto_trade_config['enabled'] and 
-                result.confidence >= self.auto_trade_config['min_confidence'] and
-                self._is_trading_hours()
-            )
+            self._finalize_cascade_result(result)
             
             print(f"🎉 [CASCADE_SYMBOL] {symbol}: Каскадный анализ завершен успешно!")
             print(f"  📊 Сигнал: {result.final_signal}")
@@ -416,6 +377,50 @@ class CascadeAnalyzer:
         
         return result
     
+    def _evaluate_stage_1d(self, initial_ml_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Этап 1d: проверка результата предварительного ML анализа."""
+        if not initial_ml_result:
+            return {'proceed': False, 'reason': 'No initial ML result available', 'confidence': 0.0}
+        
+        ensemble_signal = initial_ml_result.get('ml_ensemble_signal', 'HOLD')
+        confidence = initial_ml_result.get('ml_price_confidence', 0.0)
+        
+        if ensemble_signal not in ['BUY', 'STRONG_BUY', 'SELL', 'STRONG_SELL']:
+            return {'proceed': False, 'reason': f'Weak ML signal: {ensemble_signal}',
+                    'signal': ensemble_signal, 'confidence': confidence}
+        
+        if confidence < 0.5:  # Минимальная уверенность для каскадного анализа
+            return {'proceed': False, 'reason': f'Low ML confidence: {confidence:.2f}',
+                    'signal': ensemble_signal, 'confidence': confidence}
+        
+        return {
+            'proceed': True,
+            'signal': ensemble_signal,
+            'confidence': confidence,
+            'ensemble_signal': ensemble_signal,
+            'price_signal': initial_ml_result.get('ml_price_signal', 'HOLD'),
+            'sentiment_signal': initial_ml_result.get('ml_sentiment_signal', 'HOLD'),
+            'technical_signal': initial_ml_result.get('ml_technical_signal', 'HOLD'),
+            'reason': 'Initial ML analysis passed'
+        }
+    
+    def _finalize_cascade_result(self, result: CascadeSignalResult) -> None:
+        """Заполнить итоговый сигнал по результатам всех пройденных этапов."""
+        stage_1d, stage_1h, stage_1m, stage_1s = (result.stages[s] for s in ('1d', '1h', '1m', '1s'))
+        result.final_signal = stage_1d['signal']  # Используем сигнал из ML анализа
+        result.confidence = self._calculate_final_confidence(stage_1d, stage_1h, stage_1m, stage_1s)
+        result.entry_price = stage_1s['entry_price']
+        result.stop_loss = stage_1m['stop_loss']
+        result.take_profit = stage_1m['take_profit']
+        result.risk_reward = stage_1m['risk_reward']
+        
+        # Проверяем, можно ли включить автоматическую торговлю
+        result.auto_trade_enabled = (
+            self.auto_trade_config['enabled'] and 
+            result.confidence >= self.auto_trade_config['min_confidence'] and
+            self._is_trading_hours()
+        )
+    
     async def _analyze_stage_1d(self, symbol: str) -> Dict[str, Any]:
         """Этап 1: Анализ ML сигналов на дневных данных."""
         try:
@@ -565,8 +570,9 @@ class CascadeAnalyzer:
             logger.error(f"Error generating fallback signals: {e}")
             return {'ml_ensemble_signal': 'HOLD', 'ml_price_signal': 'HOLD'}
     
-    async def _analyze_stage_1h(self, symbol: str, stage1_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Этап 2: Подтверждение на часовых данных."""
+    async def _analyze_stage_1h(self, symbol: str, stage1_result: Dict[str, Any],
+                                hourly_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Этап 2: Подтверждение на часовых данных (hourly_data - уже загруженное окно)."""
         try:
             # Получаем FIGI для символа
             figi = self.multi_analyzer.get_figi_for_symbol(symbol)
@@ -579,7 +585,8 @@ class CascadeAnalyzer:
                 }
             
             # Получаем часовые данные из таблицы data_1hour
-            hourly_data = self._get_data_from_db(symbol, '1h')
+            if hourly_data is None:
+                hourly_data = self._get_data_from_db(symbol, '1h')
             
             if hourly_data.empty:
                 return {
@@ -647,8 +654,9 @@ class CascadeAnalyzer:
                 'confidence': 0.0
             }
     
-    async def _analyze_stage_1m(self, symbol: str, stage1_result: Dict[str, Any], stage2_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Этап 3: Поиск точки входа на минутных данных."""
+    async def _analyze_stage_1m(self, symbol: str, stage1_result: Dict[str, Any], stage2_result: Dict[str, Any],
+                                minute_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Этап 3: Поиск точки входа на минутных данных (minute_data - уже загруженное окно)."""
         try:
             # Получаем FIGI для символа
             figi = self.multi_analyzer.get_figi_for_symbol(symbol)
@@ -661,7 +669,8 @@ class CascadeAnalyzer:
                 }
             
             # Получаем минутные данные из таблицы data_1min
-            minute_data = self._get_data_from_db(symbol, '1m')
+            if minute_data is None:
+                minute_data = self._get_data_from_db(symbol, '1m')
             
             if minute_data.empty:
                 return {
@@ -731,8 +740,9 @@ class CascadeAnalyzer:
                 'confidence': 0.0
             }
     
-    async def _analyze_stage_1s(self, symbol: str, stage1_result: Dict[str, Any], stage2_result: Dict[str, Any], stage3_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Этап 4: Оптимизация на секундных данных."""
+    async def _analyze_stage_1s(self, symbol: str, stage1_result: Dict[str, Any], stage2_result: Dict[str, Any], stage3_result: Dict[str, Any],
+                                second_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Этап 4: Оптимизация на секундных данных (second_data - уже загруженное окно)."""
         try:
             # Получаем FIGI для символа
             figi = self.multi_analyzer.get_figi_for_symbol(symbol)
@@ -745,7 +755,8 @@ class CascadeAnalyzer:
                 }
             
             # Получаем секундные данные из таблицы data_1sec
-            second_data = self._get_data_from_db(symbol, '1s')
+            if second_data is None:
+                second_data = self._get_data_from_db(symbol, '1s')
             
             if second_data.empty:
                 # Если секундные данные недоступны, используем минутные данные
@@ -1634,21 +1645,22 @@ class CascadeAnalyzer:
             if symbols:
                 print(f"🔍 [ML_ANALYSIS] Первые 5 символов: {symbols[:5]}")
             
-            # Проверяем БД кэш если включен
+            # Проверяем посимвольный БД кэш: пересчитываются только символы,
+            # у которых сменилась модель или появились новые бары
+            cached_results: Dict[str, Any] = {}
+            symbols_to_analyze = list(symbols)
             if use_db_cache:
                 print(f"🔍 [ML_ANALYSIS] Проверяем БД кэш...")
-                cached_data = cascade_ml_cache.get_ml_results(symbols, min_volume, min_avg_volume)
-                if cached_data:
-                    print(f"✅ [ML_ANALYSIS] Найдены кэшированные ML результаты: {cached_data['results_count']} символов")
-                    print(f"📅 [ML_ANALYSIS] Кэш создан: {cached_data.get('created_at', 'неизвестно')}")
-                    return cached_data['ml_results']
-                else:
-                    print(f"🔍 [ML_ANALYSIS] Кэш не найден или устарел, выполняем новый анализ")
+                cached_results, symbols_to_analyze = cascade_ml_cache.get_symbol_results(symbols)
+                print(f"✅ [ML_ANALYSIS] Из кэша: {len(cached_results)}, к пересчёту: {len(symbols_to_analyze)}")
+                if not symbols_to_analyze:
+                    self.initial_ml_cache = cached_results
+                    return cached_results
             
             if not self.ml_manager:
                 print("⚠️ [ML_ANALYSIS] ML менеджер недоступен, используем fallback режим")
                 logger.warning("ML manager not available for initial analysis")
-                return {}
+                return cached_results
             
             print(f"✅ [ML_ANALYSIS] ML менеджер доступен: {type(self.ml_manager)}")
             
@@ -1659,11 +1671,15 @@ class CascadeAnalyzer:
             successful_count = 0
             failed_count = 0
             
-            for i, symbol in enumerate(symbols):
-                print(f"🔄 [ML_ANALYSIS] Анализируем {symbol} ({i+1}/{len(symbols)})...")
+            # Общие входы (рыночный сентимент, OHLCV) считаются один раз на прогон
+            batch = await signal_generator.generate_ml_signals_batch(symbols_to_analyze)
+            timings = ", ".join(f"{stage}={seconds:.1f}s" for stage, seconds in batch['timings'].items())
+            print(f"⏱️ [ML_ANALYSIS] Этапы: {timings}")
+            
+            for i, symbol in enumerate(symbols_to_analyze):
+                print(f"🔄 [ML_ANALYSIS] Анализируем {symbol} ({i+1}/{len(symbols_to_analyze)})...")
                 try:
-                    # Генерируем ML сигналы для символа
-                    signals = await signal_generator.generate_ml_signals(symbol)
+                    signals = batch['signals'].get(symbol, {'error': 'No result'})
                     if 'error' not in signals:
                         ml_results[symbol] = signals
                         successful_count += 1
@@ -1690,23 +1706,23 @@ class CascadeAnalyzer:
             print(f"💾 [ML_ANALYSIS] Размер результатов до сохранения: {len(ml_results)}")
             print(f"💾 [ML_ANALYSIS] Размер кэша до сохранения: {len(self.initial_ml_cache)}")
             
-            self.initial_ml_cache = ml_results
-            
-            # Сохраняем в БД кэш если включен
+            # Сохраняем в БД кэш только пересчитанные символы
             if use_db_cache and ml_results:
                 print(f"💾 [ML_ANALYSIS] Сохраняем результаты в БД кэш...")
-                cache_saved = cascade_ml_cache.save_ml_results(
-                    symbols=symbols,
-                    ml_results=ml_results,
-                    min_volume=min_volume,
-                    min_avg_volume=min_avg_volume,
-                    expires_in_hours=6
-                )
-                if cache_saved:
-                    print(f"✅ [ML_ANALYSIS] Результаты успешно сохранены в БД кэш")
+                saved_count = cascade_ml_cache.save_symbol_results(ml_results, expires_in_hours=6)
+                if saved_count:
+                    print(f"✅ [ML_ANALYSIS] В БД кэш сохранено символов: {saved_count}")
                 else:
                     print(f"⚠️ [ML_ANALYSIS] Не удалось сохранить результаты в БД кэш")
             
+            # Порядок результатов совпадает с порядком входных символов
+            ml_results = {
+                symbol: cached_results.get(symbol, ml_results.get(symbol))
+                for symbol in symbols
+                if symbol in cached_results or symbol in ml_results
+            }
+            self.initial_ml_cache = ml_results
+            
             print(f"💾 [ML_ANALYSIS] Кэш обновлен!")
             print(f"💾 [ML_ANALYSIS] Размер кэша после сохранения: {len(self.initial_ml_cache)}")
             print(f"💾 [ML_ANALYSIS] Ключи в кэше: {list(self.initial_ml_cache.keys())[:5]}{'...' if len(self.initial_ml_cache) > 5 else ''}")
@@ -0,0 +1,246 @@
+"""
+Event-driven cascade re-evaluation.
+Каскадный анализ в реальном времени по событиям закрытия баров.
+
+RealtimeCascade keeps per-symbol rolling windows of the bars each cascade
+stage reads and, on every closed bar from EnhancedRealTimeDataManager,
+re-runs only the stage of that timeframe and the stages after it:
+a 1m bar re-runs 1m → 1s, a 1s bar re-runs 1s, and an hourly bar (built
+from the minute stream) re-runs 1h → 1m → 1s. Earlier stage results are
+reused. Latency is tracked per timeframe from the bar's close time (open
+time plus its length) to the cascade decision, so it includes the delay
+until the stream reports the close; an hourly bar closed by the minute
+stream is counted under 1h from the end of its hour.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.bar_events import BarCloseEvent
+from core.cascade_analyzer import CascadeAnalyzer, CascadeSignalResult
+
+logger = logging.getLogger(__name__)
+
+STAGE_ORDER = ('1h', '1m', '1s')
+
+# Баров в окне этапа: _analyze_hourly_trend читает 24 часа,
+# _analyze_minute_entry и _analyze_second_optimization - последние 60 баров
+STAGE_WINDOW_BARS = {'1h': 24, '1m': 60, '1s': 60}
+
+# Последних измерений задержки на таймфрейм
+LATENCY_HISTORY = 1000
+
+WINDOW_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+@dataclass
+class SymbolCascadeState:
+    """Состояние каскада символа между событиями."""
+    stage_1d: Dict[str, Any]
+    windows: Dict[str, Deque[tuple]]
+    result: Optional[CascadeSignalResult] = None
+    forming_hour: Optional[List] = None  # Часовой бар, собираемый из минутных
+    stage_runs: Counter = field(default_factory=Counter)
+
+
+class RealtimeCascade:
+    """Инкрементальный каскад 1h → 1m → 1s поверх CascadeAnalyzer."""
+
+    def __init__(self, analyzer: CascadeAnalyzer, window_bars: Optional[Dict[str, int]] = None,
+                 on_decision: Optional[Callable[[CascadeSignalResult], Any]] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            analyzer: Каскадный анализатор (правила этапов и конфигурация)
+            window_bars: Размер окна по таймфреймам (не меньше STAGE_WINDOW_BARS)
+            on_decision: Колбэк для каждого пересчитанного результата
+            clock: Текущее время UTC в секундах эпохи (подменяется при воспроизведении истории)
+        """
+        self.analyzer = analyzer
+        self.window_bars = {tf: max(bars, (window_bars or {}).get(tf, bars))
+                            for tf, bars in STAGE_WINDOW_BARS.items()}
+        self.on_decision = on_decision
+        self.clock = clock
+        self.states: Dict[str, SymbolCascadeState] = {}
+        self.latencies: Dict[str, Deque[float]] = {tf: deque(maxlen=LATENCY_HISTORY) for tf in STAGE_ORDER}
+
+    async def add_symbol(self, symbol: str, initial_ml_result: Optional[Dict[str, Any]] = None,
+                         windows: Optional[Dict[str, pd.DataFrame]] = None) -> CascadeSignalResult:
+        """
+        Загрузить окна символа и выполнить полный каскад.
+
+        Args:
+            symbol: Торговый символ
+            initial_ml_result: Результат ML анализа 1d (по умолчанию из кэша анализатора)
+            windows: Готовые окна по таймфреймам; недостающие читаются из БД один раз
+        """
+        if not initial_ml_result:
+            initial_ml_result = self.analyzer.initial_ml_cache.get(symbol, {})
+        windows = windows or {}
+        state = SymbolCascadeState(
+            stage_1d=self.analyzer._evaluate_stage_1d(initial_ml_result),
+            windows={},
+        )
+        for timeframe in STAGE_ORDER:
+            data = windows.get(timeframe)
+            if data is None:
+                data = self.analyzer._get_data_from_db(symbol, timeframe)
+            state.windows[timeframe] = self._to_window(data, self.window_bars[timeframe])
+        self.states[symbol] = state
+        return await self._evaluate(symbol, state, STAGE_ORDER[0])
+
+    def remove_symbol(self, symbol: str) -> None:
+        self.states.pop(symbol, None)
+
+    def attach(self, manager) -> None:
+        """Подписаться на закрытия баров EnhancedRealTimeDataManager."""
+        manager.add_bar_listener(self.on_bar_close)
+
+    def detach(self, manager) -> None:
+        manager.remove_bar_listener(self.on_bar_close)
+
+    async def on_bar_close(self, event: BarCloseEvent) -> Optional[CascadeSignalResult]:
+        """Обработать закрытый бар: обновить окно и пересчитать затронутые этапы."""
+        state = self.states.get(event.symbol)
+        if state is None or event.timeframe not in STAGE_ORDER:
+            return None
+
+        start = self._apply_bar(state, event)
+        result = await self._evaluate(event.symbol, state, start)
+        now = self.clock()
+        self.latencies[event.timeframe].append(now - event.close_time.timestamp())
+        if start == '1h' and event.timeframe == '1m':
+            hour_close = state.windows['1h'][-1][0] + pd.Timedelta(1, 'h')
+            self.latencies['1h'].append(now - hour_close.timestamp())
+
+        if self.on_decision is not None:
+            try:
+                decision = self.on_decision(result)
+                if asyncio.iscoroutine(decision):
+                    await decision
+            except Exception as e:
+                logger.error(f"Error in cascade decision callback for {event.symbol}: {e}")
+        return result
+
+    def _apply_bar(self, state: SymbolCascadeState, event: BarCloseEvent) -> str:
+        """Добавить бар в окно; возвращает первый этап для пересчета."""
+        self._push(state.windows[event.timeframe], event.as_row())
+        if event.timeframe != '1m':
+            return event.timeframe
+
+        # Часовые бары собираются из минутного потока
+        hour = event.time.floor('h')
+        forming = state.forming_hour
+        if forming is None or hour > forming[0]:
+            state.forming_hour = [hour, event.open, event.high, event.low, event.close, event.volume]
+            if forming is not None:
+                self._push(state.windows['1h'], tuple(forming))
+                return '1h'
+        elif hour == forming[0]:
+            forming[2] = max(forming[2], event.high)
+            forming[3] = min(forming[3], event.low)
+            forming[4] = event.close
+            forming[5] += event.volume
+        return '1m'
+
+    async def _evaluate(self, symbol: str, state: SymbolCascadeState, start: str) -> CascadeSignalResult:
+        """Пересчитать этапы начиная со start, переиспользуя результаты предыдущих."""
+        previous = state.result
+        first = STAGE_ORDER.index(start)
+        if previous is not None and previous.rejected_at_stage in ('1d',) + STAGE_ORDER[:first]:
+            # Сигнал отклонен на более раннем этапе - новые бары решения не меняют
+            return previous
+        if previous is None or any(tf not in previous.stages for tf in STAGE_ORDER[:first]):
+            first = 0
+
+        result = CascadeSignalResult()
+        result.symbol = symbol
+        stage_1d = state.stage_1d
+        if not stage_1d['proceed']:
+            result.rejected_at_stage = '1d'
+            result.rejection_reason = stage_1d['reason']
+            state.result = result
+            return result
+        result.stages['1d'] = stage_1d
+        for timeframe in STAGE_ORDER[:first]:
+            result.stages[timeframe] = previous.stages[timeframe]
+
+        try:
+            for timeframe in STAGE_ORDER[first:]:
+                stage = await self._run_stage(symbol, timeframe, result.stages, state)
+                state.stage_runs[timeframe] += 1
+                result.stages[timeframe] = stage
+                if not stage['proceed']:
+                    result.rejected_at_stage = timeframe
+                    result.rejection_reason = stage['reason']
+                    break
+            else:
+                self.analyzer._finalize_cascade_result(result)
+        except Exception as e:
+            logger.error(f"Error in realtime cascade for {symbol}: {e}")
+            result.rejected_at_stage = 'error'
+            result.rejection_reason = str(e)
+
+        state.result = result
+        return result
+
+    async def _run_stage(self, symbol: str, timeframe: str, stages: Dict[str, Dict[str, Any]],
+                         state: SymbolCascadeState) -> Dict[str, Any]:
+        data = pd.DataFrame(list(state.windows[timeframe]), columns=WINDOW_COLUMNS)
+        if timeframe == '1h':
+            return await self.analyzer._analyze_stage_1h(symbol, stages['1d'], hourly_data=data)
+        if timeframe == '1m':
+            return await self.analyzer._analyze_stage_1m(symbol, stages['1d'], stages['1h'], minute_data=data)
+        return await self.analyzer._analyze_stage_1s(symbol, stages['1d'], stages['1h'], stages['1m'],
+                                                     second_data=data)
+
+    @staticmethod
+    def _push(window: Deque[tuple], row: tuple) -> None:
+        # Бар с тем же временем (незакрытый бар из БД) заменяется закрытым
+        if window and window[-1][0] == row[0]:
+            window.pop()
+        window.append(row)
+
+    @staticmethod
+    def _to_window(data: Optional[pd.DataFrame], bars: int) -> Deque[tuple]:
+        window: Deque[tuple] = deque(maxlen=bars)
+        if data is None or data.empty:
+            return window
+        data = data.rename(columns={'datetime': 'time'})
+        if 'time' in data.columns:
+            # Время событий - UTC без таймзоны
+            data = data.assign(time=pd.to_datetime(data['time'], utc=True).dt.tz_localize(None)).sort_values('time')
+        window.extend(data.reindex(columns=WINDOW_COLUMNS).tail(bars).itertuples(index=False, name=None))
+        return window
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Задержка закрытие бара → решение каскада (секунды) по таймфреймам."""
+        stats = {}
+        for timeframe, history in self.latencies.items():
+            if not history:
+                stats[timeframe] = {'events': 0, 'last': None, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+                continue
+            latencies = np.fromiter(history, dtype=float)
+            stats[timeframe] = {
+                'events': len(latencies),
+                'last': float(latencies[-1]),
+                'mean': float(latencies.mean()),
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(latencies.max())
+            }
+        return stats
+
+    def get_stage_runs(self) -> Dict[str, int]:
+        """Сколько раз пересчитывался каждый этап по всем символам."""
+        total: Counter = Counter()
+        for state in self.states.values():
+            total.update(state.stage_runs)
+        return {timeframe: total.get(timeframe, 0) for timeframe in STAGE_ORDER}
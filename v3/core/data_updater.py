@@ -1,7 +1,6 @@
 ﻿"""Data updater for multi-timeframe data synchronization."""
 
 import asyncio
-import schedule
 import time
 import threading
 from datetime import datetime, timedelta
@@ -11,6 +10,8 @@ import pandas as pd
 
 from .multi_timeframe_analyzer import MultiTimeframeStockAnalyzer
 from .database import get_connection
+from .price_cache import get_price_cache
+from .timeframe_resampler import DERIVED_ONLY_TIMEFRAMES, get_resampler
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ class DataUpdater:
         self.api_key = api_key
         self.analyzer = MultiTimeframeStockAnalyzer(api_key=api_key)
         self.is_running = False
-        self.scheduler_thread = None
+        self._scheduled_tasks: List[str] = []
         
         # РќР°СЃС‚СЂРѕР№РєРё РѕР±РЅРѕРІР»РµРЅРёСЏ
         self.update_schedules = {
@@ -49,17 +50,16 @@ class DataUpdater:
         self.is_running = True
         
         # РќР°СЃС‚СЂР°РёРІР°РµРј СЂР°СЃРїРёСЃР°РЅРёРµ
-        schedule.every().day.at("18:00").do(self.update_daily_data)
-        schedule.every().hour.at(":00").do(self.update_hourly_data)
-        schedule.every().minute.at(":00").do(self.update_minute_data)
-        schedule.every(5).minutes.at(":00").do(self.update_5min_data)
-        schedule.every(15).minutes.at(":00").do(self.update_15min_data)
+        from .scheduler.background import background_scheduler
+        self._scheduled_tasks = background_scheduler.add_updater_tasks(type(self).__name__, {
+            '1d': self.update_daily_data,
+            '1h': self.update_hourly_data,
+            '1m': self.update_minute_data,
+            '5m': self.update_5min_data,
+            '15m': self.update_15min_data,
+        })
         
         logger.info("Data updater scheduler started")
-        
-        # Р—Р°РїСѓСЃРєР°РµРј РІ РѕС‚РґРµР»СЊРЅРѕРј РїРѕС‚РѕРєРµ
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        self.scheduler_thread.start()
     
     def stop_scheduler(self):
         """РћСЃС‚Р°РЅРѕРІРёС‚СЊ РїР»Р°РЅРёСЂРѕРІС‰РёРє РѕР±РЅРѕРІР»РµРЅРёСЏ."""
@@ -68,23 +68,12 @@ class DataUpdater:
             return
         
         self.is_running = False
-        schedule.clear()
-        
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
+        from .scheduler.background import background_scheduler
+        background_scheduler.remove_tasks(self._scheduled_tasks)
+        self._scheduled_tasks = []
         
         logger.info("Data updater scheduler stopped")
     
-    def _run_scheduler(self):
-        """Р—Р°РїСѓСЃС‚РёС‚СЊ РїР»Р°РЅРёСЂРѕРІС‰РёРє РІ С†РёРєР»Рµ."""
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(5)
-    
     def update_daily_data(self):
         """РћР±РЅРѕРІРёС‚СЊ РґРЅРµРІРЅС‹Рµ РґР°РЅРЅС‹Рµ."""
         logger.info("Updating daily data...")
@@ -112,6 +101,10 @@ class DataUpdater:
     
     def _update_timeframe_data(self, timeframe: str):
         """РћР±РЅРѕРІРёС‚СЊ РґР°РЅРЅС‹Рµ РґР»СЏ СѓРєР°Р·Р°РЅРЅРѕРіРѕ С‚Р°Р№РјС„СЂРµР№РјР°."""
+        if timeframe in DERIVED_ONLY_TIMEFRAMES:
+            logger.info(f"Skipping {timeframe} download: bars are resampled from 1m data")
+            return
+        
         try:
             conn = get_connection()
             cursor = conn.cursor()
@@ -198,6 +191,8 @@ class DataUpdater:
             ))
         
         conn.commit()
+        get_price_cache().update_from_candles(symbol, data, source=timeframe)
+        get_resampler().invalidate_from_candles(symbol, timeframe, data)
     
     def get_update_stats(self) -> Dict:
         """РџРѕР»СѓС‡РёС‚СЊ СЃС‚Р°С‚РёСЃС‚РёРєСѓ РѕР±РЅРѕРІР»РµРЅРёР№."""
@@ -4,7 +4,6 @@ Enhanced DataUpdater with support for 1s and tick data.
 """
 
 import asyncio
-import schedule
 import time
 import threading
 from datetime import datetime, timedelta
@@ -14,6 +13,8 @@ import pandas as pd
 
 from .multi_timeframe_analyzer_enhanced import EnhancedMultiTimeframeStockAnalyzer
 from .database import get_connection
+from .price_cache import get_price_cache
+from .timeframe_resampler import DERIVED_ONLY_TIMEFRAMES, get_resampler
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ class EnhancedDataUpdater:
         self.api_key = api_key
         self.analyzer = EnhancedMultiTimeframeStockAnalyzer(api_key=api_key)
         self.is_running = False
-        self.scheduler_thread = None
+        self._scheduled_tasks: List[str] = []
         
         # Настройки обновления
         self.update_schedules = {
@@ -54,39 +55,31 @@ class EnhancedDataUpdater:
         self.is_running = True
         
         # Настраиваем расписание
-        schedule.every().day.at("18:00").do(self.update_daily_data)
-        schedule.every().hour.at(":00").do(self.update_hourly_data)
-        schedule.every().minute.at(":00").do(self.update_minute_data)
-        schedule.every(5).minutes.at(":00").do(self.update_5min_data)
-        schedule.every(15).minutes.at(":00").do(self.update_15min_data)
+        from .scheduler.background import background_scheduler
+        self._scheduled_tasks = background_scheduler.add_updater_tasks(type(self).__name__, {
+            '1d': self.update_daily_data,
+            '1h': self.update_hourly_data,
+            '1m': self.update_minute_data,
+            '5m': self.update_5min_data,
+            '15m': self.update_15min_data,
+        })
         
         # Экспериментальные: секундные и тиковые данные
-        # schedule.every().second.do(self.update_second_data)  # Очень часто!
-        # schedule.every(0.1).seconds.do(self.update_tick_data)  # Каждые 100мс!
+        # background_scheduler.add_task(f"{type(self).__name__}:1s", self.update_second_data,
+        #                                timedelta(seconds=1))  # Очень часто!
+        # background_scheduler.add_task(f"{type(self).__name__}:tick", self.update_tick_data,
+        #                                timedelta(milliseconds=100))  # Каждые 100мс!
         
         logger.info("Enhanced data updater scheduler started")
-        
-        # Запускаем в отдельном потоке
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler)
-        self.scheduler_thread.daemon = True
-        self.scheduler_thread.start()
     
     def stop_scheduler(self):
         """Остановить планировщик обновления."""
         self.is_running = False
-        schedule.clear()
+        from .scheduler.background import background_scheduler
+        background_scheduler.remove_tasks(self._scheduled_tasks)
+        self._scheduled_tasks = []
         logger.info("Enhanced data updater scheduler stopped")
     
-    def _run_scheduler(self):
-        """Запустить планировщик в цикле."""
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(5)
-    
     def update_daily_data(self):
         """Обновить дневные данные."""
         logger.info("Updating daily data...")
@@ -124,6 +117,11 @@ class EnhancedDataUpdater:
     
     def _update_timeframe_data(self, timeframe: str):
         """Обновить данные для указанного таймфрейма."""
+        if timeframe in DERIVED_ONLY_TIMEFRAMES:
+            # 5m/15m строятся из минутных свечей (core.timeframe_resampler)
+            logger.info(f"Skipping {timeframe} download: bars are resampled from 1m data")
+            return
+        
         try:
             conn = get_connection()
             cursor = conn.cursor()
@@ -221,6 +219,8 @@ class EnhancedDataUpdater:
             ))
         
         conn.commit()
+        get_price_cache().update_from_candles(symbol, data, source=timeframe)
+        get_resampler().invalidate_from_candles(symbol, timeframe, data)
     
     def _save_tick_data(self, conn, symbol: str, data: pd.DataFrame):
         """Сохранить тиковые данные."""
@@ -257,6 +257,8 @@ class EnhancedDataUpdater:
             ))
         
         conn.commit()
+        get_price_cache().update_from_candles(
+            symbol, data, source="tick", price_col="price" if "price" in data.columns else "close")
     
     def get_update_stats(self) -> Dict:
         """Получить статистику обновлений."""
@@ -334,7 +336,11 @@ class EnhancedDataUpdater:
         """Отключить обновление для таймфрейма."""
         if timeframe in self.update_schedules:
             # Удаляем из расписания
-            schedule.clear()
+            from .scheduler.background import background_scheduler
+            name = f"{type(self).__name__}:{timeframe}"
+            if name in self._scheduled_tasks:
+                background_scheduler.remove_task(name)
+                self._scheduled_tasks.remove(name)
             logger.info(f"Timeframe {timeframe} disabled")
         else:
             logger.warning(f"Timeframe {timeframe} is not supported")
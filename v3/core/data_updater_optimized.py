@@ -4,7 +4,6 @@ Optimized DataUpdater with all tickers and timeframes.
 """
 
 import asyncio
-import schedule
 import time
 import threading
 from datetime import datetime, timedelta
@@ -14,7 +13,9 @@ import pandas as pd
 import random
 
 from .multi_timeframe_analyzer_enhanced import EnhancedMultiTimeframeStockAnalyzer
+from .candle_sync import CandleSync, SyncReport
 from .database import get_connection
+from .timeframe_resampler import DERIVED_ONLY_TIMEFRAMES
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class OptimizedDataUpdater:
         self.max_requests_per_minute = max_requests_per_minute
         self.analyzer = EnhancedMultiTimeframeStockAnalyzer(api_key=api_key)
         self.is_running = False
-        self.scheduler_thread = None
+        self._scheduled_tasks: List[str] = []
         
         # Rate limiting с учетом deadline'ов
         self.request_times = []
@@ -61,9 +62,13 @@ class OptimizedDataUpdater:
             'rate_limit_hits': 0,
             'total_symbols': 0,
             'successful_updates': 0,
-            'failed_updates': 0
+            'failed_updates': 0,
+            'last_sync': {}
         }
         
+        # Инкрементальная загрузка свечей по watermark (core.candle_sync)
+        self.candle_sync = CandleSync(self._fetch_candles)
+        
         # Кэш для оптимизации
         self.symbol_cache = {}
         self.figi_cache = {}
@@ -93,6 +98,11 @@ class OptimizedDataUpdater:
             # Небольшая задержка для соблюдения deadline'а
             time.sleep(deadline_seconds / 1000.0)
     
+    def _fetch_candles(self, figi: str, timeframe: str, from_date: datetime, to_date: datetime) -> pd.DataFrame:
+        """Запрос диапазона свечей для CandleSync с учетом rate limit."""
+        self._wait_for_rate_limit('GetCandles')
+        return self.analyzer.get_stock_data(figi, timeframe, from_date=from_date, to_date=to_date)
+    
     def start_scheduler(self):
         """Запустить планировщик обновления."""
         if self.is_running:
@@ -102,35 +112,25 @@ class OptimizedDataUpdater:
         self.is_running = True
         
         # Настраиваем расписание для всех таймфреймов
-        schedule.every().day.at("18:00").do(self.update_daily_data)
-        schedule.every().hour.at(":00").do(self.update_hourly_data)
-        schedule.every().minute.at(":00").do(self.update_minute_data)
-        schedule.every(5).minutes.at(":00").do(self.update_5min_data)
-        schedule.every(15).minutes.at(":00").do(self.update_15min_data)
+        from .scheduler.background import background_scheduler
+        self._scheduled_tasks = background_scheduler.add_updater_tasks(type(self).__name__, {
+            '1d': self.update_daily_data,
+            '1h': self.update_hourly_data,
+            '1m': self.update_minute_data,
+            '5m': self.update_5min_data,
+            '15m': self.update_15min_data,
+        })
         
         logger.info("Optimized data updater scheduler started")
-        
-        # Запускаем в отдельном потоке
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler)
-        self.scheduler_thread.daemon = True
-        self.scheduler_thread.start()
     
     def stop_scheduler(self):
         """Остановить планировщик обновления."""
         self.is_running = False
-        schedule.clear()
+        from .scheduler.background import background_scheduler
+        background_scheduler.remove_tasks(self._scheduled_tasks)
+        self._scheduled_tasks = []
         logger.info("Optimized data updater scheduler stopped")
     
-    def _run_scheduler(self):
-        """Запустить планировщик в цикле."""
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(5)
-    
     def update_daily_data(self):
         """Обновить дневные данные для всех тикеров."""
         logger.info("Updating daily data for all tickers...")
@@ -158,6 +158,11 @@ class OptimizedDataUpdater:
     
     def _update_timeframe_data(self, timeframe: str):
         """Обновить данные для указанного таймфрейма для всех тикеров."""
+        if timeframe in DERIVED_ONLY_TIMEFRAMES:
+            # 5m/15m строятся из минутных свечей (core.timeframe_resampler)
+            logger.info(f"Skipping {timeframe} download: bars are resampled from 1m data")
+            return
+        
         try:
             conn = get_connection()
             cursor = conn.cursor()
@@ -174,6 +179,7 @@ class OptimizedDataUpdater:
             
             updated_count = 0
             error_count = 0
+            report = SyncReport(timeframe)
             
             # Обрабатываем символы батчами для оптимизации
             batch_size = 10  # Обрабатываем по 10 символов за раз
@@ -183,7 +189,7 @@ class OptimizedDataUpdater:
                 
                 # Обрабатываем батч
                 batch_updated, batch_errors = self._process_symbol_batch(
-                    batch_symbols, timeframe, figi_mapping, conn
+                    batch_symbols, timeframe, figi_mapping, conn, report
                 )
                 
                 updated_count += batch_updated
@@ -197,38 +203,30 @@ class OptimizedDataUpdater:
                 time.sleep(0.1)
             
             conn.close()
+            self.update_stats['last_sync'][timeframe] = report.as_dict()
+            logger.info(report.summary())
             logger.info(f"Updated {updated_count} symbols for {timeframe}, {error_count} errors")
             
         except Exception as e:
             logger.error(f"Error updating {timeframe} data: {e}")
     
     def _process_symbol_batch(self, symbols: List[str], timeframe: str, 
-                            figi_mapping: Dict, conn) -> Tuple[int, int]:
+                            figi_mapping: Dict, conn,
+                            report: Optional[SyncReport] = None) -> Tuple[int, int]:
         """Обработать батч символов."""
         updated_count = 0
         error_count = 0
         
         for symbol in symbols:
             try:
-                # Проверяем rate limit перед каждым запросом
-                self._wait_for_rate_limit('GetCandles')
-                
                 figi = figi_mapping.get(symbol)
                 if not figi:
                     logger.warning(f"FIGI not found for {symbol}")
                     error_count += 1
                     continue
                 
-                # Получаем данные через API
-                data = self.analyzer.get_stock_data(figi, timeframe)
-                
-                if data.empty:
-                    logger.warning(f"No data returned for {symbol} ({timeframe})")
-                    error_count += 1
-                    continue
-                
-                # Сохраняем в БД
-                self._save_timeframe_data(conn, symbol, timeframe, data)
+                # Запрашиваем только диапазон после watermark (rate limit - в _fetch_candles)
+                self.candle_sync.sync_symbol(conn, symbol, figi, timeframe, report)
                 updated_count += 1
                 
                 # Обновляем статистику
@@ -251,45 +249,6 @@ class OptimizedDataUpdater:
         
         return updated_count, error_count
     
-    def _save_timeframe_data(self, conn, symbol: str, timeframe: str, data: pd.DataFrame):
-        """Сохранить данные таймфрейма в БД."""
-        cursor = conn.cursor()
-        
-        # Создаем таблицу для таймфрейма, если не существует
-        table_name = f"data_{timeframe.replace('m', 'min').replace('h', 'hour')}"
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                datetime TEXT NOT NULL,
-                open REAL,
-                high REAL,
-                low REAL,
-                close REAL,
-                volume INTEGER,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(symbol, datetime)
-            )
-        """)
-        
-        # Вставляем данные
-        for _, row in data.iterrows():
-            cursor.execute(f"""
-                INSERT OR REPLACE INTO {table_name}
-                (symbol, datetime, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                symbol,
-                row['time'].isoformat(),
-                row['open'],
-                row['high'],
-                row['low'],
-                row['close'],
-                row['volume']
-            ))
-        
-        conn.commit()
-    
     def get_update_stats(self) -> Dict:
         """Получить статистику обновлений."""
         return {
@@ -301,7 +260,8 @@ class OptimizedDataUpdater:
             'current_requests_per_minute': len(self.request_times),
             'total_symbols': self.update_stats['total_symbols'],
             'successful_updates': self.update_stats['successful_updates'],
-            'failed_updates': self.update_stats['failed_updates']
+            'failed_updates': self.update_stats['failed_updates'],
+            'last_sync': self.update_stats['last_sync']
         }
     
     def get_timeframe_status(self, timeframe: str) -> Dict:
@@ -4,7 +4,6 @@ DataUpdater с ограничением скорости для работы с
 """
 
 import asyncio
-import schedule
 import time
 import threading
 from datetime import datetime, timedelta
@@ -13,6 +12,7 @@ import logging
 import pandas as pd
 
 from .multi_timeframe_analyzer_enhanced import EnhancedMultiTimeframeStockAnalyzer
+from .candle_sync import SYNC_TIMEFRAMES, CandleSync, SyncReport
 from .database import get_connection
 
 logger = logging.getLogger(__name__)
@@ -26,7 +26,7 @@ class RateLimitedDataUpdater:
         self.max_requests_per_minute = max_requests_per_minute
         self.analyzer = EnhancedMultiTimeframeStockAnalyzer(api_key=api_key)
         self.is_running = False
-        self.scheduler_thread = None
+        self._scheduled_tasks: List[str] = []
         
         # Rate limiting
         self.request_times = []
@@ -48,8 +48,12 @@ class RateLimitedDataUpdater:
             'last_update': {},
             'update_count': {},
             'errors': {},
-            'rate_limit_hits': 0
+            'rate_limit_hits': 0,
+            'last_sync': {}
         }
+        
+        # Инкрементальная загрузка свечей по watermark (core.candle_sync)
+        self.candle_sync = CandleSync(self._fetch_candles)
     
     def _wait_for_rate_limit(self):
         """Ожидать, если достигнут лимит запросов."""
@@ -71,6 +75,11 @@ class RateLimitedDataUpdater:
             # Добавляем текущий запрос
             self.request_times.append(now)
     
+    def _fetch_candles(self, figi: str, timeframe: str, from_date: datetime, to_date: datetime) -> pd.DataFrame:
+        """Запрос диапазона свечей для CandleSync с учетом rate limit."""
+        self._wait_for_rate_limit()
+        return self.analyzer.get_stock_data(figi, timeframe, from_date=from_date, to_date=to_date)
+    
     def start_scheduler(self):
         """Запустить планировщик обновления."""
         if self.is_running:
@@ -80,36 +89,26 @@ class RateLimitedDataUpdater:
         self.is_running = True
         
         # Настраиваем расписание (только безопасные интервалы)
-        schedule.every().day.at("18:00").do(self.update_daily_data)
-        schedule.every().hour.at(":00").do(self.update_hourly_data)
-        # Убираем слишком частые обновления
-        # schedule.every().minute.at(":00").do(self.update_minute_data)
-        # schedule.every(5).minutes.at(":00").do(self.update_5min_data)
-        # schedule.every(15).minutes.at(":00").do(self.update_15min_data)
+        from .scheduler.background import background_scheduler
+        self._scheduled_tasks = background_scheduler.add_updater_tasks(type(self).__name__, {
+            '1d': self.update_daily_data,
+            '1h': self.update_hourly_data,
+            # Убираем слишком частые обновления
+            # '1m': self.update_minute_data,
+            # '5m': self.update_5min_data,
+            # '15m': self.update_15min_data,
+        })
         
         logger.info("Rate-limited data updater scheduler started")
-        
-        # Запускаем в отдельном потоке
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler)
-        self.scheduler_thread.daemon = True
-        self.scheduler_thread.start()
     
     def stop_scheduler(self):
         """Остановить планировщик обновления."""
         self.is_running = False
-        schedule.clear()
+        from .scheduler.background import background_scheduler
+        background_scheduler.remove_tasks(self._scheduled_tasks)
+        self._scheduled_tasks = []
         logger.info("Rate-limited data updater scheduler stopped")
     
-    def _run_scheduler(self):
-        """Запустить планировщик в цикле."""
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(5)
-    
     def update_daily_data(self):
         """Обновить дневные данные."""
         logger.info("Updating daily data...")
@@ -163,26 +162,31 @@ class RateLimitedDataUpdater:
             
             updated_count = 0
             error_count = 0
+            report = SyncReport(timeframe)
             
             for symbol in symbols:
                 try:
-                    # Проверяем rate limit перед каждым запросом
-                    self._wait_for_rate_limit()
-                    
                     figi = figi_mapping.get(symbol)
                     if not figi:
                         logger.warning(f"FIGI not found for {symbol}")
                         continue
                     
-                    # Получаем данные через API
-                    data = self.analyzer.get_stock_data(figi, timeframe)
-                    
-                    if data.empty:
-                        logger.warning(f"No data returned for {symbol} ({timeframe})")
-                        continue
-                    
-                    # Сохраняем в БД
-                    self._save_timeframe_data(conn, symbol, timeframe, data)
+                    if timeframe in SYNC_TIMEFRAMES:
+                        # Запрашиваем только диапазон после watermark (rate limit - в _fetch_candles)
+                        self.candle_sync.sync_symbol(conn, symbol, figi, timeframe, report)
+                    else:
+                        # Проверяем rate limit перед каждым запросом
+                        self._wait_for_rate_limit()
+                        
+                        # Получаем данные через API
+                        data = self.analyzer.get_stock_data(figi, timeframe)
+                        
+                        if data.empty:
+                            logger.warning(f"No data returned for {symbol} ({timeframe})")
+                            continue
+                        
+                        # Сохраняем в БД
+                        self._save_timeframe_data(conn, symbol, timeframe, data)
                     updated_count += 1
                     
                     # Обновляем статистику
@@ -204,6 +208,9 @@ class RateLimitedDataUpdater:
                         logger.error(f"Error updating {symbol} ({timeframe}): {e}")
             
             conn.close()
+            if timeframe in SYNC_TIMEFRAMES:
+                self.update_stats['last_sync'][timeframe] = report.as_dict()
+                logger.info(report.summary())
             logger.info(f"Updated {updated_count} symbols for {timeframe}, {error_count} errors")
             
         except Exception as e:
@@ -303,7 +310,8 @@ class RateLimitedDataUpdater:
             'update_count': self.update_stats['update_count'],
             'errors': self.update_stats['errors'],
             'rate_limit_hits': self.update_stats['rate_limit_hits'],
-            'current_requests_per_minute': len(self.request_times)
+            'current_requests_per_minute': len(self.request_times),
+            'last_sync': self.update_stats['last_sync']
         }
     
     def get_timeframe_status(self, timeframe: str) -> Dict:
@@ -4,7 +4,6 @@ DataUpdater с поддержкой акций (shares) и фьючерсов (f
 """
 
 import asyncio
-import schedule
 import time
 import threading
 from datetime import datetime, timedelta
@@ -14,7 +13,9 @@ import pandas as pd
 
 from .multi_timeframe_analyzer_enhanced import EnhancedMultiTimeframeStockAnalyzer
 from .shares_integration import SharesIntegrator
+from .candle_sync import CandleSync, SyncReport
 from .database import get_connection
+from .timeframe_resampler import DERIVED_ONLY_TIMEFRAMES
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ class DataUpdaterWithShares:
         self.analyzer = EnhancedMultiTimeframeStockAnalyzer(api_key=api_key)
         self.shares_integrator = SharesIntegrator()
         self.is_running = False
-        self.scheduler_thread = None
+        self._scheduled_tasks: List[str] = []
         
         # Rate limiting
         self.request_times = []
@@ -62,8 +63,12 @@ class DataUpdaterWithShares:
             'successful_updates': 0,
             'failed_updates': 0,
             'shares_updated': 0,
-            'futures_updated': 0
+            'futures_updated': 0,
+            'last_sync': {}
         }
+        
+        # Инкрементальная загрузка свечей по watermark (core.candle_sync)
+        self.candle_sync = CandleSync(self._fetch_candles)
     
     def _wait_for_rate_limit(self, method: str = 'GetCandles', timeframe: str = None):
         """Ожидать с учетом deadline'а метода."""
@@ -95,6 +100,11 @@ class DataUpdaterWithShares:
             # Небольшая задержка для соблюдения deadline'а
             time.sleep(deadline_seconds / 1000.0)
     
+    def _fetch_candles(self, figi: str, timeframe: str, from_date: datetime, to_date: datetime) -> pd.DataFrame:
+        """Запрос диапазона свечей для CandleSync с учетом rate limit."""
+        self._wait_for_rate_limit('GetCandles', timeframe)
+        return self.analyzer.get_stock_data(figi, timeframe, from_date=from_date, to_date=to_date)
+    
     def start_scheduler(self):
         """Запустить планировщик обновления."""
         if self.is_running:
@@ -104,35 +114,25 @@ class DataUpdaterWithShares:
         self.is_running = True
         
         # Настраиваем расписание для всех таймфреймов
-        schedule.every().day.at("18:00").do(self.update_daily_data)
-        schedule.every().hour.at(":00").do(self.update_hourly_data)
-        schedule.every().minute.at(":00").do(self.update_minute_data)
-        schedule.every(5).minutes.at(":00").do(self.update_5min_data)
-        schedule.every(15).minutes.at(":00").do(self.update_15min_data)
+        from .scheduler.background import background_scheduler
+        self._scheduled_tasks = background_scheduler.add_updater_tasks(type(self).__name__, {
+            '1d': self.update_daily_data,
+            '1h': self.update_hourly_data,
+            '1m': self.update_minute_data,
+            '5m': self.update_5min_data,
+            '15m': self.update_15min_data,
+        })
         
         logger.info("DataUpdater with shares support scheduler started")
-        
-        # Запускаем в отдельном потоке
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler)
-        self.scheduler_thread.daemon = True
-        self.scheduler_thread.start()
     
     def stop_scheduler(self):
         """Остановить планировщик обновления."""
         self.is_running = False
-        schedule.clear()
+        from .scheduler.background import background_scheduler
+        background_scheduler.remove_tasks(self._scheduled_tasks)
+        self._scheduled_tasks = []
         logger.info("DataUpdater with shares support scheduler stopped")
     
-    def _run_scheduler(self):
-        """Запустить планировщик в цикле."""
-        while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(5)
-    
     def update_daily_data(self):
         """Обновить дневные данные для всех активов."""
         logger.info("Updating daily data for all assets (shares + futures)...")
@@ -160,6 +160,11 @@ class DataUpdaterWithShares:
     
     def _update_timeframe_data(self, timeframe: str):
         """Обновить данные для указанного таймфрейма для всех активов."""
+        if timeframe in DERIVED_ONLY_TIMEFRAMES:
+            # 5m/15m строятся из минутных свечей (core.timeframe_resampler)
+            logger.info(f"Skipping {timeframe} download: bars are resampled from 1m data")
+            return
+        
         try:
             conn = get_connection()
             cursor = conn.cursor()
@@ -187,6 +192,8 @@ class DataUpdaterWithShares:
             error_count = 0
             shares_updated = 0
             futures_updated = 0
+            updated_symbols: List[str] = []
+            report = SyncReport(timeframe)
             
             # Обрабатываем активы батчами для оптимизации
             batch_size = 10
@@ -196,7 +203,7 @@ class DataUpdaterWithShares:
                 
                 # Обрабатываем батч
                 batch_updated, batch_errors, batch_shares, batch_futures = self._process_asset_batch(
-                    batch_assets, timeframe, figi_mapping, conn
+                    batch_assets, timeframe, figi_mapping, conn, updated_symbols, report
                 )
                 
                 updated_count += batch_updated
@@ -213,15 +220,24 @@ class DataUpdaterWithShares:
                 # Небольшая пауза между батчами
                 time.sleep(0.1)
             
+            self._refresh_feature_store(timeframe, updated_symbols, conn)
+            
             conn.close()
+            self.update_stats['last_sync'][timeframe] = report.as_dict()
+            logger.info(report.summary())
             logger.info(f"Updated {updated_count} shares for {timeframe}: {shares_updated} successful, {error_count} errors")
             
         except Exception as e:
             logger.error(f"Error updating {timeframe} data: {e}")
     
     def _process_asset_batch(self, assets: List[Tuple[str, str]], timeframe: str, 
-                            figi_mapping: Dict, conn) -> Tuple[int, int, int, int]:
-        """Обработать батч активов."""
+                            figi_mapping: Dict, conn,
+                            updated_symbols: Optional[List[str]] = None,
+                            report: Optional[SyncReport] = None) -> Tuple[int, int, int, int]:
+        """Обработать батч активов.
+        
+        Коды активов, для которых записаны новые свечи, добавляются в *updated_symbols*.
+        """
         updated_count = 0
         error_count = 0
         shares_updated = 0
@@ -237,11 +253,8 @@ class DataUpdaterWithShares:
                         error_count += 1
                         continue
                     
-                    # Проверяем rate limit ТОЛЬКО для реальных запросов к API
-                    self._wait_for_rate_limit('GetCandles', timeframe)
-                    
-                    # Получаем данные через API для акций
-                    data = self.analyzer.get_stock_data(figi, timeframe)
+                    # Запрашиваем только диапазон после watermark (rate limit - в _fetch_candles)
+                    written = self.candle_sync.sync_symbol(conn, contract_code, figi, timeframe, report)
                 else:
                     # Для фьючерсов используем contract_code напрямую
                     logger.info(f"Updating futures data for {contract_code} ({asset_type})")
@@ -250,14 +263,9 @@ class DataUpdaterWithShares:
                     error_count += 1
                     continue
                 
-                if data.empty:
-                    logger.warning(f"No data returned for {contract_code} ({asset_type}, {timeframe})")
-                    error_count += 1
-                    continue
-                
-                # Сохраняем в БД
-                self._save_timeframe_data(conn, contract_code, timeframe, data)
                 updated_count += 1
+                if written and updated_symbols is not None:
+                    updated_symbols.append(contract_code)
                 
                 # Обновляем счетчики по типам активов (только для акций)
                 if asset_type == 'shares':
@@ -282,44 +290,25 @@ class DataUpdaterWithShares:
         
         return updated_count, error_count, shares_updated, futures_updated
     
-    def _save_timeframe_data(self, conn, contract_code: str, timeframe: str, data: pd.DataFrame):
-        """Сохранить данные таймфрейма в БД."""
-        cursor = conn.cursor()
-        
-        # Создаем таблицу для таймфрейма, если не существует
-        table_name = f"data_{timeframe.replace('m', 'min').replace('h', 'hour')}"
-        cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                datetime TEXT NOT NULL,
-                open REAL,
-                high REAL,
-                low REAL,
-                close REAL,
-                volume INTEGER,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(symbol, datetime)
-            )
-        """)
-        
-        # Вставляем данные
-        for _, row in data.iterrows():
-            cursor.execute(f"""
-                INSERT OR REPLACE INTO {table_name}
-                (symbol, datetime, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                contract_code,  # Используем contract_code как symbol
-                row['time'].isoformat(),
-                row['open'],
-                row['high'],
-                row['low'],
-                row['close'],
-                row['volume']
-            ))
-        
-        conn.commit()
+    def _refresh_feature_store(self, timeframe: str, symbols: List[str], conn) -> None:
+        """Дописать новые свечи в хранилище признаков ML (только для его таймфреймов)."""
+        if not symbols:
+            return
+        try:
+            from .ml.feature_store import get_feature_store
+        except Exception as e:
+            # ML-стек (torch, sklearn) может быть не установлен
+            logger.debug(f"Feature store unavailable: {e}")
+            return
+        # Свечи пишутся в базу из настроек (get_connection())
+        feature_store = get_feature_store()
+        if timeframe not in feature_store.config.timeframes:
+            return
+        try:
+            written = feature_store.refresh(symbols, timeframe, conn=conn)
+            logger.info(f"Feature store: {len(written)} symbols refreshed for {timeframe}")
+        except Exception as e:
+            logger.error(f"Feature store refresh failed for {timeframe}: {e}")
     
     def get_update_stats(self) -> Dict:
         """Получить статистику обновлений."""
@@ -334,7 +323,8 @@ class DataUpdaterWithShares:
             'successful_updates': self.update_stats['successful_updates'],
             'failed_updates': self.update_stats['failed_updates'],
             'shares_updated': self.update_stats['shares_updated'],
-            'futures_updated': self.update_stats['futures_updated']
+            'futures_updated': self.update_stats['futures_updated'],
+            'last_sync': self.update_stats['last_sync']
         }
     
     def get_asset_statistics(self) -> Dict:
@@ -6,7 +6,8 @@ import sqlite3
 import decimal
 import logging
 import pandas as pd
-from typing import Optional, Dict, Any, Union
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Union
 
 from core.settings import get_settings
 
@@ -376,12 +377,88 @@ def create_tables(conn: sqlite3.Connection):
         hyperparameters TEXT,              -- JSON гиперпараметры
         training_status TEXT DEFAULT 'completed', -- 'completed', 'failed', 'cancelled'
         error_message TEXT,
+        cpu_seconds REAL,                  -- CPU-время процесса обучения
+        peak_rss_mb REAL,                  -- Пиковый RSS воркера
+        torch_threads INTEGER,             -- torch.get_num_threads() воркера
+        worker_pid INTEGER,
         created_at TEXT DEFAULT CURRENT_TIMESTAMP
     );
     """)
+    ensure_ml_training_history_columns(conn)
+    create_ml_signal_cache_table(conn)
+    create_technical_indicators_state_table(conn)
+    create_correlation_state_table(conn)
 
     conn.commit()
 
+
+ML_TRAINING_RESOURCE_COLUMNS = {
+    'cpu_seconds': 'REAL',
+    'peak_rss_mb': 'REAL',
+    'torch_threads': 'INTEGER',
+    'worker_pid': 'INTEGER',
+}
+
+
+def ensure_ml_training_history_columns(conn: sqlite3.Connection) -> None:
+    """Добавить колонки ресурсных метрик в ml_training_history старых баз."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(ml_training_history)")}
+    if not existing:
+        return
+    for column, column_type in ML_TRAINING_RESOURCE_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE ml_training_history ADD COLUMN {column} {column_type}")
+
+
+def create_ml_signal_cache_table(conn: sqlite3.Connection) -> None:
+    """Посимвольный кэш ML сигналов: запись валидна, пока не изменились
+    версия модели, watermark данных (datetime последнего бара) и водяной
+    знак новостей (входит в cache_key)."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ml_signal_cache (
+        symbol TEXT PRIMARY KEY,
+        cache_key TEXT NOT NULL,           -- sha1(symbol|model_version|data_watermark)
+        model_version TEXT NOT NULL,
+        data_watermark TEXT NOT NULL,      -- datetime последнего бара
+        signal_data TEXT NOT NULL,         -- JSON сигналов
+        hit_count INTEGER DEFAULT 0,
+        expires_at TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+
+def create_technical_indicators_state_table(conn: sqlite3.Connection) -> None:
+    """Watermark материализации technical_indicators по компаниям: дата
+    последнего рассчитанного бара и ключ параметров, с которыми он рассчитан."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS technical_indicators_state (
+        company_id INTEGER PRIMARY KEY,
+        last_date TEXT NOT NULL,           -- дата последнего записанного бара
+        params_key TEXT NOT NULL,          -- JSON параметров индикаторов
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(company_id) REFERENCES companies(id)
+    );
+    """)
+
+
+def create_correlation_state_table(conn: sqlite3.Connection) -> None:
+    """Состояние скользящей EWMA-корреляции доходностей: вселенная,
+    дата последнего учтённого бара и массивы среднего/ковариации, чтобы
+    после перезапуска не прогревать матрицу заново."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS correlation_state (
+        name TEXT PRIMARY KEY,
+        symbols TEXT NOT NULL,             -- JSON список контрактов (порядок строк матрицы)
+        last_date TEXT NOT NULL,           -- дата последнего учтённого бара
+        params_key TEXT NOT NULL,          -- JSON параметров EWMA
+        state BLOB NOT NULL,               -- np.savez: mean, cov, count, last_price
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+
 def load_data_from_db(conn: sqlite3.Connection) -> pd.DataFrame:
     """
     Возвращает объединённые метрики (metrics) с кодом контракта (contract_code).
@@ -428,6 +505,50 @@ def load_daily_data_from_db(conn: sqlite3.Connection, start_date: Optional[str]
         logger.exception("Ошибка в load_daily_data_from_db")
         return pd.DataFrame()
 
+TECHNICAL_INDICATOR_COLUMNS = ('sma', 'ema', 'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower')
+
+# Upsert по UNIQUE(company_id, date); строка с теми же значениями не переписывается
+_TECHNICAL_INDICATORS_UPSERT = """
+    INSERT INTO technical_indicators (company_id, date, {columns})
+    VALUES (?, ?, {placeholders})
+    ON CONFLICT(company_id, date) DO UPDATE SET {assignments}
+    WHERE {changed}
+""".format(
+    columns=", ".join(TECHNICAL_INDICATOR_COLUMNS),
+    placeholders=", ".join("?" for _ in TECHNICAL_INDICATOR_COLUMNS),
+    assignments=", ".join(f"{col} = excluded.{col}" for col in TECHNICAL_INDICATOR_COLUMNS),
+    changed=" OR ".join(f"{col} IS NOT excluded.{col}" for col in TECHNICAL_INDICATOR_COLUMNS),
+)
+
+
+def _technical_indicators_row(company_id: int, date: str, indicators: Dict[str, Any]) -> Tuple:
+    return (company_id, date) + tuple(indicators.get(col) for col in TECHNICAL_INDICATOR_COLUMNS)
+
+
+def upsert_technical_indicators(conn: sqlite3.Connection, rows: Iterable[Tuple]) -> int:
+    """
+    Пакетно вставляет или обновляет строки technical_indicators.
+    rows — кортежи (company_id, date, sma, ema, rsi, macd, macd_signal, bb_upper, bb_middle, bb_lower).
+    Строки, значения которых не изменились, не переписываются.
+    Если транзакция уже открыта, запись идёт в неё и фиксируется вызывающим;
+    иначе функция открывает и фиксирует собственную транзакцию.
+    Возвращает число вставленных или изменённых строк.
+    """
+    own_transaction = not conn.in_transaction
+    before = conn.total_changes
+    try:
+        if own_transaction:
+            conn.execute("BEGIN")
+        conn.executemany(_TECHNICAL_INDICATORS_UPSERT, rows)
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+    return conn.total_changes - before
+
+
 def update_technical_indicators(conn: sqlite3.Connection,
                                 indicators: Dict[str, Any],
                                 daily_data_id: Optional[int] = None,
@@ -437,6 +558,7 @@ def update_technical_indicators(conn: sqlite3.Connection,
     Обновляет или вставляет запись в technical_indicators.
     Поддерживает обновление по daily_data_id (если используется) или по (company_id, date).
     Ожидаемый словарь indicators содержит ключи: sma, ema, rsi, macd, macd_signal, bb_upper, bb_middle, bb_lower.
+    Для массовой записи используйте upsert_technical_indicators.
     """
     cursor = conn.cursor()
     try:
@@ -450,38 +572,45 @@ def update_technical_indicators(conn: sqlite3.Connection,
         if company_id is None or date is None:
             raise ValueError("Для обновления technical_indicators требуются company_id и date (или daily_data_id).")
 
-        cursor.execute("SELECT id FROM technical_indicators WHERE company_id = ? AND date = ?", (company_id, date))
-        existing = cursor.fetchone()
-        if existing:
-            cursor.execute("""
-                UPDATE technical_indicators
-                SET sma = ?, ema = ?, rsi = ?, macd = ?, macd_signal = ?, bb_upper = ?, bb_middle = ?, bb_lower = ?
-                WHERE company_id = ? AND date = ?
-            """, (
-                indicators.get('sma'), indicators.get('ema'), indicators.get('rsi'),
-                indicators.get('macd'), indicators.get('macd_signal'),
-                indicators.get('bb_upper'), indicators.get('bb_middle'), indicators.get('bb_lower'),
-                company_id, date
-            ))
-        else:
-            cursor.execute("""
-                INSERT INTO technical_indicators (company_id, date, sma, ema, rsi, macd, macd_signal, bb_upper, bb_middle, bb_lower)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                company_id, date,
-                indicators.get('sma'), indicators.get('ema'), indicators.get('rsi'),
-                indicators.get('macd'), indicators.get('macd_signal'),
-                indicators.get('bb_upper'), indicators.get('bb_middle'), indicators.get('bb_lower')
-            ))
+        cursor.execute(_TECHNICAL_INDICATORS_UPSERT, _technical_indicators_row(company_id, date, indicators))
         conn.commit()
     except Exception:
         # не фатально — логируем и продолжаем
         logger.exception("Ошибка при обновлении technical_indicators")
 
-def mergeMetrDaily(conn: sqlite3.Connection) -> pd.DataFrame:
+
+def get_latest_closes(conn: sqlite3.Connection,
+                      contract_codes: Optional[Iterable[str]] = None) -> Dict[str, Tuple[Optional[str], str, Optional[float]]]:
+    """
+    Последняя свеча daily_data по каждому контракту одним запросом:
+    {contract_code: (figi, date, close)}. Без contract_codes — по всем компаниям.
+    MAX(date) берётся по индексу UNIQUE(company_id, date).
+    """
+    query = """
+    SELECT c.contract_code, c.figi, dd.date, dd.close
+    FROM companies c
+    JOIN daily_data dd
+      ON dd.company_id = c.id
+     AND dd.date = (SELECT MAX(date) FROM daily_data WHERE company_id = c.id)
+    """
+    params: List[Any] = []
+    if contract_codes is not None:
+        params = list(dict.fromkeys(contract_codes))
+        if not params:
+            return {}
+        query += f" WHERE c.contract_code IN ({', '.join('?' * len(params))})"
+    try:
+        return {code: (figi, date, close) for code, figi, date, close in conn.execute(query, params)}
+    except Exception:
+        logger.exception("Ошибка в get_latest_closes")
+        return {}
+
+
+def mergeMetrDaily(conn: sqlite3.Connection, since: Optional[str] = None) -> pd.DataFrame:
     """
     Возвращает DataFrame, объединяющий daily_data и нужные метрики (Открытые позиции, Количество лиц).
     SQL построен так, как в примере ранее — с LEFT JOIN по датам и компаниям.
+    Если задан since, возвращаются только строки с датой строго больше since.
     """
     cursor = conn.cursor()
     query = """
@@ -544,11 +673,17 @@ def mergeMetrDaily(conn: sqlite3.Connection) -> pd.DataFrame:
     ) AS kl 
         ON dd.company_id = kl.company_id 
         AND dd.date = kl.date
-        
+    {where}
     ORDER BY dd.date;
     """
+    params: tuple = ()
+    if since is not None:
+        query = query.format(where="WHERE dd.date > ?")
+        params = (since,)
+    else:
+        query = query.format(where="")
     try:
-        cursor.execute(query)
+        cursor.execute(query, params)
         columns = [col[0] for col in cursor.description]
         data = cursor.fetchall()
         df = pd.DataFrame(data, columns=columns)
@@ -645,21 +780,39 @@ def update_auto_trading_settings(conn: sqlite3.Connection, settings: Dict[str, A
         conn.commit()
 
 
-def save_trading_signal(conn: sqlite3.Connection, signal_data: Dict[str, Any]) -> int:
-    """Save a trading signal to the database."""
-    cursor = conn.cursor()
-    
-    # Ensure company exists
-    company_id = get_or_create_company_id(conn, signal_data['contract_code'])
-    if not company_id:
-        raise ValueError(f"Could not create company for {signal_data['contract_code']}")
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO trading_signals 
-        (company_id, date, signal_type, signal_strength, signal_score, price, 
-         volume, atr, stop_loss, take_profit, processed)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+_TRADING_SIGNAL_INSERT = """
+    INSERT OR REPLACE INTO trading_signals 
+    (company_id, date, signal_type, signal_strength, signal_score, price, 
+     volume, atr, stop_loss, take_profit, processed)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_AUTO_ORDER_INSERT = """
+    INSERT INTO auto_orders 
+    (signal_id, company_id, contract_code, order_type, side, quantity, 
+     price, stop_price, status, tinkoff_order_id, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_ORDER_STATUS_UPDATE = """
+    UPDATE auto_orders 
+    SET status = ?, tinkoff_order_id = ?, error_message = ?, updated_at = ?
+    WHERE id = ?
+"""
+
+_SIGNAL_PROCESSED_UPDATE = "UPDATE trading_signals SET processed = TRUE WHERE id = ?"
+
+_TRADE_HISTORY_INSERT = """
+    INSERT INTO auto_trade_history 
+    (signal_id, order_id, company_id, contract_code, side, quantity, 
+     entry_price, exit_price, stop_loss, take_profit, pnl, pnl_percent, 
+     holding_days, exit_reason, entry_date, exit_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _trading_signal_row(company_id: Optional[int], signal_data: Dict[str, Any]) -> Tuple:
+    return (
         company_id,
         signal_data['date'],
         signal_data['signal_type'],
@@ -671,7 +824,56 @@ def save_trading_signal(conn: sqlite3.Connection, signal_data: Dict[str, Any]) -
         signal_data.get('stop_loss'),
         signal_data.get('take_profit'),
         signal_data.get('processed', False)
-    ))
+    )
+
+
+def _auto_order_row(order_data: Dict[str, Any]) -> Tuple:
+    return (
+        order_data['signal_id'],
+        order_data['company_id'],
+        order_data['contract_code'],
+        order_data['order_type'],
+        order_data['side'],
+        order_data['quantity'],
+        order_data.get('price'),
+        order_data.get('stop_price'),
+        order_data.get('status', 'pending'),
+        order_data.get('tinkoff_order_id'),
+        order_data.get('error_message')
+    )
+
+
+def _trade_history_row(trade_data: Dict[str, Any]) -> Tuple:
+    return (
+        trade_data['signal_id'],
+        trade_data['order_id'],
+        trade_data['company_id'],
+        trade_data['contract_code'],
+        trade_data['side'],
+        trade_data['quantity'],
+        trade_data['entry_price'],
+        trade_data.get('exit_price'),
+        trade_data.get('stop_loss'),
+        trade_data.get('take_profit'),
+        trade_data.get('pnl', 0.0),
+        trade_data.get('pnl_percent', 0.0),
+        trade_data.get('holding_days', 0),
+        trade_data.get('exit_reason'),
+        trade_data['entry_date'],
+        trade_data.get('exit_date')
+    )
+
+
+def save_trading_signal(conn: sqlite3.Connection, signal_data: Dict[str, Any]) -> int:
+    """Save a trading signal to the database."""
+    cursor = conn.cursor()
+    
+    # Ensure company exists
+    company_id = get_or_create_company_id(conn, signal_data['contract_code'])
+    if not company_id:
+        raise ValueError(f"Could not create company for {signal_data['contract_code']}")
+    
+    cursor.execute(_TRADING_SIGNAL_INSERT, _trading_signal_row(company_id, signal_data))
     conn.commit()
     return cursor.lastrowid
 
@@ -693,24 +895,7 @@ def save_auto_order(conn: sqlite3.Connection, order_data: Dict[str, Any]) -> int
     """Save an automatic order to the database."""
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO auto_orders 
-        (signal_id, company_id, contract_code, order_type, side, quantity, 
-         price, stop_price, status, tinkoff_order_id, error_message)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        order_data['signal_id'],
-        order_data['company_id'],
-        order_data['contract_code'],
-        order_data['order_type'],
-        order_data['side'],
-        order_data['quantity'],
-        order_data.get('price'),
-        order_data.get('stop_price'),
-        order_data.get('status', 'pending'),
-        order_data.get('tinkoff_order_id'),
-        order_data.get('error_message')
-    ))
+    cursor.execute(_AUTO_ORDER_INSERT, _auto_order_row(order_data))
     conn.commit()
     return cursor.lastrowid
 
@@ -719,18 +904,15 @@ def update_order_status(conn: sqlite3.Connection, order_id: int, status: str,
                        tinkoff_order_id: str = None, error_message: str = None) -> None:
     """Update order status."""
     cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE auto_orders 
-        SET status = ?, tinkoff_order_id = ?, error_message = ?, updated_at = ?
-        WHERE id = ?
-    """, (status, tinkoff_order_id, error_message, pd.Timestamp.now().isoformat(), order_id))
+    cursor.execute(_ORDER_STATUS_UPDATE,
+                   (status, tinkoff_order_id, error_message, pd.Timestamp.now().isoformat(), order_id))
     conn.commit()
 
 
 def mark_signal_processed(conn: sqlite3.Connection, signal_id: int) -> None:
     """Mark a signal as processed."""
     cursor = conn.cursor()
-    cursor.execute("UPDATE trading_signals SET processed = TRUE WHERE id = ?", (signal_id,))
+    cursor.execute(_SIGNAL_PROCESSED_UPDATE, (signal_id,))
     conn.commit()
 
 
@@ -751,30 +933,7 @@ def save_trade_history(conn: sqlite3.Connection, trade_data: Dict[str, Any]) ->
     """Save trade history record."""
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO auto_trade_history 
-        (signal_id, order_id, company_id, contract_code, side, quantity, 
-         entry_price, exit_price, stop_loss, take_profit, pnl, pnl_percent, 
-         holding_days, exit_reason, entry_date, exit_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        trade_data['signal_id'],
-        trade_data['order_id'],
-        trade_data['company_id'],
-        trade_data['contract_code'],
-        trade_data['side'],
-        trade_data['quantity'],
-        trade_data['entry_price'],
-        trade_data.get('exit_price'),
-        trade_data.get('stop_loss'),
-        trade_data.get('take_profit'),
-        trade_data.get('pnl', 0.0),
-        trade_data.get('pnl_percent', 0.0),
-        trade_data.get('holding_days', 0),
-        trade_data.get('exit_reason'),
-        trade_data['entry_date'],
-        trade_data.get('exit_date')
-    ))
+    cursor.execute(_TRADE_HISTORY_INSERT, _trade_history_row(trade_data))
     conn.commit()
     return cursor.lastrowid
 
@@ -789,3 +948,177 @@ def get_trade_history(conn: sqlite3.Connection, limit: int = 100) -> pd.DataFram
         LIMIT ?
     """
     return pd.read_sql_query(query, conn, params=(limit,))
+
+
+def _get_or_create_company_ids(cursor: sqlite3.Cursor, contract_codes: Iterable[str]) -> Dict[str, int]:
+    """Resolve company ids for several contract codes inside the caller's transaction."""
+    codes = sorted({code.strip() for code in contract_codes if code and code.strip()})
+    if not codes:
+        return {}
+
+    def _select(pending: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        # Stay below SQLite's default limit of 999 bound parameters
+        for start in range(0, len(pending), 900):
+            chunk = pending[start:start + 900]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT contract_code, id FROM companies WHERE contract_code IN ({placeholders})",
+                chunk,
+            )
+            for code, company_id in cursor.fetchall():
+                found.setdefault(code, company_id)
+        return found
+
+    company_ids = _select(codes)
+    missing = [code for code in codes if code not in company_ids]
+    if missing:
+        cursor.executemany("INSERT INTO companies (contract_code) VALUES (?)", [(code,) for code in missing])
+        company_ids.update(_select(missing))
+    return company_ids
+
+
+@dataclass
+class TradingBatchResult:
+    """Ids generated by TradingBatchWriter.flush, in the order items were added."""
+    signal_ids: List[int] = field(default_factory=list)
+    order_ids: List[int] = field(default_factory=list)
+    trade_ids: List[int] = field(default_factory=list)
+
+
+class TradingBatchWriter:
+    """Unit of work for the auto-trading tables.
+
+    Collects trading signals, auto orders, order status updates, processed
+    marks and trade history records, then writes them with executemany in a
+    single transaction and a single commit instead of one commit per row.
+    Rows are built when items are added, so malformed items fail there and
+    not in the middle of a flush. Nothing is written before flush(). If the
+    flush fails, the transaction is rolled back and the staged items are
+    kept for another attempt.
+
+    On flush the generated ids are returned in order and also stored in the
+    staged dicts as 'signal_id', 'order_id' and 'trade_id'.
+
+    Used as a context manager, the writer flushes on normal exit and discards
+    the staged items if the block raises.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        # (item, row) pairs; signal rows get their company id on flush
+        self._signals: List[Tuple[Dict[str, Any], Tuple]] = []
+        self._orders: List[Tuple[Dict[str, Any], Tuple]] = []
+        self._status_updates: List[Tuple] = []
+        self._processed: List[Tuple[int]] = []
+        self._trades: List[Tuple[Dict[str, Any], Tuple]] = []
+
+    def __len__(self) -> int:
+        return (len(self._signals) + len(self._orders) + len(self._status_updates)
+                + len(self._processed) + len(self._trades))
+
+    def __enter__(self) -> "TradingBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.flush()
+        else:
+            self.clear()
+        return False
+
+    def add_signal(self, signal_data: Dict[str, Any]) -> None:
+        """Stage a trading signal (see save_trading_signal)."""
+        if not signal_data.get('contract_code') or not str(signal_data['contract_code']).strip():
+            raise ValueError(f"Could not create company for {signal_data.get('contract_code')}")
+        self._signals.append((signal_data, _trading_signal_row(None, signal_data)))
+
+    def add_order(self, order_data: Dict[str, Any]) -> None:
+        """Stage an automatic order (see save_auto_order)."""
+        self._orders.append((order_data, _auto_order_row(order_data)))
+
+    def update_order_status(self, order_id: int, status: str,
+                            tinkoff_order_id: str = None, error_message: str = None) -> None:
+        """Stage an order status update (see update_order_status)."""
+        self._status_updates.append(
+            (status, tinkoff_order_id, error_message, pd.Timestamp.now().isoformat(), order_id)
+        )
+
+    def mark_signal_processed(self, signal_id: int) -> None:
+        """Stage marking a signal as processed (see mark_signal_processed)."""
+        self._processed.append((signal_id,))
+
+    def add_trade(self, trade_data: Dict[str, Any]) -> None:
+        """Stage a trade history record (see save_trade_history)."""
+        self._trades.append((trade_data, _trade_history_row(trade_data)))
+
+    def clear(self) -> None:
+        """Discard all staged items."""
+        self._signals.clear()
+        self._orders.clear()
+        self._status_updates.clear()
+        self._processed.clear()
+        self._trades.clear()
+
+    def flush(self) -> TradingBatchResult:
+        """Write all staged items in one transaction.
+
+        Returns
+        -------
+        TradingBatchResult
+            Ids of the inserted signals, orders and trades in the order they were added
+        """
+        if not len(self):
+            return TradingBatchResult()
+
+        cursor = self.conn.cursor()
+        try:
+            if not self.conn.in_transaction:
+                # Take the write lock up front so the batch is not interleaved with other writers
+                cursor.execute("BEGIN IMMEDIATE")
+
+            result = TradingBatchResult(
+                signal_ids=self._write_signals(cursor),
+                order_ids=self._insert_many(cursor, _AUTO_ORDER_INSERT, [row for _, row in self._orders]),
+            )
+            cursor.executemany(_ORDER_STATUS_UPDATE, self._status_updates)
+            cursor.executemany(_SIGNAL_PROCESSED_UPDATE, self._processed)
+            result.trade_ids = self._insert_many(cursor, _TRADE_HISTORY_INSERT, [row for _, row in self._trades])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        for items, key, ids in ((self._signals, 'signal_id', result.signal_ids),
+                                (self._orders, 'order_id', result.order_ids),
+                                (self._trades, 'trade_id', result.trade_ids)):
+            for (item, _), item_id in zip(items, ids):
+                item[key] = item_id
+        self.clear()
+        return result
+
+    def _write_signals(self, cursor: sqlite3.Cursor) -> List[int]:
+        if not self._signals:
+            return []
+        company_ids = _get_or_create_company_ids(cursor, [signal['contract_code'] for signal, _ in self._signals])
+        rows = [
+            (company_ids[signal['contract_code'].strip()],) + row[1:]
+            for signal, row in self._signals
+        ]
+        cursor.executemany(_TRADING_SIGNAL_INSERT, rows)
+        # INSERT OR REPLACE may replace rows staged earlier in the same batch,
+        # so ids are looked up by the table's unique key
+        return [
+            cursor.execute(
+                "SELECT id FROM trading_signals WHERE company_id = ? AND date = ? AND signal_type = ?",
+                row[:3],
+            ).fetchone()[0]
+            for row in rows
+        ]
+
+    @staticmethod
+    def _insert_many(cursor: sqlite3.Cursor, query: str, rows: List[Tuple]) -> List[int]:
+        # executemany cannot return rows: each insert reports its own id, so
+        # ids stay exact even if the rowids are not consecutive
+        query = query.rstrip() + " RETURNING id"
+        return [cursor.execute(query, row).fetchone()[0] for row in rows]
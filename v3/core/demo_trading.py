@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 import sqlite3
 
 from . import database
+from .price_cache import get_price_cache
 
 DEFAULT_STARTING_BALANCE = 1_000_000.0
 
@@ -242,63 +244,89 @@ def get_trades(conn: sqlite3.Connection, limit: Optional[int] = None) -> pd.Data
     return df
 
 
-def _latest_price(conn: sqlite3.Connection, contract_code: str) -> Optional[float]:
-    cursor = conn.cursor()
-    cursor.execute(
+def _market_prices(conn: sqlite3.Connection, contract_codes: Sequence[str]) -> Tuple[List, List, List]:
+    """Mark prices for contracts: the newest daily close, or a fresher quote from the price cache.
+
+    One query for all contracts; intraday ticks from the real-time provider
+    win over a close of the same or an earlier date.
+    """
+    latest = database.get_latest_closes(conn, contract_codes)
+    cache = get_price_cache()
+    figis = {figi: code for code, (figi, _, _) in latest.items() if figi}
+    if figis:
+        cache.register_figis(figis)
+    quotes = cache.get_many(contract_codes)
+
+    prices: List[Optional[float]] = []
+    as_of: List[Optional[str]] = []
+    sources: List[Optional[str]] = []
+    for code in contract_codes:
+        _, date, close = latest.get(code, (None, None, None))
+        source = "daily_data" if close is not None else None
+        quote = quotes.get(code)
+        if quote is not None:
+            # ISO strings order like timestamps; a quote stamped on the close date wins
+            stamp = quote.as_of.isoformat()
+            if close is None or not date or stamp >= str(date):
+                close, date, source = quote.price, stamp, quote.source or "cache"
+        prices.append(close)
+        as_of.append(date)
+        sources.append(source)
+    return prices, as_of, sources
+
+
+def _positions_frame(conn: sqlite3.Connection) -> pd.DataFrame:
+    cursor = conn.execute(
+        """
+        SELECT contract_code, quantity, avg_price, realized_pl, updated_at
+        FROM demo_positions
+        ORDER BY contract_code
         """
-        SELECT dd.close
-        FROM daily_data dd
-        JOIN companies c ON dd.company_id = c.id
-        WHERE c.contract_code = ?
-        ORDER BY dd.date DESC
-        LIMIT 1
-        """,
-        (contract_code,),
     )
-    row = cursor.fetchone()
-    return float(row[0]) if row and row[0] is not None else None
+    columns = [description[0] for description in cursor.description]
+    rows = cursor.fetchall()
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    codes, quantity, avg_price, realized_pl, updated_at = zip(*rows)
+    quantity = np.array(quantity, dtype=float)
+    avg_price = np.array(avg_price, dtype=float)
+    prices, as_of, sources = _market_prices(conn, codes)
+    market_price = np.array(prices, dtype=float)
+    invested_value = quantity * avg_price
+    market_value = market_price * quantity
+    return pd.DataFrame({
+        "contract_code": codes,
+        "quantity": quantity,
+        "avg_price": avg_price,
+        "realized_pl": realized_pl,
+        "updated_at": updated_at,
+        "invested_value": invested_value,
+        "market_price": market_price,
+        "market_value": market_value,
+        "unrealized_pl": market_value - invested_value,
+        "price_as_of": pd.to_datetime(as_of, format="ISO8601", errors="coerce"),
+        "price_source": sources,
+    })
 
 
 def get_positions(conn: sqlite3.Connection) -> pd.DataFrame:
     """Return current positions with market value and P/L."""
     _ensure_account(conn)
-    df = pd.read_sql_query(
-        """
-        SELECT contract_code, quantity, avg_price, realized_pl, updated_at
-        FROM demo_positions
-        ORDER BY contract_code
-        """,
-        conn,
-    )
-    if df.empty:
-        return df
-    df["quantity"] = df["quantity"].astype(float)
-    df["avg_price"] = df["avg_price"].astype(float)
-    df["invested_value"] = df["quantity"] * df["avg_price"]
-    market_prices: List[Optional[float]] = []
-    market_values: List[Optional[float]] = []
-    for ticker, qty in zip(df["contract_code"], df["quantity"]):
-        price = _latest_price(conn, ticker)
-        market_prices.append(price)
-        market_values.append(price * qty if price is not None else None)
-    df["market_price"] = market_prices
-    df["market_value"] = market_values
-    df["unrealized_pl"] = df["market_value"] - df["invested_value"]
-    return df
+    return _positions_frame(conn)
 
 
 def get_account_snapshot(conn: sqlite3.Connection) -> Dict[str, float]:
     """Aggregate account metrics for dashboards/statistics."""
     info = get_account(conn)
     balance = info["balance"]
-    positions = get_positions(conn)
+    positions = _positions_frame(conn)
     invested = float(positions["invested_value"].sum()) if not positions.empty else 0.0
     market_value = float(
         positions["market_value"].fillna(0).sum()
     ) if not positions.empty else 0.0
     unrealized = market_value - invested
     realized = float(
-        pd.read_sql_query("SELECT COALESCE(SUM(realized_pl), 0) AS total FROM demo_trades", conn)["total"].iloc[0]
+        conn.execute("SELECT COALESCE(SUM(realized_pl), 0) FROM demo_trades").fetchone()[0]
     )
     equity = balance + market_value
     return {
@@ -1,6 +1,8 @@
 """Indicator calculation package."""
 from .calculations import calculate_additional_indicators, calculate_basic_indicators, generate_trading_signals
+from .materialize import MaterializationStats, materialize_technical_indicators, run_indicator_materialization
 from .profit import vectorized_dynamic_profit
+from .rolling import RollingStats, rolling_stats
 from .service import calculate_technical_indicators, clear_get_calculated_data, get_calculated_data
 from .signals import (
     calculate_additional_filters,
@@ -10,6 +12,8 @@ from .signals import (
 )
 
 __all__ = [
+    "MaterializationStats",
+    "RollingStats",
     "calculate_additional_filters",
     "calculate_additional_indicators",
     "calculate_basic_indicators",
@@ -20,5 +24,8 @@ __all__ = [
     "generate_new_adaptive_signals",
     "generate_trading_signals",
     "get_calculated_data",
+    "materialize_technical_indicators",
+    "rolling_stats",
+    "run_indicator_materialization",
     "vectorized_dynamic_profit",
 ]
@@ -7,6 +7,8 @@ import pandas as pd
 
 from core.config import IndicatorParameters
 
+from .rolling import rolling_stats
+
 
 SMA_FAST_COL = "SMA_FAST"
 SMA_SLOW_COL = "SMA_SLOW"
@@ -37,9 +39,10 @@ def calculate_basic_indicators(data: pd.DataFrame, params: IndicatorParameters)
     epsilon = 1e-9
     data = data.copy()
 
+    stats = rolling_stats(data)
     sma_fast_col, sma_slow_col, ema_fast_col, ema_slow_col = _resolve_window_columns(params)
-    data[sma_fast_col] = data["close"].rolling(window=params.sma_fast, min_periods=1).mean()
-    data[sma_slow_col] = data["close"].rolling(window=params.sma_slow, min_periods=1).mean()
+    data[sma_fast_col] = stats.mean(data, "close", params.sma_fast)
+    data[sma_slow_col] = stats.mean(data, "close", params.sma_slow)
     data[SMA_FAST_COL] = data[sma_fast_col]
     data[SMA_SLOW_COL] = data[sma_slow_col]
 
@@ -89,20 +92,21 @@ def generate_trading_signals(data: pd.DataFrame) -> pd.DataFrame:
 def calculate_additional_indicators(data: pd.DataFrame, params: IndicatorParameters) -> pd.DataFrame:
     epsilon = 1e-9
     data = data.copy()
+    stats = rolling_stats(data)
 
     window_bb = params.bollinger_period
-    data[BB_MID_COL] = data["close"].rolling(window=window_bb, min_periods=1).mean()
-    data[BB_STD_COL] = data["close"].rolling(window=window_bb, min_periods=1).std(ddof=0)
+    data[BB_MID_COL] = stats.mean(data, "close", window_bb)
+    data[BB_STD_COL] = stats.std(data, "close", window_bb, ddof=0)
     data[BB_UPPER_COL] = data[BB_MID_COL] + params.bollinger_std * data[BB_STD_COL]
     data[BB_LOWER_COL] = data[BB_MID_COL] - params.bollinger_std * data[BB_STD_COL]
 
     window_so = params.stochastic_period
-    data["Lowest_Low"] = data["low"].rolling(window=window_so, min_periods=1).min()
-    data["Highest_High"] = data["high"].rolling(window=window_so, min_periods=1).max()
+    data["Lowest_Low"] = stats.min(data, "low", window_so)
+    data["Highest_High"] = stats.max(data, "high", window_so)
     data[STOCH_K_COL] = 100 * (data["close"] - data["Lowest_Low"]) / (
         data["Highest_High"] - data["Lowest_Low"] + epsilon
     )
-    data[STOCH_D_COL] = data[STOCH_K_COL].rolling(window=params.stochastic_signal, min_periods=1).mean()
+    data[STOCH_D_COL] = stats.mean(data, STOCH_K_COL, params.stochastic_signal)
 
     data["Prev_Close"] = data["close"].shift(1)
     
@@ -116,6 +120,6 @@ def calculate_additional_indicators(data: pd.DataFrame, params: IndicatorParamet
     data["High_PrevClose"] = (data["high"] - data["Prev_Close"]).abs()
     data["Low_PrevClose"] = (data["low"] - data["Prev_Close"]).abs()
     data["TR"] = data[["High_Low", "High_PrevClose", "Low_PrevClose"]].max(axis=1)
-    data[ATR_COL] = data["TR"].rolling(window=params.atr_period, min_periods=1).mean()
+    data[ATR_COL] = stats.mean(data, "TR", params.atr_period)
     return data
 
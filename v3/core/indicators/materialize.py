@@ -0,0 +1,265 @@
+"""Incremental materialisation of the ``technical_indicators`` table.
+
+Indicators are computed from local ``daily_data`` for every company and
+upserted in bulk. Each company keeps a watermark in
+``technical_indicators_state`` (last materialised date and the indicator
+parameters it was computed with), so a run reads only a warm-up window
+before the watermark plus the new bars and writes rows after it. A change
+of parameters forces a full recompute of that company. Indicators are
+computed outside the write transaction, which is committed per chunk of
+companies, so readers and other writers wait only for the upserts.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core import database
+from core.config import IndicatorParameters, get_analytics_config
+
+from .calculations import (
+    BB_LOWER_COL,
+    BB_MID_COL,
+    BB_UPPER_COL,
+    EMA_FAST_COL,
+    MACD_COL,
+    MACD_SIGNAL_COL,
+    RSI_COL,
+    SMA_FAST_COL,
+    calculate_additional_indicators,
+    calculate_basic_indicators,
+)
+
+logger = logging.getLogger(__name__)
+
+# Стабильный профиль: оценка волатильности по последним барам менялась бы
+# от запуска к запуску и сбрасывала бы watermark
+MATERIALIZED_VOLATILITY = "medium"
+
+# Прогрев перед watermark: EWM с adjust=False забывает начальное значение
+# как (1 - alpha)^n, 10 длин окна дают относительную ошибку < 1e-8
+WARMUP_MIN_BARS = 250
+EWM_WARMUP_SPANS = 10
+
+# Компаний на одну пишущую транзакцию
+COMMIT_CHUNK_COMPANIES = 50
+
+# Столбец technical_indicators -> столбец calculations
+COLUMN_MAP = {
+    "sma": SMA_FAST_COL,
+    "ema": EMA_FAST_COL,
+    "rsi": RSI_COL,
+    "macd": MACD_COL,
+    "macd_signal": MACD_SIGNAL_COL,
+    "bb_upper": BB_UPPER_COL,
+    "bb_middle": BB_MID_COL,
+    "bb_lower": BB_LOWER_COL,
+}
+
+_STATE_UPSERT = """
+    INSERT INTO technical_indicators_state (company_id, last_date, params_key, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(company_id) DO UPDATE SET
+        last_date = excluded.last_date,
+        params_key = excluded.params_key,
+        updated_at = excluded.updated_at
+"""
+
+
+@dataclass
+class MaterializationStats:
+    """Итоги одного запуска материализации."""
+
+    companies: int = 0          # компаний с новыми барами
+    up_to_date: int = 0         # компаний без новых баров
+    full_recomputes: int = 0    # пересчёт с начала истории (нет watermark или сменились параметры)
+    bars_read: int = 0
+    rows_written: int = 0       # вставлено или изменено строк technical_indicators
+    failed: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def indicator_parameters(contract_code: Optional[str]) -> IndicatorParameters:
+    """Параметры индикаторов контракта для материализации."""
+    profile = get_analytics_config().resolve_indicator_profile(
+        contract_code, pd.DataFrame(), volatility=MATERIALIZED_VOLATILITY
+    )
+    return profile.parameters
+
+
+def params_key(params: IndicatorParameters) -> str:
+    """Ключ параметров для technical_indicators_state."""
+    return json.dumps(asdict(params), sort_keys=True)
+
+
+def warmup_bars(params: IndicatorParameters) -> int:
+    """Число баров перед watermark, достаточное для сходимости индикаторов."""
+    spans = max(params.ema_fast, params.ema_slow, params.macd_fast, params.macd_slow,
+                params.macd_signal, params.rsi_period)
+    windows = max(params.sma_fast, params.sma_slow, params.bollinger_period)
+    return max(WARMUP_MIN_BARS, EWM_WARMUP_SPANS * spans, windows)
+
+
+def compute_indicator_rows(company_id: int, data: pd.DataFrame,
+                           params: IndicatorParameters,
+                           since: Optional[str] = None) -> List[Tuple]:
+    """Строки technical_indicators для баров data с датой строго больше since.
+
+    data — бары одной компании (date, open, high, low, close, volume),
+    отсортированные по дате.
+    """
+    result = calculate_basic_indicators(data, params)
+    result = calculate_additional_indicators(result, params)
+    mask = np.ones(len(result), dtype=bool) if since is None else (data["date"] > since).to_numpy()
+    values = result.loc[mask, list(COLUMN_MAP.values())].astype(float).to_numpy()
+    dates = data["date"].to_numpy()[mask]
+    # NaN -> NULL; float() убирает numpy-типы, которые sqlite3 не принимает
+    return [
+        (company_id, date) + tuple(None if np.isnan(v) else float(v) for v in row)
+        for date, row in zip(dates, values)
+    ]
+
+
+def _pending_companies(conn: sqlite3.Connection,
+                       company_ids: Optional[Iterable[int]]) -> List[Tuple]:
+    query = """
+    SELECT c.id, c.contract_code, MAX(d.date), s.last_date, s.params_key
+    FROM companies c
+    JOIN daily_data d ON d.company_id = c.id
+    LEFT JOIN technical_indicators_state s ON s.company_id = c.id
+    """
+    params: List[Any] = []
+    if company_ids is not None:
+        ids = list(company_ids)
+        if not ids:
+            return []
+        query += f" WHERE c.id IN ({', '.join('?' for _ in ids)})"
+        params.extend(ids)
+    query += " GROUP BY c.id ORDER BY c.id"
+    return conn.execute(query, params).fetchall()
+
+
+def _load_bars(conn: sqlite3.Connection, company_id: int,
+               watermark: Optional[str], warmup: int) -> pd.DataFrame:
+    start = None
+    if watermark is not None:
+        row = conn.execute(
+            "SELECT date FROM daily_data WHERE company_id = ? AND date <= ? "
+            "ORDER BY date DESC LIMIT 1 OFFSET ?",
+            (company_id, watermark, warmup),
+        ).fetchone()
+        start = row[0] if row else None
+    query = "SELECT date, open, high, low, close, volume FROM daily_data WHERE company_id = ?"
+    params: List[Any] = [company_id]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(start)
+    query += " ORDER BY date"
+    return pd.read_sql_query(query, conn, params=params)
+
+
+def materialize_technical_indicators(conn: sqlite3.Connection,
+                                     company_ids: Optional[Iterable[int]] = None,
+                                     full: bool = False,
+                                     chunk_size: int = COMMIT_CHUNK_COMPANIES) -> MaterializationStats:
+    """Инкрементально дописать technical_indicators по локальным daily_data.
+
+    Для каждой компании с барами после watermark читается окно прогрева и
+    новые бары, строки после watermark записываются одним upsert, затем
+    watermark сдвигается. Расчёт идёт вне транзакции; запись каждых
+    ``chunk_size`` компаний фиксируется отдельной транзакцией, так что сбой
+    теряет только незафиксированный чанк. Если транзакция уже открыта
+    вызывающим, запись идёт в неё и фиксируется вызывающим.
+
+    Args:
+        conn: Соединение с базой
+        company_ids: Ограничить набор компаний (по умолчанию все с daily_data)
+        full: Пересчитать всю историю, игнорируя watermark
+        chunk_size: Компаний на одну пишущую транзакцию
+
+    Returns:
+        MaterializationStats
+    """
+    started = time.perf_counter()
+    stats = MaterializationStats()
+    database.create_technical_indicators_state_table(conn)
+    companies = _pending_companies(conn, company_ids)
+
+    own_transaction = not conn.in_transaction
+    pending: List[Tuple[int, str, pd.DataFrame, List[Tuple]]] = []
+    for position, (company_id, contract_code, max_date, last_date, stored_key) in enumerate(companies, 1):
+        try:
+            params = indicator_parameters(contract_code)
+            key = params_key(params)
+            watermark = None if full or stored_key != key else last_date
+            if watermark is not None and max_date <= watermark:
+                stats.up_to_date += 1
+            else:
+                data = _load_bars(conn, company_id, watermark, warmup_bars(params))
+                rows = compute_indicator_rows(company_id, data, params, since=watermark)
+                pending.append((company_id, key, data, rows))
+                stats.full_recomputes += watermark is None
+        except Exception:
+            logger.exception("Ошибка расчёта индикаторов для %s", contract_code)
+            stats.failed.append(contract_code)
+
+        if pending and (len(pending) >= chunk_size or position == len(companies)):
+            _write_chunk(conn, pending, stats, own_transaction)
+            pending = []
+
+    stats.elapsed = time.perf_counter() - started
+    logger.info(
+        "technical_indicators: %d компаний обновлено (%d с начала истории), %d актуальны, "
+        "%d строк записано за %.2f с",
+        stats.companies, stats.full_recomputes, stats.up_to_date, stats.rows_written, stats.elapsed,
+    )
+    return stats
+
+
+def _write_chunk(conn: sqlite3.Connection,
+                 pending: List[Tuple[int, str, pd.DataFrame, List[Tuple]]],
+                 stats: MaterializationStats, own_transaction: bool) -> None:
+    """Записать строки и watermark чанка компаний одной транзакцией."""
+    try:
+        if own_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        for company_id, key, data, rows in pending:
+            stats.rows_written += database.upsert_technical_indicators(conn, rows)
+            conn.execute(_STATE_UPSERT, (company_id, data["date"].iloc[-1], key))
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+    stats.companies += len(pending)
+    stats.bars_read += sum(len(data) for _, _, data, _ in pending)
+
+
+def run_indicator_materialization(db_path: Optional[Union[str, Path]] = None,
+                                  full: bool = False) -> Dict[str, Any]:
+    """Задача планировщика: материализация в собственном соединении.
+
+    Args:
+        db_path: Путь к базе (по умолчанию из настроек)
+        full: Пересчитать всю историю
+
+    Returns:
+        Статистика запуска (MaterializationStats.to_dict)
+    """
+    conn = database.get_connection(db_path)
+    try:
+        return materialize_technical_indicators(conn, full=full).to_dict()
+    finally:
+        conn.close()
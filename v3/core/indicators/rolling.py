@@ -0,0 +1,133 @@
+"""Rolling window statistics shared by the indicator pipeline and signal filters.
+
+The indicator pipeline and ``SignalFilter`` need overlapping statistics of
+the same columns (volume moving average, ATR quantiles, ...). A
+``RollingStats`` cache travels with the frame in ``DataFrame.attrs`` and
+is shared, not copied, by the frame copies pandas makes, so each
+statistic is computed once per frame.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROLLING_STATS_ATTR = "rolling_stats"
+
+
+class RollingStats:
+    """Кэш скользящих статистик столбцов кадра.
+
+    Результат запоминается вместе со значениями столбца, по которым он
+    посчитан: кэш остаётся верным для копий кадра и пересчитывается, если
+    столбец изменился. Возвращаемые массивы только для чтения.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, np.ndarray] = {}
+        self._results: Dict[Tuple, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __deepcopy__(self, memo) -> "RollingStats":
+        # pandas копирует attrs при каждой операции; кэш общий для всех копий
+        return self
+
+    def copy(self) -> "RollingStats":
+        """Независимый кэш с теми же (неизменяемыми) результатами."""
+        clone = RollingStats()
+        clone._sources = dict(self._sources)
+        clone._results = dict(self._results)
+        return clone
+
+    def _values(self, data: pd.DataFrame, column: str) -> np.ndarray:
+        values = data[column].to_numpy(dtype=float, na_value=np.nan)
+        source = self._sources.get(column)
+        if source is not None and not (
+            source.shape == values.shape and np.array_equal(source, values, equal_nan=True)
+        ):
+            self._results = {key: value for key, value in self._results.items() if key[1] != column}
+            source = None
+        if source is None:
+            self._sources[column] = values
+        return values
+
+    def _cached(self, key: Tuple, data: pd.DataFrame, column: str,
+                compute: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+        values = self._values(data, column)
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            result = np.asarray(compute(pd.Series(values)), dtype=float)
+            result.flags.writeable = False
+            self._results[key] = result
+        else:
+            self.hits += 1
+        return result
+
+    def _with_min_periods(self, values: np.ndarray, data: pd.DataFrame, column: str,
+                          window: int, min_periods: int) -> np.ndarray:
+        # Значения скользящих статистик pandas не зависят от min_periods,
+        # он лишь маскирует окна с малым числом наблюдений
+        if min_periods <= 1:
+            return values
+        count = self.count(data, column, window)
+        return np.where(count >= min_periods, values, np.nan)
+
+    def count(self, data: pd.DataFrame, column: str, window: int) -> np.ndarray:
+        """Число непустых значений в окне."""
+        def compute(series: pd.Series) -> np.ndarray:
+            valid = np.cumsum(series.notna().to_numpy(), dtype=np.int64)
+            count = valid.copy()
+            count[window:] -= valid[:-window]
+            return count
+
+        return self._cached(("count", column, window), data, column, compute)
+
+    def mean(self, data: pd.DataFrame, column: str, window: int, min_periods: int = 1) -> np.ndarray:
+        """Скользящее среднее, как data[column].rolling(window, min_periods).mean()."""
+        values = self._cached(("mean", column, window), data, column,
+                              lambda s: s.rolling(window=window, min_periods=1).mean())
+        return self._with_min_periods(values, data, column, window, min_periods)
+
+    def std(self, data: pd.DataFrame, column: str, window: int, min_periods: int = 1,
+            ddof: int = 1) -> np.ndarray:
+        """Скользящее стандартное отклонение."""
+        values = self._cached(("std", column, window, ddof), data, column,
+                              lambda s: s.rolling(window=window, min_periods=1).std(ddof=ddof))
+        return self._with_min_periods(values, data, column, window, min_periods)
+
+    def min(self, data: pd.DataFrame, column: str, window: int, min_periods: int = 1) -> np.ndarray:
+        """Скользящий минимум."""
+        values = self._cached(("min", column, window), data, column,
+                              lambda s: s.rolling(window=window, min_periods=1).min())
+        return self._with_min_periods(values, data, column, window, min_periods)
+
+    def max(self, data: pd.DataFrame, column: str, window: int, min_periods: int = 1) -> np.ndarray:
+        """Скользящий максимум."""
+        values = self._cached(("max", column, window), data, column,
+                              lambda s: s.rolling(window=window, min_periods=1).max())
+        return self._with_min_periods(values, data, column, window, min_periods)
+
+    def quantile(self, data: pd.DataFrame, column: str, window: int, q: float,
+                 min_periods: int = 1) -> np.ndarray:
+        """Скользящий квантиль."""
+        values = self._cached(("quantile", column, window, q), data, column,
+                              lambda s: s.rolling(window=window, min_periods=1).quantile(q))
+        return self._with_min_periods(values, data, column, window, min_periods)
+
+    def column_quantile(self, data: pd.DataFrame, column: str, q: float) -> float:
+        """Квантиль по всему столбцу."""
+        values = self._cached(("column_quantile", column, q), data, column,
+                              lambda s: np.atleast_1d(s.quantile(q)))
+        return float(values[0])
+
+
+def rolling_stats(data: pd.DataFrame) -> RollingStats:
+    """Кэш скользящих статистик кадра; создаётся и сохраняется в attrs при первом обращении."""
+    stats = data.attrs.get(ROLLING_STATS_ATTR)
+    if not isinstance(stats, RollingStats):
+        stats = RollingStats()
+        data.attrs[ROLLING_STATS_ATTR] = stats
+    return stats
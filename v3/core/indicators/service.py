@@ -181,7 +181,14 @@ def calculate_technical_indicators(
     timeframe: Optional[str] = None,
     volatility: Optional[str] = None,
     indicator_params: Optional[IndicatorParameters] = None,
+    risk_management: bool = True,
 ) -> pd.DataFrame:
+    """Рассчитать индикаторы, сигналы и оценки для одного контракта.
+
+    risk_management=False пропускает симуляцию сделок (столбцы *_trade_*
+    заполняются NA) и производные от них столбцы совместимости — они не
+    нужны, когда решение принимается только по последним барам.
+    """
     result = data.copy()
     profile = _resolve_indicator_profile(
         result,
@@ -222,7 +229,7 @@ def calculate_technical_indicators(
     result["Signal"] = result["long_signal"] - result["short_signal"]
 
     trading_costs = _resolve_trading_costs()
-    if profile.risk is not None:
+    if profile.risk is not None and risk_management:
         risk_artifacts = apply_risk_management(
             result,
             risk_profile=profile.risk,
@@ -247,7 +254,8 @@ def calculate_technical_indicators(
                 if col not in result.columns:
                     result[col] = pd.NA
 
-    result = _ensure_compatibility_columns(result)
+    if risk_management:
+        result = _ensure_compatibility_columns(result)
 
     result["resolved_asset_class"] = profile.asset_class
     result["resolved_timeframe"] = profile.timeframe
@@ -16,14 +16,16 @@ from .calculations import (
     SMA_SLOW_COL,
     STOCH_K_COL,
 )
+from .rolling import rolling_stats
 
 
 def generate_adaptive_signals(data: pd.DataFrame, use_adaptive: bool = True) -> pd.DataFrame:
     data = data.copy()
     if use_adaptive:
         window = 15
-        data["RSI_mean"] = data[RSI_COL].rolling(window=window, min_periods=1).mean()
-        data["RSI_std"] = data[RSI_COL].rolling(window=window, min_periods=1).std()
+        stats = rolling_stats(data)
+        data["RSI_mean"] = stats.mean(data, RSI_COL, window)
+        data["RSI_std"] = stats.std(data, RSI_COL, window)
         adaptive_buy_threshold = data["RSI_mean"] - data["RSI_std"]
         adaptive_sell_threshold = data["RSI_mean"] + data["RSI_std"]
 
@@ -45,7 +47,7 @@ def generate_adaptive_signals(data: pd.DataFrame, use_adaptive: bool = True) ->
 
 def generate_new_adaptive_signals(data: pd.DataFrame) -> pd.DataFrame:
     data = data.copy()
-    data["ATR_MA"] = data[ATR_COL].rolling(window=24, min_periods=1).mean()
+    data["ATR_MA"] = rolling_stats(data).mean(data, ATR_COL, 24)
 
     data["New_Adaptive_Buy_Signal"] = (
         (data["close"] < data[BB_LOWER_COL])
@@ -66,9 +68,10 @@ def generate_new_adaptive_signals(data: pd.DataFrame) -> pd.DataFrame:
 
 def calculate_additional_filters(data: pd.DataFrame) -> pd.DataFrame:
     data = data.copy()
-    data["Volume_Filter"] = data["volume"] > data["volume"].rolling(window=20, min_periods=1).mean()
-    lower_bound = data[ATR_COL].quantile(0.25)
-    upper_bound = data[ATR_COL].quantile(0.75)
+    stats = rolling_stats(data)
+    data["Volume_Filter"] = data["volume"] > stats.mean(data, "volume", 20)
+    lower_bound = stats.column_quantile(data, ATR_COL, 0.25)
+    upper_bound = stats.column_quantile(data, ATR_COL, 0.75)
     data["Volatility_Filter"] = (data[ATR_COL] > lower_bound) & (data[ATR_COL] < upper_bound)
     return data
 
@@ -18,7 +18,8 @@ logger = logging.getLogger(__name__)
 class AutoTradingRunner:
     """Runs automated trading engine in a loop."""
     
-    def __init__(self, db_path: Optional[str] = None, cycle_interval: int = 300):
+    def __init__(self, db_path: Optional[str] = None, cycle_interval: int = 300,
+                 live_mode: bool = True):
         """
         Initialize the auto trading runner.
         
@@ -28,9 +29,12 @@ class AutoTradingRunner:
             Path to database file
         cycle_interval : int
             Interval between trading cycles in seconds (default: 5 minutes)
+        live_mode : bool
+            Evaluate only new bars each cycle (see TradingEngine)
         """
         self.db_path = db_path
         self.cycle_interval = cycle_interval
+        self.live_mode = live_mode
         self.db_conn = None
         self.analyzer = None
         self.trading_engine = None
@@ -50,7 +54,7 @@ class AutoTradingRunner:
             self.analyzer = StockAnalyzer(api_key, db_conn=self.db_conn)
             
             # Create trading engine
-            self.trading_engine = TradingEngine(self.analyzer, self.db_conn)
+            self.trading_engine = TradingEngine(self.analyzer, self.db_conn, live_mode=self.live_mode)
             
             logger.info("Auto trading runner initialized successfully")
             return True
@@ -184,6 +188,8 @@ def main():
     parser.add_argument('--db-path', type=str, help='Path to database file')
     parser.add_argument('--interval', type=int, default=300, help='Cycle interval in seconds')
     parser.add_argument('--log-level', type=str, default='INFO', help='Logging level')
+    parser.add_argument('--full-history', action='store_true',
+                        help='Re-evaluate the full history every cycle instead of new bars only')
     
     args = parser.parse_args()
     
@@ -194,7 +200,8 @@ def main():
     )
     
     # Create and run runner
-    runner = AutoTradingRunner(db_path=args.db_path, cycle_interval=args.interval)
+    runner = AutoTradingRunner(db_path=args.db_path, cycle_interval=args.interval,
+                               live_mode=not args.full_history)
     
     if not runner.initialize():
         logger.error("Failed to initialize runner")
@@ -7,6 +7,8 @@ from typing import Iterable, List
 
 import pandas as pd
 
+from core.price_cache import get_price_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -151,6 +153,7 @@ def auto_update_all_tickers(analyzer, conn, full_update: bool = True) -> List[st
                     ),
                 )
             conn.commit()
+            get_price_cache().update_from_candles(ticker, stock_data, source="daily_data")
             log.append(f"Полностью обновлены данные для {ticker}.")
             continue
 
@@ -178,6 +181,7 @@ def auto_update_all_tickers(analyzer, conn, full_update: bool = True) -> List[st
                 ),
             )
         conn.commit()
+        get_price_cache().update_from_candles(ticker, stock_data, source="daily_data")
         log.append(f"Обновлены недостающие данные для {ticker}.")
 
     return log
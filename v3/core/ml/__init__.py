@@ -13,6 +13,7 @@ try:
         NewsSentimentAnalyzer,
         SentimentResult,
         SentimentConfig,
+        SentimentCache,
     )
     from .clustering import (
         StockClusterer,
@@ -61,6 +62,7 @@ __all__ = [
     "NewsSentimentAnalyzer",
     "SentimentResult",
     "SentimentConfig",
+    "SentimentCache",
     # Clustering
     "StockClusterer",
     "ClusteringResult",
@@ -0,0 +1,246 @@
+"""
+Компактный версионированный формат артефактов моделей.
+
+Вместо pickle всего объекта предсказателя на диск пишутся два файла:
+
+* ``{name}-{version}.safetensors`` — ``state_dict`` torch-модели в формате
+  safetensors (8 байт длины заголовка, JSON-заголовок, сырые тензоры). Файл
+  пишется средствами numpy и читается через ``np.memmap``, так что веса
+  подгружаются страницами по мере обращения, а не десериализуются целиком;
+* ``{name}.json`` — версия формата, класс предсказателя, ``ModelConfig``,
+  параметры ``MinMaxScaler``, оглавление тензоров и имя файла весов.
+
+Каждое сохранение пишет веса в новый файл и переключает на него manifest:
+загруженная модель держит свой файл отображённым, а Windows не даёт
+заменить или удалить такой файл. Старые версии удаляются, как только их
+больше никто не отображает.
+"""
+
+import glob
+import json
+import logging
+import re
+import struct
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 2
+MANIFEST_SUFFIX = '.json'
+WEIGHTS_SUFFIX = '.safetensors'
+
+_VERSIONED_WEIGHTS = re.compile(r'^(?P<base>.+)-[0-9a-f]{12,}' + re.escape(WEIGHTS_SUFFIX) + '$')
+
+_SCALER_ATTRIBUTES = ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_')
+
+_DTYPE_CODES = {
+    np.dtype('float32'): 'F32',
+    np.dtype('float64'): 'F64',
+    np.dtype('float16'): 'F16',
+    np.dtype('int64'): 'I64',
+    np.dtype('int32'): 'I32',
+    np.dtype('bool'): 'BOOL',
+}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+
+
+def supports_artifact(model: Any) -> bool:
+    """Можно ли сохранить модель в новом формате (обученный torch-предсказатель)."""
+    module = getattr(model, 'model', None)
+    return (
+        getattr(model, 'is_trained', False)
+        and hasattr(module, 'state_dict')
+        and hasattr(getattr(model, 'scaler', None), 'scale_')
+        and hasattr(model, '_create_model')
+    )
+
+
+def artifact_paths(base_path: Path) -> Tuple[Path, Path]:
+    """Пути (manifest, weights) для базового пути без расширения; weights — новая версия файла весов."""
+    version = f"{time.time_ns():x}"
+    return (base_path.with_suffix(MANIFEST_SUFFIX),
+            base_path.with_name(f"{base_path.name}-{version}{WEIGHTS_SUFFIX}"))
+
+
+def weights_files(base_path: Path) -> List[Path]:
+    """Все файлы весов модели: версионированные и безверсионный ``{name}.safetensors``."""
+    files = sorted(base_path.parent.glob(f"{glob.escape(base_path.name)}-*{WEIGHTS_SUFFIX}"))
+    unversioned = base_path.with_suffix(WEIGHTS_SUFFIX)
+    if unversioned.exists():
+        files.append(unversioned)
+    return files
+
+
+def remove_stale_weights(base_path: Path, keep: Optional[str] = None) -> int:
+    """
+    Удалить файлы весов модели, кроме ``keep``; возвращает число удалённых.
+
+    Файл, который ещё отображён в память (Windows), остаётся до следующей очистки.
+    """
+    removed = 0
+    for path in weights_files(base_path):
+        if path.name == keep:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Model weights {path.name} are still in use and will be removed later: {e}")
+    return removed
+
+
+def write_safetensors(tensors: Dict[str, np.ndarray], path: Path,
+                      metadata: Optional[Dict[str, str]] = None) -> int:
+    """Записать массивы в файл safetensors; возвращает размер данных в байтах."""
+    header: Dict[str, Any] = {}
+    if metadata:
+        header['__metadata__'] = metadata
+    offset = 0
+    arrays = []
+    for name, array in tensors.items():
+        array = np.ascontiguousarray(array)
+        code = _DTYPE_CODES.get(array.dtype)
+        if code is None:
+            raise ValueError(f"Unsupported tensor dtype {array.dtype} for {name}")
+        header[name] = {
+            'dtype': code,
+            'shape': list(array.shape),
+            'data_offsets': [offset, offset + array.nbytes],
+        }
+        offset += array.nbytes
+        arrays.append(array)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Выравнивание начала данных на 8 байт
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays:
+            f.write(array.tobytes())
+    tmp_path.replace(path)
+    return offset
+
+
+def read_safetensors(path: Path) -> Dict[str, np.ndarray]:
+    """Отобразить файл safetensors в память; массивы — copy-on-write представления."""
+    with open(path, 'rb') as f:
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len))
+    header.pop('__metadata__', None)
+    data_start = 8 + header_len
+    if not header:
+        return {}
+    # mode='c': страницы читаются лениво, запись в тензоры не трогает файл
+    buffer = np.memmap(path, dtype=np.uint8, mode='c', offset=data_start)
+    tensors = {}
+    for name, info in header.items():
+        start, end = info['data_offsets']
+        dtype = _CODE_DTYPES[info['dtype']]
+        tensors[name] = buffer[start:end].view(dtype).reshape(info['shape'])
+    return tensors
+
+
+def remove_unreferenced_weights(directory: Path) -> int:
+    """Удалить файлы весов каталога, на которые не ссылается manifest; возвращает число удалённых."""
+    removed = 0
+    bases = set()
+    for path in Path(directory).glob(f"*{WEIGHTS_SUFFIX}"):
+        match = _VERSIONED_WEIGHTS.match(path.name)
+        bases.add(path.with_name(match.group('base')) if match else path.with_suffix(''))
+    for base_path in sorted(bases):
+        manifest_path = base_path.with_suffix(MANIFEST_SUFFIX)
+        keep = None
+        if manifest_path.exists():
+            try:
+                keep = json.loads(manifest_path.read_text(encoding='utf-8'))['weights_file']
+            except (ValueError, KeyError, OSError) as e:
+                logger.error(f"Cannot read model manifest {manifest_path.name}: {e}")
+                continue
+        removed += remove_stale_weights(base_path, keep=keep)
+    return removed
+
+
+def save_predictor_artifact(model: Any, base_path: Path) -> Dict[str, Any]:
+    """Сохранить предсказатель как manifest + safetensors; возвращает manifest."""
+    manifest_path, weights_path = artifact_paths(base_path)
+    state = {
+        name: tensor.detach().cpu().numpy()
+        for name, tensor in model.model.state_dict().items()
+    }
+    weights_bytes = write_safetensors(
+        state, weights_path, metadata={'format_version': str(ARTIFACT_FORMAT_VERSION)}
+    )
+    scaler = model.scaler
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'predictor': type(model).__name__,
+        'config': asdict(model.config),
+        'input_size': int(scaler.n_features_in_),
+        'scaler': {
+            'feature_range': list(scaler.feature_range),
+            'n_features_in_': int(scaler.n_features_in_),
+            'n_samples_seen_': int(np.asarray(scaler.n_samples_seen_).max()),
+            **{attr: np.asarray(getattr(scaler, attr)).tolist() for attr in _SCALER_ATTRIBUTES},
+        },
+        'weights_file': weights_path.name,
+        'weights_bytes': weights_bytes,
+        'tensors': {name: list(array.shape) for name, array in state.items()},
+    }
+    tmp_path = manifest_path.with_suffix(manifest_path.suffix + '.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    tmp_path.replace(manifest_path)
+    remove_stale_weights(base_path, keep=weights_path.name)
+    return manifest
+
+
+def load_predictor_artifact(manifest_path: Path) -> Tuple[Any, Dict[str, Any]]:
+    """Восстановить предсказатель из артефакта; веса отображаются из файла."""
+    import torch
+    from sklearn.preprocessing import MinMaxScaler
+    from . import predictive_models
+
+    manifest = json.loads(Path(manifest_path).read_text(encoding='utf-8'))
+    version = manifest.get('format_version')
+    if version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact version: {version}")
+
+    predictor_cls = getattr(predictive_models, manifest['predictor'])
+    predictor = predictor_cls(predictive_models.ModelConfig(**manifest['config']))
+
+    scaler_data = manifest['scaler']
+    scaler = MinMaxScaler(feature_range=tuple(scaler_data['feature_range']))
+    for attr in _SCALER_ATTRIBUTES:
+        setattr(scaler, attr, np.asarray(scaler_data[attr], dtype=np.float64))
+    scaler.n_features_in_ = scaler_data['n_features_in_']
+    scaler.n_samples_seen_ = scaler_data['n_samples_seen_']
+    predictor.scaler = scaler
+
+    weights_path = Path(manifest_path).with_name(manifest['weights_file'])
+    state = {name: torch.from_numpy(array) for name, array in read_safetensors(weights_path).items()}
+    predictor.model = predictor._create_model(manifest['input_size'])
+    try:
+        # assign=True подставляет mmap-тензоры вместо копирования в новые параметры
+        predictor.model.load_state_dict(state, assign=True)
+    except TypeError:  # torch < 2.1
+        predictor.model.load_state_dict(state)
+    predictor.model.eval()
+    predictor.is_trained = True
+    return predictor, manifest
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """Оценка памяти модели для бюджета кэша: суммарный размер весов."""
+    module = getattr(model, 'model', None)
+    if hasattr(module, 'state_dict'):
+        try:
+            return int(sum(t.numel() * t.element_size() for t in module.state_dict().values()))
+        except Exception:
+            pass
+    return 0
@@ -49,16 +49,10 @@ class MLCacheManager:
             cutoff_time = (datetime.now() - self.cache_duration).isoformat()
             cursor.execute("DELETE FROM ml_signals WHERE created_at < ?", (cutoff_time,))
             
-            # Insert new signals
-            for _, row in signals_df.iterrows():
-                cursor.execute("""
-                    INSERT OR REPLACE INTO ml_signals (
-                        symbol, signal_type, confidence, price_signal, sentiment_signal,
-                        technical_signal, ensemble_signal, risk_level, price_prediction,
-                        sentiment, sentiment_score, sentiment_confidence, price_confidence,
-                        technical_confidence, data_points, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+            # Insert new signals in one batch
+            now = datetime.now().isoformat()
+            rows = [
+                (
                     row.get('symbol', ''),
                     row.get('ensemble_signal', 'HOLD'),
                     row.get('confidence', 0.5),
@@ -74,9 +68,19 @@ class MLCacheManager:
                     row.get('price_confidence'),
                     row.get('technical_confidence'),
                     row.get('data_points', 0),
-                    datetime.now().isoformat(),
-                    datetime.now().isoformat()
-                ))
+                    now,
+                    now
+                )
+                for row in signals_df.to_dict('records')
+            ]
+            cursor.executemany("""
+                INSERT OR REPLACE INTO ml_signals (
+                    symbol, signal_type, confidence, price_signal, sentiment_signal,
+                    technical_signal, ensemble_signal, risk_level, price_prediction,
+                    sentiment, sentiment_score, sentiment_confidence, price_confidence,
+                    technical_confidence, data_points, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
             
             conn.commit()
             conn.close()
@@ -6,18 +6,40 @@ Cascade ML Cache Manager.
 Использует базу данных для персистентного хранения кэша с проверкой актуальности.
 """
 
+import hashlib
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import sqlite3
 from pathlib import Path
 
-from core.database import get_connection
+from core.database import create_ml_signal_cache_table, get_connection
+from core.multi_timeframe_db import get_timeframe_table_name
 from core.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Версия формата сигналов: увеличить при изменении структуры результатов
+SIGNAL_CACHE_FORMAT_VERSION = 1
+
+# Лимит параметров в одном IN (...) запросе SQLite
+_SQL_CHUNK = 500
+
+
+def _json_default(value: Any) -> Any:
+    """numpy-скаляры и массивы сохраняются числами, остальное — строкой."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def stable_cache_key(*parts: Any) -> str:
+    """Ключ кэша, одинаковый между процессами (в отличие от встроенного hash())."""
+    payload = "|".join(str(part) for part in parts)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
 
 class CascadeMLCacheManager:
     """Менеджер кэша для ML результатов каскадного анализа."""
@@ -33,6 +55,18 @@ class CascadeMLCacheManager:
         self.cache_duration = timedelta(hours=6)  # Кэш на 6 часов
         self.cache_key_prefix = "cascade_ml_results"
         
+        # Статистика посимвольного кэша за время жизни процесса
+        self._stats_lock = threading.Lock()
+        self.symbol_cache_stats = {
+            'lookups': 0,
+            'full_hits': 0,
+            'partial_hits': 0,
+            'hits': 0,
+            'misses': 0,
+            'saved': 0
+        }
+        self._signal_table_ready = False
+        
     def _get_connection(self) -> sqlite3.Connection:
         """Получить соединение с базой данных."""
         return get_connection(self.db_path)
@@ -48,12 +82,247 @@ class CascadeMLCacheManager:
         Returns:
             Уникальный ключ кэша
         """
-        # Сортируем символы для консистентности
-        sorted_symbols = sorted(symbols)
-        symbols_hash = hash(tuple(sorted_symbols))
+        # Сортируем символы для консистентности; sha1 стабилен между перезапусками
+        symbols_hash = stable_cache_key(*sorted(symbols))[:16]
         
         return f"{self.cache_key_prefix}_{symbols_hash}_{min_volume}_{min_avg_volume}"
     
+    def _ensure_signal_table(self, conn: sqlite3.Connection) -> None:
+        if not self._signal_table_ready:
+            create_ml_signal_cache_table(conn)
+            self._signal_table_ready = True
+    
+    @staticmethod
+    def _chunks(items: List[str]):
+        for start in range(0, len(items), _SQL_CHUNK):
+            yield items[start:start + _SQL_CHUNK]
+    
+    def get_data_watermarks(self, symbols: List[str], timeframe: str = '1d',
+                            conn: Optional[sqlite3.Connection] = None) -> Dict[str, str]:
+        """Datetime последнего бара по каждому символу (одним запросом на чанк)."""
+        table_name = get_timeframe_table_name(timeframe)
+        own_conn = conn is None
+        conn = conn or self._get_connection()
+        try:
+            watermarks = {}
+            for chunk in self._chunks(list(symbols)):
+                placeholders = ",".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT symbol, MAX(datetime) FROM {table_name} "
+                    f"WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                    chunk
+                ).fetchall()
+                watermarks.update({symbol: str(last) for symbol, last in rows if last is not None})
+            return watermarks
+        finally:
+            if own_conn:
+                conn.close()
+    
+    def get_sentiment_watermark(self, conn: Optional[sqlite3.Connection] = None) -> str:
+        """Время самой свежей оценённой новости (водяной знак кэша тональности).
+        
+        Сигналы включают рыночную тональность, поэтому новые новости тоже
+        инвалидируют посимвольный кэш.
+        """
+        own_conn = conn is None
+        conn = conn or self._get_connection()
+        try:
+            row = conn.execute("SELECT MAX(last_published_at) FROM ml_sentiment_watermarks").fetchone()
+        except sqlite3.OperationalError:
+            # Тональность ещё не считалась
+            row = None
+        finally:
+            if own_conn:
+                conn.close()
+        return str(row[0]) if row and row[0] is not None else 'none'
+    
+    def get_model_versions(self, symbols: List[str], model_type: str = 'lstm', timeframe: str = '1d',
+                           conn: Optional[sqlite3.Connection] = None) -> Dict[str, str]:
+        """Версия активной модели символа: ``{model_version}@{training_date}``.
+        
+        Символы без обученной модели получают версию ``untrained``.
+        """
+        own_conn = conn is None
+        conn = conn or self._get_connection()
+        try:
+            versions = {symbol: 'untrained' for symbol in symbols}
+            for chunk in self._chunks(list(symbols)):
+                placeholders = ",".join("?" for _ in chunk)
+                try:
+                    rows = conn.execute(
+                        f"""
+                        SELECT symbol, model_version, MAX(training_date) FROM ml_models
+                        WHERE is_active = 1 AND model_type = ? AND timeframe = ?
+                          AND symbol IN ({placeholders})
+                        GROUP BY symbol
+                        """,
+                        [model_type, timeframe, *chunk]
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    # Таблицы моделей ещё нет
+                    return versions
+                for symbol, model_version, training_date in rows:
+                    versions[symbol] = f"{model_version}@{training_date}"
+            return versions
+        finally:
+            if own_conn:
+                conn.close()
+    
+    def _symbol_keys(self, symbols: List[str], model_type: str, timeframe: str,
+                     conn: sqlite3.Connection) -> Dict[str, Tuple[str, str, str]]:
+        """symbol -> (cache_key, model_version, data_watermark) для символов с данными."""
+        watermarks = self.get_data_watermarks(symbols, timeframe, conn)
+        versions = self.get_model_versions(symbols, model_type, timeframe, conn)
+        news_watermark = self.get_sentiment_watermark(conn)
+        keys = {}
+        for symbol in symbols:
+            watermark = watermarks.get(symbol)
+            if watermark is None:
+                continue
+            version = f"{versions[symbol]}/f{SIGNAL_CACHE_FORMAT_VERSION}"
+            keys[symbol] = (stable_cache_key(symbol, version, watermark, news_watermark), version, watermark)
+        return keys
+    
+    def get_symbol_results(self, symbols: List[str], model_type: str = 'lstm',
+                           timeframe: str = '1d') -> Tuple[Dict[str, Any], List[str]]:
+        """Посимвольный поиск в кэше.
+        
+        Запись символа валидна, пока не изменились версия его модели,
+        datetime последнего бара и водяной знак новостей, поэтому изменение состава вселенной не
+        сбрасывает кэш остальных символов.
+        
+        Returns:
+            (результаты для попаданий, список символов для пересчёта)
+        """
+        hits: Dict[str, Any] = {}
+        try:
+            conn = self._get_connection()
+            try:
+                self._ensure_signal_table(conn)
+                keys = self._symbol_keys(symbols, model_type, timeframe, conn)
+                now = datetime.now().isoformat()
+                for chunk in self._chunks(list(keys)):
+                    placeholders = ",".join("?" for _ in chunk)
+                    rows = conn.execute(
+                        f"""
+                        SELECT symbol, cache_key, signal_data FROM ml_signal_cache
+                        WHERE symbol IN ({placeholders}) AND expires_at > ?
+                        """,
+                        [*chunk, now]
+                    ).fetchall()
+                    for symbol, cache_key, signal_data in rows:
+                        if cache_key == keys[symbol][0]:
+                            hits[symbol] = json.loads(signal_data)
+                if hits:
+                    conn.execute("BEGIN")
+                    conn.executemany(
+                        "UPDATE ml_signal_cache SET hit_count = hit_count + 1 WHERE symbol = ?",
+                        [(symbol,) for symbol in hits]
+                    )
+                    conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"❌ [CACHE] Ошибка посимвольного чтения кэша: {e}")
+            hits = {}
+        
+        misses = [symbol for symbol in symbols if symbol not in hits]
+        with self._stats_lock:
+            stats = self.symbol_cache_stats
+            stats['lookups'] += 1
+            stats['hits'] += len(hits)
+            stats['misses'] += len(misses)
+            if hits and not misses:
+                stats['full_hits'] += 1
+            elif hits:
+                stats['partial_hits'] += 1
+        logger.info(f"🔍 [CACHE] Посимвольный кэш: {len(hits)} попаданий, {len(misses)} к пересчёту")
+        return hits, misses
+    
+    def save_symbol_results(self, results: Dict[str, Any], model_type: str = 'lstm',
+                            timeframe: str = '1d', expires_in_hours: int = 6) -> int:
+        """Сохранить результаты по символам одним upsert'ом.
+        
+        Версии моделей и watermark читаются после расчёта, так что модели,
+        обученные во время прогона, сразу попадают в ключ.
+        """
+        if not results:
+            return 0
+        try:
+            conn = self._get_connection()
+            try:
+                self._ensure_signal_table(conn)
+                keys = self._symbol_keys(list(results), model_type, timeframe, conn)
+                now = datetime.now().isoformat()
+                expires_at = (datetime.now() + timedelta(hours=expires_in_hours)).isoformat()
+                rows = [
+                    (symbol, *keys[symbol], json.dumps(result, default=_json_default), expires_at, now, now)
+                    for symbol, result in results.items()
+                    if symbol in keys
+                ]
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(
+                        """
+                        INSERT INTO ml_signal_cache (
+                            symbol, cache_key, model_version, data_watermark, signal_data,
+                            expires_at, created_at, updated_at
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(symbol) DO UPDATE SET
+                            cache_key = excluded.cache_key,
+                            model_version = excluded.model_version,
+                            data_watermark = excluded.data_watermark,
+                            signal_data = excluded.signal_data,
+                            hit_count = 0,
+                            expires_at = excluded.expires_at,
+                            updated_at = excluded.updated_at
+                        """,
+                        rows
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"❌ [CACHE] Ошибка посимвольного сохранения кэша: {e}")
+            return 0
+        
+        with self._stats_lock:
+            self.symbol_cache_stats['saved'] += len(rows)
+        logger.info(f"💾 [CACHE] Посимвольный кэш: сохранено {len(rows)} символов")
+        return len(rows)
+    
+    def get_symbol_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate посимвольного кэша за процесс и сводка по таблице."""
+        with self._stats_lock:
+            stats = dict(self.symbol_cache_stats)
+        looked_up = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / looked_up if looked_up else 0.0
+        stats.update({'entries': 0, 'valid_entries': 0, 'stored_hits': 0})
+        try:
+            conn = self._get_connection()
+            try:
+                self._ensure_signal_table(conn)
+                entries, valid_entries, stored_hits = conn.execute(
+                    """
+                    SELECT COUNT(*), SUM(expires_at > ?), COALESCE(SUM(hit_count), 0)
+                    FROM ml_signal_cache
+                    """,
+                    (datetime.now().isoformat(),)
+                ).fetchone()
+            finally:
+                conn.close()
+            stats.update({
+                'entries': entries,
+                'valid_entries': valid_entries or 0,
+                'stored_hits': stored_hits
+            })
+        except Exception as e:
+            logger.error(f"❌ [CACHE] Ошибка получения статистики посимвольного кэша: {e}")
+        return stats
+    
     def save_ml_results(self, symbols: List[str], ml_results: Dict[str, Any], 
                        min_volume: float, min_avg_volume: float,
                        expires_in_hours: int = 6) -> bool:
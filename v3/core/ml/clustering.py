@@ -5,20 +5,25 @@ import pandas as pd
 from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 import logging
-from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
+import threading
+from collections import OrderedDict
+from datetime import date
+from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN, AgglomerativeClustering
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.decomposition import PCA
 from sklearn.metrics import silhouette_score, calinski_harabasz_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from .feature_store import FeatureView
+
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class ClusteringConfig:
     """Configuration for clustering algorithms."""
-    algorithm: str = 'kmeans'  # 'kmeans', 'dbscan', 'hierarchical'
+    algorithm: str = 'kmeans'  # 'kmeans', 'minibatch_kmeans', 'dbscan', 'hierarchical'
     n_clusters: int = 5
     random_state: int = 42
     min_samples: int = 5  # For DBSCAN
@@ -27,6 +32,83 @@ class ClusteringConfig:
     scaler: str = 'standard'  # 'standard', 'minmax', 'none'
     use_pca: bool = False
     pca_components: Optional[int] = None
+    n_init: int = 10  # For kmeans / minibatch_kmeans
+    batch_size: int = 1024  # For minibatch_kmeans
+    silhouette_sample_size: Optional[int] = 2000  # None computes the exact O(n^2) score
+    warm_start: bool = False  # Initialise from the previous fit's centroids
+
+
+def feature_cache_key(symbols: List[str], timeframe: str,
+                      as_of: Optional[date] = None, **kwargs) -> Tuple:
+    """Cache key for a feature matrix: (symbol set, timeframe, date, feature options)."""
+    options = tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in kwargs.items()
+    ))
+    return (tuple(sorted(symbols)), timeframe, (as_of or date.today()).isoformat(), options)
+
+
+@dataclass
+class CachedFeatures:
+    """Prepared feature matrix with its column names and optional row labels."""
+    matrix: np.ndarray
+    feature_names: List[str]
+    row_labels: Optional[List[str]] = None
+
+
+class FeatureMatrixCache:
+    """Small LRU of prepared feature matrices keyed by :func:`feature_cache_key`."""
+    
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[CachedFeatures]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key: Tuple, matrix: np.ndarray, feature_names: List[str],
+            row_labels: Optional[List[str]] = None):
+        with self._lock:
+            self._entries[key] = CachedFeatures(
+                matrix, list(feature_names), list(row_labels) if row_labels is not None else None
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by all clusterers: matrices depend only on the data, not on the model
+feature_cache = FeatureMatrixCache()
+
+
+def sampled_silhouette_score(X: np.ndarray, labels: np.ndarray,
+                             sample_size: Optional[int] = None,
+                             random_state: Optional[int] = None) -> float:
+    """Silhouette score, estimated on a random sample when X is large."""
+    try:
+        if sample_size and len(X) > sample_size:
+            return float(silhouette_score(X, labels, sample_size=sample_size, random_state=random_state))
+        return float(silhouette_score(X, labels))
+    except ValueError:
+        # The sample ended up with a single cluster
+        return -1.0
 
 
 @dataclass
@@ -52,7 +134,55 @@ class StockClusterer:
         self.feature_names = None
         self.is_fitted = False
     
-    def _prepare_features(self, data: pd.DataFrame, 
+    def _get_features(self, data: pd.DataFrame, cache_key: Optional[Tuple] = None, **kwargs) -> np.ndarray:
+        """Feature matrix for *data*, reused from :data:`feature_cache` when keyed."""
+        if cache_key is not None:
+            cached = feature_cache.get(cache_key)
+            if cached is not None:
+                self.feature_names = list(cached.feature_names)
+                return cached.matrix
+        X = self._prepare_features(data, **kwargs)
+        if cache_key is not None:
+            feature_cache.put(cache_key, X, self.feature_names)
+        return X
+    
+    def build_symbol_features(self, frames: Dict[str, pd.DataFrame],
+                              cache_key: Optional[Tuple] = None, **kwargs) -> Tuple[List[str], np.ndarray]:
+        """One feature row per symbol: the latest window of :meth:`_prepare_features`.
+        
+        Symbols whose frame is empty or lacks features are skipped. Frames
+        must share the same columns so that rows line up.
+        """
+        if cache_key is not None:
+            cached = feature_cache.get(cache_key)
+            if cached is not None and cached.row_labels is not None:
+                self.feature_names = list(cached.feature_names)
+                return list(cached.row_labels), cached.matrix
+        
+        symbols: List[str] = []
+        rows: List[np.ndarray] = []
+        feature_names = None
+        for symbol, frame in frames.items():
+            if frame is None or frame.empty:
+                continue
+            try:
+                features = self._prepare_features(frame, **kwargs)
+            except ValueError:
+                continue
+            if feature_names is not None and self.feature_names != feature_names:
+                logger.warning(f"Skipping {symbol}: feature set differs from other symbols")
+                continue
+            feature_names = self.feature_names
+            symbols.append(symbol)
+            rows.append(features[-1])
+        
+        self.feature_names = feature_names
+        X = np.vstack(rows) if rows else np.empty((0, 0))
+        if cache_key is not None and rows:
+            feature_cache.put(cache_key, X, feature_names, row_labels=symbols)
+        return symbols, X
+    
+    def _prepare_features(self, data: Union[pd.DataFrame, FeatureView], 
                          price_columns: List[str] = None,
                          volume_columns: List[str] = None,
                          technical_indicators: List[str] = None) -> np.ndarray:
@@ -71,13 +201,17 @@ class StockClusterer:
         
         # Collect all available features
         all_features = price_columns + volume_columns + technical_indicators
-        available_features = [col for col in all_features if col in data.columns]
+        available_features = [col for col in all_features if col in data]
         
         if not available_features:
             raise ValueError("No valid features found in the data")
         
         # Calculate additional features
-        features_df = data[available_features].copy()
+        if isinstance(data, FeatureView):
+            # Only the selected columns leave the memory-mapped store
+            features_df = pd.DataFrame({col: np.array(data[col]) for col in available_features})
+        else:
+            features_df = data[available_features].copy()
         
         # Add price-based features
         if 'close' in features_df.columns:
@@ -120,13 +254,51 @@ class StockClusterer:
         
         return features_df.values
     
-    def _create_clusterer(self, n_features: int):
-        """Create clustering algorithm based on config."""
-        if self.config.algorithm == 'kmeans':
+    def _previous_raw_centers(self) -> Optional[np.ndarray]:
+        """Centroids of the previous fit mapped back to unscaled feature space.
+        
+        Each fit re-fits the scaler (and PCA), so stored centroids live in the
+        previous fit's coordinates; they are only usable as a seed after being
+        moved back to raw features and through the new transforms.
+        """
+        centers = getattr(self.clusterer, 'cluster_centers_', None)
+        if not self.config.warm_start or centers is None or len(centers) != self.config.n_clusters:
+            return None
+        if self.pca is not None:
+            centers = self.pca.inverse_transform(centers)
+        if self.scaler is not None:
+            centers = self.scaler.inverse_transform(centers)
+        return centers
+    
+    def _to_model_space(self, X: np.ndarray) -> np.ndarray:
+        """Apply the fitted scaler and PCA."""
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        if self.pca is not None:
+            X = self.pca.transform(X)
+        return X
+    
+    def _create_clusterer(self, n_features: int, centers: Optional[np.ndarray] = None):
+        """Create clustering algorithm based on config.
+        
+        ``centers`` (in the current model space) seed k-means when warm
+        starting.
+        """
+        if self.config.algorithm in ('kmeans', 'minibatch_kmeans'):
+            if centers is not None and centers.shape != (self.config.n_clusters, n_features):
+                centers = None
+            init_kwargs = {'init': centers, 'n_init': 1} if centers is not None else {'n_init': self.config.n_init}
+            if self.config.algorithm == 'minibatch_kmeans':
+                return MiniBatchKMeans(
+                    n_clusters=self.config.n_clusters,
+                    random_state=self.config.random_state,
+                    batch_size=self.config.batch_size,
+                    **init_kwargs
+                )
             return KMeans(
                 n_clusters=self.config.n_clusters,
                 random_state=self.config.random_state,
-                n_init=10
+                **init_kwargs
             )
         elif self.config.algorithm == 'dbscan':
             return DBSCAN(
@@ -141,10 +313,19 @@ class StockClusterer:
         else:
             raise ValueError(f"Unknown clustering algorithm: {self.config.algorithm}")
     
-    def fit(self, data: pd.DataFrame, **kwargs) -> ClusteringResult:
-        """Fit clustering model to data."""
+    def fit(self, data: Optional[pd.DataFrame], cache_key: Optional[Tuple] = None,
+            features: Optional[np.ndarray] = None, **kwargs) -> ClusteringResult:
+        """Fit clustering model to data.
+        
+        ``features`` skips feature preparation (e.g. rows from
+        :meth:`build_symbol_features`); ``cache_key`` reuses a matrix prepared
+        earlier for the same symbol set, timeframe and date.
+        """
         # Prepare features
-        X = self._prepare_features(data, **kwargs)
+        X = features if features is not None else self._get_features(data, cache_key, **kwargs)
+        previous_centers = self._previous_raw_centers()
+        if previous_centers is not None and previous_centers.shape[1] != X.shape[1]:
+            previous_centers = None
         
         # Scale features
         if self.config.scaler == 'standard':
@@ -165,16 +346,22 @@ class StockClusterer:
             self.pca = PCA(n_components=n_components)
             X_scaled = self.pca.fit_transform(X_scaled)
             logger.info(f"PCA explained variance ratio: {self.pca.explained_variance_ratio_}")
+        else:
+            self.pca = None
         
-        # Create and fit clusterer
-        self.clusterer = self._create_clusterer(X_scaled.shape[1])
+        # Create and fit clusterer; warm-start seeds move into the new scaler space
+        if previous_centers is not None:
+            previous_centers = self._to_model_space(previous_centers)
+        self.clusterer = self._create_clusterer(X_scaled.shape[1], previous_centers)
         labels = self.clusterer.fit_predict(X_scaled)
         
         # Calculate metrics
         n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
         
         if n_clusters > 1:
-            silhouette_avg = silhouette_score(X_scaled, labels)
+            silhouette_avg = sampled_silhouette_score(
+                X_scaled, labels, self.config.silhouette_sample_size, self.config.random_state
+            )
             calinski_harabasz = calinski_harabasz_score(X_scaled, labels)
         else:
             silhouette_avg = -1
@@ -258,12 +445,45 @@ class StockClusterer:
         
         return importance
     
-    def predict(self, data: pd.DataFrame, **kwargs) -> np.ndarray:
+    def partial_fit(self, data: Optional[pd.DataFrame] = None,
+                    features: Optional[np.ndarray] = None, **kwargs) -> 'StockClusterer':
+        """Update a mini-batch k-means model with a new batch of rows.
+        
+        The scaler is fitted on the first batch and then frozen so that
+        centroids stay in one coordinate space across updates. Requires
+        ``algorithm='minibatch_kmeans'``; PCA is not supported here.
+        """
+        if self.config.algorithm != 'minibatch_kmeans':
+            raise ValueError("partial_fit requires algorithm='minibatch_kmeans'")
+        if self.config.use_pca:
+            raise ValueError("PCA is not supported for streaming updates")
+        
+        X = features if features is not None else self._prepare_features(data, **kwargs)
+        if len(X) == 0:
+            return self
+        
+        if not self.is_fitted:
+            if self.config.scaler == 'standard':
+                self.scaler = StandardScaler().fit(X)
+            elif self.config.scaler == 'minmax':
+                self.scaler = MinMaxScaler().fit(X)
+            else:
+                self.scaler = None
+            self.pca = None
+            self.clusterer = self._create_clusterer(X.shape[1])
+        
+        X_scaled = self.scaler.transform(X) if self.scaler else X
+        self.clusterer.partial_fit(X_scaled)
+        self.is_fitted = True
+        return self
+    
+    def predict(self, data: Optional[pd.DataFrame], features: Optional[np.ndarray] = None,
+                **kwargs) -> np.ndarray:
         """Predict cluster labels for new data."""
         if not self.is_fitted:
             raise ValueError("Model must be fitted before making predictions")
         
-        X = self._prepare_features(data, **kwargs)
+        X = features if features is not None else self._prepare_features(data, **kwargs)
         
         if self.scaler:
             X_scaled = self.scaler.transform(X)
@@ -349,15 +569,21 @@ class StockClusterer:
         plt.show()
 
 
-def find_optimal_clusters(data: pd.DataFrame, 
+def find_optimal_clusters(data: Optional[pd.DataFrame], 
                          max_clusters: int = 10,
                          algorithm: str = 'kmeans',
+                         cache_key: Optional[Tuple] = None,
+                         features: Optional[np.ndarray] = None,
                          **kwargs) -> Dict[str, Union[int, float]]:
-    """Find optimal number of clusters using elbow method and silhouette analysis."""
+    """Find optimal number of clusters using elbow method and silhouette analysis.
+    
+    Silhouette scores are estimated on ``silhouette_sample_size`` rows, so the
+    scan stays linear in the number of rows for large universes.
+    """
     config = ClusteringConfig(algorithm=algorithm, **kwargs)
     clusterer = StockClusterer(config)
     
-    X = clusterer._prepare_features(data)
+    X = features if features is not None else clusterer._get_features(data, cache_key)
     
     if config.scaler == 'standard':
         scaler = StandardScaler()
@@ -378,11 +604,16 @@ def find_optimal_clusters(data: pd.DataFrame,
     
     inertias = []
     silhouette_scores = []
-    k_range = range(2, min(max_clusters + 1, len(data) // 2))
+    k_range = range(2, min(max_clusters + 1, len(X_scaled) // 2))
     
     for k in k_range:
         if algorithm == 'kmeans':
-            kmeans = KMeans(n_clusters=k, random_state=config.random_state, n_init=10)
+            kmeans = KMeans(n_clusters=k, random_state=config.random_state, n_init=config.n_init)
+            labels = kmeans.fit_predict(X_scaled)
+            inertias.append(kmeans.inertia_)
+        elif algorithm == 'minibatch_kmeans':
+            kmeans = MiniBatchKMeans(n_clusters=k, random_state=config.random_state,
+                                     batch_size=config.batch_size, n_init=config.n_init)
             labels = kmeans.fit_predict(X_scaled)
             inertias.append(kmeans.inertia_)
         elif algorithm == 'hierarchical':
@@ -393,7 +624,9 @@ def find_optimal_clusters(data: pd.DataFrame,
             continue
         
         if k > 1:
-            silhouette_avg = silhouette_score(X_scaled, labels)
+            silhouette_avg = sampled_silhouette_score(
+                X_scaled, labels, config.silhouette_sample_size, config.random_state
+            )
             silhouette_scores.append(silhouette_avg)
         else:
             silhouette_scores.append(-1)
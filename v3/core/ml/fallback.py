@@ -275,11 +275,20 @@ def create_fallback_ml_manager():
         
     def _get_stock_data_from_db(self, symbol: str) -> pd.DataFrame:
         """Get stock data from database for a given symbol."""
+        db_path = "stock_data.db"
+        try:
+            # The feature store only needs numpy/pandas, so it works without the ML stack
+            from .feature_store import get_feature_store
+            df = get_feature_store(db_path).get_frame(symbol)
+            if not df.empty:
+                return df
+        except Exception as e:
+            logger.warning(f"Feature store read failed for {symbol}: {e}")
+
         try:
             import sqlite3
             from pathlib import Path
-            
-            db_path = "stock_data.db"
+
             if not Path(db_path).exists():
                 return pd.DataFrame()
             
@@ -0,0 +1,434 @@
+"""
+Хранилище признаков для обучения и инференса ML моделей.
+
+Раньше каждый потребитель (``MLModelManager``, ``MLIntegrationManager``,
+fallback-менеджер) сам читал свечи из SQLite и заново считал
+``sma_20``/``rsi``/``macd``/``bb_*``. Теперь признаки по паре
+(symbol, timeframe) материализуются один раз после обновления данных и
+хранятся на диске по колонкам::
+
+    feature_store/{timeframe}/{symbol}/
+        manifest.json      — версия формата, колонки, число строк, watermark
+        index.i8           — время бара, int64 (ns, UTC)
+        close.f64, ...     — по файлу float64 на колонку
+
+Колонки читаются через ``np.memmap`` и отдаются потребителям как
+read-only представления без копирования (:class:`FeatureView`). Новые бары
+дописываются в конец файлов: индикаторы пересчитываются только на хвосте
+из ``RECOMPUTE_LOOKBACK`` строк истории плюс новые бары.
+
+Имена колонок совпадают с теми, что ожидают ``PricePredictor``,
+``StockClusterer`` и ``TradingEnvironment`` (``sma_20``, ``bb_upper``, ...),
+а не с именами ``core.indicators``.
+
+Хранилище привязано к одной базе: :func:`get_feature_store` возвращает
+отдельный экземпляр на каждый файл БД (по умолчанию — базу из настроек),
+а его каталог лежит рядом с этой базой, так что признаки разных баз не
+смешиваются.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.multi_timeframe_db import get_timeframe_table_name
+from core.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_FORMAT_VERSION = 1
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+INDICATOR_COLUMNS = ['sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi', 'macd',
+                     'bb_middle', 'bb_upper', 'bb_lower']
+STORE_COLUMNS = OHLCV_COLUMNS + INDICATOR_COLUMNS
+
+# Строк истории, пересчитываемых вместе с новыми барами. Окна индикаторов не
+# длиннее 50, а вклад начала окна в EMA(26) за 400 шагов меньше 1e-13.
+RECOMPUTE_LOOKBACK = 400
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_FILE = 'index.i8'
+COLUMN_SUFFIX = '.f64'
+
+_SQL_CHUNK = 500
+
+
+def compute_ml_features(ohlcv: pd.DataFrame) -> pd.DataFrame:
+    """Единый расчёт индикаторов ML поверх OHLCV; пропуски не заполняются."""
+    df = ohlcv.copy()
+    close = df['close']
+
+    # Простые скользящие средние
+    df['sma_20'] = close.rolling(window=20).mean()
+    df['sma_50'] = close.rolling(window=50).mean()
+
+    # EMA
+    df['ema_12'] = close.ewm(span=12).mean()
+    df['ema_26'] = close.ewm(span=26).mean()
+
+    # RSI
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    df['rsi'] = 100 - (100 / (1 + rs))
+
+    # MACD
+    df['macd'] = df['ema_12'] - df['ema_26']
+
+    # Bollinger Bands
+    df['bb_middle'] = close.rolling(window=20).mean()
+    bb_std = close.rolling(window=20).std()
+    df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
+    df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+    return df
+
+
+def _to_utc_ns(values: Iterable) -> np.ndarray:
+    index = pd.DatetimeIndex(pd.to_datetime(pd.Series(list(values), dtype=object), utc=True))
+    # pandas >= 3 разбирает строки с точностью до микросекунд; в файле всегда нс
+    return index.tz_convert(None).as_unit('ns').asi8.astype(np.int64)
+
+
+def default_store_root(db_path) -> Path:
+    """Каталог хранилища базы: ``feature_store/{имя БД}`` рядом с файлом базы."""
+    db_path = Path(db_path).expanduser().resolve()
+    return db_path.parent / 'feature_store' / db_path.stem
+
+
+@dataclass
+class FeatureStoreConfig:
+    """Настройки хранилища признаков."""
+    db_path: str = field(default_factory=lambda: str(get_settings().database_path))
+    root: Optional[Path] = None  # По умолчанию default_store_root(db_path)
+    timeframes: Tuple[str, ...] = ('1d',)  # Что материализовать после обновления данных
+
+    def __post_init__(self):
+        if self.root is None:
+            self.root = default_store_root(self.db_path)
+
+
+@dataclass
+class FeatureView:
+    """Read-only представления колонок одного символа без копирования."""
+    symbol: str
+    timeframe: str
+    index: np.ndarray                    # datetime64[ns]
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    watermark: Optional[str] = None      # datetime последнего бара, как в БД
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.columns)
+
+    def slice(self, start: Optional[int] = None, stop: Optional[int] = None) -> 'FeatureView':
+        """Подмножество строк; тоже представление."""
+        window = slice(start, stop)
+        return FeatureView(
+            self.symbol, self.timeframe, self.index[window],
+            {name: array[window] for name, array in self.columns.items()},
+            self.watermark,
+        )
+
+    def tail(self, rows: int) -> 'FeatureView':
+        return self.slice(max(0, len(self) - rows), None)
+
+    def matrix(self, columns: List[str], dtype=np.float64) -> np.ndarray:
+        """Матрица ``(rows, len(columns))`` — единственная копия для 2D-потребителей."""
+        out = np.empty((len(self), len(columns)), dtype=dtype)
+        for position, name in enumerate(columns):
+            out[:, position] = self.columns[name]
+        return out
+
+    def to_frame(self, date_as_column: bool = False) -> pd.DataFrame:
+        """DataFrame для pandas-потребителей (копирует данные)."""
+        frame = pd.DataFrame(
+            {name: np.array(array) for name, array in self.columns.items()},
+            index=pd.DatetimeIndex(self.index, name='date'),
+        )
+        if date_as_column:
+            frame = frame.reset_index()
+        return frame
+
+
+class FeatureStore:
+    """Колоночное хранилище признаков по (symbol, timeframe)."""
+
+    def __init__(self, config: Optional[FeatureStoreConfig] = None):
+        self.config = config or FeatureStoreConfig()
+        self.root = Path(self.config.root)
+        self._lock = threading.RLock()
+        self.stats = {
+            'views_served': 0,
+            'view_misses': 0,
+            'full_builds': 0,
+            'appends': 0,
+            'rows_appended': 0,
+        }
+
+    # ------------------------------------------------------------------ пути
+
+    def _symbol_dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / timeframe / symbol
+
+    def read_manifest(self, symbol: str, timeframe: str = '1d') -> Optional[Dict]:
+        path = self._symbol_dir(symbol, timeframe) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        try:
+            manifest = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable feature manifest for {symbol} ({timeframe}): {e}")
+            return None
+        if manifest.get('format_version') != FEATURE_STORE_FORMAT_VERSION:
+            return None
+        return manifest
+
+    def _write_manifest(self, directory: Path, manifest: Dict) -> None:
+        tmp_path = directory / (MANIFEST_NAME + '.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        tmp_path.replace(directory / MANIFEST_NAME)
+
+    # ------------------------------------------------------------------ чтение
+
+    def get_view(self, symbol: str, timeframe: str = '1d',
+                 tail: Optional[int] = None) -> Optional[FeatureView]:
+        """Представление признаков символа или None, если он не материализован."""
+        manifest = self.read_manifest(symbol, timeframe)
+        if manifest is None or manifest['rows'] == 0:
+            self.stats['view_misses'] += 1
+            return None
+        directory = self._symbol_dir(symbol, timeframe)
+        rows = manifest['rows']
+        start = max(0, rows - tail) if tail else 0
+        try:
+            index = np.memmap(directory / INDEX_FILE, dtype='<i8', mode='r', shape=(rows,))[start:]
+            columns = {
+                name: np.memmap(directory / (name + COLUMN_SUFFIX), dtype='<f8', mode='r', shape=(rows,))[start:]
+                for name in manifest['columns']
+            }
+        except (OSError, ValueError) as e:
+            logger.warning(f"Feature store files for {symbol} ({timeframe}) are unreadable: {e}")
+            self.stats['view_misses'] += 1
+            return None
+        self.stats['views_served'] += 1
+        return FeatureView(symbol, timeframe, index.view('datetime64[ns]'), columns, manifest['watermark'])
+
+    def get_views(self, symbols: List[str], timeframe: str = '1d', tail: Optional[int] = None,
+                  refresh_missing: bool = True) -> Dict[str, FeatureView]:
+        """Представления для многих символов; отсутствующие строятся из БД одним запросом."""
+        views = {}
+        missing = []
+        for symbol in symbols:
+            view = self.get_view(symbol, timeframe, tail)
+            if view is None:
+                missing.append(symbol)
+            else:
+                views[symbol] = view
+        if missing and refresh_missing:
+            self.refresh(missing, timeframe)
+            for symbol in missing:
+                view = self.get_view(symbol, timeframe, tail)
+                if view is not None:
+                    views[symbol] = view
+        return views
+
+    def get_frame(self, symbol: str, timeframe: str = '1d', tail: Optional[int] = None,
+                  refresh_missing: bool = True, date_as_column: bool = False) -> pd.DataFrame:
+        """DataFrame признаков символа (пустой, если данных нет)."""
+        views = self.get_views([symbol], timeframe, tail, refresh_missing)
+        view = views.get(symbol)
+        return view.to_frame(date_as_column) if view is not None else pd.DataFrame()
+
+    # ------------------------------------------------------------------ запись
+
+    def materialize(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> int:
+        """Полностью пересобрать признаки символа из OHLCV (колонка ``datetime``)."""
+        with self._lock:
+            bars = bars.sort_values('datetime').drop_duplicates('datetime', keep='last')
+            directory = self._symbol_dir(symbol, timeframe)
+            directory.mkdir(parents=True, exist_ok=True)
+            features = compute_ml_features(bars[['datetime'] + OHLCV_COLUMNS].reset_index(drop=True))
+            features[STORE_COLUMNS] = features[STORE_COLUMNS].astype(np.float64).ffill().fillna(0)
+
+            # Новые файлы подменяют старые целиком: открытые memmap остаются на старых inode
+            self._replace_file(directory / INDEX_FILE, _to_utc_ns(features['datetime']).tobytes())
+            for name in STORE_COLUMNS:
+                self._replace_file(directory / (name + COLUMN_SUFFIX),
+                                   features[name].to_numpy(dtype='<f8').tobytes())
+            self._write_manifest(directory, self._manifest(symbol, timeframe, features, len(features)))
+            self.stats['full_builds'] += 1
+            return len(features)
+
+    def append(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> int:
+        """Дописать новые (или обновлённые последние) бары.
+
+        Бары не раньше первого из *bars* перезаписываются, индикаторы для них
+        считаются на хвосте из ``RECOMPUTE_LOOKBACK`` сохранённых строк.
+        Возвращает число записанных строк.
+        """
+        if bars.empty:
+            return 0
+        with self._lock:
+            manifest = self.read_manifest(symbol, timeframe)
+            if manifest is None or manifest['rows'] == 0:
+                return self.materialize(symbol, timeframe, bars)
+
+            bars = bars.sort_values('datetime').drop_duplicates('datetime', keep='last')
+            view = self.get_view(symbol, timeframe)
+            new_index = _to_utc_ns(bars['datetime'])
+            stored_index = view.index.view('<i8')
+            # Строки, начиная с первого нового бара, заменяются
+            keep_rows = int(np.searchsorted(stored_index, new_index[0], side='left'))
+            history_start = max(0, keep_rows - RECOMPUTE_LOOKBACK)
+
+            history = pd.DataFrame({
+                name: np.array(view[name][history_start:keep_rows]) for name in OHLCV_COLUMNS
+            })
+            history.insert(0, 'datetime', pd.DatetimeIndex(view.index[history_start:keep_rows]))
+            recent = bars[['datetime'] + OHLCV_COLUMNS].copy()
+            recent['datetime'] = pd.DatetimeIndex(new_index.view('datetime64[ns]'))
+            window = compute_ml_features(pd.concat([history, recent], ignore_index=True))
+            window[STORE_COLUMNS] = window[STORE_COLUMNS].astype(np.float64).ffill().fillna(0)
+            tail = window.iloc[keep_rows - history_start:]
+
+            directory = self._symbol_dir(symbol, timeframe)
+            self._write_at(directory / INDEX_FILE, keep_rows, new_index.astype('<i8').tobytes())
+            for name in STORE_COLUMNS:
+                self._write_at(directory / (name + COLUMN_SUFFIX), keep_rows,
+                               tail[name].to_numpy(dtype='<f8').tobytes())
+            rows = keep_rows + len(tail)
+            updated = self._manifest(symbol, timeframe, bars, rows)
+            updated['first'] = manifest['first'] if keep_rows else updated['first']
+            self._write_manifest(directory, updated)
+            self.stats['appends'] += 1
+            self.stats['rows_appended'] += len(tail)
+            return len(tail)
+
+    def refresh(self, symbols: List[str], timeframe: str = '1d',
+                conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Подтянуть из БД бары после watermark каждого символа.
+
+        Бар с datetime == watermark тоже перечитывается: DataUpdater
+        перезаписывает текущую (незакрытую) свечу. Символы без манифеста
+        строятся целиком. Возвращает число записанных строк по символам.
+        """
+        if not symbols:
+            return {}
+        own_conn = conn is None
+        if own_conn:
+            if not Path(self.config.db_path).exists():
+                logger.warning(f"Database file not found: {self.config.db_path}")
+                return {}
+            conn = sqlite3.connect(self.config.db_path)
+        written: Dict[str, int] = {}
+        try:
+            watermarks = {}
+            for symbol in symbols:
+                manifest = self.read_manifest(symbol, timeframe)
+                watermarks[symbol] = manifest['watermark'] if manifest and manifest['rows'] else ''
+            table = get_timeframe_table_name(timeframe)
+            for start in range(0, len(symbols), _SQL_CHUNK):
+                chunk = symbols[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                since = min(watermarks[symbol] for symbol in chunk)
+                data = pd.read_sql_query(
+                    f"""
+                    SELECT symbol, datetime, open, high, low, close, volume
+                    FROM {table}
+                    WHERE symbol IN ({placeholders}) AND datetime >= ?
+                    ORDER BY symbol, datetime
+                    """,
+                    conn, params=[*chunk, since]
+                )
+                for symbol, group in data.groupby('symbol', sort=False):
+                    group = group[group['datetime'] >= watermarks[symbol]]
+                    if group.empty:
+                        continue
+                    try:
+                        if watermarks[symbol]:
+                            written[symbol] = self.append(symbol, timeframe, group)
+                        else:
+                            written[symbol] = self.materialize(symbol, timeframe, group)
+                    except Exception as e:
+                        logger.error(f"Feature store update failed for {symbol} ({timeframe}): {e}")
+        except Exception as e:
+            logger.error(f"Feature store refresh failed for {timeframe}: {e}")
+        finally:
+            if own_conn:
+                conn.close()
+        return written
+
+    def invalidate(self, symbol: str, timeframe: str = '1d') -> None:
+        """Удалить манифест: следующий refresh пересоберёт символ целиком."""
+        path = self._symbol_dir(symbol, timeframe) / MANIFEST_NAME
+        if path.exists():
+            path.unlink()
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+    # ------------------------------------------------------------------ утилиты
+
+    @staticmethod
+    def _manifest(symbol: str, timeframe: str, bars: pd.DataFrame, rows: int) -> Dict:
+        return {
+            'format_version': FEATURE_STORE_FORMAT_VERSION,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'columns': STORE_COLUMNS,
+            'dtype': 'float64',
+            'index_dtype': 'int64[ns, UTC]',
+            'rows': rows,
+            'first': str(bars['datetime'].iloc[0]),
+            'watermark': str(bars['datetime'].iloc[-1]),
+            'updated_at': datetime.now().isoformat(),
+        }
+
+    @staticmethod
+    def _replace_file(path: Path, payload: bytes) -> None:
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_at(path: Path, row: int, payload: bytes) -> None:
+        # Файлы только растут: укорачивать файл под открытым memmap нельзя
+        with open(path, 'r+b') as f:
+            f.seek(row * 8)
+            f.write(payload)
+
+
+# Один экземпляр на файл базы данных
+_feature_stores: Dict[Path, FeatureStore] = {}
+_feature_stores_lock = threading.Lock()
+
+
+def get_feature_store(db_path=None) -> FeatureStore:
+    """Хранилище признаков базы ``db_path`` (по умолчанию — базы из настроек)."""
+    path = Path(db_path or get_settings().database_path).expanduser().resolve()
+    with _feature_stores_lock:
+        store = _feature_stores.get(path)
+        if store is None:
+            store = _feature_stores[path] = FeatureStore(FeatureStoreConfig(db_path=str(path)))
+        return store
@@ -5,8 +5,11 @@ import pandas as pd
 from typing import Dict, List, Optional, Tuple, Union, Callable
 from dataclasses import dataclass
 import logging
+import multiprocessing
 import random
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import copy
 
 logger = logging.getLogger(__name__)
@@ -24,6 +27,9 @@ class GeneticConfig:
     random_state: Optional[int] = None
     early_stopping_patience: int = 10
     convergence_threshold: float = 1e-6
+    vectorized_fitness: bool = True  # Score the whole population in one matrix backtest
+    n_jobs: int = 1  # Worker processes for fitness evaluation (1 = in-process)
+    mp_context: str = 'spawn'
 
 
 @dataclass
@@ -105,6 +111,52 @@ class FitnessFunction(ABC):
     def evaluate(self, individual: Individual, data: pd.DataFrame) -> float:
         """Evaluate fitness of an individual."""
         pass
+    
+    def evaluate_population(self, individuals: List[Individual], data: pd.DataFrame) -> np.ndarray:
+        """Evaluate fitness of many individuals; override to vectorise."""
+        return np.array([self.evaluate(individual, data) for individual in individuals], dtype=np.float64)
+
+
+class IndicatorCache:
+    """Memoised indicator arrays for one price frame.
+    
+    Strategies truncate window parameters to integers, so individuals with
+    ``sma_short=12.3`` and ``sma_short=12.9`` share the same rolling mean.
+    Entries are keyed by ``(name, int(window))`` and dropped when the cache
+    is bound to a different frame.
+    """
+    
+    def __init__(self):
+        self._data: Optional[pd.DataFrame] = None
+        self._arrays: Dict[Tuple[str, int], np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def bind(self, data: pd.DataFrame):
+        """Start caching for *data*; clears entries computed for another frame."""
+        if data is not self._data:
+            self._data = data
+            self._arrays.clear()
+    
+    def sma(self, data: pd.DataFrame, window: float) -> np.ndarray:
+        """Rolling mean of ``close`` for ``int(window)`` periods."""
+        self.bind(data)
+        key = ('sma', int(window))
+        array = self._arrays.get(key)
+        if array is None:
+            self.misses += 1
+            array = data['close'].rolling(key[1]).mean().to_numpy(dtype=np.float64)
+            self._arrays[key] = array
+        else:
+            self.hits += 1
+        return array
+    
+    def __len__(self):
+        return len(self._arrays)
+    
+    def __getstate__(self):
+        # Worker processes rebuild their own entries
+        return {'_data': None, '_arrays': {}, 'hits': 0, 'misses': 0}
 
 
 class TradingStrategyFitness(FitnessFunction):
@@ -119,6 +171,7 @@ class TradingStrategyFitness(FitnessFunction):
         self.target_metric = target_metric
         self.risk_free_rate = risk_free_rate
         self.transaction_cost = transaction_cost
+        self.indicator_cache = IndicatorCache()
     
     def evaluate(self, individual: Individual, data: pd.DataFrame) -> float:
         """Evaluate trading strategy fitness."""
@@ -134,15 +187,18 @@ class TradingStrategyFitness(FitnessFunction):
             
             # Calculate fitness metric
             if self.target_metric == 'sharpe_ratio':
-                return self._calculate_sharpe_ratio(returns)
+                fitness = self._calculate_sharpe_ratio(returns)
             elif self.target_metric == 'max_drawdown':
-                return -self._calculate_max_drawdown(returns)  # Negative because we want to minimize
+                fitness = -self._calculate_max_drawdown(returns)  # Negative because we want to minimize
             elif self.target_metric == 'profit_factor':
-                return self._calculate_profit_factor(returns)
+                fitness = self._calculate_profit_factor(returns)
             elif self.target_metric == 'total_return':
-                return self._calculate_total_return(returns)
+                fitness = self._calculate_total_return(returns)
             else:
-                return self._calculate_sharpe_ratio(returns)
+                fitness = self._calculate_sharpe_ratio(returns)
+            # NaN would break sorting and tournament selection; rank it last
+            # (evaluate_population does the same)
+            return -np.inf if np.isnan(fitness) else float(fitness)
         
         except Exception as e:
             logger.warning(f"Fitness evaluation failed: {e}")
@@ -154,8 +210,8 @@ class TradingStrategyFitness(FitnessFunction):
         
         # Simple moving average crossover strategy
         if 'sma_short' in params and 'sma_long' in params:
-            sma_short = data['close'].rolling(int(params['sma_short'])).mean()
-            sma_long = data['close'].rolling(int(params['sma_long'])).mean()
+            sma_short = pd.Series(self.indicator_cache.sma(data, params['sma_short']), index=data.index)
+            sma_long = pd.Series(self.indicator_cache.sma(data, params['sma_long']), index=data.index)
             
             # Buy signal when short MA crosses above long MA
             signals[(sma_short > sma_long) & (sma_short.shift(1) <= sma_long.shift(1))] = 1
@@ -184,6 +240,116 @@ class TradingStrategyFitness(FitnessFunction):
         
         return signals
     
+    def evaluate_population(self, individuals: List[Individual], data: pd.DataFrame) -> np.ndarray:
+        """Backtest all individuals at once on a (population x bars) matrix.
+        
+        Produces the same fitness values as calling :meth:`evaluate` for each
+        individual; falls back to that loop if the matrix path fails.
+        """
+        if not individuals:
+            return np.empty(0, dtype=np.float64)
+        try:
+            signals = self._generate_signal_matrix(data, [individual.values for individual in individuals])
+            returns = self._calculate_return_matrix(data, signals)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fitness = self._calculate_metric_vector(returns)
+            return np.where(np.isnan(fitness), -np.inf, fitness)
+        except Exception as e:
+            logger.warning(f"Vectorised fitness evaluation failed, evaluating individually: {e}")
+            return super().evaluate_population(individuals, data)
+    
+    def _generate_signal_matrix(self, data: pd.DataFrame, params_list: List[Dict[str, float]]) -> np.ndarray:
+        """Signals for every individual as a (population, bars) matrix.
+        
+        Rules are applied in the same order as :meth:`_generate_signals`, so
+        later strategies overwrite earlier ones exactly as in the scalar path.
+        """
+        n = len(data)
+        signals = np.zeros((len(params_list), n), dtype=np.float64)
+        
+        def crossings(fast: np.ndarray, slow: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            # Comparisons with NaN are False, matching the pandas masks
+            prev_fast = np.full_like(fast, np.nan)
+            prev_slow = np.full_like(slow, np.nan)
+            prev_fast[..., 1:] = fast[..., :-1]
+            prev_slow[..., 1:] = slow[..., :-1]
+            with np.errstate(invalid='ignore'):
+                up = (fast > slow) & (prev_fast <= prev_slow)
+                down = (fast < slow) & (prev_fast >= prev_slow)
+            return up, down
+        
+        sma_rows = [i for i, params in enumerate(params_list) if 'sma_short' in params and 'sma_long' in params]
+        if sma_rows:
+            cache = self.indicator_cache
+            short = np.stack([cache.sma(data, params_list[i]['sma_short']) for i in sma_rows])
+            long = np.stack([cache.sma(data, params_list[i]['sma_long']) for i in sma_rows])
+            up, down = crossings(short, long)
+            block = signals[sma_rows]
+            block[up] = 1
+            block[down] = -1
+            signals[sma_rows] = block
+        
+        if 'rsi' in data.columns:
+            rsi_rows = [i for i, params in enumerate(params_list) if 'rsi_threshold' in params]
+            if rsi_rows:
+                rsi = data['rsi'].to_numpy(dtype=np.float64)
+                _, oversold = crossings(rsi, np.full_like(rsi, 30.0))
+                overbought, _ = crossings(rsi, np.full_like(rsi, 70.0))
+                block = signals[rsi_rows]
+                block[:, oversold] = 1
+                block[:, overbought] = -1
+                signals[rsi_rows] = block
+        
+        if 'macd' in data.columns:
+            macd_rows = [i for i, params in enumerate(params_list) if 'macd_threshold' in params]
+            if macd_rows:
+                macd = np.broadcast_to(data['macd'].to_numpy(dtype=np.float64), (len(macd_rows), n))
+                thresholds = np.array([params_list[i]['macd_threshold'] for i in macd_rows])[:, None]
+                upper = np.broadcast_to(thresholds, macd.shape)
+                up, _ = crossings(macd, upper)
+                _, down = crossings(macd, -upper)
+                block = signals[macd_rows]
+                block[up] = 1
+                block[down] = -1
+                signals[macd_rows] = block
+        
+        return signals
+    
+    def _calculate_return_matrix(self, data: pd.DataFrame, signals: np.ndarray) -> np.ndarray:
+        """Strategy returns for a signal matrix; mirrors :meth:`_calculate_returns`."""
+        close = data['close'].to_numpy(dtype=np.float64)
+        returns = np.zeros_like(signals)
+        if signals.shape[1] < 2:
+            return returns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_changes = close[1:] / close[:-1] - 1
+        returns[:, 1:] = (
+            signals[:, :-1] * price_changes
+            - np.abs(np.diff(signals, axis=1)) * self.transaction_cost
+        )
+        return np.where(np.isnan(returns), 0.0, returns)
+    
+    def _calculate_metric_vector(self, returns: np.ndarray) -> np.ndarray:
+        """Target metric per row of a return matrix."""
+        if self.target_metric == 'max_drawdown':
+            cumulative = np.cumprod(1 + returns, axis=1)
+            # fmax/fmin skip NaN like pandas expanding().max() and min()
+            running_max = np.fmax.accumulate(cumulative, axis=1)
+            return -np.fmin.reduce((cumulative - running_max) / running_max, axis=1)
+        if self.target_metric == 'profit_factor':
+            positive = np.where(returns > 0, returns, 0.0).sum(axis=1)
+            negative = np.abs(np.where(returns < 0, returns, 0.0).sum(axis=1))
+            no_losses = np.where(positive > 0, np.inf, 0.0)
+            return np.where(negative == 0, no_losses, positive / np.where(negative == 0, 1.0, negative))
+        if self.target_metric == 'total_return':
+            return np.prod(1 + returns, axis=1) - 1
+        # sharpe_ratio and unknown metrics
+        if returns.shape[1] < 2:
+            return np.zeros(len(returns))
+        std = returns.std(axis=1, ddof=1)
+        excess_mean = (returns - self.risk_free_rate / 252).mean(axis=1)
+        return np.where(std == 0, 0.0, excess_mean / np.where(std == 0, 1.0, std) * np.sqrt(252))
+    
     def _calculate_returns(self, data: pd.DataFrame, signals: pd.Series) -> pd.Series:
         """Calculate strategy returns."""
         price_changes = data['close'].pct_change()
@@ -197,8 +363,8 @@ class TradingStrategyFitness(FitnessFunction):
         return strategy_returns.fillna(0)
     
     def _calculate_sharpe_ratio(self, returns: pd.Series) -> float:
-        """Calculate Sharpe ratio."""
-        if len(returns) == 0 or returns.std() == 0:
+        """Calculate Sharpe ratio (0 when the sample std is undefined or zero)."""
+        if len(returns) < 2 or returns.std() == 0:
             return 0
         
         excess_returns = returns - self.risk_free_rate / 252  # Daily risk-free rate
@@ -237,6 +403,11 @@ class GeneticOptimizer:
         self.diversity_history = []
         self.best_individual = None
         self.best_fitness = -np.inf
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_data: Optional[pd.DataFrame] = None
+        # Set when the process pool fails; this run continues in-process
+        # without changing the caller's config
+        self._pool_unavailable = False
         
         if config.random_state is not None:
             random.seed(config.random_state)
@@ -247,41 +418,45 @@ class GeneticOptimizer:
         """Run genetic algorithm optimization."""
         # Initialize population
         self._initialize_population(parameters)
+        self._pool_unavailable = False
         
         # Track convergence
         best_fitness_history = []
         convergence_generation = None
         
-        for generation in range(self.config.generations):
-            # Evaluate fitness
-            self._evaluate_fitness(data)
-            
-            # Track best individual
-            current_best = max(self.population, key=lambda x: x.fitness)
-            if current_best.fitness > self.best_fitness:
-                self.best_fitness = current_best.fitness
-                self.best_individual = current_best.copy()
-            
-            best_fitness_history.append(self.best_fitness)
-            self.fitness_history.append(self.best_fitness)
-            
-            # Calculate population diversity
-            diversity = self._calculate_diversity()
-            self.diversity_history.append(diversity)
-            
-            # Check convergence
-            if len(best_fitness_history) >= self.config.early_stopping_patience:
-                recent_improvement = max(best_fitness_history[-self.config.early_stopping_patience:]) - min(best_fitness_history[-self.config.early_stopping_patience:])
-                if recent_improvement < self.config.convergence_threshold:
-                    convergence_generation = generation
-                    logger.info(f"Convergence reached at generation {generation}")
-                    break
-            
-            # Create next generation
-            self._evolve_generation()
-            
-            if generation % 10 == 0:
-                logger.info(f"Generation {generation}: Best fitness = {self.best_fitness:.6f}, Diversity = {diversity:.6f}")
+        try:
+            for generation in range(self.config.generations):
+                # Evaluate fitness
+                self._evaluate_fitness(data)
+                
+                # Track best individual
+                current_best = max(self.population, key=lambda x: x.fitness)
+                if current_best.fitness > self.best_fitness:
+                    self.best_fitness = current_best.fitness
+                    self.best_individual = current_best.copy()
+                
+                best_fitness_history.append(self.best_fitness)
+                self.fitness_history.append(self.best_fitness)
+                
+                # Calculate population diversity
+                diversity = self._calculate_diversity()
+                self.diversity_history.append(diversity)
+                
+                # Check convergence
+                if len(best_fitness_history) >= self.config.early_stopping_patience:
+                    recent_improvement = max(best_fitness_history[-self.config.early_stopping_patience:]) - min(best_fitness_history[-self.config.early_stopping_patience:])
+                    if recent_improvement < self.config.convergence_threshold:
+                        convergence_generation = generation
+                        logger.info(f"Convergence reached at generation {generation}")
+                        break
+                
+                # Create next generation
+                self._evolve_generation()
+                
+                if generation % 10 == 0:
+                    logger.info(f"Generation {generation}: Best fitness = {self.best_fitness:.6f}, Diversity = {diversity:.6f}")
+        finally:
+            self.close()
         
         return OptimizationResult(
             best_individual=self.best_individual.values,
@@ -301,8 +476,59 @@ class GeneticOptimizer:
     
     def _evaluate_fitness(self, data: pd.DataFrame):
         """Evaluate fitness for all individuals in population."""
-        for individual in self.population:
-            individual.fitness = self.fitness_function.evaluate(individual, data)
+        if self.config.n_jobs > 1 and not self._pool_unavailable:
+            try:
+                fitness = self._evaluate_in_pool(data)
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                logger.warning(f"Process pool unavailable, evaluating fitness in-process: {e}")
+                self.close()
+                self._pool_unavailable = True
+                fitness = None
+            if fitness is not None:
+                for individual, value in zip(self.population, fitness):
+                    individual.fitness = float(value)
+                return
+        
+        if self.config.vectorized_fitness:
+            fitness = self.fitness_function.evaluate_population(self.population, data)
+            for individual, value in zip(self.population, fitness):
+                individual.fitness = float(value)
+        else:
+            for individual in self.population:
+                individual.fitness = self.fitness_function.evaluate(individual, data)
+    
+    def _evaluate_in_pool(self, data: pd.DataFrame) -> List[float]:
+        """Split the population into one chunk per worker and evaluate remotely."""
+        if self._pool is None or self._pool_data is not data:
+            self.close()
+            context = multiprocessing.get_context(self.config.mp_context)
+            # The fitness function and the frame are shipped once per worker
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.config.n_jobs,
+                mp_context=context,
+                initializer=_init_fitness_worker,
+                initargs=(self.fitness_function, data, self.config.vectorized_fitness),
+            )
+            self._pool_data = data
+        
+        parameters = self.population[0].parameters
+        chunk_size = -(-len(self.population) // self.config.n_jobs)
+        chunks = [
+            [individual.values for individual in self.population[i:i + chunk_size]]
+            for i in range(0, len(self.population), chunk_size)
+        ]
+        futures = [self._pool.submit(_evaluate_fitness_chunk, parameters, chunk) for chunk in chunks]
+        fitness: List[float] = []
+        for future in futures:
+            fitness.extend(future.result())
+        return fitness
+    
+    def close(self):
+        """Shut down the fitness worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_data = None
     
     def _calculate_diversity(self) -> float:
         """Calculate population diversity."""
@@ -365,6 +591,28 @@ class GeneticOptimizer:
         return max(tournament, key=lambda x: x.fitness)
 
 
+_worker_fitness: Optional[FitnessFunction] = None
+_worker_data: Optional[pd.DataFrame] = None
+_worker_vectorized = True
+
+
+def _init_fitness_worker(fitness_function: FitnessFunction, data: pd.DataFrame, vectorized: bool):
+    """Pool initializer: keep the fitness function and the frame per worker."""
+    global _worker_fitness, _worker_data, _worker_vectorized
+    _worker_fitness = fitness_function
+    _worker_data = data
+    _worker_vectorized = vectorized
+
+
+def _evaluate_fitness_chunk(parameters: Dict[str, Tuple[float, float]],
+                            values_list: List[Dict[str, float]]) -> List[float]:
+    """Evaluate a chunk of individuals inside a worker process."""
+    individuals = [Individual(parameters, values) for values in values_list]
+    if _worker_vectorized:
+        return _worker_fitness.evaluate_population(individuals, _worker_data).tolist()
+    return [_worker_fitness.evaluate(individual, _worker_data) for individual in individuals]
+
+
 def optimize_trading_strategy(data: pd.DataFrame,
                             parameters: Dict[str, Tuple[float, float]],
                             target_metric: str = 'sharpe_ratio',
@@ -0,0 +1,326 @@
+"""
+Пакетный инференс LSTM/GRU предсказателей для многих символов.
+
+``MLModelManager.predict_price_movement`` вызывает ``model.predict`` по одному
+символу, и на коротких последовательностях время уходит на накладные расходы
+torch, а не на вычисления. Сервис собирает запросы в группы с одинаковой
+архитектурой ``(model_type, timeframe, класс, input_size, hidden_size,
+num_layers, sequence_length)``, складывает окна всех символов группы в один
+дополненный нулями тензор ``(models, windows, seq, features)`` и прогоняет его
+одним векторизованным вызовом (``torch.func.vmap`` по стеку весов) внутри
+``torch.inference_mode()``. Группы разбиваются на микробатчи, которые
+выполняются фиксированным пулом потоков. Результаты пишутся в
+``ml_predictions_cache`` одним ``executemany``.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from .predictive_models import TORCH_AVAILABLE, make_sequence_windows
+
+if TORCH_AVAILABLE:
+    import torch
+
+logger = logging.getLogger(__name__)
+
+# Столько же строк берёт MLModelManager.predict_price_movement
+PREDICTION_TAIL_ROWS = 100
+
+
+@dataclass
+class InferenceConfig:
+    """Настройки пакетного инференса."""
+    num_threads: int = 4             # Потоки пула, исполняющего микробатчи
+    torch_threads: Optional[int] = None  # torch.set_num_threads; None — не менять
+    max_models_per_batch: int = 32   # Символов в одном векторизованном вызове
+    tail_rows: int = PREDICTION_TAIL_ROWS
+    vectorize: bool = True           # vmap по стеку весов; False — цикл по моделям
+
+
+@dataclass
+class InferenceRequest:
+    """Запрос предсказания для одного символа."""
+    symbol: str
+    predictor: Any
+    data: pd.DataFrame
+    model_type: str = 'lstm'
+    timeframe: str = '1d'
+
+
+@dataclass
+class InferenceReport:
+    """Результаты пакетного прогона и метрики задержки."""
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    latencies_ms: Dict[str, float] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    groups: int = 0
+    batches: int = 0
+
+    def latency_percentile(self, pct: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        return float(np.percentile(list(self.latencies_ms.values()), pct))
+
+    @property
+    def throughput_per_s(self) -> float:
+        if self.wall_seconds <= 0:
+            return 0.0
+        return len(self.results) / self.wall_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'symbols': len(self.results),
+            'groups': self.groups,
+            'batches': self.batches,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'latency_p50_ms': round(self.latency_percentile(50), 2),
+            'latency_p99_ms': round(self.latency_percentile(99), 2),
+            'throughput_per_s': round(self.throughput_per_s, 1),
+        }
+
+
+@dataclass
+class _Prepared:
+    request: InferenceRequest
+    windows: np.ndarray
+    actual: np.ndarray
+
+    @property
+    def group_key(self) -> Hashable:
+        predictor = self.request.predictor
+        config = predictor.config
+        return (
+            self.request.model_type,
+            self.request.timeframe,
+            type(predictor).__name__,
+            self.windows.shape[2],
+            config.hidden_size,
+            config.num_layers,
+            config.sequence_length,
+        )
+
+
+class BatchInferenceService:
+    """Сгруппированный пакетный инференс предсказателей цен."""
+
+    def __init__(self, config: Optional[InferenceConfig] = None, storage=None):
+        if not TORCH_AVAILABLE:
+            raise ImportError("PyTorch is required for batched inference")
+        self.config = config or InferenceConfig()
+        if storage is None:
+            from .storage import ml_storage
+            storage = ml_storage
+        self.storage = storage
+        if self.config.torch_threads:
+            torch.set_num_threads(self.config.torch_threads)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.num_threads), thread_name_prefix='ml-inference'
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def infer(self, requests: Iterable[InferenceRequest]) -> InferenceReport:
+        """Выполнить запросы и вернуть результаты в формате ``predict_price_movement``."""
+        started = time.perf_counter()
+        report = InferenceReport()
+
+        prepared: List[_Prepared] = []
+        for request in requests:
+            try:
+                item = self._prepare(request)
+            except Exception as e:
+                logger.error(f"Inference input preparation failed for {request.symbol}: {e}")
+                item = None
+            if item is None:
+                report.results[request.symbol] = {'error': f'Not enough data to predict {request.symbol}'}
+                report.latencies_ms[request.symbol] = (time.perf_counter() - started) * 1000
+            else:
+                prepared.append(item)
+
+        groups: Dict[Hashable, List[_Prepared]] = {}
+        for item in prepared:
+            groups.setdefault(item.group_key, []).append(item)
+        report.groups = len(groups)
+
+        step = max(1, self.config.max_models_per_batch)
+        batches = [
+            members[i:i + step]
+            for members in groups.values()
+            for i in range(0, len(members), step)
+        ]
+        report.batches = len(batches)
+
+        futures = [self._executor.submit(self._run_batch, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                outputs = future.result()
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                outputs = [None] * len(batch)
+            finished = (time.perf_counter() - started) * 1000
+            for item, predictions in zip(batch, outputs):
+                symbol = item.request.symbol
+                if predictions is None:
+                    report.results[symbol] = {'error': f'Inference failed for {symbol}'}
+                else:
+                    report.results[symbol] = self._make_result(item, predictions)
+                report.latencies_ms[symbol] = finished
+
+        report.wall_seconds = time.perf_counter() - started
+        return report
+
+    def predict_many(self, symbols: List[str], timeframe: str = '1d', model_type: str = 'lstm',
+                     frames: Optional[Dict[str, pd.DataFrame]] = None,
+                     use_cache: bool = True, train_missing: bool = True) -> InferenceReport:
+        """Предсказать движение цены для многих символов.
+
+        Кэшированные предсказания читаются одним запросом, недостающие модели
+        берутся из хранилища (или обучаются, как в ``predict_price_movement``),
+        свежие предсказания сохраняются одним ``executemany``.
+        """
+        from .model_manager import ml_model_manager
+
+        started = time.perf_counter()
+        cached_results: Dict[str, Dict[str, Any]] = {}
+        if use_cache:
+            for symbol, cached in self.storage.get_predictions_bulk(symbols, 'price', timeframe).items():
+                cached_results[symbol] = {
+                    'prediction': cached['prediction'],
+                    'confidence': cached['confidence'],
+                    'cached': True,
+                    'cache_date': cached['date']
+                }
+
+        requests: List[InferenceRequest] = []
+        failures: Dict[str, Dict[str, Any]] = {}
+        metadata_by_symbol: Dict[str, Dict[str, Any]] = {}
+        for symbol in symbols:
+            if symbol in cached_results:
+                continue
+            data = frames.get(symbol) if frames is not None else None
+            if data is None:
+                data = ml_model_manager._get_stock_data_from_db(symbol, timeframe)
+            if data is None or data.empty:
+                failures[symbol] = {'error': f'No historical data available for {symbol}'}
+                continue
+            predictor, metadata = self.storage.get_model(symbol, model_type, timeframe)
+            if predictor is None and train_missing:
+                try:
+                    predictor, metadata = ml_model_manager.get_or_train_model(symbol, model_type, timeframe)
+                except Exception as e:
+                    failures[symbol] = {'error': str(e)}
+                    continue
+            if predictor is None:
+                failures[symbol] = {'error': f'Failed to train model for {symbol}'}
+                continue
+            metadata_by_symbol[symbol] = metadata
+            requests.append(InferenceRequest(symbol, predictor, data, model_type, timeframe))
+
+        report = self.infer(requests)
+        for symbol, result in report.results.items():
+            if 'error' not in result:
+                result['training_metrics'] = metadata_by_symbol.get(symbol)
+
+        self.storage.save_predictions_bulk(
+            [
+                (symbol, result['prediction'], result['confidence'])
+                for symbol, result in report.results.items()
+                if 'error' not in result
+            ],
+            'price',
+            timeframe,
+        )
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for symbol, result in {**cached_results, **failures}.items():
+            report.results[symbol] = result
+            report.latencies_ms.setdefault(symbol, elapsed_ms)
+        report.results = {symbol: report.results[symbol] for symbol in symbols if symbol in report.results}
+        report.wall_seconds = time.perf_counter() - started
+        logger.info(f"Batched price inference: {report.summary()}")
+        return report
+
+    def _prepare(self, request: InferenceRequest) -> Optional[_Prepared]:
+        predictor = request.predictor
+        if not getattr(predictor, 'is_trained', False) or getattr(predictor, 'model', None) is None:
+            raise ValueError("Model must be trained before making predictions")
+        data = request.data.tail(self.config.tail_rows)
+        # Та же подготовка признаков, что и в PricePredictor.predict
+        matrix = predictor.build_feature_matrix(data)
+        seq = predictor.config.sequence_length
+        windows = make_sequence_windows(matrix.features, seq)
+        if len(windows) == 0:
+            return None
+        return _Prepared(request, windows, matrix.target[seq:])
+
+    def _run_batch(self, batch: List[_Prepared]) -> List[np.ndarray]:
+        """Прогнать микробатч одной архитектуры; возвращает предсказания по символам."""
+        counts = [len(item.windows) for item in batch]
+        max_windows = max(counts)
+        _, seq, features = batch[0].windows.shape
+        stacked = np.zeros((len(batch), max_windows, seq, features), dtype=np.float32)
+        for row, item in enumerate(batch):
+            stacked[row, :counts[row]] = item.windows
+        inputs = torch.from_numpy(stacked)
+        modules = [item.request.predictor.model for item in batch]
+
+        with torch.inference_mode():
+            for module in modules:
+                module.eval()
+            outputs = None
+            if self.config.vectorize and len(modules) > 1:
+                try:
+                    outputs = self._forward_vectorized(modules, inputs)
+                except Exception as e:
+                    logger.debug(f"Vectorized forward unavailable, looping over models: {e}")
+            if outputs is None:
+                outputs = torch.stack([module(x) for module, x in zip(modules, inputs)])
+            outputs = outputs.reshape(len(modules), max_windows).numpy()
+        return [outputs[row, :counts[row]].copy() for row in range(len(batch))]
+
+    @staticmethod
+    def _forward_vectorized(modules: List[Any], inputs: "torch.Tensor") -> "torch.Tensor":
+        """Один вызов по стеку весов моделей одинаковой архитектуры."""
+        from torch.func import functional_call, stack_module_state, vmap
+
+        params, buffers = stack_module_state(modules)
+        template = modules[0]
+
+        def forward(p, b, x):
+            return functional_call(template, (p, b), (x,))
+
+        return vmap(forward)(params, buffers, inputs)
+
+    @staticmethod
+    def _make_result(item: _Prepared, predictions: np.ndarray) -> Dict[str, Any]:
+        # Метрики считаются так же, как в PricePredictor.predict
+        actual = item.actual
+        mse = mean_squared_error(actual, predictions)
+        mae = mean_absolute_error(actual, predictions)
+        rmse = float(np.sqrt(mse))
+        confidence = max(0, 1 - (rmse / np.mean(actual)))
+        return {
+            'prediction': predictions[-1] if len(predictions) > 0 else 0,
+            'confidence': confidence,
+            'model_metrics': {'mse': mse, 'mae': mae, 'rmse': rmse},
+            'cached': False
+        }
+
+
+_inference_service: Optional[BatchInferenceService] = None
+
+
+def get_inference_service() -> BatchInferenceService:
+    """Общий экземпляр сервиса (пул потоков создаётся один раз)."""
+    global _inference_service
+    if _inference_service is None:
+        _inference_service = BatchInferenceService()
+    return _inference_service
@@ -5,15 +5,19 @@ import pandas as pd
 from typing import Dict, List, Optional, Tuple, Union, Any
 import logging
 from datetime import datetime, timedelta
+from pathlib import Path
 
 from ..analytics import StrategyMetrics, compute_strategy_metrics
 from ..news_pipeline import NewsBatchProcessor
+from ..settings import get_settings
 from .predictive_models import LSTMPredictor, GRUPredictor, ModelConfig, create_predictor
 from .sentiment_analysis import NewsSentimentAnalyzer, SentimentConfig
 from .clustering import StockClusterer, ClusteringConfig, create_clusterer
 from .genetic_optimization import GeneticOptimizer, GeneticConfig, TradingStrategyFitness
 from .reinforcement_learning import TradingAgent, RLEnvironment, RLConfig
 from .ensemble_methods import EnsemblePredictor, EnsembleConfig
+from ..multi_timeframe_db import get_timeframe_table_name
+from .feature_store import get_feature_store, compute_ml_features
 from .model_manager import ml_model_manager
 from .storage import ml_storage
 from .training_scheduler import ml_training_scheduler
@@ -37,7 +41,10 @@ class MLIntegrationManager:
         self.ensemble_predictor = None
         
         # Configuration
-        self.sentiment_config = SentimentConfig()
+        self.db_path = str(get_settings().database_path)
+        self.sentiment_config = SentimentConfig(
+            cache_db_path=self.db_path if Path(self.db_path).exists() else None
+        )
         self.model_config = ModelConfig()
         self.clustering_config = ClusteringConfig()
         self.genetic_config = GeneticConfig()
@@ -65,6 +72,13 @@ class MLIntegrationManager:
             # Try to get news data from database first
             news_data = self._get_news_data_from_db(days_back)
             
+            if not news_data.empty and self.sentiment_analyzer.cache is not None:
+                # Only articles newer than the last run reach the model; the rest come from the cache
+                scored = self.sentiment_analyzer.analyze_new_articles(
+                    news_data, time_column='date', text_column='content', title_column='title'
+                )
+                logger.info(f"Scored {len(scored)} new articles for market sentiment")
+            
             if news_data.empty:
                 # Fallback to dummy data for demonstration
                 logger.warning("No news data available, using dummy data for sentiment analysis")
@@ -86,8 +100,10 @@ class MLIntegrationManager:
                     'date': pd.date_range(start=datetime.now() - timedelta(days=days_back), periods=5, freq='D')
                 })
             
-            # Analyze sentiment
-            sentiment_result = self.sentiment_analyzer.get_market_sentiment(news_data)
+            # Analyze sentiment; articles scored on earlier calls come from the cache
+            sentiment_result = self.sentiment_analyzer.get_market_sentiment(
+                news_data, text_column='content', title_column='title'
+            )
             
             return sentiment_result
         
@@ -100,16 +116,32 @@ class MLIntegrationManager:
                 'error': str(e)
             }
     
-    def predict_price_movement(self, symbol: str, days_ahead: int = 1, timeframe: str = '1d') -> Dict[str, Any]:
-        """Predict price movement for a given symbol using new ML system."""
+    def predict_price_movement(self, symbol: str, days_ahead: int = 1, timeframe: str = '1d',
+                               historical_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Predict price movement for a given symbol using new ML system.
+        
+        ``historical_data`` lets batch callers pass already loaded OHLCV.
+        """
         try:
             # Используем новый ML менеджер
-            return ml_model_manager.predict_price_movement(symbol, timeframe, days_ahead)
+            return ml_model_manager.predict_price_movement(
+                symbol, timeframe, days_ahead, historical_data=historical_data
+            )
         
         except Exception as e:
             logger.error(f"Price prediction failed: {e}")
             return {'error': str(e)}
     
+    def predict_price_movements(self, symbols: List[str], timeframe: str = '1d',
+                                frames: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, Dict[str, Any]]:
+        """Predict price movement for many symbols with batched inference."""
+        try:
+            return ml_model_manager.predict_price_movements(symbols, timeframe, frames=frames)
+        
+        except Exception as e:
+            logger.error(f"Batched price prediction failed: {e}")
+            return {symbol: {'error': str(e)} for symbol in symbols}
+    
     def cluster_stocks(self, symbols: List[str], timeframe: str = '1d') -> Dict[str, Any]:
         """Cluster stocks based on their characteristics using new ML system."""
         try:
@@ -235,13 +267,11 @@ class MLIntegrationManager:
         """Get news data from database for sentiment analysis."""
         try:
             import sqlite3
-            from pathlib import Path
             
-            db_path = "stock_data.db"
-            if not Path(db_path).exists():
+            if not Path(self.db_path).exists():
                 return pd.DataFrame()
             
-            conn = sqlite3.connect(db_path)
+            conn = sqlite3.connect(self.db_path)
             
             # Check for news-related tables
             cursor = conn.cursor()
@@ -347,20 +377,27 @@ class MLIntegrationManager:
     def _get_stock_data_from_db(self, symbol: str, timeframe: str = '1d') -> pd.DataFrame:
         """Get stock data from database for a given symbol."""
         try:
-            print(f"    🔍 [ML_INTEGRATION] {symbol} ({timeframe}): Получаем данные из data_1d...")
+            df = get_feature_store(self.db_path).get_frame(symbol, timeframe)
+            if not df.empty:
+                print(f"    ✅ [ML_INTEGRATION] {symbol} ({timeframe}): {len(df)} записей из хранилища признаков")
+                return df
+        except Exception as e:
+            logger.warning(f"Feature store read failed for {symbol}: {e}")
+        
+        try:
+            table = get_timeframe_table_name(timeframe)
+            print(f"    🔍 [ML_INTEGRATION] {symbol} ({timeframe}): Получаем данные из {table}...")
             import sqlite3
-            from pathlib import Path
             
-            db_path = "stock_data.db"
-            if not Path(db_path).exists():
+            if not Path(self.db_path).exists():
                 print(f"    ❌ [ML_INTEGRATION] {symbol} ({timeframe}): База данных не найдена")
-                logger.warning(f"Database file not found: {db_path}")
+                logger.warning(f"Database file not found: {self.db_path}")
                 return pd.DataFrame()
             
-            conn = sqlite3.connect(db_path)
+            conn = sqlite3.connect(self.db_path)
             
-            # Get stock data from data_1d table
-            query = """
+            # Get stock data from the timeframe's table
+            query = f"""
                 SELECT 
                     datetime as date,
                     open,
@@ -368,7 +405,7 @@ class MLIntegrationManager:
                     low,
                     close,
                     volume
-                FROM data_1d
+                FROM {table}
                 WHERE symbol = ?
                 ORDER BY datetime
             """
@@ -380,31 +417,7 @@ class MLIntegrationManager:
             
             if not df.empty:
                 print(f"    ✅ [ML_INTEGRATION] {symbol} ({timeframe}): Данные получены, обрабатываем...")
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.set_index('date')
-                
-                # Add some basic technical indicators
-                df['sma_20'] = df['close'].rolling(20).mean()
-                df['sma_50'] = df['close'].rolling(50).mean()
-                df['ema_12'] = df['close'].ewm(span=12).mean()
-                df['ema_26'] = df['close'].ewm(span=26).mean()
-                
-                # RSI calculation
-                delta = df['close'].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                rs = gain / loss
-                df['rsi'] = 100 - (100 / (1 + rs))
-                
-                # MACD calculation
-                df['macd'] = df['ema_12'] - df['ema_26']
-                
-                # Bollinger Bands
-                df['bb_middle'] = df['close'].rolling(20).mean()
-                bb_std = df['close'].rolling(20).std()
-                df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-                df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-                
+                df = self._prepare_stock_frame(df)
                 print(f"    ✅ [ML_INTEGRATION] {symbol} ({timeframe}): Данные обработаны, итого {len(df)} записей")
             else:
                 print(f"    ❌ [ML_INTEGRATION] {symbol} ({timeframe}): Данные пусты")
@@ -416,20 +429,85 @@ class MLIntegrationManager:
             logger.error(f"Failed to get stock data for {symbol}: {e}")
             return pd.DataFrame()
     
+    def _get_stock_data_batch_from_db(self, symbols: List[str], timeframe: str = '1d') -> Dict[str, pd.DataFrame]:
+        """Get stock data for many symbols with one query.
+        
+        Returns frames identical to :meth:`_get_stock_data_from_db`; symbols
+        without data map to an empty DataFrame.
+        """
+        frames = {symbol: pd.DataFrame() for symbol in symbols}
+        if not symbols:
+            return frames
+        try:
+            views = get_feature_store(self.db_path).get_views(symbols, timeframe)
+            for symbol, view in views.items():
+                frames[symbol] = view.to_frame()
+            symbols = [symbol for symbol in symbols if symbol not in views]
+            if not symbols:
+                return frames
+        except Exception as e:
+            logger.warning(f"Feature store batch read failed: {e}")
+        try:
+            import sqlite3
+            
+            if not Path(self.db_path).exists():
+                logger.warning(f"Database file not found: {self.db_path}")
+                return frames
+            
+            table = get_timeframe_table_name(timeframe)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                chunks = []
+                for start in range(0, len(symbols), 500):
+                    chunk = symbols[start:start + 500]
+                    placeholders = ",".join("?" for _ in chunk)
+                    query = f"""
+                        SELECT 
+                            symbol,
+                            datetime as date,
+                            open,
+                            high,
+                            low,
+                            close,
+                            volume
+                        FROM {table}
+                        WHERE symbol IN ({placeholders})
+                        ORDER BY symbol, datetime
+                    """
+                    chunks.append(pd.read_sql_query(query, conn, params=chunk))
+            finally:
+                conn.close()
+            
+            data = pd.concat(chunks, ignore_index=True)
+            for symbol, group in data.groupby('symbol', sort=False):
+                frame = group.drop(columns='symbol').reset_index(drop=True)
+                frames[symbol] = self._prepare_stock_frame(frame).ffill().fillna(0)
+            logger.info(f"Loaded {len(data)} rows for {len(symbols)} symbols in one query")
+            return frames
+        
+        except Exception as e:
+            logger.error(f"Failed to get batch stock data: {e}")
+            return frames
+    
+    @staticmethod
+    def _prepare_stock_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Index OHLCV rows by date and add basic technical indicators."""
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.set_index('date')
+        return compute_ml_features(df)
+    
     def get_available_tickers(self) -> List[str]:
         """Get list of available tickers from database."""
         try:
             print("🔍 [ML_INTEGRATION] Получаем доступные тикеры из data_1d...")
             import sqlite3
-            from pathlib import Path
             
-            db_path = "stock_data.db"
-            if not Path(db_path).exists():
+            if not Path(self.db_path).exists():
                 print("❌ [ML_INTEGRATION] База данных не найдена")
-                logger.warning(f"Database file not found: {db_path}")
+                logger.warning(f"Database file not found: {self.db_path}")
                 return []
             
-            conn = sqlite3.connect(db_path)
+            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             # Get tickers from data_1d table
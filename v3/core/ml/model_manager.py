@@ -5,7 +5,11 @@
 
 import logging
 import asyncio
+import os
+import threading
+import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple, Union
 import pandas as pd
 import numpy as np
@@ -13,11 +17,91 @@ import numpy as np
 from .storage import ml_storage
 from .predictive_models import LSTMPredictor, GRUPredictor, ModelConfig
 from .sentiment_analysis import NewsSentimentAnalyzer, SentimentConfig
-from .clustering import StockClusterer, ClusteringConfig
+from .clustering import StockClusterer, ClusteringConfig, feature_cache_key
 from .ensemble_methods import EnsemblePredictor, EnsembleConfig
+from ..multi_timeframe_db import get_timeframe_table_name
+from .feature_store import get_feature_store, compute_ml_features
 
 logger = logging.getLogger(__name__)
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_PROC_STATUS = Path('/proc/self/status')
+_PROC_CLEAR_REFS = Path('/proc/self/clear_refs')
+
+
+def _lifetime_peak_rss_mb() -> Optional[float]:
+    """Пиковый RSS процесса за всё время жизни в МБ (ru_maxrss в КБ на Linux)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _read_vm_hwm_mb() -> Optional[float]:
+    """VmHWM из /proc/self/status в МБ (None вне Linux)."""
+    try:
+        for line in _PROC_STATUS.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+class PeakRssMeter:
+    """Пиковый RSS одного обучения, а не всего процесса.
+    
+    Воркер пула обучает много моделей подряд, а ``ru_maxrss`` — пик за всё
+    время жизни процесса. На Linux пик сбрасывается записью ``5`` в
+    ``/proc/self/clear_refs`` и читается из VmHWM. Там, где сброс недоступен,
+    возвращается прирост пожизненного пика за время задачи (0, если задача
+    не превысила прежний пик).
+    """
+    
+    def __init__(self):
+        self._reset = False
+        self._baseline = None
+    
+    def start(self) -> None:
+        try:
+            _PROC_CLEAR_REFS.write_text('5')
+            self._reset = _read_vm_hwm_mb() is not None
+        except OSError:
+            self._reset = False
+        self._baseline = None if self._reset else _lifetime_peak_rss_mb()
+    
+    def peak_mb(self) -> Optional[float]:
+        if self._reset:
+            return _read_vm_hwm_mb()
+        current = _lifetime_peak_rss_mb()
+        if current is None or self._baseline is None:
+            return None
+        return max(0.0, current - self._baseline)
+
+
+def _torch_threads() -> Optional[int]:
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch.get_num_threads()
+
+
+class _LazyFrames:
+    """Отображение symbol -> DataFrame, загружающее данные при первом обращении."""
+    
+    def __init__(self, symbols: List[str], loader):
+        self._symbols = list(symbols)
+        self._loader = loader
+    
+    def items(self):
+        for symbol in self._symbols:
+            yield symbol, self._loader(symbol)
+
 
 class MLModelManager:
     """Менеджер ML моделей с поддержкой разных таймфреймов."""
@@ -29,6 +113,23 @@ class MLModelManager:
         # Кэш обученных моделей
         self.trained_models = {}
         
+        # Пакетная генерация сигналов вызывает get_or_train_model из пула потоков:
+        # модель одного ключа обучается один раз, остальные потоки ждут её
+        self._training_locks: Dict[str, threading.Lock] = {}
+        self._training_locks_guard = threading.Lock()
+        
+        # Общий анализатор настроений (модель загружается один раз)
+        self._sentiment_analyzer: Optional[NewsSentimentAnalyzer] = None
+        
+        # Ресурсы последнего обучения (CPU, пиковая память, потоки torch)
+        self.last_training_resources: Dict[str, Any] = {}
+        
+        # Кластеризаторы по (timeframe, n_clusters): центроиды прошлого
+        # запуска служат начальным приближением для следующего
+        self._clusterers: Dict[Tuple[str, int], StockClusterer] = {}
+        # Начиная с этого числа символов используется MiniBatchKMeans
+        self.minibatch_clustering_threshold = 1000
+        
         # Конфигурации по умолчанию для разных таймфреймов
         self.timeframe_configs = {
             '1d': {
@@ -86,12 +187,25 @@ class MLModelManager:
                 logger.debug(f"Using cached model for {symbol}_{model_type}_{timeframe}")
                 return model, metadata
         
-        # Обучаем новую модель
-        logger.info(f"Training new {model_type} model for {symbol} ({timeframe})")
-        return self._train_model(symbol, model_type, timeframe)
+        with self._training_lock(f"{symbol}_{model_type}_{timeframe}"):
+            # Пока ждали блокировку, модель мог обучить другой поток
+            if not force_retrain:
+                model, metadata = self.storage.get_model(symbol, model_type, timeframe)
+                if model is not None:
+                    return model, metadata
+            
+            # Обучаем новую модель
+            logger.info(f"Training new {model_type} model for {symbol} ({timeframe})")
+            return self._train_model(symbol, model_type, timeframe)
+    
+    def _training_lock(self, key: str) -> threading.Lock:
+        """Блокировка обучения одного ключа модели."""
+        with self._training_locks_guard:
+            return self._training_locks.setdefault(key, threading.Lock())
     
     def predict_price_movement(self, symbol: str, timeframe: str = '1d', 
-                             days_ahead: int = 1, use_cache: bool = True) -> Dict[str, Any]:
+                             days_ahead: int = 1, use_cache: bool = True,
+                             historical_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Предсказать движение цены.
         
@@ -100,6 +214,7 @@ class MLModelManager:
             timeframe: Таймфрейм данных
             days_ahead: На сколько дней вперед предсказывать
             use_cache: Использовать кэш предсказаний
+            historical_data: Уже загруженные данные (пакетная генерация сигналов)
             
         Returns:
             Словарь с результатами предсказания
@@ -118,7 +233,8 @@ class MLModelManager:
         
         try:
             # Получаем данные
-            historical_data = self._get_stock_data_from_db(symbol, timeframe)
+            if historical_data is None:
+                historical_data = self._get_stock_data_from_db(symbol, timeframe)
             if historical_data.empty:
                 return {'error': f'No historical data available for {symbol}'}
             
@@ -153,6 +269,22 @@ class MLModelManager:
             logger.error(f"Error predicting price movement for {symbol}: {e}")
             return {'error': str(e)}
     
+    def predict_price_movements(self, symbols: List[str], timeframe: str = '1d',
+                                frames: Optional[Dict[str, pd.DataFrame]] = None,
+                                use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Предсказать движение цены для многих символов пакетным инференсом.
+        
+        Результаты по символам имеют тот же формат, что и у
+        :meth:`predict_price_movement`.
+        """
+        from .inference import get_inference_service
+        
+        report = get_inference_service().predict_many(
+            symbols, timeframe, 'lstm', frames=frames, use_cache=use_cache
+        )
+        return report.results
+    
     def analyze_sentiment(self, symbol: str, timeframe: str = '1d', 
                          use_cache: bool = True) -> Dict[str, Any]:
         """Анализ настроений для символа."""
@@ -175,26 +307,19 @@ class MLModelManager:
             if news_data.empty:
                 return {'error': f'No news data available for {symbol}'}
             
-            # Анализируем настроения
-            sentiment_config = SentimentConfig()
-            sentiment_analyzer = NewsSentimentAnalyzer(sentiment_config)
+            sentiment_analyzer = self._get_sentiment_analyzer()
             
             # Объединяем заголовки и контент
-            texts = []
-            for _, row in news_data.iterrows():
-                text_parts = []
-                if pd.notna(row.get('title')):
-                    text_parts.append(str(row['title']))
-                if pd.notna(row.get('content')):
-                    text_parts.append(str(row['content']))
-                if text_parts:
-                    texts.append(' '.join(text_parts))
+            texts = [
+                text for text in sentiment_analyzer.combine_text_columns(news_data, 'content', 'title')
+                if text
+            ]
             
             if not texts:
                 return {'error': 'No valid news texts found'}
             
-            # Анализируем настроения
-            sentiment_results = sentiment_analyzer.analyze_batch(texts[:10])  # Ограничиваем количество
+            # Анализируем настроения батчами; уже оценённые новости берутся из кэша
+            sentiment_results = sentiment_analyzer.analyze_batch(texts)
             
             # Агрегируем результаты
             sentiments = [r.sentiment for r in sentiment_results]
@@ -225,37 +350,51 @@ class MLModelManager:
             logger.error(f"Error analyzing sentiment for {symbol}: {e}")
             return {'error': str(e)}
     
+    def _get_sentiment_analyzer(self) -> NewsSentimentAnalyzer:
+        """Ленивая инициализация анализатора с кэшем оценок в SQLite."""
+        if self._sentiment_analyzer is None:
+            from pathlib import Path
+            cache_path = self.db_path if Path(self.db_path).exists() else None
+            self._sentiment_analyzer = NewsSentimentAnalyzer(SentimentConfig(cache_db_path=cache_path))
+        return self._sentiment_analyzer
+    
     def cluster_stocks(self, symbols: List[str], timeframe: str = '1d', 
                       n_clusters: int = 5) -> Dict[str, Any]:
-        """Кластеризация акций."""
+        """Кластеризация акций.
+        
+        Каждый символ описывается последней строкой своих признаков; матрица
+        признаков кэшируется по (набор символов, таймфрейм, дата), а центроиды
+        предыдущего запуска используются как начальные.
+        """
         try:
-            # Получаем данные для всех символов
-            all_data = []
-            valid_symbols = []
-            
-            for symbol in symbols:
-                data = self._get_stock_data_from_db(symbol, timeframe)
-                if not data.empty:
-                    all_data.append(data)
-                    valid_symbols.append(symbol)
-            
-            if not all_data:
+            # Алгоритм выбирается по размеру текущего набора символов при каждом
+            # вызове; центроиды прошлого запуска подходят обоим вариантам k-means
+            algorithm = ('minibatch_kmeans' if len(symbols) >= self.minibatch_clustering_threshold
+                         else 'kmeans')
+            clusterer = self._clusterers.get((timeframe, n_clusters))
+            if clusterer is None:
+                clusterer = StockClusterer(ClusteringConfig(
+                    algorithm=algorithm, n_clusters=n_clusters, warm_start=True
+                ))
+                self._clusterers[(timeframe, n_clusters)] = clusterer
+            clusterer.config.algorithm = algorithm
+            
+            cache_key = feature_cache_key(symbols, timeframe)
+            # Данные читаются только при промахе кэша признаков
+            frames = _LazyFrames(symbols, lambda symbol: self._get_stock_data_from_db(symbol, timeframe))
+            valid_symbols, features = clusterer.build_symbol_features(frames, cache_key=cache_key)
+            
+            if not valid_symbols:
                 return {'error': 'No valid data for clustering'}
+            if len(valid_symbols) <= n_clusters:
+                return {'error': f'Need more than {n_clusters} symbols with data for clustering'}
             
-            # Объединяем данные
-            combined_data = pd.concat(all_data, ignore_index=True)
-            
-            # Кластеризация
-            clustering_config = ClusteringConfig(n_clusters=n_clusters)
-            clusterer = StockClusterer(clustering_config)
-            
-            clustering_result = clusterer.cluster_stocks(combined_data)
+            clustering_result = clusterer.fit(None, features=features)
             
             # Создаем маппинг символов к кластерам
-            symbol_clusters = {}
-            for i, symbol in enumerate(valid_symbols):
-                if i < len(clustering_result.cluster_labels):
-                    symbol_clusters[symbol] = int(clustering_result.cluster_labels[i])
+            symbol_clusters = {
+                symbol: int(label) for symbol, label in zip(valid_symbols, clustering_result.labels)
+            }
             
             return {
                 'clusters': symbol_clusters,
@@ -333,8 +472,14 @@ class MLModelManager:
         """Очистить устаревшие модели."""
         return self.storage.cleanup_expired_models()
     
-    def _train_model(self, symbol: str, model_type: str, timeframe: str) -> Tuple[Any, Dict[str, Any]]:
-        """Обучить модель."""
+    def _train_model(self, symbol: str, model_type: str, timeframe: str,
+                     epochs: Optional[int] = None) -> Tuple[Any, Dict[str, Any]]:
+        """Обучить модель (``epochs`` переопределяет значение из конфигурации таймфрейма)."""
+        started_at = datetime.now()
+        cpu_start = time.process_time()
+        rss_meter = PeakRssMeter()
+        rss_meter.start()
+        self.last_training_resources = {}
         try:
             # Получаем данные
             historical_data = self._get_stock_data_from_db(symbol, timeframe)
@@ -342,7 +487,9 @@ class MLModelManager:
                 raise ValueError(f'No historical data available for {symbol}')
             
             # Получаем конфигурацию для таймфрейма
-            config_params = self.timeframe_configs.get(timeframe, self.timeframe_configs['1d'])
+            config_params = dict(self.timeframe_configs.get(timeframe, self.timeframe_configs['1d']))
+            if epochs is not None:
+                config_params['epochs'] = epochs
             
             # Создаем модель
             if model_type == 'lstm':
@@ -370,8 +517,9 @@ class MLModelManager:
             
             # Обучаем модель
             start_time = datetime.now()
-            training_result = model.train(historical_data)
+            training_result = model.train(historical_data, cache_key=(symbol, timeframe))
             training_duration = (datetime.now() - start_time).total_seconds()
+            resources = self._collect_training_resources(cpu_start, rss_meter)
             
             # Подготавливаем метрики
             training_metrics = {
@@ -384,7 +532,10 @@ class MLModelManager:
                 'training_duration': training_duration,
                 'sequence_length': config_params['sequence_length'],
                 'hidden_size': config_params['hidden_size'],
-                'features_used': ['open', 'high', 'low', 'close', 'volume']  # Базовые признаки
+                'features_used': ['open', 'high', 'low', 'close', 'volume'],  # Базовые признаки
+                'training_start': started_at.isoformat(),
+                'training_end': datetime.now().isoformat(),
+                **resources
             }
             
             # Сохраняем модель
@@ -399,27 +550,53 @@ class MLModelManager:
         except Exception as e:
             logger.error(f"Error training model {symbol}_{model_type}_{timeframe}: {e}")
             # Записываем ошибку в историю
-            self._record_training_history(symbol, model_type, timeframe, {}, 'failed', str(e))
+            failure_metrics = {
+                'training_start': started_at.isoformat(),
+                'training_end': datetime.now().isoformat(),
+                'training_duration': (datetime.now() - started_at).total_seconds(),
+                **self._collect_training_resources(cpu_start, rss_meter)
+            }
+            self._record_training_history(symbol, model_type, timeframe, failure_metrics, 'failed', str(e))
             raise
     
+    def _collect_training_resources(self, cpu_start: float, rss_meter: PeakRssMeter) -> Dict[str, Any]:
+        """Снять ресурсные метрики текущего обучения."""
+        self.last_training_resources = {
+            'cpu_seconds': time.process_time() - cpu_start,
+            'peak_rss_mb': rss_meter.peak_mb(),
+            'torch_threads': _torch_threads(),
+            'worker_pid': os.getpid()
+        }
+        return self.last_training_resources
+    
     def _get_stock_data_from_db(self, symbol: str, timeframe: str = '1d') -> pd.DataFrame:
-        """Получить данные акций из БД."""
+        """Получить данные акций с индикаторами (из хранилища признаков, иначе из БД)."""
         import sqlite3
         from pathlib import Path
         
         print(f"    📊 [ML_DATA] Получаем данные для {symbol}...")
         
-        db_path = "stock_data.db"
-        if not Path(db_path).exists():
+        # Признаки материализуются после обновления данных; при промахе
+        # символ достраивается из БД и сохраняется для следующих вызовов
+        try:
+            df = get_feature_store(self.db_path).get_frame(symbol, timeframe, tail=1000, date_as_column=True)
+            if not df.empty:
+                print(f"    ✅ [ML_DATA] {symbol}: {len(df)} записей из хранилища признаков")
+                return df
+        except Exception as e:
+            logger.warning(f"Feature store read failed for {symbol}: {e}")
+        
+        if not Path(self.db_path).exists():
             print(f"    ❌ [ML_DATA] {symbol}: База данных не найдена")
             return pd.DataFrame()
         
-        conn = sqlite3.connect(db_path)
+        table = get_timeframe_table_name(timeframe)
+        conn = sqlite3.connect(self.db_path)
         try:
-            # Базовый запрос для дневных данных
-            query = """
+            # Последние 1000 баров таблицы таймфрейма
+            query = f"""
                 SELECT datetime as date, open, high, low, close, volume
-                FROM data_1d 
+                FROM {table} 
                 WHERE symbol = ?
                 ORDER BY datetime DESC
                 LIMIT 1000
@@ -428,7 +605,7 @@ class MLModelManager:
             df = pd.read_sql_query(query, conn, params=(symbol,))
             
             if df.empty:
-                print(f"    ❌ [ML_DATA] {symbol}: Нет данных в таблице data_1d")
+                print(f"    ❌ [ML_DATA] {symbol}: Нет данных в таблице {table}")
                 return df
             else:
                 print(f"    ✅ [ML_DATA] {symbol}: Найдено {len(df)} записей")
@@ -455,11 +632,10 @@ class MLModelManager:
         import sqlite3
         from pathlib import Path
         
-        db_path = "stock_data.db"
-        if not Path(db_path).exists():
+        if not Path(self.db_path).exists():
             return pd.DataFrame()
         
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(self.db_path)
         try:
             # Определяем период для новостей
             days_back = 7 if timeframe == '1d' else 1
@@ -496,31 +672,7 @@ class MLModelManager:
     def _add_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """Добавить технические индикаторы."""
         try:
-            # Простые скользящие средние
-            df['sma_20'] = df['close'].rolling(window=20).mean()
-            df['sma_50'] = df['close'].rolling(window=50).mean()
-            
-            # EMA
-            df['ema_12'] = df['close'].ewm(span=12).mean()
-            df['ema_26'] = df['close'].ewm(span=26).mean()
-            
-            # RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            df['rsi'] = 100 - (100 / (1 + rs))
-            
-            # MACD
-            df['macd'] = df['ema_12'] - df['ema_26']
-            
-            # Bollinger Bands
-            bb_period = 20
-            bb_std = 2
-            df['bb_middle'] = df['close'].rolling(window=bb_period).mean()
-            bb_std_val = df['close'].rolling(window=bb_period).std()
-            df['bb_upper'] = df['bb_middle'] + (bb_std_val * bb_std)
-            df['bb_lower'] = df['bb_middle'] - (bb_std_val * bb_std)
+            df = compute_ml_features(df)
             
             # Заполняем NaN значения
             df = df.ffill().fillna(0)
@@ -537,14 +689,18 @@ class MLModelManager:
         """Записать историю обучения в БД."""
         import sqlite3
         
-        conn = sqlite3.connect(self.db_path)
+        from core.database import ensure_ml_training_history_columns
+        
+        conn = sqlite3.connect(self.db_path, timeout=30)
         try:
+            ensure_ml_training_history_columns(conn)
             conn.execute("""
                 INSERT INTO ml_training_history
                 (symbol, model_type, timeframe, training_start, training_end,
                  duration_seconds, data_points, epochs_trained, final_accuracy,
-                 final_loss, hyperparameters, training_status, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 final_loss, hyperparameters, training_status, error_message,
+                 cpu_seconds, peak_rss_mb, torch_threads, worker_pid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 symbol, model_type, timeframe,
                 training_metrics.get('training_start', datetime.now().isoformat()),
@@ -556,7 +712,11 @@ class MLModelManager:
                 training_metrics.get('mse', 0.0),
                 '{}',  # hyperparameters
                 status,
-                error_message
+                error_message,
+                training_metrics.get('cpu_seconds'),
+                training_metrics.get('peak_rss_mb'),
+                training_metrics.get('torch_threads'),
+                training_metrics.get('worker_pid')
             ))
             conn.commit()
         finally:
@@ -2,11 +2,17 @@
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Hashable, List, Optional, Tuple, Union
 from dataclasses import dataclass
+from collections import OrderedDict
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+import hashlib
 import logging
+import threading
+
+from .feature_store import FeatureView
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +20,7 @@ try:
     import torch
     import torch.nn as nn
     import torch.optim as optim
-    from torch.utils.data import DataLoader, TensorDataset
+    from torch.utils.data import DataLoader, Dataset
     TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
@@ -47,6 +53,112 @@ class PredictionResult:
     model_type: str
 
 
+FEATURE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+TECHNICAL_INDICATOR_COLUMNS = ['sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi', 'macd', 'bb_upper', 'bb_lower']
+
+
+@dataclass
+class FeatureMatrix:
+    """Scaled float32 feature matrix and target shared between predictors."""
+    features: np.ndarray
+    target: np.ndarray
+    scaler: MinMaxScaler
+    feature_columns: List[str]
+
+
+class FeatureMatrixCache:
+    """Small LRU of feature matrices keyed by (symbol, timeframe) and data fingerprint.
+    
+    LSTM and GRU training on the same symbol reuse one scaled matrix instead of
+    rebuilding it. Entries are replaced when the underlying data changes.
+    """
+    
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, FeatureMatrix]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, fingerprint: Hashable) -> Optional[FeatureMatrix]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: Hashable, fingerprint: Hashable, matrix: FeatureMatrix) -> None:
+        with self._lock:
+            self._entries[key] = (fingerprint, matrix)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+feature_matrix_cache = FeatureMatrixCache()
+
+
+def data_fingerprint(*arrays: np.ndarray) -> str:
+    """Checksum of the raw input arrays.
+    
+    Hashes every row, so an edit anywhere in the history (not only the last
+    bar) invalidates the cached matrix. Hashing is a single pass over the bytes
+    and is much cheaper than re-fitting the scaler.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        if array.dtype == object:
+            digest.update(repr(array.tolist()).encode())
+        else:
+            digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+def make_sequence_windows(features: np.ndarray, sequence_length: int) -> np.ndarray:
+    """Zero-copy ``(n_windows, sequence_length, n_features)`` view of *features*.
+    
+    Window ``j`` covers rows ``j .. j + sequence_length - 1`` and is paired with
+    the target at row ``j + sequence_length``, so the last full window (which has
+    no target) is dropped.
+    """
+    if len(features) <= sequence_length:
+        return np.empty((0, sequence_length, features.shape[1]), dtype=features.dtype)
+    windows = sliding_window_view(features, sequence_length, axis=0)[:-1]
+    # sliding_window_view puts the window axis last: (n, features, seq) -> (n, seq, features)
+    return windows.transpose(0, 2, 1)
+
+
+if TORCH_AVAILABLE:
+    class SequenceWindowDataset(Dataset):
+        """Lazy dataset slicing ``sequence_length`` windows on demand.
+        
+        Only the rows of each requested window are materialised (by the
+        DataLoader collate step), never the full ``n x sequence_length`` tensor.
+        """
+        
+        def __init__(self, features: np.ndarray, target: np.ndarray, sequence_length: int,
+                     start: int = 0, stop: Optional[int] = None):
+            self.features = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32))
+            self.target = torch.from_numpy(np.ascontiguousarray(target, dtype=np.float32))
+            self.sequence_length = sequence_length
+            total = max(0, len(features) - sequence_length)
+            self.start = start
+            self.stop = total if stop is None else min(stop, total)
+        
+        def __len__(self) -> int:
+            return max(0, self.stop - self.start)
+        
+        def __getitem__(self, index: int):
+            row = self.start + index
+            return (self.features[row:row + self.sequence_length],
+                    self.target[row + self.sequence_length])
+
+
 class LSTMModel(nn.Module):
     """LSTM neural network for time series prediction."""
     
@@ -103,52 +215,83 @@ class PricePredictor:
         self.model = None
         self.is_trained = False
         
-    def prepare_data(self, data: pd.DataFrame, target_column: str = 'close') -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare data for training/prediction."""
-        # Select features (OHLCV + technical indicators)
-        feature_columns = ['open', 'high', 'low', 'close', 'volume']
-        
-        # Add technical indicators if available
-        technical_indicators = ['sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi', 'macd', 'bb_upper', 'bb_lower']
-        available_indicators = [col for col in technical_indicators if col in data.columns]
-        feature_columns.extend(available_indicators)
+    def build_feature_matrix(self, data: Union[pd.DataFrame, FeatureView], target_column: str = 'close',
+                             cache_key: Optional[Hashable] = None) -> FeatureMatrix:
+        """Scale features to float32, reusing the shared cache when *cache_key* is given.
         
-        # Prepare features
-        features = data[feature_columns].values
-        target = data[target_column].values
+        *data* may be a DataFrame or a :class:`FeatureView` from the feature
+        store; the latter is read straight from its memory-mapped columns.
+        """
+        # Select features (OHLCV + technical indicators)
+        feature_columns = FEATURE_COLUMNS + [
+            col for col in TECHNICAL_INDICATOR_COLUMNS if col in data
+        ]
+        target = np.asarray(data[target_column])
+        if isinstance(data, FeatureView):
+            features = data.matrix(feature_columns)
+        else:
+            features = data[feature_columns].to_numpy(dtype=np.float64)
+        fingerprint = None
+        if cache_key is not None:
+            fingerprint = (target_column, tuple(feature_columns),
+                           data_fingerprint(np.asarray(data.index), features, target))
+            cached = feature_matrix_cache.get(cache_key, fingerprint)
+            if cached is not None:
+                self.scaler = cached.scaler
+                return cached
         
-        # Scale features - avoid inplace operations
-        features_scaled = self.scaler.fit_transform(features.copy())
+        scaler = MinMaxScaler()
+        features_scaled = scaler.fit_transform(features).astype(np.float32)
+        matrix = FeatureMatrix(
+            features=features_scaled,
+            target=target.astype(np.float32),
+            scaler=scaler,
+            feature_columns=feature_columns,
+        )
+        self.scaler = scaler
+        if cache_key is not None:
+            feature_matrix_cache.put(cache_key, fingerprint, matrix)
+        return matrix
+    
+    def prepare_data(self, data: pd.DataFrame, target_column: str = 'close',
+                     cache_key: Optional[Hashable] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Prepare data for training/prediction.
         
-        # Create sequences
-        X, y = [], []
-        for i in range(self.config.sequence_length, len(features_scaled)):
-            X.append(features_scaled[i-self.config.sequence_length:i])
-            y.append(target[i])
-            
-        return np.array(X), np.array(y)
+        Returns a read-only sliding-window view ``X`` of shape
+        ``(n, sequence_length, n_features)`` and the aligned target ``y``;
+        neither copies the feature matrix.
+        """
+        matrix = self.build_feature_matrix(data, target_column, cache_key)
+        seq = self.config.sequence_length
+        X = make_sequence_windows(matrix.features, seq)
+        y = matrix.target[seq:]
+        return X, y
     
-    def train(self, data: pd.DataFrame, target_column: str = 'close') -> Dict[str, float]:
-        """Train the model."""
+    def train(self, data: pd.DataFrame, target_column: str = 'close',
+              cache_key: Optional[Hashable] = None) -> Dict[str, float]:
+        """Train the model.
+        
+        ``cache_key`` (e.g. ``(symbol, timeframe)``) lets predictors trained on
+        the same data share one scaled feature matrix.
+        """
         if not TORCH_AVAILABLE:
             raise ImportError("PyTorch is required for training models")
             
-        X, y = self.prepare_data(data, target_column)
+        matrix = self.build_feature_matrix(data, target_column, cache_key)
+        seq = self.config.sequence_length
+        n_windows = max(0, len(matrix.features) - seq)
         
         # Split data
-        split_idx = int(len(X) * (1 - self.config.validation_split))
-        X_train, X_val = X[:split_idx], X[split_idx:]
-        y_train, y_val = y[:split_idx], y[split_idx:]
+        split_idx = int(n_windows * (1 - self.config.validation_split))
+        train_dataset = SequenceWindowDataset(matrix.features, matrix.target, seq, 0, split_idx)
+        val_dataset = SequenceWindowDataset(matrix.features, matrix.target, seq, split_idx)
         
         # Create data loaders
-        train_dataset = TensorDataset(torch.FloatTensor(X_train), torch.FloatTensor(y_train))
-        val_dataset = TensorDataset(torch.FloatTensor(X_val), torch.FloatTensor(y_val))
-        
         train_loader = DataLoader(train_dataset, batch_size=self.config.batch_size, shuffle=True)
         val_loader = DataLoader(val_dataset, batch_size=self.config.batch_size, shuffle=False)
         
         # Initialize model
-        input_size = X.shape[2]
+        input_size = matrix.features.shape[1]
         self.model = self._create_model(input_size)
         
         # Training setup
@@ -160,6 +303,7 @@ class PricePredictor:
         train_losses = []
         val_losses = []
         best_val_loss = float('inf')
+        best_state = None
         patience_counter = 0
         
         for epoch in range(self.config.epochs):
@@ -194,6 +338,7 @@ class PricePredictor:
             # Early stopping
             if val_loss < best_val_loss:
                 best_val_loss = val_loss
+                best_state = {k: v.detach().clone() for k, v in self.model.state_dict().items()}
                 patience_counter = 0
             else:
                 patience_counter += 1
@@ -205,6 +350,10 @@ class PricePredictor:
             if epoch % 10 == 0:
                 logger.info(f"Epoch {epoch}, Train Loss: {train_loss:.6f}, Val Loss: {val_loss:.6f}")
         
+        # Early stopping: keep the weights of the best validation epoch
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        
         self.is_trained = True
         return {
             'final_train_loss': train_losses[-1],
@@ -219,12 +368,17 @@ class PricePredictor:
             raise ValueError("Model must be trained before making predictions")
         
         try:
-            X, y_actual = self.prepare_data(data, target_column)
+            matrix = self.build_feature_matrix(data, target_column)
+            seq = self.config.sequence_length
+            dataset = SequenceWindowDataset(matrix.features, matrix.target, seq)
+            y_actual = matrix.target[seq:]
             
             self.model.eval()
+            batches = []
             with torch.no_grad():
-                X_tensor = torch.FloatTensor(X)
-                predictions = self.model(X_tensor).squeeze().numpy()
+                for batch_X, _ in DataLoader(dataset, batch_size=max(self.config.batch_size, 256)):
+                    batches.append(self.model(batch_X).reshape(-1).numpy())
+            predictions = np.concatenate(batches) if batches else np.empty(0, dtype=np.float32)
             
             # Calculate metrics
             mse = mean_squared_error(y_actual, predictions)
@@ -7,7 +7,8 @@ from dataclasses import dataclass
 import logging
 from abc import ABC, abstractmethod
 import random
-from collections import deque
+
+from .feature_store import FeatureView
 
 logger = logging.getLogger(__name__)
 
@@ -41,12 +42,49 @@ class RLConfig:
     use_gpu: bool = False
 
 
+STATE_SIZE = 10
+MARKET_FEATURES = 7
+
+
+def build_state_features(data: Union[pd.DataFrame, FeatureView]) -> np.ndarray:
+    """Precompute the market part of the state for every row.
+    
+    Returns a float64 ``(len(data), 7)`` matrix with price change, high/low
+    ratios, volume ratio, normalised RSI, squashed MACD and price-to-SMA
+    ratio; missing indicators are zero columns. *data* may also be a
+    :class:`FeatureView`, whose columns are read without a copy.
+    """
+    n = len(data)
+    features = np.zeros((n, MARKET_FEATURES), dtype=np.float64)
+    if n == 0:
+        return features
+    close = np.asarray(data['close'], dtype=np.float64)
+    features[:, 0] = close / np.asarray(data['open'], dtype=np.float64) - 1
+    features[:, 1] = np.asarray(data['high'], dtype=np.float64) / close - 1
+    features[:, 2] = np.asarray(data['low'], dtype=np.float64) / close - 1
+    if 'volume' in data:
+        volume = np.asarray(data['volume'], dtype=np.float64)
+        features[:, 3] = volume / np.nanmean(volume)
+    else:
+        features[:, 3] = 1.0
+    if 'rsi' in data:
+        features[:, 4] = np.asarray(data['rsi'], dtype=np.float64) / 100 - 0.5
+    if 'macd' in data:
+        features[:, 5] = np.tanh(np.asarray(data['macd'], dtype=np.float64) * 100)
+    if 'sma_20' in data:
+        features[:, 6] = close / np.asarray(data['sma_20'], dtype=np.float64) - 1
+    return features
+
+
 class TradingEnvironment:
     """Trading environment for reinforcement learning."""
     
-    def __init__(self, data: pd.DataFrame, initial_balance: float = 10000.0,
+    def __init__(self, data: Union[pd.DataFrame, FeatureView], initial_balance: float = 10000.0,
                  transaction_cost: float = 0.001, max_position: float = 1.0):
-        self.data = data.reset_index(drop=True)
+        self.data = data if isinstance(data, FeatureView) else data.reset_index(drop=True)
+        # Per-step inputs are precomputed once instead of read through iloc
+        self._close = np.asarray(self.data['close'], dtype=np.float64)
+        self._features = build_state_features(self.data)
         self.initial_balance = initial_balance
         self.transaction_cost = transaction_cost
         self.max_position = max_position
@@ -115,8 +153,8 @@ class TradingEnvironment:
     
     def _execute_action(self, action: int) -> float:
         """Execute trading action and return reward."""
-        current_price = self.data.iloc[self.current_step]['close']
-        previous_price = self.data.iloc[self.current_step - 1]['close'] if self.current_step > 0 else current_price
+        current_price = float(self._close[self.current_step])
+        previous_price = float(self._close[self.current_step - 1]) if self.current_step > 0 else current_price
         
         # Calculate price change
         price_change = (current_price - previous_price) / previous_price if previous_price > 0 else 0
@@ -187,53 +225,142 @@ class TradingEnvironment:
     
     def _update_portfolio_value(self):
         """Update portfolio value based on current position."""
-        if self.current_step < len(self.data):
-            current_price = self.data.iloc[self.current_step]['close']
+        if self.current_step < len(self._close):
+            current_price = float(self._close[self.current_step])
             self.portfolio_value = self.balance + self.shares * current_price
     
     def _get_state(self) -> np.ndarray:
         """Get current state representation."""
-        if self.current_step >= len(self.data):
-            return np.zeros(10)  # Return zero state if out of bounds
-        
-        row = self.data.iloc[self.current_step]
-        
-        # Basic price features
-        state = [
-            row['close'] / row['open'] - 1,  # Price change
-            row['high'] / row['close'] - 1,  # High to close ratio
-            row['low'] / row['close'] - 1,   # Low to close ratio
-            row['volume'] / self.data['volume'].mean() if 'volume' in self.data.columns else 1.0,  # Volume ratio
-        ]
-        
-        # Technical indicators if available
-        if 'rsi' in row:
-            state.append(row['rsi'] / 100 - 0.5)  # Normalized RSI
-        else:
-            state.append(0)
+        if self.current_step >= len(self._features):
+            return np.zeros(STATE_SIZE)  # Return zero state if out of bounds
         
-        if 'macd' in row:
-            state.append(np.tanh(row['macd'] * 100))  # Normalized MACD
-        else:
-            state.append(0)
-        
-        if 'sma_20' in row and 'close' in row:
-            state.append(row['close'] / row['sma_20'] - 1)  # Price to SMA ratio
-        else:
-            state.append(0)
+        state = np.empty(STATE_SIZE, dtype=np.float32)
+        state[:MARKET_FEATURES] = self._features[self.current_step]
         
         # Portfolio state
-        state.extend([
-            self.position,  # Current position
-            self.portfolio_value / self.initial_balance - 1,  # Portfolio return
-            self.balance / self.portfolio_value,  # Cash ratio
-        ])
+        state[7] = self.position  # Current position
+        state[8] = self.portfolio_value / self.initial_balance - 1  # Portfolio return
+        state[9] = self.balance / self.portfolio_value  # Cash ratio
+        return state
+
+
+class VectorizedTradingEnvironment:
+    """K trading environments stepped in lockstep with array arithmetic.
+    
+    Each environment runs over its own frame (different symbols, or the
+    same symbol from different offsets) with the same dynamics and reward
+    as :class:`TradingEnvironment`. Finished environments stay done and
+    return zero reward until they are reset.
+    """
+    
+    def __init__(self, frames: List[Union[pd.DataFrame, FeatureView]], initial_balance: float = 10000.0,
+                 transaction_cost: float = 0.001, offsets: Optional[List[int]] = None):
+        if not frames:
+            raise ValueError("At least one frame is required")
+        self.num_envs = len(frames)
+        self.initial_balance = initial_balance
+        self.transaction_cost = transaction_cost
         
-        # Pad or truncate to fixed size
-        while len(state) < 10:
-            state.append(0)
+        offsets = offsets or [0] * self.num_envs
+        prepared = [frame.slice(offset) if isinstance(frame, FeatureView)
+                    else frame.reset_index(drop=True).iloc[offset:].reset_index(drop=True)
+                    for frame, offset in zip(frames, offsets)]
+        self.lengths = np.array([len(frame) for frame in prepared], dtype=np.int64)
+        if (self.lengths == 0).any():
+            raise ValueError("Every environment needs at least one row of data")
+        max_len = int(self.lengths.max())
+        
+        # Padded (K, T) prices and (K, T, 7) market features
+        self._close = np.ones((self.num_envs, max_len), dtype=np.float64)
+        self._features = np.zeros((self.num_envs, max_len, MARKET_FEATURES), dtype=np.float64)
+        for k, frame in enumerate(prepared):
+            n = len(frame)
+            self._close[k, :n] = np.asarray(frame['close'], dtype=np.float64)
+            self._features[k, :n] = build_state_features(frame)
+        self._rows = np.arange(self.num_envs)
+        self.reset()
+    
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Reset all environments (or those selected by *mask*)."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        if not hasattr(self, 'current_step'):
+            self.current_step = np.zeros(self.num_envs, dtype=np.int64)
+            self.balance = np.zeros(self.num_envs, dtype=np.float64)
+            self.position = np.zeros(self.num_envs, dtype=np.float64)
+            self.shares = np.zeros(self.num_envs, dtype=np.float64)
+            self.portfolio_value = np.zeros(self.num_envs, dtype=np.float64)
+            self.done = np.zeros(self.num_envs, dtype=bool)
+        self.current_step[mask] = 0
+        self.balance[mask] = self.initial_balance
+        self.position[mask] = 0.0
+        self.shares[mask] = 0.0
+        self.portfolio_value[mask] = self.initial_balance
+        self.done[mask] = False
+        return self._get_states()
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """Apply one action per environment; returns ``(states, rewards, dones, info)``."""
+        actions = np.asarray(actions)
+        active = ~self.done
+        step = self.current_step
+        rows = self._rows
+        
+        price = self._close[rows, step]
+        previous = np.where(step > 0, self._close[rows, np.maximum(step - 1, 0)], price)
+        safe_previous = np.where(previous > 0, previous, 1.0)
+        price_change = np.where(previous > 0, (price - previous) / safe_previous, 0.0)
+        
+        new_position = np.where(
+            actions == 0, np.minimum(1.0, self.position + 0.1),
+            np.where(actions == 1, self.position, np.maximum(-1.0, self.position - 0.1))
+        )
+        position_change = np.abs(new_position - self.position)
+        transaction_cost = position_change * self.transaction_cost * self.portfolio_value
         
-        return np.array(state[:10], dtype=np.float32)
+        # Long and short rebalancing share one formula; flat closes any open shares
+        target_shares = (new_position * self.portfolio_value) / price
+        rebalanced = self.balance - ((target_shares - self.shares) * price + transaction_cost)
+        closed = self.balance + np.where(self.shares != 0, self.shares * price - transaction_cost, 0.0)
+        flat = new_position == 0
+        new_balance = np.where(flat, closed, rebalanced)
+        new_shares = np.where(flat, 0.0, target_shares)
+        
+        rewards = (
+            new_position * price_change
+            - position_change * self.transaction_cost
+            - np.abs(new_position) * 0.01
+            + (self.portfolio_value - self.initial_balance) / self.initial_balance * 0.1
+        )
+        rewards = np.where(active, rewards, 0.0)
+        
+        self.position = np.where(active, new_position, self.position)
+        self.balance = np.where(active, new_balance, self.balance)
+        self.shares = np.where(active, new_shares, self.shares)
+        self.current_step = np.where(active, step + 1, step)
+        
+        in_bounds = active & (self.current_step < self.lengths)
+        next_price = self._close[rows, np.minimum(self.current_step, self._close.shape[1] - 1)]
+        self.portfolio_value = np.where(in_bounds, self.balance + self.shares * next_price, self.portfolio_value)
+        self.done = self.done | (self.current_step >= self.lengths - 1)
+        
+        info = {
+            'portfolio_value': self.portfolio_value.copy(),
+            'position': self.position.copy(),
+            'step': self.current_step.copy()
+        }
+        return self._get_states(), rewards, self.done.copy(), info
+    
+    def _get_states(self) -> np.ndarray:
+        states = np.zeros((self.num_envs, STATE_SIZE), dtype=np.float32)
+        valid = self.current_step < self.lengths
+        steps = np.minimum(self.current_step, self._features.shape[1] - 1)
+        states[:, :MARKET_FEATURES] = self._features[self._rows, steps]
+        states[:, 7] = self.position
+        states[:, 8] = self.portfolio_value / self.initial_balance - 1
+        states[:, 9] = self.balance / self.portfolio_value
+        states[~valid] = 0.0
+        return states
 
 
 class DQNNetwork(nn.Module):
@@ -256,23 +383,64 @@ class DQNNetwork(nn.Module):
 
 
 class ReplayBuffer:
-    """Experience replay buffer for DQN."""
+    """Experience replay buffer for DQN.
+    
+    A ring buffer over preallocated arrays: ``push`` writes one slot and
+    ``sample`` gathers a batch with fancy indexing, without building Python
+    tuples or re-stacking them.
+    """
     
     def __init__(self, capacity: int):
-        self.buffer = deque(maxlen=capacity)
+        self.capacity = capacity
+        self.position = 0
+        self.size = 0
+        self.states: Optional[np.ndarray] = None
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states: Optional[np.ndarray] = None
+        self.dones = np.zeros(capacity, dtype=bool)
+    
+    def _allocate(self, state) -> None:
+        shape = (self.capacity,) + np.shape(state)
+        self.states = np.zeros(shape, dtype=np.float32)
+        self.next_states = np.zeros(shape, dtype=np.float32)
     
     def push(self, state, action, reward, next_state, done):
         """Add experience to buffer."""
-        self.buffer.append((state, action, reward, next_state, done))
+        if self.states is None:
+            self._allocate(state)
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+    
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        """Add one experience per environment of a vectorised step."""
+        states = np.asarray(states)
+        if self.states is None:
+            self._allocate(states[0])
+        count = len(states)
+        indices = (self.position + np.arange(count)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self.position = int((self.position + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
     
     def sample(self, batch_size: int):
         """Sample batch of experiences."""
-        batch = random.sample(self.buffer, min(batch_size, len(self.buffer)))
-        state, action, reward, next_state, done = map(np.stack, zip(*batch))
-        return state, action, reward, next_state, done
+        indices = np.fromiter(random.sample(range(self.size), min(batch_size, self.size)), dtype=np.int64)
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices])
     
     def __len__(self):
-        return len(self.buffer)
+        return self.size
 
 
 class TradingAgent:
@@ -311,10 +479,24 @@ class TradingAgent:
         q_values = self.q_network(state_tensor)
         return q_values.argmax().item()
     
+    def act_batch(self, states: np.ndarray, training: bool = True) -> np.ndarray:
+        """Choose one action per environment with a single forward pass."""
+        with torch.no_grad():
+            q_values = self.q_network(torch.from_numpy(np.asarray(states, dtype=np.float32)).to(self.device))
+        actions = q_values.argmax(dim=1).cpu().numpy()
+        if training:
+            explore = np.random.random(len(actions)) < self.epsilon
+            actions[explore] = np.random.randint(self.config.action_size, size=int(explore.sum()))
+        return actions
+    
     def remember(self, state, action, reward, next_state, done):
         """Store experience in replay buffer."""
         self.memory.push(state, action, reward, next_state, done)
     
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        """Store one experience per environment of a vectorised step."""
+        self.memory.push_batch(states, actions, rewards, next_states, dones)
+    
     def replay(self):
         """Train the network on a batch of experiences."""
         if len(self.memory) < self.config.batch_size:
@@ -323,11 +505,11 @@ class TradingAgent:
         # Sample batch
         states, actions, rewards, next_states, dones = self.memory.sample(self.config.batch_size)
         
-        states = torch.FloatTensor(states).to(self.device)
-        actions = torch.LongTensor(actions).to(self.device)
-        rewards = torch.FloatTensor(rewards).to(self.device)
-        next_states = torch.FloatTensor(next_states).to(self.device)
-        dones = torch.BoolTensor(dones).to(self.device)
+        states = torch.from_numpy(states).to(self.device)
+        actions = torch.from_numpy(actions).to(self.device)
+        rewards = torch.from_numpy(rewards).to(self.device)
+        next_states = torch.from_numpy(next_states).to(self.device)
+        dones = torch.from_numpy(dones).to(self.device)
         
         # Current Q values
         current_q_values = self.q_network(states).gather(1, actions.unsqueeze(1))
@@ -441,6 +623,38 @@ class RLEnvironment:
         }
 
 
+def train_agent_vectorized(agent: TradingAgent, env: VectorizedTradingEnvironment,
+                           total_steps: int) -> Dict[str, List[float]]:
+    """Train *agent* on K lockstep environments for ``total_steps`` vector steps.
+    
+    Finished environments are reset immediately; one replay update runs per
+    vector step, so each update sees K fresh transitions.
+    """
+    states = env.reset()
+    episode_rewards = np.zeros(env.num_envs, dtype=np.float64)
+    scores: List[float] = []
+    portfolio_values: List[float] = []
+    
+    for _ in range(total_steps):
+        actions = agent.act_batch(states, training=True)
+        next_states, rewards, dones, info = env.step(actions)
+        agent.remember_batch(states, actions, rewards, next_states, dones)
+        agent.replay()
+        
+        episode_rewards += rewards
+        if dones.any():
+            scores.extend(episode_rewards[dones].tolist())
+            portfolio_values.extend(info['portfolio_value'][dones].tolist())
+            episode_rewards[dones] = 0.0
+            next_states = env.reset(dones)
+        states = next_states
+    
+    return {
+        'scores': scores,
+        'portfolio_values': portfolio_values
+    }
+
+
 def create_trading_agent(config: Optional[RLConfig] = None) -> TradingAgent:
     """Factory function to create trading agent."""
     if config is None:
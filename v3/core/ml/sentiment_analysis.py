@@ -2,11 +2,15 @@
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
+import hashlib
+import json
 import logging
 import re
+import sqlite3
 from collections import Counter
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +38,7 @@ class SentimentConfig:
     confidence_threshold: float = 0.7
     use_gpu: bool = False
     fallback_to_lexicon: bool = True
+    cache_db_path: Optional[str] = None  # SQLite file for persisted scores; None disables the cache
 
 
 @dataclass
@@ -149,6 +154,125 @@ class LexiconSentimentAnalyzer:
         )
 
 
+class SentimentCache:
+    """SQLite-backed cache of per-article sentiment scores.
+
+    Scores are keyed by a hash of the model name and the cleaned text, so the
+    same article (or a verbatim copy) is never scored twice. A per-scope
+    watermark of the newest scored publication time drives incremental runs.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _ensure_schema(self) -> None:
+        conn = self._get_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ml_sentiment_cache (
+                    text_hash TEXT PRIMARY KEY,
+                    article_id INTEGER,
+                    model_name TEXT NOT NULL,
+                    sentiment TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    scores TEXT NOT NULL,
+                    method TEXT,
+                    published_at TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ml_sentiment_cache_article ON ml_sentiment_cache(article_id)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ml_sentiment_watermarks (
+                    scope TEXT PRIMARY KEY,
+                    last_published_at TEXT NOT NULL,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def text_hash(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}::{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, SentimentResult]:
+        found: Dict[str, SentimentResult] = {}
+        if not hashes:
+            return found
+        conn = self._get_connection()
+        try:
+            for start in range(0, len(hashes), 500):
+                chunk = list(hashes[start:start + 500])
+                placeholders = ','.join('?' for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT text_hash, sentiment, confidence, scores, method "
+                    f"FROM ml_sentiment_cache WHERE text_hash IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for text_hash, sentiment, confidence, scores, method in rows:
+                    found[text_hash] = SentimentResult(
+                        text='',
+                        sentiment=sentiment,
+                        confidence=confidence,
+                        scores=json.loads(scores),
+                        method=method or 'cache',
+                    )
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, entries: Sequence[Tuple[str, str, SentimentResult, Optional[int], Optional[str]]]) -> None:
+        """Store ``(text_hash, model_name, result, article_id, published_at)`` rows."""
+        if not entries:
+            return
+        conn = self._get_connection()
+        try:
+            conn.executemany("""
+                INSERT OR REPLACE INTO ml_sentiment_cache
+                (text_hash, article_id, model_name, sentiment, confidence, scores, method, published_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (text_hash, article_id, model_name, result.sentiment, float(result.confidence),
+                 json.dumps(result.scores), result.method, published_at)
+                for text_hash, model_name, result, article_id, published_at in entries
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_watermark(self, scope: str) -> Optional[str]:
+        conn = self._get_connection()
+        try:
+            row = conn.execute(
+                "SELECT last_published_at FROM ml_sentiment_watermarks WHERE scope = ?", (scope,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def set_watermark(self, scope: str, last_published_at: str) -> None:
+        conn = self._get_connection()
+        try:
+            conn.execute("""
+                INSERT INTO ml_sentiment_watermarks (scope, last_published_at, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(scope) DO UPDATE SET
+                    last_published_at = MAX(last_published_at, excluded.last_published_at),
+                    updated_at = excluded.updated_at
+            """, (scope, last_published_at, datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+
+
 class NewsSentimentAnalyzer:
     """Advanced sentiment analyzer for financial news."""
     
@@ -156,9 +280,15 @@ class NewsSentimentAnalyzer:
         self.config = config
         self.transformer_pipeline = None
         self.lexicon_analyzer = LexiconSentimentAnalyzer()
+        self.cache = SentimentCache(config.cache_db_path) if config.cache_db_path else None
         
         if TRANSFORMERS_AVAILABLE and TORCH_AVAILABLE:
             self._initialize_transformer_model()
+
+    @property
+    def model_key(self) -> str:
+        """Name stored alongside cached scores so methods never mix."""
+        return self.config.model_name if self.transformer_pipeline else 'lexicon'
     
     def _initialize_transformer_model(self):
         """Initialize transformer-based sentiment analysis model."""
@@ -254,30 +384,7 @@ class NewsSentimentAnalyzer:
                 short_text = text[:128]
                 results = self.transformer_pipeline(short_text, truncation=True, max_length=64)
             
-            # Convert results to our format
-            scores = {}
-            for result in results[0]:
-                label = result['label'].lower()
-                score = result['score']
-                
-                if 'positive' in label or 'pos' in label:
-                    scores['positive'] = score
-                elif 'negative' in label or 'neg' in label:
-                    scores['negative'] = score
-                else:
-                    scores['neutral'] = score
-            
-            # Determine sentiment
-            sentiment = max(scores, key=scores.get)
-            confidence = scores[sentiment]
-            
-            return SentimentResult(
-                text=text,
-                sentiment=sentiment,
-                confidence=confidence,
-                scores=scores,
-                method='transformer'
-            )
+            return self._result_from_scores(text, results[0])
             
         except Exception as e:
             logger.error(f"Transformer analysis failed: {e}")
@@ -290,61 +397,211 @@ class NewsSentimentAnalyzer:
                 method='transformer_error'
             )
     
-    def analyze_batch(self, texts: List[str]) -> List[SentimentResult]:
-        """Analyze sentiment for a batch of texts."""
-        results = []
-        
-        # Limit batch size to avoid memory issues
-        max_batch_size = 10
-        if len(texts) > max_batch_size:
-            logger.warning(f"Batch size {len(texts)} too large, limiting to {max_batch_size}")
-            texts = texts[:max_batch_size]
+    @staticmethod
+    def _result_from_scores(text: str, label_scores: List[Dict[str, float]]) -> SentimentResult:
+        """Convert pipeline label scores into a :class:`SentimentResult`."""
+        scores = {}
+        for result in label_scores:
+            label = result['label'].lower()
+            score = result['score']
+            
+            if 'positive' in label or 'pos' in label:
+                scores['positive'] = score
+            elif 'negative' in label or 'neg' in label:
+                scores['negative'] = score
+            else:
+                scores['neutral'] = score
         
-        for i, text in enumerate(texts):
+        sentiment = max(scores, key=scores.get)
+        return SentimentResult(
+            text=text,
+            sentiment=sentiment,
+            confidence=scores[sentiment],
+            scores=scores,
+            method='transformer'
+        )
+
+    def _prepare_transformer_text(self, text: str) -> str:
+        max_chars = min(self.config.max_length, 256)
+        return self._clean_text(text[:max_chars])
+
+    def _score_uncached(self, texts: List[str], batch_size: int) -> List[SentimentResult]:
+        """Score non-empty texts, running the transformer on padded batches."""
+        if not texts:
+            return []
+        if self.transformer_pipeline:
+            prepared = [self._prepare_transformer_text(text) for text in texts]
+            results: List[Optional[SentimentResult]] = [None] * len(prepared)
+            # Texts that are empty after cleaning never reach the model (as in _analyze_with_transformer)
+            batch = []
+            for i, text in enumerate(prepared):
+                if text.strip():
+                    batch.append(i)
+                else:
+                    results[i] = SentimentResult(
+                        text=text,
+                        sentiment='neutral',
+                        confidence=0.5,
+                        scores={'positive': 0.33, 'negative': 0.33, 'neutral': 0.34},
+                        method='transformer_empty'
+                    )
             try:
-                result = self.analyze_text(text)
-                results.append(result)
+                for start in range(0, len(batch), batch_size):
+                    chunk = batch[start:start + batch_size]
+                    outputs = self.transformer_pipeline(
+                        [prepared[i] for i in chunk],
+                        batch_size=len(chunk),
+                        truncation=True,
+                        max_length=128,
+                    )
+                    for i, output in zip(chunk, outputs):
+                        results[i] = self._result_from_scores(prepared[i], output)
+                return results
             except Exception as e:
-                logger.error(f"Error analyzing text {i}: {e}")
-                # Add neutral result for failed analysis
-                results.append(SentimentResult(
+                logger.warning(f"Batched transformer analysis failed, scoring one by one: {e}")
+        return [self.analyze_text(text) for text in texts]
+
+    def analyze_batch(self, texts: List[str], batch_size: Optional[int] = None,
+                      article_ids: Optional[Sequence[Optional[int]]] = None,
+                      published_at: Optional[Sequence[Optional[str]]] = None) -> List[SentimentResult]:
+        """Analyze sentiment for a batch of texts.
+        
+        Texts are tokenised and run through the transformer in padded batches of
+        ``batch_size`` (``config.batch_size`` by default). When a cache is
+        configured, previously scored texts are served from it and only misses
+        reach the model.
+        """
+        batch_size = max(1, batch_size or self.config.batch_size)
+        results: List[Optional[SentimentResult]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        model_key = self.model_key
+        
+        for i, text in enumerate(texts):
+            if not text or not str(text).strip():
+                results[i] = SentimentResult(
                     text=text,
                     sentiment='neutral',
+                    confidence=0.0,
+                    scores={'positive': 0.0, 'negative': 0.0, 'neutral': 1.0},
+                    method='empty'
+                )
+                continue
+            key = SentimentCache.text_hash(model_key, ' '.join(str(text).split()))
+            pending.setdefault(key, []).append(i)
+        
+        if self.cache and pending:
+            for key, cached in self.cache.get_many(list(pending)).items():
+                for i in pending.pop(key):
+                    results[i] = SentimentResult(
+                        text=texts[i],
+                        sentiment=cached.sentiment,
+                        confidence=cached.confidence,
+                        scores=cached.scores,
+                        method=cached.method,
+                    )
+        
+        keys = list(pending)
+        try:
+            scored = self._score_uncached([texts[pending[key][0]] for key in keys], batch_size)
+        except Exception as e:
+            logger.error(f"Error analyzing batch: {e}")
+            scored = [
+                SentimentResult(
+                    text=texts[pending[key][0]],
+                    sentiment='neutral',
                     confidence=0.5,
                     scores={'positive': 0.33, 'negative': 0.33, 'neutral': 0.34},
                     method='error_fallback'
+                )
+                for key in keys
+            ]
+        
+        to_store = []
+        for key, result in zip(keys, scored):
+            for i in pending[key]:
+                results[i] = result
+            if result.method not in ('error_fallback', 'transformer_error'):
+                first = pending[key][0]
+                to_store.append((
+                    key,
+                    model_key,
+                    result,
+                    article_ids[first] if article_ids is not None else None,
+                    published_at[first] if published_at is not None else None,
                 ))
+        if self.cache:
+            self.cache.put_many(to_store)
         
         return results
     
+    @staticmethod
+    def combine_text_columns(df: pd.DataFrame, text_column: str,
+                              title_column: Optional[str]) -> pd.Series:
+        parts = []
+        if title_column and title_column in df.columns:
+            parts.append(df[title_column])
+        if text_column in df.columns:
+            parts.append(df[text_column])
+        if not parts:
+            return pd.Series('', index=df.index, dtype=object)
+        combined = pd.Series('', index=df.index, dtype=object)
+        for part in parts:
+            part = part.where(part.notna(), None)
+            text = part.astype(object).map(lambda value: '' if value is None else str(value))
+            combined = combined.str.cat(text, sep=' ')
+        return combined.str.strip()
+    
     def analyze_news_dataframe(self, df: pd.DataFrame, 
                               text_column: str = 'content',
-                              title_column: Optional[str] = None) -> pd.DataFrame:
+                              title_column: Optional[str] = None,
+                              id_column: Optional[str] = None,
+                              time_column: Optional[str] = None) -> pd.DataFrame:
         """Analyze sentiment for a DataFrame of news."""
-        results = []
-        
-        for idx, row in df.iterrows():
-            # Combine title and content if both available
-            text_parts = []
-            if title_column and pd.notna(row.get(title_column)):
-                text_parts.append(str(row[title_column]))
-            if pd.notna(row.get(text_column)):
-                text_parts.append(str(row[text_column]))
-            
-            combined_text = ' '.join(text_parts)
-            result = self.analyze_text(combined_text)
-            
-            results.append({
-                'index': idx,
-                'sentiment': result.sentiment,
-                'confidence': result.confidence,
-                'positive_score': result.scores.get('positive', 0.0),
-                'negative_score': result.scores.get('negative', 0.0),
-                'neutral_score': result.scores.get('neutral', 0.0),
-                'method': result.method
-            })
-        
-        return pd.DataFrame(results)
+        if df.empty:
+            return pd.DataFrame(columns=['index', 'sentiment', 'confidence', 'positive_score',
+                                         'negative_score', 'neutral_score', 'method'])
+        texts = self.combine_text_columns(df, text_column, title_column).tolist()
+        article_ids = df[id_column].tolist() if id_column and id_column in df.columns else None
+        published = (
+            df[time_column].astype(str).tolist()
+            if time_column and time_column in df.columns else None
+        )
+        results = self.analyze_batch(texts, article_ids=article_ids, published_at=published)
+        
+        return pd.DataFrame({
+            'index': df.index,
+            'sentiment': [r.sentiment for r in results],
+            'confidence': [r.confidence for r in results],
+            'positive_score': [r.scores.get('positive', 0.0) for r in results],
+            'negative_score': [r.scores.get('negative', 0.0) for r in results],
+            'neutral_score': [r.scores.get('neutral', 0.0) for r in results],
+            'method': [r.method for r in results],
+        })
+    
+    def analyze_new_articles(self, df: pd.DataFrame, time_column: str,
+                             scope: str = 'market',
+                             text_column: str = 'content',
+                             title_column: Optional[str] = None,
+                             id_column: Optional[str] = None) -> pd.DataFrame:
+        """Incremental mode: score only articles newer than the last run.
+        
+        The watermark for ``scope`` is advanced to the newest ``time_column``
+        value that was scored. Requires a configured cache and ``time_column``.
+        """
+        if self.cache is None:
+            raise ValueError("Incremental sentiment analysis requires SentimentConfig.cache_db_path")
+        if time_column not in df.columns:
+            raise ValueError(f"Incremental sentiment analysis requires the '{time_column}' column")
+        if df.empty:
+            return self.analyze_news_dataframe(df, text_column, title_column)
+        times = df[time_column].astype(str)
+        watermark = self.cache.get_watermark(scope)
+        new_rows = df[times > watermark] if watermark else df
+        result = self.analyze_news_dataframe(new_rows, text_column, title_column,
+                                             id_column=id_column, time_column=time_column)
+        if not new_rows.empty:
+            self.cache.set_watermark(scope, times.loc[new_rows.index].max())
+        return result
     
     def get_market_sentiment(self, news_df: pd.DataFrame, 
                            text_column: str = 'content',
@@ -352,15 +609,14 @@ class NewsSentimentAnalyzer:
                            time_column: Optional[str] = None,
                            window_hours: int = 24) -> Dict[str, float]:
         """Calculate overall market sentiment from news."""
-        # Analyze sentiment
-        sentiment_df = self.analyze_news_dataframe(news_df, text_column, title_column)
-        
-        # Filter by time window if time column provided
+        # Filter by time window first so only relevant articles are scored
         if time_column and time_column in news_df.columns:
             if pd.api.types.is_datetime64_any_dtype(news_df[time_column]):
                 cutoff_time = pd.Timestamp.now() - pd.Timedelta(hours=window_hours)
-                recent_mask = news_df[time_column] >= cutoff_time
-                sentiment_df = sentiment_df[recent_mask]
+                news_df = news_df[news_df[time_column] >= cutoff_time]
+        
+        # Analyze sentiment
+        sentiment_df = self.analyze_news_dataframe(news_df, text_column, title_column)
         
         if len(sentiment_df) == 0:
             return {
@@ -374,9 +630,10 @@ class NewsSentimentAnalyzer:
         
         # Calculate ratios
         total_articles = len(sentiment_df)
-        positive_count = len(sentiment_df[sentiment_df['sentiment'] == 'positive'])
-        negative_count = len(sentiment_df[sentiment_df['sentiment'] == 'negative'])
-        neutral_count = len(sentiment_df[sentiment_df['sentiment'] == 'neutral'])
+        counts = sentiment_df['sentiment'].value_counts()
+        positive_count = int(counts.get('positive', 0))
+        negative_count = int(counts.get('negative', 0))
+        neutral_count = int(counts.get('neutral', 0))
         
         positive_ratio = positive_count / total_articles
         negative_ratio = negative_count / total_articles
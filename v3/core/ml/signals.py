@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 """ML-based trading signals generation."""
 
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 import pandas as pd
@@ -9,6 +12,7 @@ import numpy as np
 
 from .notifications import ml_notification_manager
 from .cache import ml_cache_manager
+from .cascade_cache import cascade_ml_cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,42 +31,9 @@ class MLSignalGenerator:
             if stock_data.empty:
                 return {'error': f'No data available for {symbol}'}
             
-            signals = {}
-            
-            # 1. Price Prediction Signal
             prediction_result = self.ml_manager.predict_price_movement(symbol)
-            if 'prediction' in prediction_result:
-                pred = prediction_result['prediction']
-                signals['ml_price_signal'] = self._interpret_price_prediction(pred)
-                # Handle both dict and numpy object cases
-                if isinstance(pred, dict):
-                    signals['ml_price_confidence'] = pred.get('confidence', 0.0)
-                    signals['ml_price_direction'] = pred.get('direction', 'neutral')
-                else:
-                    signals['ml_price_confidence'] = getattr(pred, 'confidence', 0.0)
-                    signals['ml_price_direction'] = getattr(pred, 'direction', 'neutral')
-            
-            # 2. Sentiment Signal
             sentiment_result = self.ml_manager.analyze_market_sentiment(days_back)
-            if 'overall_sentiment' in sentiment_result:
-                signals['ml_sentiment_signal'] = self._interpret_sentiment(sentiment_result['overall_sentiment'])
-                signals['ml_sentiment_confidence'] = sentiment_result.get('confidence', 0.0)
-            
-            # 3. Technical ML Signal (based on technical indicators)
-            tech_signal = self._generate_technical_ml_signal(stock_data)
-            signals.update(tech_signal)
-            
-            # 4. Ensemble Signal (combine all signals)
-            ensemble_signal = self._generate_ensemble_signal(signals)
-            signals['ml_ensemble_signal'] = ensemble_signal
-            
-            # 5. Risk Assessment
-            risk_assessment = self._assess_ml_risk(stock_data, signals)
-            signals.update(risk_assessment)
-            
-            signals['symbol'] = symbol
-            signals['timestamp'] = datetime.now().isoformat()
-            signals['data_points'] = len(stock_data)
+            signals = self._build_signals(symbol, stock_data, prediction_result, sentiment_result)
             
             # Send notifications for worthy signals
             try:
@@ -76,6 +47,159 @@ class MLSignalGenerator:
             logger.error(f"Error generating ML signals for {symbol}: {e}")
             return {'error': str(e)}
     
+    async def generate_ml_signals_batch(self, symbols: List[str], days_back: int = 30,
+                                        max_workers: Optional[int] = None,
+                                        notify: bool = True) -> Dict[str, Any]:
+        """Generate ML signals for many symbols in one run.
+        
+        Market sentiment (and the news frame behind it) is computed once,
+        OHLCV for all symbols is loaded with a single query when the manager
+        supports it, and price predictions go through batched inference (or a
+        thread pool for managers without a batch API).
+        
+        Returns:
+            ``{'signals': {symbol: signals}, 'timings': {stage: seconds}}``;
+            per-symbol failures are reported as ``{'error': ...}`` entries.
+        """
+        timings: Dict[str, float] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        symbols = list(dict.fromkeys(symbols))
+        run_started = time.perf_counter()
+        
+        # 1. OHLCV for all symbols
+        stage_started = time.perf_counter()
+        batch_loader = getattr(self.ml_manager, '_get_stock_data_batch_from_db', None)
+        if batch_loader is not None:
+            stock_frames = batch_loader(symbols, '1d')
+        else:
+            stock_frames = {symbol: self.ml_manager._get_stock_data_from_db(symbol, '1d') for symbol in symbols}
+        timings['load_ohlcv'] = time.perf_counter() - stage_started
+        
+        ready = []
+        for symbol in symbols:
+            frame = stock_frames.get(symbol)
+            if frame is None or frame.empty:
+                results[symbol] = {'error': f'No data available for {symbol}'}
+            else:
+                ready.append(symbol)
+        
+        # 2. Market-wide sentiment, shared by every symbol
+        stage_started = time.perf_counter()
+        try:
+            sentiment_result = self.ml_manager.analyze_market_sentiment(days_back) if ready else {}
+        except Exception as e:
+            logger.error(f"Market sentiment failed for batch: {e}")
+            sentiment_result = {}
+        timings['market_sentiment'] = time.perf_counter() - stage_started
+        
+        # 3. Price predictions (batched inference or a thread pool)
+        stage_started = time.perf_counter()
+        predictions = await self._predict_batch(ready, stock_frames, batch_loader is not None, max_workers)
+        timings['price_predictions'] = time.perf_counter() - stage_started
+        
+        # 4. Technical, ensemble and risk signals
+        stage_started = time.perf_counter()
+        for symbol in ready:
+            try:
+                results[symbol] = self._build_signals(
+                    symbol, stock_frames[symbol], predictions.get(symbol, {}), sentiment_result
+                )
+            except Exception as e:
+                logger.error(f"Error generating ML signals for {symbol}: {e}")
+                results[symbol] = {'error': str(e)}
+        timings['signals'] = time.perf_counter() - stage_started
+        
+        # 5. Notifications
+        stage_started = time.perf_counter()
+        if notify:
+            for symbol in ready:
+                if 'error' in results[symbol]:
+                    continue
+                try:
+                    await self._send_ml_notifications(symbol, results[symbol])
+                except Exception as e:
+                    logger.error(f"Failed to send ML notifications for {symbol}: {e}")
+        timings['notifications'] = time.perf_counter() - stage_started
+        timings['total'] = time.perf_counter() - run_started
+        
+        logger.info(
+            f"Generated ML signals for {len(ready)}/{len(symbols)} symbols: "
+            + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+        )
+        return {'signals': {symbol: results[symbol] for symbol in symbols}, 'timings': timings}
+    
+    async def _predict_batch(self, symbols: List[str], stock_frames: Dict[str, pd.DataFrame],
+                             pass_frames: bool, max_workers: Optional[int]) -> Dict[str, Dict[str, Any]]:
+        """Run price predictions for *symbols*, batched when the manager supports it."""
+        if not symbols:
+            return {}
+        
+        batch_predict = getattr(self.ml_manager, 'predict_price_movements', None)
+        if batch_predict is not None and pass_frames:
+            # Batched inference: one stacked forward pass per model architecture
+            loop = asyncio.get_running_loop()
+            frames = {symbol: stock_frames[symbol] for symbol in symbols}
+            return await loop.run_in_executor(None, lambda: batch_predict(symbols, frames=frames))
+        
+        def predict(symbol: str) -> Dict[str, Any]:
+            try:
+                if pass_frames:
+                    return self.ml_manager.predict_price_movement(
+                        symbol, historical_data=stock_frames[symbol]
+                    )
+                return self.ml_manager.predict_price_movement(symbol)
+            except Exception as e:
+                logger.error(f"Price prediction failed for {symbol}: {e}")
+                return {'error': str(e)}
+        
+        workers = max_workers or min(8, len(symbols))
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = await asyncio.gather(
+                *(loop.run_in_executor(executor, predict, symbol) for symbol in symbols)
+            )
+        return dict(zip(symbols, outcomes))
+    
+    def _build_signals(self, symbol: str, stock_data: pd.DataFrame,
+                       prediction_result: Dict[str, Any],
+                       sentiment_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine prediction, sentiment and technical inputs into ML signals."""
+        signals = {}
+        
+        # 1. Price Prediction Signal
+        if 'prediction' in prediction_result:
+            pred = prediction_result['prediction']
+            signals['ml_price_signal'] = self._interpret_price_prediction(pred)
+            # Handle both dict and numpy object cases
+            if isinstance(pred, dict):
+                signals['ml_price_confidence'] = pred.get('confidence', 0.0)
+                signals['ml_price_direction'] = pred.get('direction', 'neutral')
+            else:
+                signals['ml_price_confidence'] = getattr(pred, 'confidence', 0.0)
+                signals['ml_price_direction'] = getattr(pred, 'direction', 'neutral')
+        
+        # 2. Sentiment Signal
+        if 'overall_sentiment' in sentiment_result:
+            signals['ml_sentiment_signal'] = self._interpret_sentiment(sentiment_result['overall_sentiment'])
+            signals['ml_sentiment_confidence'] = sentiment_result.get('confidence', 0.0)
+        
+        # 3. Technical ML Signal (based on technical indicators)
+        tech_signal = self._generate_technical_ml_signal(stock_data)
+        signals.update(tech_signal)
+        
+        # 4. Ensemble Signal (combine all signals)
+        ensemble_signal = self._generate_ensemble_signal(signals)
+        signals['ml_ensemble_signal'] = ensemble_signal
+        
+        # 5. Risk Assessment
+        risk_assessment = self._assess_ml_risk(stock_data, signals)
+        signals.update(risk_assessment)
+        
+        signals['symbol'] = symbol
+        signals['timestamp'] = datetime.now().isoformat()
+        signals['data_points'] = len(stock_data)
+        return signals
+    
     def _interpret_price_prediction(self, prediction) -> str:
         """Convert price prediction to trading signal."""
         # Handle both dict and numpy object cases
@@ -295,48 +419,37 @@ class MLSignalGenerator:
             DataFrame with ML signals
         """
         try:
-            # Try to get from cache first
+            # Per-symbol cache: only symbols whose model or data changed are recomputed
+            cached_signals: Dict[str, Dict[str, Any]] = {}
+            symbols_to_generate = list(symbols)
             if use_cache:
-                cached_signals = ml_cache_manager.get_ml_signals(symbols)
-                if not cached_signals.empty:
+                cached_signals, symbols_to_generate = cascade_ml_cache.get_symbol_results(symbols)
+                if cached_signals:
                     logger.info(f"Using cached ML signals for {len(cached_signals)} symbols")
-                    return cached_signals
             
-            # Generate new signals if cache miss or cache disabled
-            logger.info(f"Generating new ML signals for {len(symbols)} symbols")
-            results = []
+            generated_signals: Dict[str, Dict[str, Any]] = {}
+            if symbols_to_generate:
+                logger.info(f"Generating new ML signals for {len(symbols_to_generate)} symbols")
+                batch = await self.generate_ml_signals_batch(symbols_to_generate)
+                generated_signals = {
+                    symbol: signals for symbol, signals in batch['signals'].items()
+                    if 'error' not in signals
+                }
+                cascade_ml_cache.save_symbol_results(generated_signals)
             
+            results = []
             for symbol in symbols:
-                signals = await self.generate_ml_signals(symbol)
-                if 'error' not in signals:
-                    results.append({
-                        'symbol': symbol,
-                        'ensemble_signal': signals.get('ml_ensemble_signal', 'HOLD'),
-                        'price_signal': signals.get('ml_price_signal', 'HOLD'),
-                        'sentiment_signal': signals.get('ml_sentiment_signal', 'HOLD'),
-                        'technical_signal': signals.get('ml_technical_signal', 'HOLD'),
-                        'risk_level': signals.get('ml_risk_level', 'UNKNOWN'),
-                        'confidence': round(np.mean([
-                            signals.get('ml_price_confidence', 0.5),
-                            signals.get('ml_sentiment_confidence', 0.5),
-                            signals.get('ml_technical_confidence', 0.5)
-                        ]), 2),
-                        'data_points': signals.get('data_points', 0),
-                        'timestamp': signals.get('timestamp', ''),
-                        'price_prediction': signals.get('ml_price_prediction'),
-                        'sentiment': signals.get('ml_sentiment'),
-                        'sentiment_score': signals.get('ml_sentiment_score'),
-                        'sentiment_confidence': signals.get('ml_sentiment_confidence'),
-                        'price_confidence': signals.get('ml_price_confidence'),
-                        'technical_confidence': signals.get('ml_technical_confidence')
-                    })
+                signals = cached_signals.get(symbol) or generated_signals.get(symbol)
+                if signals is not None:
+                    results.append(self._summary_row(symbol, signals))
             
             signals_df = pd.DataFrame(results)
             
-            # Save to cache
-            if not signals_df.empty:
-                ml_cache_manager.save_ml_signals(signals_df)
-                logger.info(f"Saved {len(signals_df)} ML signals to cache")
+            # Save freshly generated signals to the signals table
+            generated_df = signals_df[signals_df['symbol'].isin(generated_signals)] if not signals_df.empty else signals_df
+            if not generated_df.empty:
+                ml_cache_manager.save_ml_signals(generated_df)
+                logger.info(f"Saved {len(generated_df)} ML signals to cache")
             
             return signals_df
             
@@ -344,6 +457,31 @@ class MLSignalGenerator:
             logger.error(f"Error getting ML signal summary: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def _summary_row(symbol: str, signals: Dict[str, Any]) -> Dict[str, Any]:
+        """One row of :meth:`get_ml_signal_summary`."""
+        return {
+            'symbol': symbol,
+            'ensemble_signal': signals.get('ml_ensemble_signal', 'HOLD'),
+            'price_signal': signals.get('ml_price_signal', 'HOLD'),
+            'sentiment_signal': signals.get('ml_sentiment_signal', 'HOLD'),
+            'technical_signal': signals.get('ml_technical_signal', 'HOLD'),
+            'risk_level': signals.get('ml_risk_level', 'UNKNOWN'),
+            'confidence': round(np.mean([
+                signals.get('ml_price_confidence', 0.5),
+                signals.get('ml_sentiment_confidence', 0.5),
+                signals.get('ml_technical_confidence', 0.5)
+            ]), 2),
+            'data_points': signals.get('data_points', 0),
+            'timestamp': signals.get('timestamp', ''),
+            'price_prediction': signals.get('ml_price_prediction'),
+            'sentiment': signals.get('ml_sentiment'),
+            'sentiment_score': signals.get('ml_sentiment_score'),
+            'sentiment_confidence': signals.get('ml_sentiment_confidence'),
+            'price_confidence': signals.get('ml_price_confidence'),
+            'technical_confidence': signals.get('ml_technical_confidence')
+        }
+    
     async def _send_ml_notifications(self, symbol: str, signals: Dict[str, Any]) -> None:
         """Send ML notifications for worthy signals.
         
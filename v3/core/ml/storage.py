@@ -8,6 +8,8 @@ import os
 import json
 import sqlite3
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple, Union
 from pathlib import Path
@@ -27,7 +29,17 @@ except ImportError:
     PICKLE_AVAILABLE = False
     logging.warning("pickle not available")
 
-from core.database import get_connection
+from core.database import ensure_ml_training_history_columns, get_connection
+from .artifacts import (
+    ARTIFACT_FORMAT_VERSION,
+    artifact_paths,
+    estimate_model_bytes,
+    load_predictor_artifact,
+    remove_stale_weights,
+    remove_unreferenced_weights,
+    save_predictor_artifact,
+    supports_artifact,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,14 +47,19 @@ logger = logging.getLogger(__name__)
 class MLModelStorage:
     """Гибридная система хранения ML моделей."""
     
-    def __init__(self, db_path: str = "stock_data.db", cache_dir: str = "models/"):
+    def __init__(self, db_path: str = "stock_data.db", cache_dir: str = "models/",
+                 cache_max_bytes: int = 512 * 1024 * 1024):
         self.db_path = db_path
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         
-        # Кэш в памяти для быстрого доступа
-        self.memory_cache = {}
+        # LRU-кэш в памяти: key -> (model, metadata, size_bytes)
+        self.memory_cache: "OrderedDict[str, Tuple[Any, Dict[str, Any], int]]" = OrderedDict()
         self.cache_max_size = 50  # Максимум моделей в памяти
+        self.cache_max_bytes = cache_max_bytes  # Бюджет памяти под веса моделей
+        self._cache_bytes = 0
+        self._cache_lock = threading.RLock()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'file_loads': 0, 'migrations': 0}
         
         # Настройки по умолчанию для разных таймфреймов
         self.timeframe_configs = {
@@ -87,30 +104,41 @@ class MLModelStorage:
         cache_key = f"{symbol}_{model_type}_{timeframe}"
         
         # 1. Проверяем кэш в памяти
-        if cache_key in self.memory_cache:
-            model, metadata = self.memory_cache[cache_key]
-            if not self._is_model_expired(metadata, timeframe):
-                logger.debug(f"Model {cache_key} loaded from memory cache")
-                return model, metadata
-            else:
+        with self._cache_lock:
+            entry = self.memory_cache.get(cache_key)
+            if entry is not None:
+                model, metadata, _ = entry
+                if not self._is_model_expired(metadata, timeframe):
+                    self.memory_cache.move_to_end(cache_key)
+                    self.cache_stats['hits'] += 1
+                    logger.debug(f"Model {cache_key} loaded from memory cache")
+                    return model, metadata
                 # Удаляем устаревшую модель из кэша
-                del self.memory_cache[cache_key]
+                self._drop_from_memory_cache(cache_key)
+            self.cache_stats['misses'] += 1
         
-        # 2. Загружаем из файла
-        model_path = self.cache_dir / f"{symbol}_{model_type}_{timeframe}.pkl"
-        if model_path.exists():
+        # 2. Загружаем из файла: сначала артефакт, затем устаревший .pkl
+        base_path = self.cache_dir / cache_key
+        manifest_path, _ = artifact_paths(base_path)
+        legacy_path = base_path.with_suffix('.pkl')
+        if manifest_path.exists() or legacy_path.exists():
             try:
-                model = self._load_model_from_file(model_path)
                 metadata = self._get_model_metadata(symbol, model_type, timeframe)
                 
                 if metadata and not self._is_model_expired(metadata, timeframe):
+                    if manifest_path.exists():
+                        model, _ = load_predictor_artifact(manifest_path)
+                    else:
+                        model = self._load_model_from_file(legacy_path)
+                        self._migrate_legacy_file(legacy_path, model, metadata)
+                    self.cache_stats['file_loads'] += 1
                     # Сохраняем в кэш памяти
                     self._add_to_memory_cache(cache_key, model, metadata)
                     logger.debug(f"Model {cache_key} loaded from file")
                     return model, metadata
                 else:
-                    # Модель устарела, удаляем файл
-                    model_path.unlink()
+                    # Модель устарела, удаляем файлы
+                    self._remove_model_files(base_path)
                     logger.info(f"Expired model {cache_key} removed from file system")
             except Exception as e:
                 logger.error(f"Error loading model {cache_key} from file: {e}")
@@ -136,11 +164,23 @@ class MLModelStorage:
         Returns:
             Метаданные сохраненной модели
         """
-        model_path = self.cache_dir / f"{symbol}_{model_type}_{timeframe}.pkl"
+        base_path = self.cache_dir / f"{symbol}_{model_type}_{timeframe}"
+        # Прежняя версия держит свой файл весов отображённым в память
+        self.invalidate_memory_cache(symbol, model_type, timeframe)
         
-        # 1. Сохраняем модель в файл
+        # 1. Сохраняем модель в файл: torch-предсказатели — артефактом, остальное — pickle
         try:
-            self._save_model_to_file(model, model_path)
+            if supports_artifact(model):
+                save_predictor_artifact(model, base_path)
+                model_path, _ = artifact_paths(base_path)
+                model_version = str(ARTIFACT_FORMAT_VERSION)
+                legacy_path = base_path.with_suffix('.pkl')
+                if legacy_path.exists():
+                    legacy_path.unlink()
+            else:
+                model_path = base_path.with_suffix('.pkl')
+                self._save_model_to_file(model, model_path)
+                model_version = '1.0'
             logger.info(f"Model {symbol}_{model_type}_{timeframe} saved to file")
         except Exception as e:
             logger.error(f"Error saving model to file: {e}")
@@ -164,7 +204,7 @@ class MLModelStorage:
             'hidden_size': training_metrics.get('hidden_size', 50) if training_metrics else 50,
             'features_used': json.dumps(training_metrics.get('features_used', [])) if training_metrics else '[]',
             'hyperparameters': json.dumps(hyperparameters) if hyperparameters else '{}',
-            'model_version': '1.0',
+            'model_version': model_version,
             'is_active': True
         }
         
@@ -227,6 +267,64 @@ class MLModelStorage:
         finally:
             conn.close()
     
+    def get_predictions_bulk(self, symbols: List[str], prediction_type: str,
+                             timeframe: str = '1d') -> Dict[str, Dict[str, Any]]:
+        """Получить актуальные кэшированные предсказания для многих символов одним запросом."""
+        found: Dict[str, Dict[str, Any]] = {}
+        if not symbols:
+            return found
+        conn = get_connection(self.db_path)
+        try:
+            now = datetime.now().isoformat()
+            for start in range(0, len(symbols), 500):
+                chunk = symbols[start:start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cursor = conn.execute(f"""
+                    SELECT symbol, prediction_value, confidence, input_data, prediction_date
+                    FROM ml_predictions_cache
+                    WHERE symbol IN ({placeholders}) AND prediction_type = ? AND timeframe = ?
+                    AND expires_at > ?
+                    ORDER BY prediction_date
+                """, (*chunk, prediction_type, timeframe, now))
+                # Более поздние строки перезаписывают ранние — остаётся последнее предсказание
+                for symbol, value, confidence, input_data, date in cursor.fetchall():
+                    found[symbol] = {
+                        'prediction': value,
+                        'confidence': confidence,
+                        'input_data': json.loads(input_data) if input_data else {},
+                        'date': date
+                    }
+            return found
+        finally:
+            conn.close()
+    
+    def save_predictions_bulk(self, predictions: List[Tuple[str, float, float]], prediction_type: str,
+                              timeframe: str = '1d') -> None:
+        """Сохранить предсказания ``(symbol, prediction, confidence)`` одним executemany."""
+        if not predictions:
+            return
+        config = self.timeframe_configs.get(timeframe, self.timeframe_configs['1d'])
+        now = datetime.now()
+        expires_at = (now + timedelta(minutes=config['prediction_cache_minutes'])).isoformat()
+        prediction_date = now.isoformat()
+        
+        conn = get_connection(self.db_path)
+        try:
+            conn.execute("BEGIN")
+            conn.executemany("""
+                INSERT OR REPLACE INTO ml_predictions_cache
+                (symbol, prediction_type, timeframe, prediction_value, confidence, 
+                 input_data, prediction_date, expires_at)
+                VALUES (?, ?, ?, ?, ?, '{}', ?, ?)
+            """, [
+                (symbol, prediction_type, timeframe, float(prediction), float(confidence),
+                 prediction_date, expires_at)
+                for symbol, prediction, confidence in predictions
+            ])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    
     def get_active_models(self, timeframe: Optional[str] = None) -> pd.DataFrame:
         """Получить список активных моделей."""
         conn = get_connection(self.db_path)
@@ -260,6 +358,7 @@ class MLModelStorage:
         """Получить историю обучения."""
         conn = get_connection(self.db_path)
         try:
+            ensure_ml_training_history_columns(conn)
             conditions = []
             params = []
             
@@ -277,7 +376,8 @@ class MLModelStorage:
             query = f"""
                 SELECT symbol, model_type, timeframe, training_start, training_end,
                        duration_seconds, data_points, epochs_trained, final_accuracy,
-                       final_loss, training_status, error_message
+                       final_loss, training_status, error_message,
+                       cpu_seconds, peak_rss_mb, torch_threads, worker_pid
                 FROM ml_training_history 
                 {where_clause}
                 ORDER BY training_start DESC
@@ -293,8 +393,9 @@ class MLModelStorage:
         """Очистить устаревшие модели."""
         cleaned_count = 0
         
-        # Очистка файлов
-        for model_file in self.cache_dir.glob("*.pkl"):
+        # Очистка файлов (артефакты и устаревшие .pkl)
+        model_files = list(self.cache_dir.glob("*.pkl")) + list(self.cache_dir.glob("*.json"))
+        for model_file in model_files:
             try:
                 # Извлекаем информацию из имени файла
                 parts = model_file.stem.split('_')
@@ -304,24 +405,28 @@ class MLModelStorage:
                     # Проверяем метаданные в БД
                     metadata = self._get_model_metadata(symbol, model_type, timeframe)
                     if metadata and self._is_model_expired(metadata, timeframe):
-                        model_file.unlink()
+                        self._remove_model_files(model_file.with_suffix(''))
                         cleaned_count += 1
                         logger.info(f"Expired model file removed: {model_file}")
             except Exception as e:
                 logger.error(f"Error cleaning up model file {model_file}: {e}")
         
-        # Очистка кэша в памяти
-        expired_keys = []
-        for key, (model, metadata) in self.memory_cache.items():
-            parts = key.split('_')
-            if len(parts) >= 3:
-                timeframe = '_'.join(parts[2:])
-                if self._is_model_expired(metadata, timeframe):
-                    expired_keys.append(key)
+        # Версии весов, которые не удалось удалить раньше, пока они были отображены в память
+        cleaned_count += remove_unreferenced_weights(self.cache_dir)
         
-        for key in expired_keys:
-            del self.memory_cache[key]
-            cleaned_count += 1
+        # Очистка кэша в памяти
+        with self._cache_lock:
+            expired_keys = []
+            for key, (model, metadata, _) in self.memory_cache.items():
+                parts = key.split('_')
+                if len(parts) >= 3:
+                    timeframe = '_'.join(parts[2:])
+                    if self._is_model_expired(metadata, timeframe):
+                        expired_keys.append(key)
+            
+            for key in expired_keys:
+                self._drop_from_memory_cache(key)
+                cleaned_count += 1
         
         # Очистка кэша предсказаний
         conn = get_connection(self.db_path)
@@ -363,7 +468,7 @@ class MLModelStorage:
             cursor = conn.execute("""
                 SELECT * FROM ml_models 
                 WHERE symbol = ? AND model_type = ? AND timeframe = ?
-                ORDER BY training_date DESC LIMIT 1
+                ORDER BY training_date DESC, id DESC LIMIT 1
             """, (symbol, model_type, timeframe))
             
             result = cursor.fetchone()
@@ -414,14 +519,96 @@ class MLModelStorage:
             return True
     
     def _add_to_memory_cache(self, key: str, model: Any, metadata: Dict[str, Any]) -> None:
-        """Добавить модель в кэш памяти."""
-        # Если кэш переполнен, удаляем самую старую модель
-        if len(self.memory_cache) >= self.cache_max_size:
-            oldest_key = min(self.memory_cache.keys(), 
-                           key=lambda k: self.memory_cache[k][1].get('training_date', ''))
-            del self.memory_cache[oldest_key]
-        
-        self.memory_cache[key] = (model, metadata)
+        """Добавить модель в LRU-кэш памяти с учётом бюджета в байтах."""
+        size = estimate_model_bytes(model)
+        with self._cache_lock:
+            self._drop_from_memory_cache(key)
+            self.memory_cache[key] = (model, metadata, size)
+            self._cache_bytes += size
+            # Вытесняем давно не использовавшиеся модели, но не только что добавленную
+            while len(self.memory_cache) > 1 and (
+                len(self.memory_cache) > self.cache_max_size
+                or self._cache_bytes > self.cache_max_bytes
+            ):
+                oldest_key = next(iter(self.memory_cache))
+                self._drop_from_memory_cache(oldest_key)
+                self.cache_stats['evictions'] += 1
+    
+    def _drop_from_memory_cache(self, key: str) -> None:
+        entry = self.memory_cache.pop(key, None)
+        if entry is not None:
+            self._cache_bytes -= entry[2]
+    
+    def invalidate_memory_cache(self, symbol: str, model_type: str = 'lstm', timeframe: str = '1d') -> None:
+        """Сбросить модель из кэша памяти (например, после обучения в другом процессе)."""
+        with self._cache_lock:
+            self._drop_from_memory_cache(f"{symbol}_{model_type}_{timeframe}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Метрики кэша моделей в памяти."""
+        with self._cache_lock:
+            lookups = self.cache_stats['hits'] + self.cache_stats['misses']
+            return {
+                **self.cache_stats,
+                'hit_rate': self.cache_stats['hits'] / lookups if lookups else 0.0,
+                'models': len(self.memory_cache),
+                'bytes': self._cache_bytes,
+                'max_bytes': self.cache_max_bytes,
+                'max_models': self.cache_max_size
+            }
+    
+    def _remove_model_files(self, base_path: Path) -> None:
+        """Удалить все файлы модели (артефакт и устаревший .pkl)."""
+        with self._cache_lock:
+            self._drop_from_memory_cache(base_path.name)
+        manifest_path, _ = artifact_paths(base_path)
+        for path in (manifest_path, base_path.with_suffix('.pkl')):
+            if path.exists():
+                path.unlink()
+        remove_stale_weights(base_path)
+    
+    def _migrate_legacy_file(self, legacy_path: Path, model: Any,
+                             metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Переписать pickle-модель в формат артефакта и удалить .pkl."""
+        if not supports_artifact(model):
+            return False
+        base_path = legacy_path.with_suffix('')
+        with self._cache_lock:
+            self._drop_from_memory_cache(base_path.name)
+        save_predictor_artifact(model, base_path)
+        legacy_path.unlink()
+        self.cache_stats['migrations'] += 1
+        # Строка новой версии с той же training_date выбирается по большему id
+        if metadata:
+            metadata = dict(metadata)
+            metadata['model_path'] = str(artifact_paths(base_path)[0])
+            metadata['model_version'] = str(ARTIFACT_FORMAT_VERSION)
+            try:
+                self._save_model_metadata(metadata)
+            except Exception as e:
+                logger.error(f"Error updating metadata for migrated model {legacy_path.stem}: {e}")
+        logger.info(f"Migrated legacy model {legacy_path.name} to artifact format")
+        return True
+    
+    def migrate_legacy_models(self) -> Dict[str, int]:
+        """Перевести все .pkl модели каталога в формат артефактов."""
+        summary = {'migrated': 0, 'skipped': 0, 'failed': 0}
+        for legacy_path in sorted(self.cache_dir.glob("*.pkl")):
+            try:
+                model = self._load_model_from_file(legacy_path)
+                parts = legacy_path.stem.split('_')
+                metadata = None
+                if len(parts) >= 3:
+                    metadata = self._get_model_metadata(parts[0], parts[1], '_'.join(parts[2:]))
+                if self._migrate_legacy_file(legacy_path, model, metadata):
+                    summary['migrated'] += 1
+                else:
+                    summary['skipped'] += 1
+            except Exception as e:
+                summary['failed'] += 1
+                logger.error(f"Error migrating model file {legacy_path}: {e}")
+        logger.info(f"Legacy model migration: {summary}")
+        return summary
 
 
 # Глобальный экземпляр для использования в приложении
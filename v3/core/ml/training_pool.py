@@ -0,0 +1,287 @@
+"""
+Пул процессов для параллельного обучения моделей по многим символам.
+
+Каждый воркер получает фиксированное число потоков torch (intra-op), чтобы
+N параллельных обучений не делили между собой все ядра машины.  Задачи
+отправляются в пул в порядке убывания оценочной стоимости
+(``data_points × epochs``): свободный воркер забирает следующую по тяжести
+задачу из общей очереди, поэтому длинные обучения стартуют первыми и не
+остаются «хвостом» в конце прогона.
+"""
+
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Совпадает с LIMIT в MLModelManager._get_stock_data_from_db
+MAX_TRAINING_ROWS = 1000
+
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+@dataclass
+class TrainingJob:
+    """Одна задача обучения модели."""
+    symbol: str
+    model_type: str = 'lstm'
+    timeframe: str = '1d'
+    data_points: int = MAX_TRAINING_ROWS
+    epochs: int = 100
+
+    @property
+    def estimated_cost(self) -> int:
+        return self.data_points * self.epochs
+
+
+@dataclass
+class TrainingPoolConfig:
+    """Настройки пула обучения."""
+    max_workers: Optional[int] = None      # None -> cpu_count // threads_per_worker
+    threads_per_worker: int = 1            # torch.set_num_threads в каждом воркере
+    mp_context: str = 'spawn'              # fork небезопасен после инициализации torch
+    timeout_seconds: float = 3600.0        # Общий таймаут прогона
+
+    def resolved_workers(self) -> int:
+        if self.max_workers:
+            return max(1, self.max_workers)
+        cpus = os.cpu_count() or 1
+        return max(1, cpus // max(1, self.threads_per_worker))
+
+
+@dataclass
+class TrainingRunReport:
+    """Итоги прогона пула."""
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    workers: int = 1
+
+    @property
+    def successful(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r.get('success')]
+
+    @property
+    def failed(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if not r.get('success')]
+
+    @property
+    def jobs_per_minute(self) -> float:
+        if self.wall_seconds <= 0:
+            return 0.0
+        return len(self.results) * 60.0 / self.wall_seconds
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(r.get('cpu_seconds') or 0.0 for r in self.results)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'jobs': len(self.results),
+            'successful': len(self.successful),
+            'failed': len(self.failed),
+            'workers': self.workers,
+            'wall_seconds': round(self.wall_seconds, 2),
+            'cpu_seconds': round(self.cpu_seconds, 2),
+            'jobs_per_minute': round(self.jobs_per_minute, 2),
+        }
+
+
+def pin_worker_threads(threads: int) -> None:
+    """Ограничить число потоков BLAS/torch в текущем процессе."""
+    threads = max(1, int(threads))
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Межоперационный пул уже запущен в этом процессе
+        pass
+
+
+def _run_training_job(job: TrainingJob) -> Dict[str, Any]:
+    """Точка входа воркера: обучить одну модель и вернуть сводку."""
+    from .model_manager import ml_model_manager
+
+    started = time.perf_counter()
+    result: Dict[str, Any] = {
+        'symbol': job.symbol,
+        'model_type': job.model_type,
+        'timeframe': job.timeframe,
+        'estimated_cost': job.estimated_cost,
+        'worker_pid': os.getpid(),
+    }
+    try:
+        model, metadata = ml_model_manager._train_model(
+            job.symbol, job.model_type, job.timeframe, epochs=job.epochs
+        )
+        result['success'] = model is not None
+        result['metadata'] = metadata
+        if model is None:
+            result['error'] = 'Model training returned None'
+    except Exception as e:
+        result['success'] = False
+        result['error'] = str(e)
+    result['duration_seconds'] = time.perf_counter() - started
+    result.update(ml_model_manager.last_training_resources)
+    return result
+
+
+def estimate_data_points(symbols: Iterable[str], db_path: str = "stock_data.db",
+                         timeframe: str = '1d') -> Dict[str, int]:
+    """Число строк таблицы таймфрейма по символам одним запросом (с учётом LIMIT загрузки)."""
+    from ..multi_timeframe_db import get_timeframe_table_name
+
+    symbols = list(symbols)
+    counts = {symbol: 0 for symbol in symbols}
+    if not symbols or not Path(db_path).exists():
+        return counts
+    table = get_timeframe_table_name(timeframe)
+    conn = sqlite3.connect(db_path)
+    try:
+        for start in range(0, len(symbols), 500):
+            chunk = symbols[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            cursor = conn.execute(
+                f"SELECT symbol, COUNT(*) FROM {table} WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                chunk,
+            )
+            for symbol, count in cursor.fetchall():
+                counts[symbol] = min(int(count), MAX_TRAINING_ROWS)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not estimate training data size: {e}")
+    finally:
+        conn.close()
+    return counts
+
+
+class TrainingPool:
+    """Процессный пул обучения с упорядочиванием задач по стоимости."""
+
+    def __init__(self, config: Optional[TrainingPoolConfig] = None,
+                 job_runner: Optional[Callable[[TrainingJob], Dict[str, Any]]] = None):
+        self.config = config or TrainingPoolConfig()
+        # Функция уровня модуля: в spawn-воркер она передаётся через pickle
+        self.job_runner = job_runner or _run_training_job
+
+    def build_jobs(self, symbols: Iterable[str], model_type: str = 'lstm',
+                   timeframe: str = '1d', db_path: str = "stock_data.db",
+                   epochs: Optional[int] = None) -> List[TrainingJob]:
+        """Создать задачи, оценив объём данных каждого символа."""
+        if epochs is None:
+            from .model_manager import ml_model_manager
+            tf_config = ml_model_manager.timeframe_configs.get(
+                timeframe, ml_model_manager.timeframe_configs['1d']
+            )
+            epochs = tf_config['epochs']
+        counts = estimate_data_points(symbols, db_path, timeframe)
+        return [
+            TrainingJob(symbol, model_type, timeframe, data_points=count, epochs=epochs)
+            for symbol, count in counts.items()
+        ]
+
+    def run(self, jobs: Iterable[TrainingJob]) -> TrainingRunReport:
+        """Обучить все задачи; самые тяжёлые отправляются первыми."""
+        ordered = sorted(jobs, key=lambda job: job.estimated_cost, reverse=True)
+        workers = min(self.config.resolved_workers(), max(1, len(ordered)))
+        report = TrainingRunReport(workers=workers)
+        if not ordered:
+            return report
+
+        started = time.perf_counter()
+        if workers == 1:
+            report.results = [self.job_runner(job) for job in ordered]
+        else:
+            try:
+                report.results = self._run_in_processes(ordered, workers)
+            except (OSError, NotImplementedError) as e:
+                # Нет поддержки multiprocessing (песочница, ограниченный /dev/shm)
+                logger.warning(f"Process pool unavailable, training inline: {e}")
+                report.workers = 1
+                report.results = [self.job_runner(job) for job in ordered]
+        report.wall_seconds = time.perf_counter() - started
+
+        logger.info(f"Training pool finished: {report.summary()}")
+        return report
+
+    def _run_in_processes(self, ordered: List[TrainingJob], workers: int) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        context = multiprocessing.get_context(self.config.mp_context)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=pin_worker_threads,
+            initargs=(self.config.threads_per_worker,),
+        )
+        # ProcessPoolExecutor держит в очереди не больше workers + 1 задач,
+        # поэтому порядок отправки и есть порядок старта.
+        futures = {executor.submit(self.job_runner, job): job for job in ordered}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=self.config.timeout_seconds):
+                pending.discard(future)
+                job = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # Воркер упал, не дойдя до записи в историю обучения
+                    results.append(_failed_result(job, str(e), record=True))
+        except FuturesTimeout:
+            logger.warning(f"Training pool timeout after {self.config.timeout_seconds}s, "
+                           f"terminating {len(pending)} unfinished jobs")
+            # Выход из with ProcessPoolExecutor ждал бы работающие задачи:
+            # отменяем очередь и останавливаем воркеров сами
+            _terminate_executor(executor)
+            for future in pending:
+                results.append(_failed_result(futures[future], 'Training pool timeout',
+                                              status='cancelled', record=True))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+
+def _failed_result(job: TrainingJob, error: str, status: str = 'failed',
+                   record: bool = False) -> Dict[str, Any]:
+    """Сводка неуспешной задачи; ``record`` закрывает её строку в истории обучения."""
+    if record:
+        from .model_manager import ml_model_manager
+        now = datetime.now().isoformat()
+        try:
+            ml_model_manager._record_training_history(
+                job.symbol, job.model_type, job.timeframe,
+                {'training_start': now, 'training_end': now}, status, error,
+            )
+        except Exception as e:
+            logger.warning(f"Could not record {status} training of {job.symbol}: {e}")
+    return {
+        'symbol': job.symbol,
+        'model_type': job.model_type,
+        'timeframe': job.timeframe,
+        'success': False,
+        'error': error,
+    }
+
+
+def _terminate_executor(executor: ProcessPoolExecutor) -> None:
+    """Отменить ожидающие задачи и завершить процессы воркеров, не дожидаясь их."""
+    # Публичного API для остановки воркеров нет до Python 3.14; shutdown()
+    # обнуляет _processes, поэтому список процессов берётся до него
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=5)
@@ -14,6 +14,7 @@ import time
 
 from .model_manager import ml_model_manager
 from .storage import ml_storage
+from .training_pool import TrainingPool, TrainingPoolConfig, TrainingRunReport
 from core.database import get_connection
 
 logger = logging.getLogger(__name__)
@@ -22,9 +23,13 @@ logger = logging.getLogger(__name__)
 class MLTrainingScheduler:
     """Планировщик обучения ML моделей."""
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, threads_per_worker: int = 1):
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Обучение идёт в отдельных процессах с фиксированным числом потоков torch
+        self.training_pool = TrainingPool(TrainingPoolConfig(
+            max_workers=max_workers, threads_per_worker=threads_per_worker
+        ))
         self.is_running = False
         self.training_tasks = {}
         
@@ -157,45 +162,46 @@ class MLTrainingScheduler:
             return True
     
     async def _train_models_batch(self, symbols: List[str], timeframe: str, batch_size: int) -> None:
-        """Обучить модели батчами."""
-        for i in range(0, len(symbols), batch_size):
-            batch = symbols[i:i + batch_size]
-            
-            # Обучаем модели параллельно
-            futures = []
-            for symbol in batch:
-                future = self.executor.submit(
-                    self._train_single_model, symbol, 'lstm', timeframe
-                )
-                futures.append((symbol, future))
+        """Обучить модели в пуле процессов.
+
+        ``batch_size`` больше не дробит список: пул сам раздаёт задачи
+        освободившимся воркерам, начиная с самых тяжёлых.
+        """
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(
+            self.executor, self._run_training_pool, symbols, 'lstm', timeframe
+        )
+        for result in report.results:
+            symbol = result['symbol']
+            if result.get('success'):
+                logger.info(f"Successfully trained {symbol} ({timeframe}) in {result.get('duration_seconds', 0.0):.1f}s")
+            else:
+                logger.error(f"Failed to train {symbol} ({timeframe}): {result.get('error', 'Unknown error')}")
+    
+    def _run_training_pool(self, symbols: List[str], model_type: str, timeframe: str) -> TrainingRunReport:
+        """Прогнать символы через пул и обновить статистику."""
+        jobs = self.training_pool.build_jobs(symbols, model_type, timeframe, db_path=ml_model_manager.db_path)
+        report = self.training_pool.run(jobs)
+        
+        for result in report.results:
+            # Модель сохранена другим процессом — кэш памяти этого процесса устарел
+            ml_storage.invalidate_memory_cache(result['symbol'], model_type, timeframe)
             
-            # Ждем завершения батча
-            for symbol, future in futures:
-                try:
-                    start_time = time.time()
-                    result = future.result(timeout=300)  # 5 минут таймаут
-                    training_time = time.time() - start_time
-                    
-                    if result['success']:
-                        self.training_stats['successful_trainings'] += 1
-                        logger.info(f"Successfully trained {symbol} ({timeframe}) in {training_time:.1f}s")
-                    else:
-                        self.training_stats['failed_trainings'] += 1
-                        logger.error(f"Failed to train {symbol} ({timeframe}): {result.get('error', 'Unknown error')}")
-                    
-                    self.training_stats['total_trainings'] += 1
-                    self.training_stats['last_training'] = datetime.now().isoformat()
-                    
-                    # Обновляем среднее время обучения
-                    total_time = self.training_stats['average_training_time'] * (self.training_stats['total_trainings'] - 1)
-                    self.training_stats['average_training_time'] = (total_time + training_time) / self.training_stats['total_trainings']
-                    
-                except Exception as e:
-                    self.training_stats['failed_trainings'] += 1
-                    logger.error(f"Error training {symbol} ({timeframe}): {e}")
+            if result.get('success'):
+                self.training_stats['successful_trainings'] += 1
+            else:
+                self.training_stats['failed_trainings'] += 1
+            self.training_stats['total_trainings'] += 1
             
-            # Небольшая пауза между батчами
-            await asyncio.sleep(10)
+            # Обновляем среднее время обучения
+            training_time = result.get('duration_seconds', 0.0)
+            total_time = self.training_stats['average_training_time'] * (self.training_stats['total_trainings'] - 1)
+            self.training_stats['average_training_time'] = (total_time + training_time) / self.training_stats['total_trainings']
+        
+        if report.results:
+            self.training_stats['last_training'] = datetime.now().isoformat()
+        self.training_stats['last_pool_run'] = report.summary()
+        return report
     
     def _train_single_model(self, symbol: str, model_type: str, timeframe: str) -> Dict[str, Any]:
         """Обучить одну модель."""
@@ -280,37 +286,19 @@ class MLTrainingScheduler:
             
             logger.info(f"Starting batch training for {len(all_symbols)} symbols ({timeframe})")
             
-            # Обучаем все модели параллельно
-            futures = []
-            for symbol in all_symbols:
-                future = self.executor.submit(
-                    self._train_single_model, symbol, model_type, timeframe
-                )
-                futures.append((symbol, future))
+            report = self._run_training_pool(all_symbols, model_type, timeframe)
             
             # Собираем результаты
             results = {
-                'successful': [],
-                'failed': [],
-                'total': len(all_symbols)
+                'successful': [r['symbol'] for r in report.successful],
+                'failed': [
+                    {'symbol': r['symbol'], 'error': r.get('error', 'Unknown error')}
+                    for r in report.failed
+                ],
+                'total': len(all_symbols),
+                'pool': report.summary()
             }
             
-            for symbol, future in futures:
-                try:
-                    result = future.result(timeout=600)  # 10 минут таймаут
-                    if result['success']:
-                        results['successful'].append(symbol)
-                    else:
-                        results['failed'].append({
-                            'symbol': symbol,
-                            'error': result.get('error', 'Unknown error')
-                        })
-                except Exception as e:
-                    results['failed'].append({
-                        'symbol': symbol,
-                        'error': str(e)
-                    })
-            
             logger.info(f"Batch training completed: {len(results['successful'])} successful, {len(results['failed'])} failed")
             
             return {
@@ -70,9 +70,18 @@ class TinkoffDataProvider(DataProvider):
             'tick': {'days': 0.01, 'max_candles': 1000},  # тик - 15 минут (экспериментально)
         }
     
-    def get_data(self, symbol: str, timeframe: str) -> pd.DataFrame:
-        """Получить данные через Tinkoff API."""
+    def get_data(self, symbol: str, timeframe: str, from_date: Optional[datetime] = None,
+                 to_date: Optional[datetime] = None) -> pd.DataFrame:
+        """Получить данные через Tinkoff API.
+        
+        Без диапазона запрашивается стандартный период таймфрейма. С явным
+        диапазоном (инкрементальная синхронизация) ошибки API пробрасываются,
+        а в результат добавляется колонка is_complete.
+        """
+        explicit_range = from_date is not None
         if not TINKOFF_AVAILABLE or not self.api_key:
+            if explicit_range:
+                raise RuntimeError("Tinkoff API not available")
             logger.warning("Tinkoff API not available")
             return pd.DataFrame(columns=["time", "open", "close", "high", "low", "volume"])
         
@@ -84,6 +93,8 @@ class TinkoffDataProvider(DataProvider):
                 return self._get_high_frequency_data(symbol, timeframe)
             
             if not interval:
+                if explicit_range:
+                    raise ValueError(f"Unsupported timeframe: {timeframe}")
                 logger.error(f"Unsupported timeframe: {timeframe}")
                 return pd.DataFrame(columns=["time", "open", "close", "high", "low", "volume"])
             
@@ -91,8 +102,11 @@ class TinkoffDataProvider(DataProvider):
             period_config = self.data_periods.get(timeframe, self.data_periods['1d'])
             
             with Client(self.api_key) as client:
-                to_date = datetime.now(timezone.utc)
-                from_date = to_date - timedelta(days=period_config['days'])
+                if not explicit_range:
+                    to_date = datetime.now(timezone.utc)
+                    from_date = to_date - timedelta(days=period_config['days'])
+                elif to_date is None:
+                    to_date = datetime.now(timezone.utc)
                 
                 response = client.market_data.get_candles(
                     figi=symbol,  # В данном контексте symbol это FIGI
@@ -103,12 +117,13 @@ class TinkoffDataProvider(DataProvider):
                 
                 candles = getattr(response, "candles", None) or []
                 if not candles:
-                    logger.warning(f"No candles returned for {symbol} with timeframe {timeframe}")
+                    if not explicit_range:  # Пустой диапазон (нет сделок) - штатная ситуация
+                        logger.warning(f"No candles returned for {symbol} with timeframe {timeframe}")
                     return pd.DataFrame(columns=["time", "open", "close", "high", "low", "volume"])
                 
                 # Ограничиваем количество свечей
                 max_candles = period_config['max_candles']
-                if len(candles) > max_candles:
+                if not explicit_range and len(candles) > max_candles:
                     candles = candles[-max_candles:]
                 
                 # Конвертируем в DataFrame
@@ -120,11 +135,15 @@ class TinkoffDataProvider(DataProvider):
                     "low": [quotation_to_decimal(candle.low) for candle in candles],
                     "volume": [candle.volume for candle in candles],
                 })
+                if explicit_range:
+                    data["is_complete"] = [getattr(candle, "is_complete", True) for candle in candles]
                 
                 logger.info(f"Retrieved {len(data)} candles for {symbol} ({timeframe})")
                 return data
                 
         except Exception as e:
+            if explicit_range:
+                raise
             error_msg = str(e)
             if "30014" in error_msg or "maximum request period" in error_msg.lower():
                 logger.warning(f"API period limit exceeded for {symbol} ({timeframe}): {e}")
@@ -338,12 +357,23 @@ class EnhancedMultiTimeframeStockAnalyzer:
             'tick': [self.tinkoff_provider],  # Используем симуляцию
         }
     
-    def get_stock_data(self, figi: str, timeframe: str = '1d') -> pd.DataFrame:
-        """Получить данные акции для указанного таймфрейма."""
+    def get_stock_data(self, figi: str, timeframe: str = '1d', from_date: Optional[datetime] = None,
+                       to_date: Optional[datetime] = None) -> pd.DataFrame:
+        """Получить данные акции для указанного таймфрейма.
+        
+        from_date/to_date запрашивают только заданный диапазон (см. core.candle_sync);
+        в этом режиме ошибки провайдера пробрасываются.
+        """
         if not figi:
             logger.warning("EnhancedMultiTimeframeStockAnalyzer.get_stock_data called with empty FIGI")
             return pd.DataFrame(columns=["time", "open", "close", "high", "low", "volume"])
         
+        if from_date is not None:
+            provider = self.tinkoff_provider
+            if provider is None or not provider.is_available():
+                raise RuntimeError(f"No data provider available for {figi} ({timeframe})")
+            return provider.get_data(figi, timeframe, from_date=from_date, to_date=to_date)
+        
         # Специальная обработка для дневных данных - используем StockAnalyzer как fallback
         if timeframe == '1d' and self.base_analyzer:
             try:
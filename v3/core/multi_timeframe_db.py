@@ -1,11 +1,14 @@
 ﻿"""Helper functions for multi-timeframe database operations."""
 
+import re
 import sqlite3
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
 
+from .timeframe_resampler import get_resampler, is_resampled
+
 logger = logging.getLogger(__name__)
 
 
@@ -132,7 +135,20 @@ def add_multi_timeframe_tables(conn: sqlite3.Connection):
     """)
 
     # 26) РўР°Р±Р»РёС†Р° СЃС‚Р°С‚РёСЃС‚РёРєРё РѕР±РЅРѕРІР»РµРЅРёР№
-    cursor.execute("""
+    ensure_data_update_stats_table(conn)
+    
+    conn.commit()
+    logger.info("Multi-timeframe tables created successfully")
+
+
+def ensure_data_update_stats_table(conn: sqlite3.Connection):
+    """Create data_update_stats; add the watermark column to older databases.
+
+    watermark is the open time of the last complete bar of (symbol, timeframe)
+    already synced from the API, in the ISO format of the candle tables
+    (see core.candle_sync).
+    """
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS data_update_stats (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timeframe TEXT NOT NULL,
@@ -141,31 +157,71 @@ def add_multi_timeframe_tables(conn: sqlite3.Connection):
         update_count INTEGER DEFAULT 1,
         error_count INTEGER DEFAULT 0,
         last_error TEXT,
+        watermark TEXT,
         created_at TEXT DEFAULT CURRENT_TIMESTAMP,
         updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
         UNIQUE(timeframe, symbol)
     );
     """)
-    
-    conn.commit()
-    logger.info("Multi-timeframe tables created successfully")
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(data_update_stats)")}
+    if 'watermark' not in existing:
+        conn.execute("ALTER TABLE data_update_stats ADD COLUMN watermark TEXT")
 
 
 def get_timeframe_data(conn: sqlite3.Connection, symbol: str, timeframe: str, 
                       limit: int = 1000) -> pd.DataFrame:
-    """РџРѕР»СѓС‡РёС‚СЊ РґР°РЅРЅС‹Рµ РґР»СЏ СѓРєР°Р·Р°РЅРЅРѕРіРѕ СЃРёРјРІРѕР»Р° Рё С‚Р°Р№РјС„СЂРµР№РјР°."""
-    table_name = f"data_{timeframe.replace('m', 'min').replace('h', 'hour')}"
+    """РџРѕР»СѓС‡РёС‚СЊ РґР°РЅРЅС‹Рµ РґР»СЏ СѓРєР°Р·Р°РЅРЅРѕРіРѕ СЃРёРјРІРѕР»Р° Рё С‚Р°Р№РјС„СЂРµР№РјР°.
+
+    5m/15m/1h bars are resampled from data_1min (see core.timeframe_resampler);
+    stored bars of the timeframe fill in history older than the 1m data and
+    are used as is when the symbol has no 1m data.
+    """
+    if not is_resampled(timeframe):
+        return _read_timeframe_table(conn, symbol, timeframe, limit)
+
+    try:
+        resampled = get_resampler().get(conn, symbol, timeframe, limit)
+    except Exception as e:
+        logger.error(f"Error resampling {timeframe} data for {symbol}: {e}")
+        resampled = pd.DataFrame()
+    if len(resampled) >= limit:
+        return resampled
+    if resampled.empty:
+        return _read_timeframe_table(conn, symbol, timeframe, limit)
+
+    first, last = resampled['datetime'].iloc[0], resampled['datetime'].iloc[-1]
+    stored = _read_timeframe_table(conn, symbol, timeframe, limit - len(resampled),
+                                   outside=(first.isoformat(), last.isoformat()))
+    if stored.empty:
+        return resampled
+    try:
+        # Resampled bars win inside their range; stored bars outside it are kept
+        # (older history, or newer bars if the 1m data lags behind)
+        outside = stored[(stored['datetime'] < first) | (stored['datetime'] > last)]
+        data = pd.concat([outside, resampled], ignore_index=True)
+        return data.sort_values('datetime').tail(limit).reset_index(drop=True)
+    except TypeError as e:
+        # Stored and 1m datetimes differ in timezone awareness
+        logger.warning(f"Cannot merge stored {timeframe} bars for {symbol}: {e}")
+        return resampled
+
+
+def _read_timeframe_table(conn: sqlite3.Connection, symbol: str, timeframe: str,
+                          limit: int, outside: Optional[tuple] = None) -> pd.DataFrame:
+    table_name = get_timeframe_table_name(timeframe)
+    # outside=(first, last): only rows before first or after last (ISO strings)
+    bounds = "AND (datetime < ? OR datetime > ?)" if outside else ""
     
     query = f"""
         SELECT datetime, open, high, low, close, volume
         FROM {table_name}
-        WHERE symbol = ?
+        WHERE symbol = ? {bounds}
         ORDER BY datetime DESC
         LIMIT ?
     """
     
     try:
-        df = pd.read_sql_query(query, conn, params=(symbol, limit))
+        df = pd.read_sql_query(query, conn, params=(symbol, *(outside or ()), limit))
         if not df.empty:
             df['datetime'] = pd.to_datetime(df['datetime'])
             df = df.sort_values('datetime').reset_index(drop=True)
@@ -180,7 +236,7 @@ def save_timeframe_data(conn: sqlite3.Connection, symbol: str, timeframe: str,
     """РЎРѕС…СЂР°РЅРёС‚СЊ РґР°РЅРЅС‹Рµ С‚Р°Р№РјС„СЂРµР№РјР° РІ Р‘Р”."""
     cursor = conn.cursor()
     
-    table_name = f"data_{timeframe.replace('m', 'min').replace('h', 'hour')}"
+    table_name = get_timeframe_table_name(timeframe)
     
     # РЎРѕР·РґР°РµРј С‚Р°Р±Р»РёС†Сѓ, РµСЃР»Рё РЅРµ СЃСѓС‰РµСЃС‚РІСѓРµС‚
     cursor.execute(f"""
@@ -228,36 +284,62 @@ def get_available_timeframes() -> List[str]:
     return ['1d', '1h', '1m', '5m', '15m', '1s', 'tick']
 
 
+# Timeframe units as written by callers ('1m', '1min', '1h', ...) -> table suffix
+_TIMEFRAME_UNITS = {
+    's': 'sec', 'sec': 'sec',
+    'm': 'min', 'min': 'min',
+    'h': 'hour', 'hour': 'hour',
+    'd': 'd', 'w': 'w',
+}
+_TIMEFRAME_PATTERN = re.compile(r'^(\d+)(sec|min|hour|s|m|h|d|w)$')
+
+
 def get_timeframe_table_name(timeframe: str) -> str:
     """РџРѕР»СѓС‡РёС‚СЊ РёРјСЏ С‚Р°Р±Р»РёС†С‹ РґР»СЏ С‚Р°Р№РјС„СЂРµР№РјР°."""
-    return f"data_{timeframe.replace('m', 'min').replace('h', 'hour')}"
+    match = _TIMEFRAME_PATTERN.match(timeframe)
+    if match is None:
+        # 'tick' and other non-interval timeframes map to their own table
+        return f"data_{timeframe}"
+    count, unit = match.groups()
+    return f"data_{count}{_TIMEFRAME_UNITS[unit]}"
 
 
 def update_data_stats(conn: sqlite3.Connection, symbol: str, timeframe: str, 
-                     success: bool = True, error_message: str = None):
-    """РћР±РЅРѕРІРёС‚СЊ СЃС‚Р°С‚РёСЃС‚РёРєСѓ РѕР±РЅРѕРІР»РµРЅРёСЏ РґР°РЅРЅС‹С…."""
+                     success: bool = True, error_message: str = None,
+                     watermark: Optional[str] = None):
+    """РћР±РЅРѕРІРёС‚СЊ СЃС‚Р°С‚РёСЃС‚РёРєСѓ РѕР±РЅРѕРІР»РµРЅРёСЏ РґР°РЅРЅС‹С….
+
+    The row is upserted, so the sync watermark (see core.candle_sync) is kept
+    unless a new one is passed.
+    """
     cursor = conn.cursor()
     
     now = datetime.now().isoformat()
     
     if success:
         cursor.execute("""
-            INSERT OR REPLACE INTO data_update_stats
-            (timeframe, symbol, last_update, update_count, error_count, last_error, updated_at)
-            VALUES (?, ?, ?, 
-                    COALESCE((SELECT update_count FROM data_update_stats WHERE timeframe = ? AND symbol = ?), 0) + 1,
-                    COALESCE((SELECT error_count FROM data_update_stats WHERE timeframe = ? AND symbol = ?), 0),
-                    NULL, ?)
-        """, (timeframe, symbol, now, timeframe, symbol, timeframe, symbol, now))
+            INSERT INTO data_update_stats
+            (timeframe, symbol, last_update, update_count, error_count, last_error, watermark, updated_at)
+            VALUES (?, ?, ?, 1, 0, NULL, ?, ?)
+            ON CONFLICT(timeframe, symbol) DO UPDATE SET
+                last_update = excluded.last_update,
+                update_count = update_count + 1,
+                last_error = NULL,
+                watermark = COALESCE(excluded.watermark, watermark),
+                updated_at = excluded.updated_at
+        """, (timeframe, symbol, now, watermark, now))
     else:
         cursor.execute("""
-            INSERT OR REPLACE INTO data_update_stats
-            (timeframe, symbol, last_update, update_count, error_count, last_error, updated_at)
-            VALUES (?, ?, ?, 
-                    COALESCE((SELECT update_count FROM data_update_stats WHERE timeframe = ? AND symbol = ?), 0),
-                    COALESCE((SELECT error_count FROM data_update_stats WHERE timeframe = ? AND symbol = ?), 0) + 1,
-                    ?, ?)
-        """, (timeframe, symbol, now, timeframe, symbol, timeframe, symbol, error_message, now))
+            INSERT INTO data_update_stats
+            (timeframe, symbol, last_update, update_count, error_count, last_error, watermark, updated_at)
+            VALUES (?, ?, ?, 0, 1, ?, ?, ?)
+            ON CONFLICT(timeframe, symbol) DO UPDATE SET
+                last_update = excluded.last_update,
+                error_count = error_count + 1,
+                last_error = excluded.last_error,
+                watermark = COALESCE(excluded.watermark, watermark),
+                updated_at = excluded.updated_at
+        """, (timeframe, symbol, now, error_message, watermark, now))
     
     conn.commit()
 
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
 from news_parser.news_parser.config import Config, load_config
+from news_parser.news_parser.dedup import assign_cluster_keys
 from news_parser.news_parser.jobs import run_once
 from news_parser.news_parser.storage import Storage
 from news_parser.news_parser.utils import acquire_db_lock as _acquire_lock_util
@@ -265,11 +266,12 @@ def _build_summary_from_pipeline(storage, target_date: datetime) -> Dict[str, An
     try:
         # Get articles with confirmed tickers for the date range
         sql = """
-            SELECT a.id, a.title, a.body, a.url, a.published_at,
+            SELECT a.id, a.title, a.body, a.url, a.published_at, m.cluster_id,
                    GROUP_CONCAT(DISTINCT t.ticker) AS ticker_symbols
             FROM articles a
             LEFT JOIN news_tickers nt ON nt.news_id = a.id AND nt.confirmed = 1
             LEFT JOIN tickers t ON t.id = nt.ticker_id
+            LEFT JOIN article_minhash m ON m.article_id = a.id
             WHERE a.published_at >= ? AND a.published_at <= ?
             GROUP BY a.id
             ORDER BY a.published_at DESC
@@ -289,6 +291,7 @@ def _build_summary_from_pipeline(storage, target_date: datetime) -> Dict[str, An
                 "body": row["body"] or "",
                 "url": row["url"],
                 "hash": str(row["id"]),  # Use ID as hash
+                "cluster_id": row["cluster_id"],
                 "tickers": tickers,
             })
         
@@ -316,11 +319,10 @@ def _build_summary_from_pipeline(storage, target_date: datetime) -> Dict[str, An
 
 
 def _build_clusters_from_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Build clusters from articles data."""
-    clusters: Dict[str, Dict[str, Any]] = {}
+    """Build clusters of near-duplicate articles."""
+    clusters: Dict[Any, Dict[str, Any]] = {}
     
-    for article in articles:
-        key = article.get("hash") or article.get("title")
+    for article, key in zip(articles, assign_cluster_keys(articles)):
         if key not in clusters:
             clusters[key] = {
                 "headline": article.get("title"),
@@ -0,0 +1,111 @@
+"""In-process cache of the last known price per contract.
+
+Data updaters put the close of the newest candle they save and the real-time
+provider puts every tick and streamed candle. Readers such as demo trading
+valuation take the fresher of a cached quote and the database close.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class PriceQuote:
+    price: float
+    as_of: pd.Timestamp  # UTC, tz-naive; daily closes are stamped at midnight of their date
+    source: str
+
+
+def _timestamp(value) -> pd.Timestamp:
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert("UTC").tz_localize(None)
+    return stamp
+
+
+def fresher(quote: Optional[PriceQuote], other: Optional[PriceQuote]) -> Optional[PriceQuote]:
+    """The more recent of two quotes; ``quote`` wins ties."""
+    if quote is None:
+        return other
+    if other is None:
+        return quote
+    return other if other.as_of > quote.as_of else quote
+
+
+class LastPriceCache:
+    """Thread-safe contract_code -> PriceQuote map.
+
+    The real-time provider only knows FIGIs: quotes for a FIGI without a
+    registered contract code are kept under the FIGI and moved once
+    ``register_figis`` maps it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, PriceQuote] = {}
+        self._figis: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def update(self, key: str, price, as_of, source: str = "") -> bool:
+        """Store a quote unless a newer one is cached; returns True if stored."""
+        if not key or price is None:
+            return False
+        price = float(price)
+        if not price > 0:
+            return False
+        quote = PriceQuote(price, _timestamp(as_of), source)
+        with self._lock:
+            key = self._figis.get(key, key)
+            current = self._quotes.get(key)
+            if current is not None and current.as_of > quote.as_of:
+                return False
+            self._quotes[key] = quote
+            return True
+
+    def update_from_candles(self, key: str, data: pd.DataFrame, source: str = "",
+                            time_col: str = "time", price_col: str = "close") -> bool:
+        """Store the close of the newest candle in a frame."""
+        if data is None or data.empty or time_col not in data.columns or price_col not in data.columns:
+            return False
+        times = pd.to_datetime(data[time_col], errors="coerce", utc=True)
+        if times.isna().all():
+            return False
+        last = times.idxmax()
+        return self.update(key, data.at[last, price_col], times[last], source)
+
+    def register_figis(self, mapping: Mapping[str, str]) -> None:
+        """Register FIGI -> contract_code aliases and move quotes stored under a FIGI."""
+        with self._lock:
+            for figi, contract_code in mapping.items():
+                if not figi or not contract_code:
+                    continue
+                self._figis[figi] = contract_code
+                quote = self._quotes.pop(figi, None)
+                if quote is not None:
+                    self._quotes[contract_code] = fresher(self._quotes.get(contract_code), quote)
+
+    def get(self, contract_code: str) -> Optional[PriceQuote]:
+        return self._quotes.get(contract_code)
+
+    def get_many(self, contract_codes: Iterable[str]) -> Dict[str, PriceQuote]:
+        quotes = self._quotes
+        return {code: quotes[code] for code in contract_codes if code in quotes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+            self._figis.clear()
+
+
+_price_cache = LastPriceCache()
+
+
+def get_price_cache() -> LastPriceCache:
+    """Process-wide price cache."""
+    return _price_cache
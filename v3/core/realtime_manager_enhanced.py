@@ -6,10 +6,11 @@ Enhanced Real-Time Data Manager with real WebSocket support.
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import pandas as pd
 import json
 
+from .bar_events import BarAggregator, BarCloseEvent
 from .tinkoff_websocket_provider import TinkoffWebSocketProvider, create_tinkoff_websocket_provider
 from .multi_timeframe_analyzer_enhanced import get_tinkoff_api_key
 from .database import get_connection
@@ -34,6 +35,10 @@ class EnhancedRealTimeDataManager:
         # Кэш данных в реальном времени
         self.real_time_cache: Dict[str, Dict[str, Any]] = {}
         
+        # Закрытия баров: минутные из потока свечей, секундные из тиков
+        self.bar_aggregator = BarAggregator()
+        self.bar_listeners: List[Callable[[BarCloseEvent], Any]] = []
+        
         # Путь к БД
         self.db_path = "stock_data.db"
         
@@ -160,6 +165,10 @@ class EnhancedRealTimeDataManager:
             
             logger.debug(f"Processed second data for {symbol}: {candle_data}")
             
+            closed = self.bar_aggregator.add_candle(symbol, '1m', candle_data)
+            if closed is not None:
+                await self._emit_bar_close(closed)
+            
             # Сохраняем в БД (таблица data_1s)
             await self._save_real_time_data_to_db(symbol, '1s', candle_data)
             
@@ -184,12 +193,39 @@ class EnhancedRealTimeDataManager:
             
             logger.debug(f"Processed tick data for {symbol}: {tick_data}")
             
+            closed = self.bar_aggregator.add_tick(
+                symbol, '1s', tick_data['time'], tick_data['price'], tick_data.get('volume', 0)
+            )
+            if closed is not None:
+                await self._emit_bar_close(closed)
+            
             # Сохраняем в БД (таблица data_tick)
             await self._save_real_time_data_to_db(symbol, 'tick', tick_data)
             
         except Exception as e:
             logger.error(f"Error handling tick data: {e}")
     
+    def add_bar_listener(self, callback: Callable[[BarCloseEvent], Any]) -> None:
+        """Подписаться на закрытия баров (обычная функция или корутина)."""
+        if callback not in self.bar_listeners:
+            self.bar_listeners.append(callback)
+    
+    def remove_bar_listener(self, callback: Callable[[BarCloseEvent], Any]) -> None:
+        """Отписаться от закрытий баров."""
+        if callback in self.bar_listeners:
+            self.bar_listeners.remove(callback)
+    
+    async def _emit_bar_close(self, event: BarCloseEvent):
+        """Передать закрытый бар подписчикам до записи в БД."""
+        for callback in list(self.bar_listeners):
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(event)
+                else:
+                    callback(event)
+            except Exception as e:
+                logger.error(f"Error in bar close listener for {event.symbol} ({event.timeframe}): {e}")
+    
     async def _handle_orderbook_data(self, orderbook_data: Dict[str, Any]):
         """Обработать данные стакана."""
         try:
@@ -8,7 +8,7 @@ This module provides task scheduling capabilities including:
 - Notifications
 """
 
-from .scheduler import TaskScheduler, TaskStatus
+from .scheduler import TaskScheduler, TaskStatus, ResourceClass
 from .trading_calendar import TradingCalendar, Market
 from .integration import SchedulerIntegration
 from .real_integration import RealSchedulerIntegration
@@ -16,6 +16,7 @@ from .real_integration import RealSchedulerIntegration
 __all__ = [
     "TaskScheduler", 
     "TaskStatus", 
+    "ResourceClass",
     "TradingCalendar", 
     "Market",
     "SchedulerIntegration",
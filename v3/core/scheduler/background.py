@@ -0,0 +1,212 @@
+"""Background scheduler shared by the data updaters.
+
+This module runs a single TaskScheduler on its own event loop thread so
+that synchronous code (the data updaters, Streamlit pages) can register
+jobs, trigger them and signal events without running a polling loop of
+its own.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from .scheduler import TaskScheduler
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock schedule of data updates per timeframe: (interval, alignment offset)
+UPDATE_SCHEDULES = {
+    "1d": (timedelta(days=1), timedelta(hours=18)),  # After market close
+    "1h": (timedelta(hours=1), timedelta(0)),         # Every hour at :00
+    "1m": (timedelta(minutes=1), timedelta(0)),       # Every minute at :00
+    "5m": (timedelta(minutes=5), timedelta(0)),       # Every 5 minutes at :00
+    "15m": (timedelta(minutes=15), timedelta(0)),     # Every 15 minutes at :00
+}
+
+
+def data_updated_event(timeframe: str) -> str:
+    """Event name signalled after new candles of a timeframe are written.
+
+    Args:
+        timeframe: Timeframe code ("1d", "1h", ...)
+
+    Returns:
+        Event name for TaskScheduler.notify
+    """
+    return f"data_updated:{timeframe}"
+
+
+class BackgroundScheduler:
+    """Runs a TaskScheduler on a dedicated event loop thread.
+
+    All methods are safe to call from any thread; calls are executed on
+    the scheduler's loop. The thread starts lazily with the first task.
+    """
+
+    def __init__(self, scheduler: Optional[TaskScheduler] = None):
+        """Initialize the background scheduler.
+
+        Args:
+            scheduler: Scheduler to run; by default one without task timeouts
+                whose I/O tasks run one at a time, like the old updater threads
+        """
+        self.scheduler = scheduler or TaskScheduler(io_workers=1, default_timeout=None)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    def start(self) -> None:
+        """Start the scheduler thread if it is not running."""
+        with self._lock:
+            if self.running:
+                return
+            if self._thread is not None and self._thread.is_alive():
+                # The previous run is still finishing a task
+                self._thread.join()
+            self._stopping = False
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._loop, ready), name="background-scheduler", daemon=True
+            )
+            self._thread.start()
+            ready.wait(timeout=5)
+            logger.info("Background scheduler started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the scheduler thread.
+
+        Args:
+            timeout: Seconds to wait for the thread to finish
+        """
+        with self._lock:
+            if not self.running:
+                return
+            self._stopping = True
+            asyncio.run_coroutine_threadsafe(self.scheduler.stop(), self._loop)
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                # A running update holds the loop until it returns
+                logger.warning("Background scheduler is still finishing a running task")
+                return
+            self._thread = None
+            logger.info("Background scheduler stopped")
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_until_complete(self.scheduler.start())
+        finally:
+            loop.close()
+
+    def _call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a scheduler method on its loop thread and return the result."""
+        if not self.running or threading.current_thread() is self._thread:
+            return func(*args, **kwargs)
+
+        async def invoke():
+            return func(*args, **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(invoke(), self._loop).result()
+
+    def add_task(self, name: str, func: Callable, interval: timedelta, **kwargs) -> None:
+        """Add a task (see TaskScheduler.add_task) and make sure the thread runs.
+
+        Args:
+            name: Unique task name
+            func: Function to execute
+            interval: Time interval between executions
+            **kwargs: Other TaskScheduler.add_task arguments
+        """
+        self._call(self.scheduler.add_task, name, func, interval, **kwargs)
+        self.start()
+
+    def remove_task(self, name: str) -> None:
+        """Remove a task.
+
+        Args:
+            name: Task name to remove
+        """
+        self._call(self.scheduler.remove_task, name)
+
+    def trigger_task(self, name: str) -> bool:
+        """Make a task due immediately.
+
+        Args:
+            name: Task name to trigger
+
+        Returns:
+            True if the task exists and is enabled
+        """
+        return self._call(self.scheduler.trigger_task, name)
+
+    def notify(self, event: str) -> List[str]:
+        """Signal an external event to subscribed tasks.
+
+        Args:
+            event: Event name, e.g. data_updated_event("1d")
+
+        Returns:
+            Names of triggered tasks
+        """
+        return self._call(self.scheduler.notify, event)
+
+    def add_updater_tasks(self, owner: str, jobs: Dict[str, Callable]) -> List[str]:
+        """Register data update jobs on the wall-clock UPDATE_SCHEDULES.
+
+        Each job signals data_updated_event(timeframe) when it finishes, so
+        tasks subscribed to it run without waiting for their own interval.
+
+        Args:
+            owner: Prefix for task names (usually the updater class name)
+            jobs: Update function per timeframe
+
+        Returns:
+            Registered task names, for remove_tasks
+        """
+        names = []
+        for timeframe, func in jobs.items():
+            interval, offset = UPDATE_SCHEDULES[timeframe]
+            name = f"{owner}:{timeframe}"
+            if name in self.scheduler.tasks:
+                self.remove_task(name)
+            self.add_task(name, self._notify_after(func, timeframe), interval, align_offset=offset)
+            names.append(name)
+        return names
+
+    def remove_tasks(self, names: List[str]) -> None:
+        """Remove several tasks.
+
+        Args:
+            names: Task names to remove
+        """
+        for name in names:
+            self.remove_task(name)
+
+    def _notify_after(self, func: Callable, timeframe: str) -> Callable:
+        def job():
+            result = func()
+            # Runs on an executor thread; notify marshals onto the loop
+            self.notify(data_updated_event(timeframe))
+            return result
+
+        job.__qualname__ = getattr(func, "__qualname__", "job")
+        return job
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get status of the underlying scheduler."""
+        status = self._call(self.scheduler.get_status)
+        status["thread_alive"] = self.running
+        return status
+
+
+# Global instance shared by all data updaters
+background_scheduler = BackgroundScheduler()
@@ -33,7 +33,7 @@ class SchedulerCLI:
         """
         self.db_path = db_path
         self.trading_calendar = TradingCalendar()
-        self.scheduler = TaskScheduler(self.trading_calendar)
+        self.scheduler = TaskScheduler(self.trading_calendar, metrics_db_path=db_path)
         self.integration = SchedulerIntegration(self.scheduler, self.trading_calendar)
         
     def setup_logging(self, level: str = "INFO") -> None:
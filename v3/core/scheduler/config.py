@@ -34,6 +34,25 @@ TASK_DEPENDENCIES = {
     "process_news_pipeline": ["fetch_news"],
 }
 
+# Resource classes: "io" tasks share the I/O thread pool, "cpu" tasks the
+# CPU executor (thread or process pool, see PERFORMANCE_CONFIG)
+TASK_RESOURCE_CLASSES = {
+    "update_market_data": "io",
+    "fetch_news": "io",
+    "process_news_pipeline": "cpu",
+    "calculate_indicators": "cpu",
+    "generate_signals": "cpu",
+    "send_notifications": "io",
+}
+
+# Per-task timeouts in seconds (PERFORMANCE_CONFIG["task_timeout"] otherwise)
+TASK_TIMEOUTS = {
+    "update_market_data": 1800,
+    "fetch_news": 600,
+    "process_news_pipeline": 1800,
+    "send_notifications": 120,
+}
+
 # Maximum errors before disabling task
 TASK_MAX_ERRORS = {
     "update_market_data": 3,
@@ -102,6 +121,9 @@ NOTIFICATION_CONFIG = {
 PERFORMANCE_CONFIG = {
     "max_concurrent_tasks": 5,
     "task_timeout": 300,  # seconds
+    "io_workers": 4,  # concurrent "io" tasks
+    "cpu_workers": 2,  # concurrent "cpu" tasks
+    "cpu_executor": "thread",  # "thread" or "process" (task functions must be picklable)
     "memory_limit": 512 * 1024 * 1024,  # 512MB
     "cpu_limit": 80,  # percentage
 }
@@ -133,6 +155,8 @@ DEFAULT_CONFIG = {
     "priorities": TASK_PRIORITIES,
     "dependencies": TASK_DEPENDENCIES,
     "max_errors": TASK_MAX_ERRORS,
+    "resource_classes": TASK_RESOURCE_CLASSES,
+    "timeouts": TASK_TIMEOUTS,
     "market_hours": MARKET_HOURS,
     "retry": RETRY_CONFIG,
     "logging": LOGGING_CONFIG,
@@ -167,6 +191,8 @@ def get_task_config(task_name: str) -> Dict[str, Any]:
         "priority": TASK_PRIORITIES.get(task_name, 0),
         "dependencies": TASK_DEPENDENCIES.get(task_name, []),
         "max_errors": TASK_MAX_ERRORS.get(task_name, 3),
+        "resource_class": TASK_RESOURCE_CLASSES.get(task_name, "io"),
+        "timeout": TASK_TIMEOUTS.get(task_name),
     }
 
 
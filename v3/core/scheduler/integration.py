@@ -11,6 +11,7 @@ import asyncio
 
 from .scheduler import TaskScheduler
 from .trading_calendar import TradingCalendar, Market
+from .config import TASK_RESOURCE_CLASSES, TASK_TIMEOUTS
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,9 @@ class SchedulerIntegration:
             interval=timedelta(hours=1),
             priority=10,  # High priority
             dependencies=[],
-            max_errors=3
+            max_errors=3,
+            resource_class=TASK_RESOURCE_CLASSES["update_market_data"],
+            timeout=TASK_TIMEOUTS.get("update_market_data")
         )
         
         logger.info("Market data update task configured")
@@ -60,7 +63,9 @@ class SchedulerIntegration:
             interval=timedelta(minutes=30),
             priority=5,
             dependencies=[],
-            max_errors=5
+            max_errors=5,
+            resource_class=TASK_RESOURCE_CLASSES["fetch_news"],
+            timeout=TASK_TIMEOUTS.get("fetch_news")
         )
         
         # News processing - every 2 hours
@@ -70,7 +75,9 @@ class SchedulerIntegration:
             interval=timedelta(hours=2),
             priority=3,
             dependencies=["fetch_news"],
-            max_errors=3
+            max_errors=3,
+            resource_class=TASK_RESOURCE_CLASSES["process_news_pipeline"],
+            timeout=TASK_TIMEOUTS.get("process_news_pipeline")
         )
         
         logger.info("News tasks configured")
@@ -89,7 +96,10 @@ class SchedulerIntegration:
             interval=timedelta(hours=1),
             priority=8,
             dependencies=["update_market_data"],
-            max_errors=3
+            run_on_dependencies=True,
+            max_errors=3,
+            resource_class=TASK_RESOURCE_CLASSES["calculate_indicators"],
+            timeout=TASK_TIMEOUTS.get("calculate_indicators")
         )
         
         # Signal generation - after indicators calculation
@@ -99,7 +109,10 @@ class SchedulerIntegration:
             interval=timedelta(hours=1),
             priority=7,
             dependencies=["calculate_indicators"],
-            max_errors=3
+            run_on_dependencies=True,
+            max_errors=3,
+            resource_class=TASK_RESOURCE_CLASSES["generate_signals"],
+            timeout=TASK_TIMEOUTS.get("generate_signals")
         )
         
         logger.info("Analysis tasks configured")
@@ -117,7 +130,9 @@ class SchedulerIntegration:
             interval=timedelta(minutes=15),
             priority=9,  # High priority for notifications
             dependencies=[],
-            max_errors=5
+            max_errors=5,
+            resource_class=TASK_RESOURCE_CLASSES["send_notifications"],
+            timeout=TASK_TIMEOUTS.get("send_notifications")
         )
         
         logger.info("Notification tasks configured")
@@ -0,0 +1,252 @@
+"""Task timing metrics for the task scheduler.
+
+This module keeps per-task histograms of execution time and admission
+wait (time between a task becoming due and actually starting) and
+persists them to the ``scheduler_task_metrics`` table created by
+``migrations.py``.
+"""
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .migrations import run_migrations
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+DURATION_BUCKETS: Tuple[float, ...] = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, float("inf"))
+
+TASK_OUTCOMES = ("completed", "failed", "timeout", "cancelled")
+
+
+def _bucket_label(bound: float) -> str:
+    return "inf" if bound == float("inf") else f"{bound:g}"
+
+
+@dataclass
+class TimingHistogram:
+    """Fixed-bucket histogram of durations in seconds."""
+    buckets: Tuple[float, ...] = DURATION_BUCKETS
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+    max_value: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Add a single observation.
+
+        Args:
+            value: Duration in seconds
+        """
+        value = max(value, 0.0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.max_value = max(self.max_value, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile: upper bound of the bucket holding it.
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            Bucket upper bound (capped at the observed maximum) or None if empty
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max_value)
+        return self.max_value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary suitable for status reporting."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max_value if self.count else None,
+            "buckets": {_bucket_label(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class _TaskTimings:
+    """Duration/wait histograms and outcome counters of one task."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.duration = TimingHistogram(buckets)
+        self.queue_wait = TimingHistogram(buckets)
+        self.outcomes: Dict[str, int] = {outcome: 0 for outcome in TASK_OUTCOMES}
+
+    def observe(self, duration: float, queue_wait: float, outcome: str) -> None:
+        self.duration.observe(duration)
+        self.queue_wait.observe(queue_wait)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+class TaskMetricsRecorder:
+    """Collects task timings and persists them to ``scheduler_task_metrics``.
+
+    Two sets of histograms are kept: running totals for status reporting
+    and the deltas since the last :meth:`flush`. Each flush writes the
+    deltas as one row per non-empty bucket (``duration_bucket_le_<bound>``,
+    ``queue_wait_bucket_le_<bound>``) plus ``*_sum``/``*_count``/``*_max``
+    and ``outcome_<name>`` counters, so summing rows over a time range gives
+    the histogram for that range.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        """Initialize the recorder.
+
+        Args:
+            db_path: Database to persist metrics to; None keeps them in memory only
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.db_path = db_path
+        self.buckets = buckets
+        self._totals: Dict[str, _TaskTimings] = {}
+        self._pending: Dict[str, _TaskTimings] = {}
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def observe(self, task_name: str, duration: float, queue_wait: float, outcome: str) -> None:
+        """Record one task execution.
+
+        Args:
+            task_name: Task name
+            duration: Execution time in seconds
+            queue_wait: Seconds between the task becoming due and starting
+            outcome: One of ``TASK_OUTCOMES``
+        """
+        with self._lock:
+            for timings in (self._totals, self._pending):
+                if task_name not in timings:
+                    timings[task_name] = _TaskTimings(self.buckets)
+                timings[task_name].observe(duration, queue_wait, outcome)
+
+    def get_task_metrics(self, task_name: Optional[str] = None) -> Dict[str, Any]:
+        """Get in-memory metric summaries.
+
+        Args:
+            task_name: Single task to report; all tasks if None
+
+        Returns:
+            Dictionary keyed by task name
+        """
+        with self._lock:
+            names = [task_name] if task_name else list(self._totals)
+            return {
+                name: {
+                    "duration": self._totals[name].duration.to_dict(),
+                    "queue_wait": self._totals[name].queue_wait.to_dict(),
+                    "outcomes": dict(self._totals[name].outcomes),
+                }
+                for name in names if name in self._totals
+            }
+
+    def flush(self, tasks: Optional[Dict[str, Any]] = None) -> int:
+        """Persist metrics gathered since the previous flush.
+
+        Args:
+            tasks: Scheduler tasks by name, used to register missing rows in
+                ``scheduler_tasks`` (metrics reference tasks by id)
+
+        Returns:
+            Number of metric rows written
+        """
+        if not self.db_path:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            if not self._migrated:
+                run_migrations(self.db_path)
+                self._migrated = True
+
+            rows_written = 0
+            with sqlite3.connect(self.db_path, timeout=30) as conn:
+                for task_name, timings in pending.items():
+                    task_id = self._get_task_id(conn, task_name, (tasks or {}).get(task_name))
+                    rows = self._metric_rows(task_id, timings)
+                    conn.executemany("""
+                        INSERT INTO scheduler_task_metrics (task_id, metric_name, metric_value)
+                        VALUES (?, ?, ?)
+                    """, rows)
+                    rows_written += len(rows)
+                conn.commit()
+            return rows_written
+
+        except Exception as e:
+            logger.error(f"Error persisting task metrics: {e}")
+            # Keep the deltas for the next attempt
+            with self._lock:
+                for task_name, timings in pending.items():
+                    self._merge_pending(task_name, timings)
+            return 0
+
+    def _merge_pending(self, task_name: str, timings: _TaskTimings) -> None:
+        current = self._pending.get(task_name)
+        if current is None:
+            self._pending[task_name] = timings
+            return
+        for mine, theirs in ((current.duration, timings.duration), (current.queue_wait, timings.queue_wait)):
+            mine.counts = [a + b for a, b in zip(mine.counts, theirs.counts)]
+            mine.total += theirs.total
+            mine.count += theirs.count
+            mine.max_value = max(mine.max_value, theirs.max_value)
+        for outcome, count in timings.outcomes.items():
+            current.outcomes[outcome] = current.outcomes.get(outcome, 0) + count
+
+    @staticmethod
+    def _get_task_id(conn: sqlite3.Connection, task_name: str, task: Optional[Any]) -> int:
+        """Get the ``scheduler_tasks`` id of a task, registering it if needed."""
+        row = conn.execute("SELECT id FROM scheduler_tasks WHERE name = ?", (task_name,)).fetchone()
+        if row:
+            return row[0]
+        func = getattr(task, "func", None)
+        interval = getattr(task, "interval", None)
+        cursor = conn.execute("""
+            INSERT INTO scheduler_tasks (name, func_name, interval_seconds, priority, max_errors, enabled)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            task_name,
+            getattr(func, "__qualname__", None) or repr(func),
+            int(interval.total_seconds()) if interval else 0,
+            getattr(task, "priority", 0),
+            getattr(task, "max_errors", 3),
+            bool(getattr(task, "enabled", True)),
+        ))
+        return cursor.lastrowid
+
+    @staticmethod
+    def _metric_rows(task_id: int, timings: _TaskTimings) -> List[Tuple[int, str, float]]:
+        rows = []
+        for kind, histogram in (("duration", timings.duration), ("queue_wait", timings.queue_wait)):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                if count:
+                    rows.append((task_id, f"{kind}_bucket_le_{_bucket_label(bound)}", float(count)))
+            rows.append((task_id, f"{kind}_sum", histogram.total))
+            rows.append((task_id, f"{kind}_count", float(histogram.count)))
+            rows.append((task_id, f"{kind}_max", histogram.max_value))
+        for outcome, count in timings.outcomes.items():
+            if count:
+                rows.append((task_id, f"outcome_{outcome}", float(count)))
+        return rows
@@ -17,8 +17,9 @@ from .integration import SchedulerIntegration
 # Import existing modules
 from ..data_loader import load_csv_data
 from ..news import run_fetch_job, build_summary
-from ..analyzer import StockAnalyzer
 from ..database import get_connection
+from ..indicators import run_indicator_materialization
+from ..analytics.correlation import run_correlation_update
 
 logger = logging.getLogger(__name__)
 
@@ -125,51 +126,34 @@ class RealSchedulerIntegration:
             logger.error(f"Error processing news: {e}")
             raise
             
-    async def _calculate_indicators(self):
-        """Calculate technical indicators."""
+    def _calculate_indicators(self):
+        """Materialize technical indicators from local daily data.
+
+        Runs synchronously on the scheduler's CPU executor. Only bars after
+        each company's watermark are computed and written. The persisted
+        return correlation matrix is advanced by the same new bars.
+        """
         try:
             logger.info("Starting indicators calculation...")
             
-            # Get database connection
-            conn = get_connection()
-            if not conn:
-                logger.error("No database connection available")
-                return
-                
-            # Get list of companies
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, contract_code, figi FROM companies WHERE figi IS NOT NULL")
-            companies = cursor.fetchall()
+            stats = run_indicator_materialization()
             
-            if not companies:
-                logger.warning("No companies found for indicators calculation")
-                return
-                
-            # Calculate indicators for each company
-            processed = 0
-            for company_id, contract_code, figi in companies:
-                try:
-                    # Get stock data
-                    analyzer = StockAnalyzer(self.api_key, conn)
-                    data = analyzer.get_stock_data(figi)
-                    
-                    if data.empty:
-                        logger.warning(f"No data for {contract_code} ({figi})")
-                        continue
-                        
-                    # Calculate indicators
-                    # This is a simplified example - in reality you would:
-                    # 1. Calculate various technical indicators
-                    # 2. Store them in the database
-                    # 3. Update existing records
-                    
-                    processed += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error calculating indicators for {contract_code}: {e}")
-                    continue
-                    
-            logger.info(f"Indicators calculated for {processed} companies")
+            if stats["failed"]:
+                logger.warning(f"Indicators failed for: {', '.join(stats['failed'])}")
+            logger.info(
+                f"Indicators calculated for {stats['companies']} companies "
+                f"({stats['rows_written']} rows written, {stats['up_to_date']} up to date)"
+            )
+            
+            try:
+                correlations = run_correlation_update()
+                logger.info(
+                    f"Correlation matrix for {correlations['symbols']} contracts "
+                    f"updated to {correlations['last_date']}"
+                )
+            except Exception as e:
+                logger.error(f"Error updating correlation matrix: {e}")
+            return stats
             
         except Exception as e:
             logger.error(f"Error calculating indicators: {e}")
@@ -5,17 +5,32 @@ scheduled tasks for market data updates, news fetching, and analysis.
 """
 
 import asyncio
+import heapq
+import itertools
 import logging
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from .config import MONITORING_CONFIG, PERFORMANCE_CONFIG
+from .metrics import TaskMetricsRecorder
 from .trading_calendar import TradingCalendar
 
 logger = logging.getLogger(__name__)
 
 
+def _consume_result(future: asyncio.Future) -> None:
+    """Retrieve the outcome of a job whose awaiter may have timed out."""
+    if not future.cancelled():
+        future.exception()
+
+
 class TaskStatus(Enum):
     """Task execution status."""
     PENDING = "pending"
@@ -25,6 +40,12 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"
 
 
+class ResourceClass(Enum):
+    """Executor a synchronous task runs on."""
+    IO = "io"    # network/disk bound: shared thread pool
+    CPU = "cpu"  # compute bound: thread or process pool
+
+
 @dataclass
 class Task:
     """Represents a scheduled task."""
@@ -39,12 +60,39 @@ class Task:
     enabled: bool = True
     priority: int = 0  # Higher number = higher priority
     dependencies: List[str] = None  # List of task names this task depends on
+    resource_class: ResourceClass = ResourceClass.IO
+    timeout: Optional[float] = None  # Seconds; None uses the scheduler default
+    align_offset: Optional[timedelta] = None  # Run on wall-clock interval boundaries shifted by this
+    run_on_dependencies: bool = False  # Run as soon as all dependencies complete
+    events: List[str] = None  # External events that make the task due immediately
     
     def __post_init__(self):
         if self.dependencies is None:
             self.dependencies = []
+        if self.events is None:
+            self.events = []
+        self.resource_class = ResourceClass(self.resource_class)
         if self.next_run is None:
-            self.next_run = datetime.now() + self.interval
+            self.next_run = self.compute_next_run(datetime.now())
+            
+    def compute_next_run(self, after: datetime) -> datetime:
+        """Get the next regular run time after a moment.
+        
+        Aligned tasks run at ``midnight + align_offset + k * interval``,
+        e.g. every hour at :00 or daily at 18:00; others run ``interval``
+        after the moment.
+        
+        Args:
+            after: Moment to schedule from (usually completion time)
+            
+        Returns:
+            Next run time
+        """
+        if self.align_offset is None:
+            return after + self.interval
+        anchor = after.replace(hour=0, minute=0, second=0, microsecond=0) + self.align_offset
+        periods = (after - anchor) // self.interval + 1
+        return anchor + periods * self.interval
 
 
 class TaskScheduler:
@@ -56,18 +104,72 @@ class TaskScheduler:
     - Technical analysis calculations
     - Signal generation
     - Notifications
+    
+    Coroutine tasks run on the event loop; synchronous tasks run on an
+    executor chosen by their resource class so they never block the loop.
+    Ready tasks are admitted in priority order while there are free slots,
+    both overall (``max_concurrent_tasks``) and per resource class.
+    
+    The loop keeps a heap of next run times and sleeps until the earliest
+    one, or until it is woken by a finished task, :meth:`trigger_task` or
+    :meth:`notify`; there is no fixed polling interval.
     """
     
-    def __init__(self, trading_calendar: Optional[TradingCalendar] = None):
+    def __init__(
+        self,
+        trading_calendar: Optional[TradingCalendar] = None,
+        max_concurrent_tasks: int = PERFORMANCE_CONFIG["max_concurrent_tasks"],
+        io_workers: int = PERFORMANCE_CONFIG["io_workers"],
+        cpu_workers: int = PERFORMANCE_CONFIG["cpu_workers"],
+        cpu_executor: str = PERFORMANCE_CONFIG["cpu_executor"],
+        default_timeout: Optional[float] = PERFORMANCE_CONFIG["task_timeout"],
+        metrics_db_path: Optional[str] = None,
+        metrics_interval: float = MONITORING_CONFIG["metrics_interval"]
+    ):
         """Initialize the task scheduler.
         
         Args:
             trading_calendar: Optional trading calendar for market-aware scheduling
+            max_concurrent_tasks: Maximum number of tasks running at once
+            io_workers: Concurrency limit (and pool size) for I/O tasks
+            cpu_workers: Concurrency limit (and pool size) for CPU tasks
+            cpu_executor: "thread" or "process" pool for CPU tasks
+            default_timeout: Timeout in seconds for tasks without their own; None disables
+            metrics_db_path: Database for task timing metrics; None keeps them in memory
+            metrics_interval: Seconds between metric flushes to the database
         """
+        if cpu_executor not in ("thread", "process"):
+            raise ValueError(f"Unknown cpu_executor '{cpu_executor}'")
         self.trading_calendar = trading_calendar or TradingCalendar()
         self.tasks: Dict[str, Task] = {}
         self.running = False
         self._stop_event = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # (next_run, seq, name); entries whose next_run changed are skipped lazily
+        self._heap: List[tuple] = []
+        self._heap_seq = itertools.count()
+        self.wakeups = 0
+        
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.concurrency_limits: Dict[ResourceClass, int] = {
+            ResourceClass.IO: io_workers,
+            ResourceClass.CPU: cpu_workers,
+        }
+        self.cpu_executor_kind = cpu_executor
+        self.default_timeout = default_timeout
+        self._executors: Dict[ResourceClass, Executor] = {}
+        self._picklable: Dict[str, bool] = {}
+        
+        # Admitted tasks and executor jobs still running (possibly past a timeout)
+        self._active: Dict[str, asyncio.Task] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._running_by_class: Dict[ResourceClass, int] = {rc: 0 for rc in ResourceClass}
+        
+        self.metrics = TaskMetricsRecorder(metrics_db_path)
+        self.metrics_interval = metrics_interval
+        self._last_metrics_flush = time.monotonic()
         
     def add_task(
         self,
@@ -77,7 +179,12 @@ class TaskScheduler:
         priority: int = 0,
         dependencies: List[str] = None,
         max_errors: int = 3,
-        enabled: bool = True
+        enabled: bool = True,
+        resource_class: Any = ResourceClass.IO,
+        timeout: Optional[float] = None,
+        align_offset: Optional[timedelta] = None,
+        run_on_dependencies: bool = False,
+        events: List[str] = None
     ) -> None:
         """Add a new task to the scheduler.
         
@@ -89,6 +196,12 @@ class TaskScheduler:
             dependencies: List of task names this task depends on
             max_errors: Maximum consecutive errors before disabling
             enabled: Whether task is enabled by default
+            resource_class: ResourceClass (or "io"/"cpu") of a synchronous task
+            timeout: Timeout in seconds; None uses the scheduler default
+            align_offset: Run on wall-clock multiples of interval shifted by this
+                (timedelta(0) with a 1h interval = every hour at :00)
+            run_on_dependencies: Run immediately each time all dependencies complete
+            events: External event names (see notify) that make the task due now
         """
         if name in self.tasks:
             raise ValueError(f"Task '{name}' already exists")
@@ -100,10 +213,17 @@ class TaskScheduler:
             priority=priority,
             dependencies=dependencies or [],
             max_errors=max_errors,
-            enabled=enabled
+            enabled=enabled,
+            resource_class=ResourceClass(resource_class),
+            timeout=timeout,
+            align_offset=align_offset,
+            run_on_dependencies=run_on_dependencies,
+            events=events or []
         )
         
         self.tasks[name] = task
+        self._push(task)
+        self._wake()
         logger.info(f"Added task '{name}' with interval {interval}")
         
     def remove_task(self, name: str) -> None:
@@ -126,6 +246,8 @@ class TaskScheduler:
         """
         if name in self.tasks:
             self.tasks[name].enabled = True
+            self._push(self.tasks[name])
+            self._wake()
             logger.info(f"Enabled task '{name}'")
             
     def disable_task(self, name: str) -> None:
@@ -162,6 +284,83 @@ class TaskScheduler:
         task = self.tasks.get(name)
         return task.next_run if task else None
         
+    def trigger_task(self, name: str) -> bool:
+        """Make a task due immediately.
+        
+        Must be called from the scheduler's event loop thread.
+        
+        Args:
+            name: Task name to trigger
+            
+        Returns:
+            True if the task exists and is enabled
+        """
+        task = self.tasks.get(name)
+        if not task or not task.enabled:
+            return False
+        self._set_next_run(task, datetime.now())
+        self._wake()
+        return True
+        
+    def notify(self, event: str) -> List[str]:
+        """Signal an external event, e.g. new market data written.
+        
+        Tasks subscribed to the event via ``events`` become due immediately.
+        Must be called from the scheduler's event loop thread.
+        
+        Args:
+            event: Event name
+            
+        Returns:
+            Names of triggered tasks
+        """
+        triggered = [name for name, task in self.tasks.items() if event in task.events]
+        for name in triggered:
+            self.trigger_task(name)
+        if triggered:
+            logger.debug(f"Event '{event}' triggered {triggered}")
+        return triggered
+        
+    def cancel_task(self, name: str) -> bool:
+        """Cancel a running task.
+        
+        Coroutine tasks are cancelled at their next await. A synchronous
+        task that has already started on an executor cannot be interrupted:
+        it is marked cancelled, but keeps its resource slot until it returns.
+        
+        Args:
+            name: Task name to cancel
+            
+        Returns:
+            True if a running task was found and cancelled
+        """
+        active = self._active.get(name)
+        if active is None or active.done():
+            return False
+        active.cancel()
+        logger.info(f"Cancelling task '{name}'")
+        return True
+        
+    def get_task_metrics(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Get execution time and admission wait histograms.
+        
+        Args:
+            name: Task name; all tasks if None
+            
+        Returns:
+            Metric summaries keyed by task name
+        """
+        return self.metrics.get_task_metrics(name)
+        
+    def flush_metrics(self) -> int:
+        """Persist task metrics gathered since the last flush.
+        
+        Returns:
+            Number of metric rows written
+        """
+        self._last_metrics_flush = time.monotonic()
+        return self.metrics.flush(self.tasks)
+        
     async def start(self) -> None:
         """Start the task scheduler."""
         if self.running:
@@ -169,7 +368,10 @@ class TaskScheduler:
             return
             
         self.running = True
-        self._stop_event.clear()
+        # Events bind to the loop that first waits on them; start may run on a new loop
+        self._stop_event = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
         logger.info("Starting task scheduler")
         
         try:
@@ -177,7 +379,11 @@ class TaskScheduler:
         except Exception as e:
             logger.exception("Scheduler error: %s", e)
         finally:
+            await self._cancel_active_tasks()
+            self._shutdown_executors()
+            self.flush_metrics()
             self.running = False
+            self._loop = None
             logger.info("Task scheduler stopped")
             
     async def stop(self) -> None:
@@ -188,31 +394,135 @@ class TaskScheduler:
             
         logger.info("Stopping task scheduler")
         self._stop_event.set()
+        self._wake()
         
     async def _run_scheduler(self) -> None:
         """Main scheduler loop."""
+        loop = asyncio.get_running_loop()
         while not self._stop_event.is_set():
             try:
-                # Get tasks ready to run
-                ready_tasks = self._get_ready_tasks()
+                self._admit_ready_tasks()
                 
-                if ready_tasks:
-                    # Execute tasks in priority order
-                    ready_tasks.sort(key=lambda t: t.priority, reverse=True)
-                    
-                    # Run tasks concurrently
-                    await asyncio.gather(
-                        *[self._execute_task(task) for task in ready_tasks],
-                        return_exceptions=True
-                    )
+                if time.monotonic() - self._last_metrics_flush >= self.metrics_interval:
+                    await loop.run_in_executor(None, self.flush_metrics)
                 
-                # Wait before next check
-                await asyncio.sleep(1)
+                # Sleep until the next due task or metrics flush, or until woken
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next_event())
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                self.wakeups += 1
                 
             except Exception as e:
                 logger.exception("Error in scheduler loop: %s", e)
                 await asyncio.sleep(5)  # Wait before retrying
                 
+    def _seconds_until_next_event(self) -> float:
+        """Seconds until the earliest future run time or metrics flush."""
+        now = datetime.now()
+        timeout = max(self.metrics_interval - (time.monotonic() - self._last_metrics_flush), 0.0)
+        while self._heap:
+            when, _, name = self._heap[0]
+            task = self.tasks.get(name)
+            if task is None or not task.enabled or task.next_run != when or when <= now:
+                # Stale, or due but not admitted (waiting for a dependency or a
+                # free slot): admission is retried when a running task finishes
+                heapq.heappop(self._heap)
+                continue
+            timeout = min(timeout, (when - now).total_seconds())
+            break
+        return timeout
+        
+    def _push(self, task: Task) -> None:
+        """Add the task's current next run time to the heap."""
+        if task.next_run is not None:
+            heapq.heappush(self._heap, (task.next_run, next(self._heap_seq), task.name))
+            
+    def _set_next_run(self, task: Task, when: datetime) -> None:
+        task.next_run = when
+        self._push(task)
+        
+    def _wake(self) -> None:
+        """Wake the scheduler loop (safe to call from any thread)."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+            
+    def _trigger_dependents(self, completed: Task) -> None:
+        """Make tasks waiting on a completed task due if all their dependencies are met."""
+        now = datetime.now()
+        for task in self.tasks.values():
+            if (task.run_on_dependencies and task.enabled and completed.name in task.dependencies
+                    and self._check_dependencies(task)):
+                self._set_next_run(task, now)
+                
+    def _admit_ready_tasks(self) -> List[Task]:
+        """Start ready tasks in priority order while slots are free.
+        
+        A task whose resource class is full blocks lower-priority tasks of
+        the same class, so they cannot overtake it when a slot frees up.
+        
+        Returns:
+            Tasks started by this call
+        """
+        ready_tasks = self._get_ready_tasks()
+        ready_tasks.sort(key=lambda t: (-t.priority, t.next_run))
+        
+        admitted = []
+        blocked = set()
+        for task in ready_tasks:
+            if len(self._active) >= self.max_concurrent_tasks:
+                break
+            resource_class = task.resource_class
+            if resource_class in blocked:
+                continue
+            if self._running_by_class[resource_class] >= self.concurrency_limits[resource_class]:
+                blocked.add(resource_class)
+                continue
+            
+            self._running_by_class[resource_class] += 1
+            task.status = TaskStatus.RUNNING
+            self._active[task.name] = asyncio.create_task(
+                self._run_admitted(task), name=f"scheduler:{task.name}"
+            )
+            admitted.append(task)
+        return admitted
+        
+    async def _run_admitted(self, task: Task) -> None:
+        """Run an admitted task and release its slot once it really finishes."""
+        try:
+            await self._execute_task(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # A timed-out or cancelled executor job keeps running; hold its slot
+            inflight = self._inflight.pop(task.name, None)
+            if inflight is not None and not inflight.done():
+                try:
+                    await asyncio.wait({asyncio.wrap_future(inflight)})
+                except asyncio.CancelledError:
+                    pass
+            self._running_by_class[task.resource_class] -= 1
+            self._active.pop(task.name, None)
+            self._wakeup.set()
+            
+    async def _cancel_active_tasks(self) -> None:
+        """Cancel admitted tasks when the scheduler stops."""
+        active = list(self._active.values())
+        for running in active:
+            running.cancel()
+        if active:
+            await asyncio.gather(*active, return_exceptions=True)
+            
     def _get_ready_tasks(self) -> List[Task]:
         """Get tasks that are ready to run.
         
@@ -223,7 +533,7 @@ class TaskScheduler:
         now = datetime.now()
         
         for task in self.tasks.values():
-            if not task.enabled or task.status == TaskStatus.RUNNING:
+            if not task.enabled or task.status == TaskStatus.RUNNING or task.name in self._active:
                 continue
                 
             # Check if task is ready to run
@@ -257,25 +567,51 @@ class TaskScheduler:
         """
         task.status = TaskStatus.RUNNING
         task.last_run = datetime.now()
+        queue_wait = (task.last_run - task.next_run).total_seconds() if task.next_run else 0.0
+        timeout = task.timeout if task.timeout is not None else self.default_timeout
+        started = time.perf_counter()
+        outcome = "completed"
         
         try:
             logger.info(f"Executing task '{task.name}'")
             
             # Execute the task function
             if asyncio.iscoroutinefunction(task.func):
-                await task.func()
+                await asyncio.wait_for(task.func(), timeout)
             else:
-                task.func()
+                job = self._submit(task)
+                self._inflight[task.name] = job
+                result = asyncio.wrap_future(job)
+                result.add_done_callback(_consume_result)
+                # shield: timing out must not mark a job that is still running as done
+                await asyncio.wait_for(asyncio.shield(result), timeout)
                 
             # Task completed successfully
             task.status = TaskStatus.COMPLETED
             task.error_count = 0
-            task.next_run = datetime.now() + task.interval
+            self._set_next_run(task, task.compute_next_run(datetime.now()))
+            self._trigger_dependents(task)
             
             logger.info(f"Task '{task.name}' completed successfully")
             
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            self._cancel_inflight(task)
+            task.status = TaskStatus.CANCELLED
+            self._set_next_run(task, task.compute_next_run(datetime.now()))
+            logger.warning(f"Task '{task.name}' cancelled")
+            raise
+            
         except Exception as e:
             # Task failed
+            timed_out = (isinstance(e, asyncio.TimeoutError) and timeout is not None
+                         and time.perf_counter() - started >= timeout)
+            if timed_out:
+                outcome = "timeout"
+                self._cancel_inflight(task)
+                e = TimeoutError(f"timed out after {timeout}s")
+            else:
+                outcome = "failed"
             task.status = TaskStatus.FAILED
             task.error_count += 1
             
@@ -288,7 +624,68 @@ class TaskScheduler:
                 
             # Schedule retry with exponential backoff
             retry_delay = min(task.interval.total_seconds() * (2 ** task.error_count), 3600)
-            task.next_run = datetime.now() + timedelta(seconds=retry_delay)
+            self._set_next_run(task, datetime.now() + timedelta(seconds=retry_delay))
+            
+        finally:
+            if task.name in self._inflight and self._inflight[task.name].done():
+                del self._inflight[task.name]
+            self.metrics.observe(task.name, time.perf_counter() - started, max(queue_wait, 0.0), outcome)
+            
+    def _submit(self, task: Task) -> Future:
+        """Submit a synchronous task to the executor of its resource class."""
+        executor = self._get_executor(task)
+        try:
+            return executor.submit(task.func)
+        except BrokenProcessPool:
+            # A crashed worker breaks the whole pool; start a fresh one
+            logger.warning("CPU process pool is broken, recreating it")
+            self._executors.pop(ResourceClass.CPU, None)
+            executor.shutdown(wait=False)
+            return self._get_executor(task).submit(task.func)
+            
+    def _get_executor(self, task: Task) -> Executor:
+        """Get (creating lazily) the executor for a task."""
+        resource_class = task.resource_class
+        if resource_class == ResourceClass.CPU and self.cpu_executor_kind == "process":
+            if not self._is_picklable(task):
+                resource_class = ResourceClass.IO
+            
+        executor = self._executors.get(resource_class)
+        if executor is None:
+            workers = self.concurrency_limits[resource_class]
+            if resource_class == ResourceClass.CPU and self.cpu_executor_kind == "process":
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f"scheduler-{resource_class.value}"
+                )
+            self._executors[resource_class] = executor
+        return executor
+        
+    def _is_picklable(self, task: Task) -> bool:
+        """Check once whether a task function can be sent to a process pool."""
+        if task.name not in self._picklable:
+            try:
+                pickle.dumps(task.func)
+                self._picklable[task.name] = True
+            except Exception as e:
+                logger.warning(f"Task '{task.name}' cannot run in a process pool ({e}); using threads")
+                self._picklable[task.name] = False
+        return self._picklable[task.name]
+        
+    def _cancel_inflight(self, task: Task) -> None:
+        """Cancel an executor job if it has not started yet."""
+        job = self._inflight.get(task.name)
+        if job is not None:
+            job.cancel()
+            
+    def _shutdown_executors(self) -> None:
+        """Shut down executors without waiting for running jobs."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
             
     def get_status(self) -> Dict[str, Any]:
         """Get scheduler status information.
@@ -302,13 +699,15 @@ class TaskScheduler:
             "enabled_tasks": sum(1 for t in self.tasks.values() if t.enabled),
             "running_tasks": sum(1 for t in self.tasks.values() if t.status == TaskStatus.RUNNING),
             "failed_tasks": sum(1 for t in self.tasks.values() if t.status == TaskStatus.FAILED),
+            "active_by_class": {rc.value: count for rc, count in self._running_by_class.items()},
             "tasks": {
                 name: {
                     "status": task.status.value,
                     "last_run": task.last_run.isoformat() if task.last_run else None,
                     "next_run": task.next_run.isoformat() if task.next_run else None,
                     "error_count": task.error_count,
-                    "enabled": task.enabled
+                    "enabled": task.enabled,
+                    "resource_class": task.resource_class.value
                 }
                 for name, task in self.tasks.items()
             }
@@ -0,0 +1,243 @@
+"""Coarser OHLCV timeframes derived from the stored 1-minute bars.
+
+Tinkoff 5m, 15m and 1h candles aggregate the same trades as the 1m candles,
+so they can be built from ``data_1min`` instead of being downloaded and
+stored separately: open of the first minute, highest high, lowest low, close
+of the last minute and summed volume, bucketed on UTC boundaries.
+
+``TimeframeResampler`` caches the aggregated bars per (database, symbol,
+timeframe). Once an entry is built, a read only loads the minutes from the
+start of the newest (possibly still forming) bar onwards and re-aggregates
+them. Minutes older than the newest bar are treated as final: code that
+writes history behind it (re-downloads, gap backfills) calls ``invalidate``
+or ``invalidate_from_candles``.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_TIMEFRAME = "1m"
+BASE_TABLE = "data_1min"
+
+# Minutes per bar of the timeframes served from the base table
+RESAMPLED_TIMEFRAMES: Dict[str, int] = {"5m": 5, "15m": 15, "1h": 60}
+
+# Timeframes the data updaters no longer download: the 1m download covers the
+# same day. 1h is still downloaded because it reaches a week back.
+DERIVED_ONLY_TIMEFRAMES = ("5m", "15m")
+
+# Upper bound on base rows read to build one cache entry (about three weeks of MOEX minutes)
+MAX_BASE_ROWS = 20000
+
+BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+_NS_PER_MINUTE = 60 * 10**9
+
+
+def is_resampled(timeframe: str) -> bool:
+    return timeframe in RESAMPLED_TIMEFRAMES
+
+
+def _to_ns(values) -> np.ndarray:
+    """ISO datetime strings or timestamps -> int64 UTC nanoseconds (naive values are UTC)."""
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True, format="ISO8601")).as_unit("ns").asi8
+
+
+def aggregate(times: np.ndarray, values: np.ndarray, minutes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aggregate time-sorted base bars into bars of ``minutes``.
+
+    ``times`` are int64 UTC nanoseconds, ``values`` an (n, 5) array of
+    open/high/low/close/volume. Returns the bar start times, the (m, 5) bar
+    values and the index of the first base row of every bar.
+    """
+    if not len(times):
+        return times[:0], values[:0], np.empty(0, dtype=np.intp)
+    step = minutes * _NS_PER_MINUTE
+    buckets = times - times % step
+    first = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    last = np.r_[first[1:], len(buckets)] - 1
+    bars = np.empty((len(first), len(BAR_COLUMNS)))
+    bars[:, 0] = values[first, 0]
+    bars[:, 1] = np.fmax.reduceat(values[:, 1], first)
+    bars[:, 2] = np.fmin.reduceat(values[:, 2], first)
+    bars[:, 3] = values[last, 3]
+    bars[:, 4] = np.add.reduceat(np.nan_to_num(values[:, 4]), first)
+    return buckets[first], bars, first
+
+
+def resample_frame(data: pd.DataFrame, timeframe: str, time_col: str = "datetime") -> pd.DataFrame:
+    """Resample a frame of 1m bars in memory (same rules as the cache)."""
+    if data.empty:
+        return pd.DataFrame(columns=[time_col] + BAR_COLUMNS)
+    data = data.sort_values(time_col)
+    times, bars, _ = aggregate(_to_ns(data[time_col]), data[BAR_COLUMNS].to_numpy(dtype=float),
+                               RESAMPLED_TIMEFRAMES[timeframe])
+    return _frame(times, bars, tz_aware=getattr(data[time_col].dtype, "tz", None) is not None, time_col=time_col)
+
+
+def _frame(times: np.ndarray, bars: np.ndarray, tz_aware: bool, time_col: str = "datetime") -> pd.DataFrame:
+    index = pd.DatetimeIndex(times.view("datetime64[ns]"))
+    columns = {time_col: index.tz_localize("UTC") if tz_aware else index}
+    columns.update((name, bars[:, k]) for k, name in enumerate(BAR_COLUMNS))
+    if np.isfinite(bars[:, 4]).all():
+        columns["volume"] = np.rint(bars[:, 4]).astype("int64")
+    return pd.DataFrame(columns)
+
+
+@dataclass
+class _ResampledSeries:
+    times: np.ndarray    # Bar start, int64 UTC nanoseconds
+    bars: np.ndarray     # (n, 5) open/high/low/close/volume
+    anchors: np.ndarray  # Stored datetime string of the first base row of every bar
+    depth: int           # Bars kept; the largest limit requested
+    complete: bool       # Starts at the oldest base row of the symbol
+    tz_aware: bool       # Base datetimes carry an offset
+
+
+class TimeframeResampler:
+    """Thread-safe cache of resampled bars over the ``data_1min`` table."""
+
+    def __init__(self, max_base_rows: int = MAX_BASE_ROWS):
+        self.max_base_rows = max_base_rows
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str], _ResampledSeries] = {}
+        self.stats = {"builds": 0, "refreshes": 0, "base_rows_read": 0, "invalidations": 0}
+
+    def get(self, conn: sqlite3.Connection, symbol: str, timeframe: str, limit: int = 1000) -> pd.DataFrame:
+        """Last ``limit`` bars of ``timeframe`` built from the symbol's 1m bars.
+
+        The newest bar may still be forming. Returns an empty frame when the
+        symbol has no 1m data.
+        """
+        minutes = RESAMPLED_TIMEFRAMES[timeframe]
+        key = (_database_key(conn), symbol, timeframe)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or (limit > series.depth and not series.complete):
+                series = self._build(conn, symbol, minutes, max(limit, series.depth if series else 0))
+            else:
+                series = self._refresh(conn, symbol, minutes, series)
+            if series is None:
+                self._series.pop(key, None)
+                return pd.DataFrame(columns=["datetime"] + BAR_COLUMNS)
+            self._series[key] = series
+            return _frame(series.times[-limit:], series.bars[-limit:], series.tz_aware)
+
+    def invalidate(self, symbol: str, since=None) -> None:
+        """Forget cached bars of ``symbol`` from the bar containing ``since`` on (all bars if None).
+
+        Call after writing 1m rows older than the newest cached bar; the
+        dropped bars are rebuilt from the database on the next read.
+        """
+        since_ns = None if since is None else int(_to_ns([since])[0])
+        with self._lock:
+            for key in [key for key in self._series if key[1] == symbol]:
+                series = self._series[key]
+                if since_ns is not None:
+                    step = RESAMPLED_TIMEFRAMES[key[2]] * _NS_PER_MINUTE
+                    keep = int(np.searchsorted(series.times, since_ns - since_ns % step))
+                    if keep >= len(series.times):
+                        continue  # Covered by the next incremental read
+                    if keep > 0:
+                        # The next read re-aggregates from the first row of the last kept bar
+                        series.times, series.bars, series.anchors = (
+                            series.times[:keep], series.bars[:keep], series.anchors[:keep])
+                        self.stats["invalidations"] += 1
+                        continue
+                del self._series[key]
+                self.stats["invalidations"] += 1
+
+    def invalidate_from_candles(self, symbol: str, timeframe: str, data: pd.DataFrame,
+                                time_col: str = "time") -> None:
+        """Invalidate from the oldest candle of a freshly saved 1m frame."""
+        if timeframe != BASE_TIMEFRAME or data is None or data.empty or time_col not in data.columns:
+            return
+        with self._lock:
+            if not any(key[1] == symbol for key in self._series):
+                return
+        self.invalidate(symbol, data[time_col].min())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "cached_series": len(self._series)}
+
+    # ------------------------------------------------------------------ internals
+
+    def _build(self, conn: sqlite3.Connection, symbol: str, minutes: int, depth: int) -> Optional[_ResampledSeries]:
+        # A bar holds at most `minutes` rows, so this many rows cover `depth` full bars
+        cap = min((depth + 1) * minutes, self.max_base_rows)
+        rows = conn.execute(
+            f"SELECT datetime, open, high, low, close, volume FROM {BASE_TABLE} "
+            "WHERE symbol = ? ORDER BY datetime DESC LIMIT ?",
+            (symbol, cap)).fetchall()
+        self.stats["builds"] += 1
+        self.stats["base_rows_read"] += len(rows)
+        if not rows:
+            return None
+        rows.reverse()
+        complete = len(rows) < cap
+        times, bars, anchors = self._aggregate_rows(rows, minutes)
+        if not complete and len(times) > 1:
+            # The oldest bar may be missing minutes cut off by LIMIT
+            times, bars, anchors = times[1:], bars[1:], anchors[1:]
+        series = _ResampledSeries(times, bars, anchors, depth, complete, _has_offset(rows[0][0]))
+        self._trim(series)
+        return series
+
+    def _refresh(self, conn: sqlite3.Connection, symbol: str, minutes: int,
+                 series: _ResampledSeries) -> Optional[_ResampledSeries]:
+        rows = conn.execute(
+            f"SELECT datetime, open, high, low, close, volume FROM {BASE_TABLE} "
+            "WHERE symbol = ? AND datetime >= ? ORDER BY datetime",
+            (symbol, series.anchors[-1])).fetchall()
+        self.stats["refreshes"] += 1
+        self.stats["base_rows_read"] += len(rows)
+        if not rows:
+            return series
+        times, bars, anchors = self._aggregate_rows(rows, minutes)
+        keep = int(np.searchsorted(series.times, times[0]))
+        series.times = np.concatenate([series.times[:keep], times])
+        series.bars = np.concatenate([series.bars[:keep], bars])
+        series.anchors = np.concatenate([series.anchors[:keep], anchors])
+        self._trim(series)
+        return series
+
+    @staticmethod
+    def _aggregate_rows(rows: List[Sequence], minutes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        stamps = np.array([row[0] for row in rows], dtype=object)
+        values = np.array([row[1:] for row in rows], dtype=float)
+        times, bars, first = aggregate(_to_ns(stamps), values, minutes)
+        return times, bars, stamps[first]
+
+    @staticmethod
+    def _trim(series: _ResampledSeries) -> None:
+        if len(series.times) > series.depth:
+            series.times = series.times[-series.depth:]
+            series.bars = series.bars[-series.depth:]
+            series.anchors = series.anchors[-series.depth:]
+            series.complete = False
+
+
+def _has_offset(stamp: str) -> bool:
+    return pd.Timestamp(stamp).tzinfo is not None
+
+
+def _database_key(conn: sqlite3.Connection) -> str:
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return path or f"memory:{id(conn)}"
+
+
+_resampler = TimeframeResampler()
+
+
+def get_resampler() -> TimeframeResampler:
+    return _resampler
@@ -11,6 +11,8 @@ from datetime import datetime, timezone
 from typing import Dict, List, Optional, Callable, Any
 import pandas as pd
 
+from .price_cache import get_price_cache
+
 # Попытка импорта Tinkoff API
 try:
     from tinkoff.invest import Client, CandleInterval
@@ -122,6 +124,7 @@ class TinkoffWebSocketProvider:
             
             # Конвертируем в стандартный формат
             candle_data = {
+                "figi": figi,
                 "time": datetime.fromisoformat(candle.get("time", "").replace("Z", "+00:00")),
                 "open": quotation_to_decimal(candle.get("open", {})),
                 "close": quotation_to_decimal(candle.get("close", {})),
@@ -136,6 +139,7 @@ class TinkoffWebSocketProvider:
                 "candle": candle_data,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
+            get_price_cache().update(figi, candle_data["close"], candle_data["time"], "candle")
             
             # Вызываем колбэк, если есть
             if figi in self.callbacks:
@@ -161,6 +165,7 @@ class TinkoffWebSocketProvider:
             
             # Конвертируем в стандартный формат
             tick_data = {
+                "figi": figi,
                 "time": datetime.fromisoformat(trade.get("time", "").replace("Z", "+00:00")),
                 "price": quotation_to_decimal(trade.get("price", {})),
                 "volume": trade.get("quantity", 0),
@@ -172,6 +177,7 @@ class TinkoffWebSocketProvider:
                 "tick": tick_data,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
+            get_price_cache().update(figi, tick_data["price"], tick_data["time"], "tick")
             
             # Вызываем колбэк, если есть
             if figi in self.callbacks:
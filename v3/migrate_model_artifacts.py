@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Convert pickled models in models/ to the safetensors + JSON artifact format."""
+
+import argparse
+import logging
+
+from core.ml.storage import MLModelStorage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--models-dir", default="models/")
+    parser.add_argument("--db", default="stock_data.db")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    storage = MLModelStorage(db_path=args.db, cache_dir=args.models_dir)
+    summary = storage.migrate_legacy_models()
+    print(f"✅ Migrated: {summary['migrated']}")
+    print(f"⏭️ Skipped (not a torch predictor): {summary['skipped']}")
+    print(f"❌ Failed: {summary['failed']}")
+
+
+if __name__ == "__main__":
+    main()
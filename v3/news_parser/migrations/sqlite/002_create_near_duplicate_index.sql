@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS article_minhash (
+  article_id INTEGER PRIMARY KEY,
+  signature BLOB,
+  cluster_id INTEGER,
+  FOREIGN KEY(article_id) REFERENCES articles(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_article_minhash_cluster ON article_minhash(cluster_id);
+
+CREATE TABLE IF NOT EXISTS article_lsh (
+  bucket TEXT NOT NULL,
+  article_id INTEGER NOT NULL,
+  PRIMARY KEY (bucket, article_id),
+  FOREIGN KEY(article_id) REFERENCES articles(id) ON DELETE CASCADE
+) WITHOUT ROWID;
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS llm_enrichment_cache (
+  content_hash TEXT PRIMARY KEY,
+  article_id INTEGER,
+  model TEXT,
+  result TEXT NOT NULL,
+  latency_ms INTEGER,
+  created_at TEXT DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS idx_llm_enrichment_cache_article ON llm_enrichment_cache(article_id);
@@ -86,6 +86,32 @@ class Config:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
 
+@dataclass
+class LLMConfig:
+    """Settings for the OpenAI-compatible enrichment endpoint (GPT4Free)."""
+
+    base_url: str = "http://localhost:1337/v1"
+    model: str = "gpt-4o-mini"
+    api_key: Optional[str] = None
+    temperature: float = 0.2
+    timeout: float = 60.0
+    max_concurrency: int = 4
+    batch_size: int = 5
+    max_body_chars: int = 4000
+
+    @classmethod
+    def from_env(cls) -> "LLMConfig":
+        return cls(
+            base_url=os.getenv("NEWS_PARSER_LLM_BASE_URL", cls.base_url),
+            model=os.getenv("NEWS_PARSER_LLM_MODEL", cls.model),
+            api_key=os.getenv("NEWS_PARSER_LLM_API_KEY") or None,
+            temperature=float(os.getenv("NEWS_PARSER_LLM_TEMPERATURE", str(cls.temperature))),
+            timeout=float(os.getenv("NEWS_PARSER_LLM_TIMEOUT", str(cls.timeout))),
+            max_concurrency=int(os.getenv("NEWS_PARSER_LLM_CONCURRENCY", str(cls.max_concurrency))),
+            batch_size=int(os.getenv("NEWS_PARSER_LLM_BATCH_SIZE", str(cls.batch_size))),
+        )
+
+
 def _load_sources_from_env() -> List[SourceConfig]:
     raw = os.getenv("NEWS_PARSER_SOURCES")
     if not raw:
@@ -145,4 +171,4 @@ def iter_source_configs(config: Config) -> Iterable[SourceConfig]:
     return list(config.sources)
 
 
-__all__ = ["Config", "SourceConfig", "iter_source_configs", "load_config"]
+__all__ = ["Config", "LLMConfig", "SourceConfig", "iter_source_configs", "load_config"]
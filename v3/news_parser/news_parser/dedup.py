@@ -3,13 +3,183 @@
 from __future__ import annotations
 
 import hashlib
+import random
+import struct
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Set, Tuple
 
 from .normalize import normalize_text
 
+NUM_PERM = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_THRESHOLD = 0.6
+FINGERPRINT_BODY_CHARS = 2000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
 
 def article_hash(title: str, url: str) -> str:
     normalized = normalize_text(title) + "::" + url.strip()
     return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
 
-__all__ = ["article_hash"]
+def fingerprint_text(title: Optional[str], body: Optional[str]) -> str:
+    """Return the text used for near-duplicate detection of an article."""
+
+    return f"{title or ''} {(body or '')[:FINGERPRINT_BODY_CHARS]}"
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    words = normalize_text(text).split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _shingle_hash(shingle: str) -> int:
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    # Fixed seed keeps signatures comparable across processes and restarts.
+    rng = random.Random(num_perm)
+    return [
+        (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+        for _ in range(num_perm)
+    ]
+
+
+_PERMUTATIONS: Dict[int, List[Tuple[int, int]]] = {}
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM) -> Tuple[int, ...]:
+    """Compute a MinHash signature over word shingles of normalised *text*."""
+
+    hashes = {_shingle_hash(shingle) for shingle in shingles(text)}
+    if not hashes:
+        return ()
+    perms = _PERMUTATIONS.get(num_perm)
+    if perms is None:
+        perms = _PERMUTATIONS.setdefault(num_perm, _permutations(num_perm))
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in perms
+    )
+
+
+def signature_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimate Jaccard similarity from two MinHash signatures."""
+
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def band_keys(signature: Sequence[int], bands: int = LSH_BANDS) -> List[str]:
+    """Split *signature* into LSH band bucket keys."""
+
+    if not signature:
+        return []
+    rows = max(1, len(signature) // bands)
+    keys = []
+    for band in range(bands):
+        chunk = signature[band * rows : (band + 1) * rows]
+        if not chunk:
+            break
+        digest = hashlib.blake2b(pack_signature(chunk), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def pack_signature(signature: Sequence[int]) -> bytes:
+    return struct.pack(f"<{len(signature)}I", *signature)
+
+
+def unpack_signature(blob: Optional[bytes]) -> Tuple[int, ...]:
+    if not blob:
+        return ()
+    return struct.unpack(f"<{len(blob) // 4}I", blob)
+
+
+class NearDuplicateIndex:
+    """In-memory MinHash-LSH index mapping items to their canonical cluster."""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self._buckets: Dict[str, List[Hashable]] = {}
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._canonical: Dict[Hashable, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def candidates(self, signature: Sequence[int]) -> Set[Hashable]:
+        found: Set[Hashable] = set()
+        for key in band_keys(signature, self.bands):
+            found.update(self._buckets.get(key, ()))
+        return found
+
+    def find_duplicate(self, signature: Sequence[int]) -> Optional[Hashable]:
+        """Return the canonical id of the closest indexed near-duplicate."""
+
+        best_id: Optional[Hashable] = None
+        best_score = self.threshold
+        for candidate in self.candidates(signature):
+            score = signature_similarity(signature, self._signatures[candidate])
+            if score >= best_score:
+                best_id, best_score = candidate, score
+        if best_id is None:
+            return None
+        return self._canonical.get(best_id, best_id)
+
+    def add(self, item_id: Hashable, signature: Sequence[int]) -> Hashable:
+        """Index *item_id* and return the canonical id of its cluster."""
+
+        canonical = self.find_duplicate(signature)
+        if canonical is None:
+            canonical = item_id
+        signature = tuple(signature)
+        self._signatures[item_id] = signature
+        self._canonical[item_id] = canonical
+        for key in band_keys(signature, self.bands):
+            self._buckets.setdefault(key, []).append(item_id)
+        return canonical
+
+    def canonical_of(self, item_id: Hashable) -> Optional[Hashable]:
+        return self._canonical.get(item_id)
+
+
+def assign_cluster_keys(rows: Sequence[Mapping[str, object]]) -> List[Hashable]:
+    """Return a near-duplicate cluster key for each article row.
+
+    Rows that already carry a persisted ``cluster_id`` keep it; when some rows
+    were never indexed, all rows are clustered in memory so they can still be
+    merged with their indexed siblings.
+    """
+
+    keys: List[Optional[Hashable]] = [row.get("cluster_id") for row in rows]
+    if all(key is not None for key in keys):
+        return list(keys)
+    index = NearDuplicateIndex()
+    for position, row in enumerate(rows):
+        item_id = keys[position] if keys[position] is not None else ("row", position)
+        text = fingerprint_text(row.get("title"), row.get("body"))  # type: ignore[arg-type]
+        keys[position] = index.add(item_id, minhash_signature(text))
+    return list(keys)
+
+
+__all__ = [
+    "NEAR_DUPLICATE_THRESHOLD",
+    "NearDuplicateIndex",
+    "article_hash",
+    "assign_cluster_keys",
+    "band_keys",
+    "fingerprint_text",
+    "minhash_signature",
+    "pack_signature",
+    "signature_similarity",
+    "unpack_signature",
+]
@@ -0,0 +1,275 @@
+"""Batched, cached LLM enrichment of stored articles."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+from .config import LLMConfig
+from .dedup import fingerprint_text
+from .llm import ArticleEnvelope, AsyncGPT4FreeClient, EnrichmentResult
+from .normalize import normalize_text
+from .storage import Storage
+
+LOGGER = logging.getLogger(__name__)
+
+
+def content_hash(article: ArticleEnvelope, model: str, tickers: Sequence[str]) -> str:
+    """Cache key: model, allowed tickers and normalised article text."""
+
+    text = normalize_text(fingerprint_text(article.title, article.body))
+    tickers_key = ",".join(sorted(set(tickers)))
+    return hashlib.sha256(f"{model}::{tickers_key}::{text}".encode("utf-8")).hexdigest()
+
+
+def _percentile(values: Sequence[int], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return float(ordered[index])
+
+
+@dataclass
+class EnrichmentMetrics:
+    """Aggregated latency/throughput figures for an enrichment run."""
+
+    articles: int = 0
+    cache_hits: int = 0
+    duplicate_hits: int = 0
+    requests: int = 0
+    batched_requests: int = 0
+    failures: int = 0
+    wall_time_s: float = 0.0
+    latencies_ms: List[int] = field(default_factory=list)
+
+    @property
+    def latency_p50_ms(self) -> float:
+        return _percentile(self.latencies_ms, 50)
+
+    @property
+    def latency_p95_ms(self) -> float:
+        return _percentile(self.latencies_ms, 95)
+
+    @property
+    def throughput_per_s(self) -> float:
+        if self.wall_time_s <= 0:
+            return 0.0
+        return self.articles / self.wall_time_s
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("latencies_ms")
+        data.update(
+            latency_p50_ms=self.latency_p50_ms,
+            latency_p95_ms=self.latency_p95_ms,
+            throughput_per_s=round(self.throughput_per_s, 2),
+        )
+        return data
+
+
+class EnrichmentCache:
+    """Persistent result cache stored in ``llm_enrichment_cache``."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    @staticmethod
+    def _decode(payload: str) -> EnrichmentResult:
+        return replace(EnrichmentResult(**json.loads(payload)), cached=True)
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, EnrichmentResult]:
+        found: Dict[str, EnrichmentResult] = {}
+        if not hashes:
+            return found
+        with self.storage.connect() as conn:
+            for chunk_start in range(0, len(hashes), 500):
+                chunk = hashes[chunk_start : chunk_start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cur = conn.execute(
+                    f"SELECT content_hash, result FROM llm_enrichment_cache WHERE content_hash IN ({placeholders})",
+                    tuple(chunk),
+                )
+                found.update({row[0]: self._decode(row[1]) for row in cur.fetchall()})
+        return found
+
+    def get_by_articles(self, article_ids: Sequence[int]) -> Dict[int, EnrichmentResult]:
+        found: Dict[int, EnrichmentResult] = {}
+        if not article_ids:
+            return found
+        with self.storage.connect() as conn:
+            for chunk_start in range(0, len(article_ids), 500):
+                chunk = article_ids[chunk_start : chunk_start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cur = conn.execute(
+                    f"SELECT article_id, result FROM llm_enrichment_cache WHERE article_id IN ({placeholders})",
+                    tuple(chunk),
+                )
+                found.update({row[0]: self._decode(row[1]) for row in cur.fetchall()})
+        return found
+
+    def put_many(self, entries: Iterable[tuple[str, int, str, EnrichmentResult]]) -> None:
+        rows = [
+            (
+                key,
+                article_id,
+                model,
+                json.dumps(asdict(replace(result, cached=False)), ensure_ascii=False),
+                result.latency_ms,
+            )
+            for key, article_id, model, result in entries
+        ]
+        if not rows:
+            return
+        with self.storage.connect() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO llm_enrichment_cache
+                (content_hash, article_id, model, result, latency_ms)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.commit()
+
+
+class EnrichmentEngine:
+    """Enrich articles through one pooled async client.
+
+    Results are looked up in the persistent cache first, syndicated copies
+    reuse the result of their canonical article, and the remaining articles
+    are grouped into multi-article requests of ``config.batch_size``.
+    """
+
+    def __init__(
+        self,
+        config: LLMConfig,
+        storage: Storage,
+        *,
+        client: Optional[AsyncGPT4FreeClient] = None,
+    ):
+        self.config = config
+        self.storage = storage
+        self.cache = EnrichmentCache(storage)
+        self.client = client or AsyncGPT4FreeClient(config)
+        self.metrics = EnrichmentMetrics()
+
+    def _record(self, result: EnrichmentResult) -> None:
+        self.metrics.latencies_ms.append(result.latency_ms)
+        if not result.success:
+            self.metrics.failures += 1
+
+    async def _send(
+        self, articles: Sequence[ArticleEnvelope], tickers: Sequence[str]
+    ) -> Dict[int, EnrichmentResult]:
+        batch_size = max(1, self.config.batch_size)
+        chunks = [articles[i : i + batch_size] for i in range(0, len(articles), batch_size)]
+        self.metrics.requests += len(chunks)
+        self.metrics.batched_requests += sum(1 for chunk in chunks if len(chunk) > 1)
+        responses = await asyncio.gather(
+            *(self.client.aenrich_batch(chunk, tickers=tickers) for chunk in chunks)
+        )
+        results: Dict[int, EnrichmentResult] = {}
+        for response in responses:
+            results.update(response)
+        missing = [article for article in articles if article.id not in results]
+        if missing:
+            LOGGER.info("Retrying %d articles missing from batched answers", len(missing))
+            self.metrics.requests += len(missing)
+            singles = await asyncio.gather(
+                *(self.client.aenrich(article, tickers=tickers) for article in missing)
+            )
+            results.update({article.id: result for article, result in zip(missing, singles)})
+        for result in results.values():
+            self._record(result)
+        return results
+
+    async def aenrich_articles(
+        self,
+        articles: Sequence[ArticleEnvelope],
+        *,
+        tickers: Iterable[str] = (),
+        canonical: Optional[Mapping[int, int]] = None,
+    ) -> Dict[int, EnrichmentResult]:
+        """Return ``{article_id: EnrichmentResult}`` for *articles*.
+
+        ``canonical`` maps near-duplicate article ids to their canonical
+        article; by default it is read from the storage near-duplicate index.
+        """
+
+        tickers = sorted(set(tickers))
+        started = time.perf_counter()
+        self.metrics.articles += len(articles)
+        keys = {article.id: content_hash(article, self.config.model, tickers) for article in articles}
+        cached = self.cache.get_many(list(set(keys.values())))
+        results: Dict[int, EnrichmentResult] = {}
+        pending: List[ArticleEnvelope] = []
+        for article in articles:
+            hit = cached.get(keys[article.id])
+            if hit is not None:
+                results[article.id] = hit
+            else:
+                pending.append(article)
+        self.metrics.cache_hits += len(results)
+
+        if canonical is None:
+            canonical = self.storage.near_duplicate_map([article.id for article in pending])
+        pending_ids = {article.id for article in pending}
+        known = self.cache.get_by_articles(
+            sorted({canonical[a.id] for a in pending if a.id in canonical} - pending_ids)
+        )
+        followers: Dict[int, int] = {}
+        to_send: List[ArticleEnvelope] = []
+        for article in pending:
+            root = canonical.get(article.id)
+            if root is not None and root in known:
+                results[article.id] = known[root]
+                self.metrics.duplicate_hits += 1
+            elif root is not None and root in pending_ids and root != article.id:
+                followers[article.id] = root
+            else:
+                to_send.append(article)
+
+        try:
+            fresh = await self._send(to_send, tickers) if to_send else {}
+        finally:
+            await self.client.aclose()
+        results.update(fresh)
+        for follower, root in followers.items():
+            if root in fresh:
+                results[follower] = replace(fresh[root], cached=fresh[root].success)
+                self.metrics.duplicate_hits += 1
+        self.cache.put_many(
+            (keys[article.id], article.id, self.config.model, fresh[article.id])
+            for article in to_send
+            if article.id in fresh and fresh[article.id].success
+        )
+        self.metrics.wall_time_s += time.perf_counter() - started
+        LOGGER.info("LLM enrichment metrics: %s", self.metrics.as_dict())
+        return results
+
+    def enrich_articles(
+        self,
+        articles: Sequence[ArticleEnvelope],
+        *,
+        tickers: Iterable[str] = (),
+        canonical: Optional[Mapping[int, int]] = None,
+    ) -> Dict[int, EnrichmentResult]:
+        """Synchronous wrapper around :meth:`aenrich_articles`."""
+
+        return asyncio.run(
+            self.aenrich_articles(articles, tickers=tickers, canonical=canonical)
+        )
+
+
+__all__ = [
+    "EnrichmentCache",
+    "EnrichmentEngine",
+    "EnrichmentMetrics",
+    "content_hash",
+]
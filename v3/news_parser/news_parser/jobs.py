@@ -128,11 +128,22 @@ def run_once(
                 skipped=skipped_duplicates,
             )
         matches_total = 0
+        near_duplicates = storage.near_duplicate_map(new_article_ids)
         tickers = storage.fetch_tickers()
         matcher = TickerMatcher(tickers) if tickers else None
         if matcher:
             emit("matching_start", total=len(new_article_ids))
             for match_index, article_id in enumerate(new_article_ids, start=1):
+                canonical_id = near_duplicates.get(article_id)
+                if canonical_id is not None:
+                    # Syndicated copy: reuse the canonical article's matches.
+                    matches_total += storage.copy_ticker_mentions(canonical_id, article_id)
+                    emit(
+                        "matching_progress",
+                        processed=match_index,
+                        total=len(new_article_ids),
+                    )
+                    continue
                 with storage.connect() as conn:
                     cur = conn.execute("SELECT body FROM articles WHERE id = ?", (article_id,))
                     row = cur.fetchone()
@@ -158,7 +169,7 @@ def run_once(
             status="success",
             new_articles=len(new_article_ids),
             duplicates=duplicates,
-            log=f"ticker_matches={matches_total}",
+            log=f"ticker_matches={matches_total} near_duplicates={len(near_duplicates)}",
         )
         logger.info(
             "Job finished: %s new articles, %s duplicates", len(new_article_ids), duplicates
@@ -168,10 +179,12 @@ def run_once(
             new_articles=len(new_article_ids),
             duplicates=duplicates,
             ticker_matches=matches_total,
+            near_duplicates=len(near_duplicates),
         )
         return {
             "new_articles": len(new_article_ids),
             "duplicates": duplicates,
+            "near_duplicates": len(near_duplicates),
             "ticker_matches": matches_total,
         }
     except Exception as exc:  # pragma: no cover - exceptional path
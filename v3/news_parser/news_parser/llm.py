@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence
+from typing import Dict, Iterable, List, Optional, Sequence
 
 import httpx
 
@@ -14,6 +15,18 @@ from .config import LLMConfig
 
 LOGGER = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "Ты помощник по разметке финансовых новостей. Всегда возвращай корректный JSON."
+
+RESPONSE_SCHEMA = (
+    "{\n"
+    "  \"tickers\": [\n"
+    "    {\"symbol\": \"SBER\", \"confidence\": 0.92, \"evidence\": \"Краткая цитата\"}\n"
+    "  ],\n"
+    "  \"sentiment\": \"positive|negative|neutral|uncertain\",\n"
+    "  \"summary\": \"краткий пересказ на русском до 240 символов\"\n"
+    "}"
+)
+
 
 @dataclass(frozen=True)
 class ArticleEnvelope:
@@ -36,6 +49,63 @@ class EnrichmentResult:
     latency_ms: int
     error: Optional[str] = None
     status: str = "success"
+    cached: bool = False
+
+
+def _failure(
+    *, raw_response: str, latency_ms: int, error: str, status: str = "failed"
+) -> EnrichmentResult:
+    return EnrichmentResult(
+        success=False,
+        tags=[],
+        summary="",
+        sentiment="uncertain",
+        confidence=None,
+        raw_response=raw_response,
+        latency_ms=latency_ms,
+        error=error,
+        status=status,
+    )
+
+
+def parse_enrichment(data: dict, *, raw_response: str, latency_ms: int) -> EnrichmentResult:
+    """Convert one decoded JSON answer into an :class:`EnrichmentResult`."""
+
+    tickers_data = data.get("tickers") or []
+    if not isinstance(tickers_data, list):
+        tickers_data = []
+    tags: List[dict] = []
+    for item in tickers_data:
+        if not isinstance(item, dict):
+            continue
+        symbol = str(item.get("symbol", "")).strip().upper()
+        if not symbol:
+            continue
+        tags.append(
+            {
+                "symbol": symbol,
+                "confidence": float(item.get("confidence", 0) or 0),
+                "evidence": str(item.get("evidence", "")),
+            }
+        )
+
+    sentiment = str(data.get("sentiment") or "uncertain").strip().lower()
+    summary = str(data.get("summary") or "").strip()
+
+    avg_conf: Optional[float] = None
+    if tags:
+        avg_conf = sum(tag.get("confidence") or 0 for tag in tags) / len(tags)
+
+    return EnrichmentResult(
+        success=True,
+        tags=tags,
+        summary=summary,
+        sentiment=sentiment,
+        confidence=avg_conf,
+        raw_response=raw_response,
+        latency_ms=latency_ms,
+        status="success",
+    )
 
 
 class GPT4FreeClient:
@@ -52,26 +122,35 @@ class GPT4FreeClient:
         if config.api_key:
             headers["Authorization"] = f"Bearer {config.api_key}"
         self.headers = headers
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(headers=self.headers, timeout=self.config.timeout)
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _trim_body(self, body: str) -> str:
+        body = body or ""
+        if len(body) > self.config.max_body_chars:
+            body = body[: self.config.max_body_chars]
+        return body
 
     def _build_prompt(self, article: ArticleEnvelope, tickers: Sequence[str]) -> List[dict]:
         tickers_list = ", ".join(sorted(set(tickers))) if tickers else ""
-        body = article.body or ""
-        if len(body) > 4000:
-            body = body[:4000]
+        body = self._trim_body(article.body)
         user_content = (
             "Тебе дана новостная заметка по финансовым рынкам. "
             "Нужно найти тикеры Московской биржи, которые явно упоминаются или подразумеваются, "
             "и оценить настрой новости. Ответь строго JSON по схеме:\n"
-            "{\n"
-            "  \"tickers\": [\n"
-            "    {\"symbol\": \"SBER\", \"confidence\": 0.92, \"evidence\": \"Краткая цитата\"}\n"
-            "  ],\n"
-            "  \"sentiment\": \"positive|negative|neutral|uncertain\",\n"
-            "  \"summary\": \"краткий пересказ на русском до 240 символов\"\n"
-            "}\n"
-            "Если нет уверенности, оставь массив tickers пустым и поставь sentiment=\"uncertain\"."
+            + RESPONSE_SCHEMA
+            + "\nЕсли нет уверенности, оставь массив tickers пустым и поставь sentiment=\"uncertain\"."
         )
-        user_content = "".join(user_content)
         if tickers_list:
             user_content += f"\nСписок допустимых тикеров: {tickers_list}."
         user_content += (
@@ -79,132 +158,215 @@ class GPT4FreeClient:
             "\nЗаголовок: {title}\nURL: {url}\nТекст: {body}\n"
         ).format(title=article.title or "", url=article.url or "", body=body)
         return [
-            {
-                "role": "system",
-                "content": "Ты помощник по разметке финансовых новостей. Всегда возвращай корректный JSON.",
-            },
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_content},
         ]
-    def enrich(
-        self,
-        article: ArticleEnvelope,
-        *,
-        tickers: Iterable[str],
-    ) -> EnrichmentResult:
-        payload = {
+
+    def _build_batch_prompt(
+        self, articles: Sequence[ArticleEnvelope], tickers: Sequence[str]
+    ) -> List[dict]:
+        tickers_list = ", ".join(sorted(set(tickers))) if tickers else ""
+        user_content = (
+            "Тебе даны несколько новостных заметок по финансовым рынкам. "
+            "Для каждой найди тикеры Московской биржи, которые явно упоминаются или подразумеваются, "
+            "и оцени настрой новости. Ответь строго JSON вида "
+            "{\"articles\": [{\"id\": <id заметки>, ...}]}, где каждый элемент имеет схему:\n"
+            + RESPONSE_SCHEMA
+            + "\nЕсли нет уверенности, оставь массив tickers пустым и поставь sentiment=\"uncertain\"."
+        )
+        if tickers_list:
+            user_content += f"\nСписок допустимых тикеров: {tickers_list}."
+        user_content += "\nУчитывай только фактические упоминания компаний или активов.\n"
+        for article in articles:
+            user_content += (
+                "\n### id={id}\nЗаголовок: {title}\nURL: {url}\nТекст: {body}\n"
+            ).format(
+                id=article.id,
+                title=article.title or "",
+                url=article.url or "",
+                body=self._trim_body(article.body),
+            )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content},
+        ]
+
+    def _payload(self, messages: List[dict], *, max_tokens: int = 400) -> dict:
+        return {
             "model": self.config.model,
-            "messages": self._build_prompt(article, tickers),
+            "messages": messages,
             "temperature": self.config.temperature,
-            "max_tokens": 400,
+            "max_tokens": max_tokens,
             "response_format": {"type": "json_object"},
         }
-        start = time.perf_counter()
-        try:
-            response = httpx.post(
-                self.endpoint,
-                json=payload,
-                headers=self.headers,
-                timeout=self.config.timeout,
-            )
-            latency_ms = int((time.perf_counter() - start) * 1000)
-        except Exception as exc:  # pragma: no cover - network failure
-            LOGGER.exception("GPT4Free request failed")
-            return EnrichmentResult(
-                success=False,
-                tags=[],
-                summary="",
-                sentiment="uncertain",
-                confidence=None,
-                raw_response="",
-                latency_ms=int((time.perf_counter() - start) * 1000),
-                error=str(exc),
-                status="unavailable",
-            )
+
+    def _decode_response(
+        self, response: httpx.Response, latency_ms: int
+    ) -> tuple[Optional[dict], Optional[EnrichmentResult], str]:
+        """Return ``(data, failure, content)`` for a chat completion response."""
 
         raw = response.text
         if response.status_code >= 400:
             status_label = "unavailable" if response.status_code >= 500 else "failed"
             LOGGER.error("GPT4Free error %s: %s", response.status_code, raw)
-            return EnrichmentResult(
-                success=False,
-                tags=[],
-                summary="",
-                sentiment="uncertain",
-                confidence=None,
+            return None, _failure(
                 raw_response=raw,
                 latency_ms=latency_ms,
                 error=f"HTTP {response.status_code}",
                 status=status_label,
-            )
+            ), raw
 
         try:
             payload_json = response.json()
             content = payload_json["choices"][0]["message"]["content"]
         except Exception as exc:  # pragma: no cover - defensive
             LOGGER.error("Unexpected GPT4Free payload: %s", exc)
-            return EnrichmentResult(
-                success=False,
-                tags=[],
-                summary="",
-                sentiment="uncertain",
-                confidence=None,
-                raw_response=raw,
-                latency_ms=latency_ms,
-                error="invalid_payload",
-                status="failed",
-            )
+            return None, _failure(
+                raw_response=raw, latency_ms=latency_ms, error="invalid_payload"
+            ), raw
 
         try:
             data = json.loads(content)
         except json.JSONDecodeError as exc:
             LOGGER.warning("Failed to decode LLM JSON: %s", exc)
-            return EnrichmentResult(
-                success=False,
-                tags=[],
-                summary="",
-                sentiment="uncertain",
-                confidence=None,
-                raw_response=content,
-                latency_ms=latency_ms,
-                error="json_decode_error",
-                status="failed",
+            return None, _failure(
+                raw_response=content, latency_ms=latency_ms, error="json_decode_error"
+            ), content
+        if not isinstance(data, dict):
+            return None, _failure(
+                raw_response=content, latency_ms=latency_ms, error="json_decode_error"
+            ), content
+        return data, None, content
+
+    def enrich(
+        self,
+        article: ArticleEnvelope,
+        *,
+        tickers: Iterable[str],
+    ) -> EnrichmentResult:
+        payload = self._payload(self._build_prompt(article, list(tickers)))
+        start = time.perf_counter()
+        try:
+            response = self.client.post(self.endpoint, json=payload)
+            latency_ms = int((time.perf_counter() - start) * 1000)
+        except Exception as exc:  # pragma: no cover - network failure
+            LOGGER.exception("GPT4Free request failed")
+            return _failure(
+                raw_response="",
+                latency_ms=int((time.perf_counter() - start) * 1000),
+                error=str(exc),
+                status="unavailable",
             )
 
-        tickers_data = data.get("tickers") or []
-        if not isinstance(tickers_data, list):
-            tickers_data = []
-        tags: List[dict] = []
-        for item in tickers_data:
-            if not isinstance(item, dict):
-                continue
-            symbol = str(item.get("symbol", "")).strip().upper()
-            if not symbol:
-                continue
-            tags.append(
-                {
-                    "symbol": symbol,
-                    "confidence": float(item.get("confidence", 0) or 0),
-                    "evidence": str(item.get("evidence", "")),
-                }
+        data, failure, content = self._decode_response(response, latency_ms)
+        if failure is not None:
+            return failure
+        return parse_enrichment(data, raw_response=content, latency_ms=latency_ms)
+
+
+class AsyncGPT4FreeClient(GPT4FreeClient):
+    """Async variant sharing one connection pool under a concurrency cap."""
+
+    def __init__(self, config: LLMConfig):
+        super().__init__(config)
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            limit = max(1, self.config.max_concurrency)
+            self._async_client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.config.timeout,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
             )
+        return self._async_client
 
-        sentiment = str(data.get("sentiment") or "uncertain").strip().lower()
-        summary = str(data.get("summary") or "").strip()
-
-        avg_conf: Optional[float] = None
-        if tags:
-            avg_conf = sum(tag.get("confidence") or 0 for tag in tags) / len(tags)
-
-        return EnrichmentResult(
-            success=True,
-            tags=tags,
-            summary=summary,
-            sentiment=sentiment,
-            confidence=avg_conf,
-            raw_response=content,
-            latency_ms=latency_ms,
-            status="success",
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self._semaphore = None
+
+    async def _post(self, payload: dict) -> tuple[Optional[httpx.Response], int, Optional[str]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self.async_client.post(self.endpoint, json=payload)
+            except Exception as exc:  # pragma: no cover - network failure
+                LOGGER.exception("GPT4Free request failed")
+                return None, int((time.perf_counter() - start) * 1000), str(exc)
+            return response, int((time.perf_counter() - start) * 1000), None
+
+    async def aenrich(
+        self, article: ArticleEnvelope, *, tickers: Iterable[str]
+    ) -> EnrichmentResult:
+        payload = self._payload(self._build_prompt(article, list(tickers)))
+        response, latency_ms, error = await self._post(payload)
+        if response is None:
+            return _failure(
+                raw_response="", latency_ms=latency_ms, error=error or "", status="unavailable"
+            )
+        data, failure, content = self._decode_response(response, latency_ms)
+        if failure is not None:
+            return failure
+        return parse_enrichment(data, raw_response=content, latency_ms=latency_ms)
+
+    async def aenrich_batch(
+        self, articles: Sequence[ArticleEnvelope], *, tickers: Iterable[str]
+    ) -> Dict[int, EnrichmentResult]:
+        """Enrich several articles with one request.
+
+        Articles missing from the model answer are absent from the returned
+        mapping so the caller can retry them individually.
+        """
+
+        if len(articles) == 1:
+            article = articles[0]
+            return {article.id: await self.aenrich(article, tickers=tickers)}
+        payload = self._payload(
+            self._build_batch_prompt(articles, list(tickers)),
+            max_tokens=400 * len(articles),
         )
+        response, latency_ms, error = await self._post(payload)
+        if response is None:
+            failure = _failure(
+                raw_response="", latency_ms=latency_ms, error=error or "", status="unavailable"
+            )
+            return {article.id: failure for article in articles}
+        data, failure, content = self._decode_response(response, latency_ms)
+        if failure is not None:
+            if failure.status == "unavailable":
+                return {article.id: failure for article in articles}
+            return {}
+        items = data.get("articles")
+        if not isinstance(items, list):
+            return {}
+        wanted = {article.id for article in articles}
+        results: Dict[int, EnrichmentResult] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                article_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if article_id in wanted:
+                results[article_id] = parse_enrichment(
+                    item,
+                    raw_response=json.dumps(item, ensure_ascii=False),
+                    latency_ms=latency_ms,
+                )
+        return results
 
 
-__all__ = ["ArticleEnvelope", "EnrichmentResult", "GPT4FreeClient"]
+__all__ = [
+    "ArticleEnvelope",
+    "AsyncGPT4FreeClient",
+    "EnrichmentResult",
+    "GPT4FreeClient",
+    "parse_enrichment",
+]
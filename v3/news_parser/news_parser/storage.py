@@ -6,12 +6,22 @@ import json
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from .config import SourceConfig
+from .dedup import (
+    NEAR_DUPLICATE_THRESHOLD,
+    band_keys,
+    fingerprint_text,
+    minhash_signature,
+    pack_signature,
+    signature_similarity,
+    unpack_signature,
+)
 from .utils import acquire_db_lock, release_db_lock
 
-MIGRATION_FILE = Path(__file__).resolve().parent.parent / "migrations" / "sqlite" / "001_create_news_tables.sql"
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "sqlite"
+MIGRATION_FILE = MIGRATIONS_DIR / "001_create_news_tables.sql"
 
 
 @dataclass
@@ -41,9 +51,9 @@ class Storage:
         return conn
 
     def migrate(self) -> None:
-        sql = MIGRATION_FILE.read_text(encoding="utf-8")
         with self.connect() as conn:
-            conn.executescript(sql)
+            for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                conn.executescript(migration.read_text(encoding="utf-8"))
 
     def ensure_sources(self, sources: Sequence[SourceConfig]) -> dict[str, int]:
         mapping: dict[str, int] = {}
@@ -88,11 +98,105 @@ class Storage:
                 )
                 if cur.rowcount:
                     ids.append(cur.lastrowid)
+                    self._index_article(
+                        conn, cur.lastrowid, fingerprint_text(article.title, article.body)
+                    )
                 else:
                     duplicates += 1
             conn.commit()
         return ids, duplicates
 
+    def _index_article(self, conn: sqlite3.Connection, article_id: int, text: str) -> int:
+        """Add an article to the MinHash-LSH index and return its cluster id."""
+
+        signature = minhash_signature(text)
+        buckets = band_keys(signature)
+        cluster_id = article_id
+        if buckets:
+            placeholders = ",".join("?" for _ in buckets)
+            cur = conn.execute(
+                f"""
+                SELECT m.article_id, m.signature, m.cluster_id
+                FROM article_minhash m
+                WHERE m.article_id IN (
+                    SELECT DISTINCT article_id FROM article_lsh WHERE bucket IN ({placeholders})
+                )
+                """,
+                tuple(buckets),
+            )
+            best_score = NEAR_DUPLICATE_THRESHOLD
+            for candidate_id, blob, candidate_cluster in cur.fetchall():
+                if candidate_id == article_id:
+                    continue
+                score = signature_similarity(signature, unpack_signature(blob))
+                if score >= best_score:
+                    best_score = score
+                    cluster_id = candidate_cluster or candidate_id
+        conn.execute(
+            "INSERT OR REPLACE INTO article_minhash (article_id, signature, cluster_id) VALUES (?, ?, ?)",
+            (article_id, pack_signature(signature), cluster_id),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO article_lsh (bucket, article_id) VALUES (?, ?)",
+            [(bucket, article_id) for bucket in buckets],
+        )
+        return cluster_id
+
+    def backfill_near_duplicate_index(self, limit: Optional[int] = None) -> int:
+        """Index articles stored before the near-duplicate index existed."""
+
+        sql = (
+            "SELECT a.id, a.title, a.body FROM articles a "
+            "LEFT JOIN article_minhash m ON m.article_id = a.id "
+            "WHERE m.article_id IS NULL ORDER BY a.id ASC"
+        )
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self.connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            for article_id, title, body in rows:
+                self._index_article(conn, article_id, fingerprint_text(title, body))
+            conn.commit()
+        return len(rows)
+
+    def near_duplicate_map(self, article_ids: Sequence[int]) -> Dict[int, int]:
+        """Return ``{article_id: canonical_id}`` for articles that are near-duplicates."""
+
+        if not article_ids:
+            return {}
+        mapping: Dict[int, int] = {}
+        with self.connect() as conn:
+            for chunk_start in range(0, len(article_ids), 500):
+                chunk = article_ids[chunk_start : chunk_start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cur = conn.execute(
+                    f"""
+                    SELECT article_id, cluster_id FROM article_minhash
+                    WHERE article_id IN ({placeholders}) AND cluster_id != article_id
+                    """,
+                    tuple(chunk),
+                )
+                mapping.update({row[0]: row[1] for row in cur.fetchall()})
+        return mapping
+
+    def copy_ticker_mentions(self, source_article_id: int, target_article_id: int) -> int:
+        """Reuse ticker matches of a canonical article for its near-duplicate."""
+
+        with self.connect() as conn:
+            cur = conn.execute(
+                """
+                INSERT INTO article_ticker
+                (article_id, ticker_id, mention_type, confidence, mention_text)
+                SELECT ?, ticker_id, mention_type, confidence, mention_text
+                FROM article_ticker WHERE article_id = ?
+                """,
+                (target_article_id, source_article_id),
+            )
+            conn.commit()
+            return cur.rowcount
+
     def insert_ticker_mentions(
         self, article_id: int, matches: Sequence[tuple[int, str, float, Optional[str]]]
     ) -> None:
@@ -146,9 +250,10 @@ class Storage:
         with conn:
             cur = conn.execute(
                 """
-                SELECT a.*, GROUP_CONCAT(at.ticker_id) as ticker_ids
+                SELECT a.*, GROUP_CONCAT(at.ticker_id) as ticker_ids, m.cluster_id
                 FROM articles a
                 LEFT JOIN article_ticker at ON at.article_id = a.id
+                LEFT JOIN article_minhash m ON m.article_id = a.id
                 WHERE a.published_at BETWEEN ? AND ?
                 GROUP BY a.id
                 ORDER BY a.published_at ASC
@@ -6,16 +6,16 @@ import json
 from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Sequence
+from typing import Dict, Hashable, List, Sequence
 
+from .dedup import assign_cluster_keys
 from .normalize import to_msk_interval
 from .storage import Storage
 
 
 def build_clusters(rows: Sequence[dict]) -> List[dict]:
-    clusters: Dict[str, dict] = {}
-    for row in rows:
-        key = row.get("hash") or row.get("title")
+    clusters: Dict[Hashable, dict] = {}
+    for row, key in zip(rows, assign_cluster_keys(rows)):
         if key not in clusters:
             clusters[key] = {
                 "headline": row.get("title"),
@@ -56,6 +56,7 @@ def generate_summary(storage: Storage, date: datetime) -> dict:
                 "body": row["body"],
                 "url": row["url"],
                 "hash": row["hash"],
+                "cluster_id": row["cluster_id"],
                 "tickers": [ticker for ticker in ticker_ids if ticker],
             }
         )
@@ -1,4 +1,5 @@
-from news_parser.dedup import article_hash
+from news_parser.dedup import NearDuplicateIndex, article_hash, fingerprint_text, minhash_signature
+from news_parser.storage import ArticleRecord, Storage
 
 
 def test_article_hash_stable():
@@ -11,3 +12,46 @@ def test_article_hash_changes():
     h1 = article_hash("Title", "https://example.com/a")
     h2 = article_hash("Title", "https://example.com/b")
     assert h1 != h2
+
+
+SYNDICATED_BODY = (
+    "Совет директоров ПАО Газпром рекомендовал выплатить дивиденды по итогам года "
+    "в размере 15 рублей на акцию, говорится в сообщении компании. Дата закрытия "
+    "реестра назначена на 20 июля, годовое собрание акционеров пройдет 30 июня."
+)
+
+
+def test_near_duplicate_index_groups_edited_copies():
+    index = NearDuplicateIndex()
+    first = index.add(1, minhash_signature(fingerprint_text("Газпром рекомендовал дивиденды", SYNDICATED_BODY)))
+    second = index.add(
+        2,
+        minhash_signature(
+            fingerprint_text("Газпром рекомендовал дивиденды", SYNDICATED_BODY + " Об этом сообщает Интерфакс.")
+        ),
+    )
+    other = index.add(3, minhash_signature(fingerprint_text("Сбербанк", "Сбербанк отчитался о прибыли за квартал по МСФО")))
+    assert first == 1
+    assert second == 1
+    assert other == 3
+
+
+def test_minhash_signature_stable():
+    assert minhash_signature("Газпром дивиденды") == minhash_signature("газпром, дивиденды!")
+    assert minhash_signature("") == ()
+
+
+def test_storage_assigns_cluster_at_insert(tmp_path):
+    storage = Storage(tmp_path / "news.db")
+    storage.migrate()
+    with storage.connect() as conn:
+        conn.execute("INSERT INTO sources (id, name) VALUES (1, 'Test')")
+        conn.commit()
+    records = [
+        ArticleRecord("Газпром рекомендовал дивиденды", SYNDICATED_BODY, "https://a/1", None, 1, "h1"),
+        ArticleRecord("Газпром рекомендовал дивиденды", SYNDICATED_BODY + " Источник: РБК.", "https://b/1", None, 1, "h2"),
+        ArticleRecord("Сбербанк отчитался", "Сбербанк отчитался о прибыли за квартал по МСФО", "https://c/1", None, 1, "h3"),
+    ]
+    ids, duplicates = storage.insert_articles(records)
+    assert duplicates == 0
+    assert storage.near_duplicate_map(ids) == {ids[1]: ids[0]}
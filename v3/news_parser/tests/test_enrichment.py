@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from news_parser.config import LLMConfig
+from news_parser.enrichment import EnrichmentEngine
+from news_parser.llm import ArticleEnvelope
+from news_parser.storage import Storage
+
+ID_RE = re.compile(r"### id=(\d+)")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests: list = []
+
+    def do_POST(self):  # noqa: N802 - http.server API
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        StubHandler.requests.append(payload)
+        prompt = payload["messages"][-1]["content"]
+        answer = {"tickers": [{"symbol": "gazp", "confidence": 0.9, "evidence": "Газпром"}],
+                  "sentiment": "positive", "summary": "ok"}
+        ids = ID_RE.findall(prompt)
+        if ids:
+            answer = {"articles": [dict(answer, id=int(article_id)) for article_id in ids]}
+        body = json.dumps({"choices": [{"message": {"content": json.dumps(answer)}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def stub_server():
+    StubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+@pytest.fixture()
+def storage(tmp_path: Path) -> Storage:
+    storage = Storage(tmp_path / "news.db")
+    storage.migrate()
+    return storage
+
+
+def _articles(count: int) -> list[ArticleEnvelope]:
+    return [
+        ArticleEnvelope(id=i, title=f"Новость {i}", body=f"Газпром событие номер {i}", url=f"https://x/{i}")
+        for i in range(1, count + 1)
+    ]
+
+
+def test_engine_batches_and_caches(stub_server, storage):
+    config = LLMConfig(base_url=stub_server, batch_size=3, max_concurrency=2)
+    engine = EnrichmentEngine(config, storage)
+    results = engine.enrich_articles(_articles(7), tickers=["GAZP"], canonical={})
+    assert len(results) == 7
+    assert all(result.success and result.tags[0]["symbol"] == "GAZP" for result in results.values())
+    assert len(StubHandler.requests) == 3
+    assert engine.metrics.batched_requests == 2
+
+    again = EnrichmentEngine(config, storage)
+    cached = again.enrich_articles(_articles(7), tickers=["GAZP"], canonical={})
+    assert len(StubHandler.requests) == 3
+    assert again.metrics.cache_hits == 7
+    assert all(result.cached for result in cached.values())
+
+
+def test_engine_reuses_canonical_result(stub_server, storage):
+    config = LLMConfig(base_url=stub_server, batch_size=1)
+    engine = EnrichmentEngine(config, storage)
+    results = engine.enrich_articles(_articles(2), tickers=[], canonical={2: 1})
+    assert len(StubHandler.requests) == 1
+    assert results[2].summary == results[1].summary
+    metrics = engine.metrics.as_dict()
+    assert metrics["duplicate_hits"] == 1
+    assert metrics["requests"] == 1
+    assert metrics["latency_p50_ms"] >= 0
@@ -6,7 +6,7 @@ from pathlib import Path
 import pytest
 
 from news_parser.storage import Storage
-from news_parser.summary import generate_summary
+from news_parser.summary import build_clusters, generate_summary
 
 
 @pytest.fixture()
@@ -44,3 +44,15 @@ def test_generate_summary(temp_db: Path):
     assert summary["date"] == "2024-05-01"
     assert summary["top_mentions"][0]["ticker"] == "1"
     assert summary["clusters"][0]["sources_count"] == 1
+
+
+def test_build_clusters_merges_near_duplicates():
+    body = "Газпром (GAZP) опубликовал отчет по МСФО за первый квартал, чистая прибыль выросла на 20 процентов"
+    rows = [
+        {"title": "Газпром отчитался", "body": body, "url": "https://a/1", "hash": "h1", "tickers": ["1"]},
+        {"title": "Газпром отчитался", "body": body + ", пишет РБК", "url": "https://b/1", "hash": "h2", "tickers": []},
+        {"title": "Лукойл", "body": "Лукойл объявил обратный выкуп акций", "url": "https://c/1", "hash": "h3", "tickers": []},
+    ]
+    clusters = build_clusters(rows)
+    assert [cluster["sources_count"] for cluster in clusters] == [2, 1]
+    assert clusters[0]["links"] == ["https://a/1", "https://b/1"]
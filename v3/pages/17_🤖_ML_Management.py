@@ -15,6 +15,7 @@ import asyncio
 try:
     from core.ml.model_manager import ml_model_manager
     from core.ml.storage import ml_storage
+    from core.ml.cascade_cache import cascade_ml_cache
     from core.ml.training_scheduler import ml_training_scheduler
     from core.database import get_connection
     ML_AVAILABLE = True
@@ -61,6 +62,28 @@ if scheduler_status['stats']['last_training']:
     last_training = datetime.fromisoformat(scheduler_status['stats']['last_training'])
     st.sidebar.metric("Последнее обучение", last_training.strftime("%H:%M:%S"))
 
+# Кэш моделей в памяти
+cache_stats = ml_storage.get_cache_stats()
+st.sidebar.subheader("🧠 Кэш моделей")
+st.sidebar.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+st.sidebar.metric("Моделей в памяти", f"{cache_stats['models']} / {cache_stats['max_models']}")
+st.sidebar.metric("Память весов", f"{cache_stats['bytes'] / 1024 ** 2:.1f} / {cache_stats['max_bytes'] / 1024 ** 2:.0f} МБ")
+st.sidebar.caption(
+    f"Попадания: {cache_stats['hits']} · промахи: {cache_stats['misses']} · "
+    f"вытеснения: {cache_stats['evictions']} · загрузки с диска: {cache_stats['file_loads']}"
+)
+
+# Посимвольный кэш ML сигналов
+signal_cache_stats = cascade_ml_cache.get_symbol_cache_stats()
+st.sidebar.subheader("📡 Кэш ML сигналов")
+st.sidebar.metric("Hit rate", f"{signal_cache_stats['hit_rate']:.0%}")
+st.sidebar.metric("Символов в кэше", f"{signal_cache_stats['valid_entries']} / {signal_cache_stats['entries']}")
+st.sidebar.caption(
+    f"Попадания: {signal_cache_stats['hits']} · пересчёты: {signal_cache_stats['misses']} · "
+    f"частичные: {signal_cache_stats['partial_hits']} · полные: {signal_cache_stats['full_hits']} · "
+    f"всего попаданий в БД: {signal_cache_stats['stored_hits']}"
+)
+
 # Управление обучением
 st.sidebar.subheader("🚀 Обучение моделей")
 
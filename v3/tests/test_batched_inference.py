@@ -0,0 +1,104 @@
+"""Tests for grouped multi-symbol price inference."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from core.ml.inference import BatchInferenceService, InferenceConfig, InferenceRequest  # noqa: E402
+from core.ml.predictive_models import GRUPredictor, LSTMPredictor, ModelConfig  # noqa: E402
+
+
+def make_prices(rows, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    return pd.DataFrame({
+        'open': close - 0.5, 'high': close + 1, 'low': close - 1,
+        'close': close, 'volume': rng.integers(100, 1000, rows).astype(float),
+    }, index=pd.date_range('2025-01-01', periods=rows, freq='D'))
+
+
+def make_predictor(cls=LSTMPredictor, seed=0, sequence_length=10, hidden_size=8):
+    torch.manual_seed(seed)
+    predictor = cls(ModelConfig(sequence_length=sequence_length, hidden_size=hidden_size,
+                                  num_layers=1, dropout=0.0))
+    predictor.model = predictor._create_model(5)
+    predictor.is_trained = True
+    return predictor
+
+
+class FakeStorage:
+    def __init__(self, models=None, cached=None):
+        self.models = models or {}
+        self.cached = cached or {}
+        self.saved = []
+
+    def get_predictions_bulk(self, symbols, prediction_type, timeframe='1d'):
+        return {symbol: self.cached[symbol] for symbol in symbols if symbol in self.cached}
+
+    def save_predictions_bulk(self, predictions, prediction_type, timeframe='1d'):
+        self.saved.append(list(predictions))
+
+    def get_model(self, symbol, model_type='lstm', timeframe='1d'):
+        return self.models.get(symbol, (None, None))
+
+
+class TestBatchInferenceService:
+    """Batched results must equal PricePredictor.predict for every symbol."""
+
+    @pytest.fixture(params=[True, False], ids=['vmap', 'loop'])
+    def service(self, request):
+        service = BatchInferenceService(InferenceConfig(num_threads=2, max_models_per_batch=3,
+                                                        vectorize=request.param),
+                                        storage=FakeStorage())
+        yield service
+        service.close()
+
+    def test_matches_single_symbol_predict(self, service, monkeypatch):
+        vectorized_calls = []
+        forward = BatchInferenceService._forward_vectorized
+        monkeypatch.setattr(service, '_forward_vectorized',
+                            lambda modules, inputs: vectorized_calls.append(len(modules)) or forward(modules, inputs))
+        requests = [
+            InferenceRequest(f'S{i}', make_predictor(seed=i), make_prices(60 + 10 * i, seed=i))
+            for i in range(5)
+        ] + [InferenceRequest('G0', make_predictor(GRUPredictor, seed=9), make_prices(80, seed=9), 'gru')]
+
+        report = service.infer(requests)
+
+        assert report.groups == 2
+        assert report.batches == 3  # Five LSTMs in batches of 3 + one GRU
+        assert sorted(vectorized_calls) == ([2, 3] if service.config.vectorize else [])
+        for request in requests:
+            expected = request.predictor.predict(request.data.tail(100))
+            result = report.results[request.symbol]
+            assert result['prediction'] == pytest.approx(expected.predictions[-1], rel=1e-5, abs=1e-6)
+            assert result['confidence'] == pytest.approx(expected.confidence, rel=1e-5, abs=1e-6)
+            assert result['model_metrics']['mse'] == pytest.approx(expected.mse, rel=1e-4)
+
+    def test_short_history_reports_error_without_failing_batch(self, service):
+        requests = [
+            InferenceRequest('OK', make_predictor(), make_prices(50, seed=1)),
+            InferenceRequest('SHORT', make_predictor(), make_prices(8, seed=2)),
+        ]
+
+        report = service.infer(requests)
+
+        assert 'error' in report.results['SHORT']
+        assert 'prediction' in report.results['OK']
+
+    def test_predict_many_uses_cache_and_saves_fresh_predictions(self, service):
+        predictor = make_predictor()
+        service.storage = FakeStorage(
+            models={'SBER': (predictor, {'trained': True})},
+            cached={'GAZP': {'prediction': 1.5, 'confidence': 0.7, 'date': '2025-03-01'}},
+        )
+
+        report = service.predict_many(['GAZP', 'SBER'], frames={'SBER': make_prices(60, seed=3)},
+                                      train_missing=False)
+
+        assert list(report.results) == ['GAZP', 'SBER']
+        assert report.results['GAZP']['cached'] is True
+        assert report.results['SBER']['training_metrics'] == {'trained': True}
+        assert [symbol for symbol, _, _ in service.storage.saved[0]] == ['SBER']
@@ -0,0 +1,168 @@
+"""Tests for the watermark-based incremental candle sync."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.candle_sync import CandleSync, CandleSyncConfig, SyncReport
+from core.multi_timeframe_db import add_multi_timeframe_tables, update_data_stats
+
+
+class FakeExchange:
+    """Hourly candles 07:00-15:00 UTC on weekdays; nothing after the clock is visible."""
+
+    def __init__(self, start: str = '2025-02-24', end: str = '2025-03-14', seed: int = 0):
+        rng = np.random.default_rng(seed)
+        hours = pd.date_range(start, end, freq='h', tz='UTC')
+        hours = hours[(hours.dayofweek < 5) & (hours.hour >= 7) & (hours.hour < 16)]
+        close = 100 + np.cumsum(rng.normal(0, 1, len(hours)))
+        self.candles = pd.DataFrame({
+            'time': hours, 'open': close - 0.5, 'high': close + 1, 'low': close - 1,
+            'close': close, 'volume': rng.integers(1, 1000, len(hours)),
+        })
+        self.clock = None
+        self.requests = []
+        self.fail = False
+
+    def fetch(self, figi, timeframe, from_date, to_date):
+        self.requests.append((pd.Timestamp(from_date), pd.Timestamp(to_date)))
+        if self.fail:
+            raise ConnectionError('UNAVAILABLE')
+        assert pd.Timestamp(to_date) - pd.Timestamp(from_date) <= pd.Timedelta(days=7)
+        candles = self.candles
+        visible = (candles['time'] >= from_date) & (candles['time'] < to_date) & (candles['time'] <= self.clock)
+        data = candles[visible].copy()
+        data['is_complete'] = data['time'] + pd.Timedelta(hours=1) <= self.clock
+        return data
+
+
+def stored(conn, symbol='SBER'):
+    return pd.read_sql("SELECT datetime FROM data_1hour WHERE symbol = ? ORDER BY datetime",
+                       conn, params=(symbol,))['datetime'].tolist()
+
+
+def watermark(conn, symbol='SBER'):
+    row = conn.execute("SELECT watermark FROM data_update_stats WHERE timeframe = '1h' AND symbol = ?",
+                       (symbol,)).fetchone()
+    return row[0] if row else None
+
+
+class TestCandleSync:
+    """CandleSync must request only missing ranges and keep the table equal to the exchange."""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+        add_multi_timeframe_tables(conn)
+        yield conn
+        conn.close()
+
+    @pytest.fixture
+    def exchange(self):
+        return FakeExchange()
+
+    @pytest.fixture
+    def sync(self, exchange):
+        return CandleSync(exchange.fetch, CandleSyncConfig(backfill_days=7))
+
+    def run(self, conn, sync, exchange, clock):
+        exchange.clock = pd.Timestamp(clock, tz='UTC')
+        exchange.requests.clear()
+        report = SyncReport('1h')
+        sync.sync_symbol(conn, 'SBER', 'FIGI', '1h', report, now=exchange.clock)
+        return report
+
+    def test_initial_load_stores_watermark_of_last_closed_bar(self, conn, sync, exchange):
+        report = self.run(conn, sync, exchange, '2025-03-05 12:30')
+
+        assert watermark(conn) == '2025-03-05T11:00:00+00:00'
+        assert stored(conn)[-1] == '2025-03-05T12:00:00+00:00'  # Forming bar is stored too
+        assert report.api_calls == 1
+        assert report.rows_written == len(stored(conn))
+
+    def test_requests_only_range_after_watermark(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-05 12:30')
+
+        report = self.run(conn, sync, exchange, '2025-03-05 14:10')
+
+        assert exchange.requests == [(pd.Timestamp('2025-03-05 12:00', tz='UTC'),
+                                      pd.Timestamp('2025-03-05 14:10', tz='UTC'))]
+        assert report.candles_fetched == 3
+        assert watermark(conn) == '2025-03-05T13:00:00+00:00'
+
+    def test_unchanged_bars_are_not_rewritten(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-05 12:30')
+        self.run(conn, sync, exchange, '2025-03-05 13:10')
+
+        report = self.run(conn, sync, exchange, '2025-03-05 13:40')
+
+        # The 13:00 bar is refetched but identical; the closed 12:00 bar is not requested
+        assert report.candles_fetched == 1
+        assert report.rows_written == 0
+        assert report.rows_unchanged == 1
+
+    def test_forming_bar_is_updated(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-05 12:30')
+        exchange.candles.loc[exchange.candles['time'] == '2025-03-05 12:00', 'close'] += 5
+
+        report = self.run(conn, sync, exchange, '2025-03-05 12:50')
+
+        assert report.rows_written == 1
+        close = conn.execute("SELECT close FROM data_1hour WHERE datetime = '2025-03-05T12:00:00+00:00'").fetchone()[0]
+        expected = exchange.candles.loc[exchange.candles['time'] == '2025-03-05 12:00', 'close'].item()
+        assert close == pytest.approx(expected)
+
+    def test_weekend_makes_no_requests(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-08 10:00')  # Saturday: closes Friday's range
+
+        report = self.run(conn, sync, exchange, '2025-03-09 10:00')
+
+        assert exchange.requests == []
+        assert report.non_trading_days == 2  # Rest of Saturday and Sunday
+
+    def test_gap_is_backfilled(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-07 18:00')
+        conn.execute("DELETE FROM data_1hour WHERE datetime LIKE '2025-03-04%'")
+
+        report = self.run(conn, sync, exchange, '2025-03-10 09:30')
+
+        assert report.gap_days == 1
+        assert (pd.Timestamp('2025-03-04', tz='UTC'), pd.Timestamp('2025-03-05', tz='UTC')) in exchange.requests
+        expected = exchange.candles['time']
+        expected = expected[(expected >= stored(conn)[0]) & (expected <= exchange.clock)]
+        assert stored(conn) == [stamp.isoformat() for stamp in expected]
+
+    def test_gap_scan_runs_once_a_day(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-07 18:00')
+        conn.execute("DELETE FROM data_1hour WHERE datetime LIKE '2025-03-04%'")
+        self.run(conn, sync, exchange, '2025-03-10 09:30')
+        conn.execute("DELETE FROM data_1hour WHERE datetime LIKE '2025-03-05%'")
+
+        report = self.run(conn, sync, exchange, '2025-03-10 10:30')
+
+        assert report.api_calls == 1
+        assert report.gap_days == 0
+
+    def test_error_keeps_watermark_and_is_recorded(self, conn, sync, exchange):
+        self.run(conn, sync, exchange, '2025-03-05 12:30')
+        exchange.fail = True
+
+        with pytest.raises(ConnectionError):
+            self.run(conn, sync, exchange, '2025-03-06 12:30')
+
+        row = conn.execute("SELECT watermark, error_count, last_error FROM data_update_stats").fetchone()
+        assert row == ('2025-03-05T11:00:00+00:00', 1, 'UNAVAILABLE')
+
+        exchange.fail = False
+        self.run(conn, sync, exchange, '2025-03-06 12:30')
+        assert exchange.requests[0][0] == pd.Timestamp('2025-03-05 12:00', tz='UTC')
+
+    def test_update_data_stats_keeps_watermark(self, conn):
+        update_data_stats(conn, 'SBER', '1h', watermark='2025-03-05T11:00:00+00:00')
+        update_data_stats(conn, 'SBER', '1h', success=False, error_message='boom')
+        update_data_stats(conn, 'SBER', '1h')
+
+        row = conn.execute("SELECT update_count, error_count, last_error, watermark FROM data_update_stats").fetchone()
+        assert row == (2, 1, None, '2025-03-05T11:00:00+00:00')
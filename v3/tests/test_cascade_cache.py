@@ -0,0 +1,76 @@
+"""Tests for the per-symbol ML signal cache of the cascade analyzer."""
+
+import sqlite3
+
+import pytest
+
+from core.ml.cascade_cache import CascadeMLCacheManager
+from core.multi_timeframe_db import add_multi_timeframe_tables, get_timeframe_table_name
+
+
+class TestTimeframeTableName:
+    @pytest.mark.parametrize('timeframe, table', [
+        ('1m', 'data_1min'), ('1min', 'data_1min'), ('5m', 'data_5min'), ('15min', 'data_15min'),
+        ('1h', 'data_1hour'), ('1hour', 'data_1hour'), ('1d', 'data_1d'), ('1s', 'data_1sec'),
+        ('tick', 'data_tick'),
+    ])
+    def test_aliases_map_to_existing_tables(self, timeframe, table):
+        assert get_timeframe_table_name(timeframe) == table
+
+
+class TestSymbolSignalCache:
+    """A cached signal is served until its bars, model or news change."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / 'stocks.db'
+        conn = sqlite3.connect(path)
+        add_multi_timeframe_tables(conn)
+        conn.execute("CREATE TABLE data_1d (symbol TEXT, datetime TEXT, close REAL)")
+        conn.executemany("INSERT INTO data_1min (symbol, datetime, open, high, low, close, volume) "
+                         "VALUES (?, ?, 1, 1, 1, 1, 1)",
+                         [('SBER', '2025-03-05T10:00:00'), ('GAZP', '2025-03-05T10:01:00')])
+        conn.commit()
+        conn.close()
+        return str(path)
+
+    @pytest.fixture
+    def cache(self, db_path):
+        return CascadeMLCacheManager(db_path)
+
+    def execute(self, db_path, sql, params=()):
+        conn = sqlite3.connect(db_path)
+        conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+    def test_watermarks_for_minute_aliases(self, cache):
+        expected = {'SBER': '2025-03-05T10:00:00', 'GAZP': '2025-03-05T10:01:00'}
+
+        assert cache.get_data_watermarks(['SBER', 'GAZP'], '1m') == expected
+        assert cache.get_data_watermarks(['SBER', 'GAZP'], '1min') == expected
+
+    def test_hit_until_new_bar(self, cache, db_path):
+        cache.save_symbol_results({'SBER': {'signal': 'BUY'}, 'GAZP': {'signal': 'SELL'}}, timeframe='1m')
+        hits, misses = cache.get_symbol_results(['SBER', 'GAZP'], timeframe='1m')
+        assert hits == {'SBER': {'signal': 'BUY'}, 'GAZP': {'signal': 'SELL'}} and misses == []
+
+        self.execute(db_path, "INSERT INTO data_1min (symbol, datetime, open, high, low, close, volume) "
+                              "VALUES ('SBER', '2025-03-05T10:02:00', 1, 1, 1, 1, 1)")
+
+        hits, misses = cache.get_symbol_results(['SBER', 'GAZP'], timeframe='1m')
+        assert list(hits) == ['GAZP'] and misses == ['SBER']
+
+    def test_new_news_invalidates_every_symbol(self, cache, db_path):
+        self.execute(db_path, "CREATE TABLE ml_sentiment_watermarks (scope TEXT PRIMARY KEY, "
+                              "last_published_at TEXT NOT NULL, updated_at TEXT)")
+        self.execute(db_path, "INSERT INTO ml_sentiment_watermarks VALUES ('market', '2025-03-05 09:00', NULL)")
+        cache.save_symbol_results({'SBER': {'signal': 'BUY'}}, timeframe='1m')
+        assert cache.get_symbol_results(['SBER'], timeframe='1m')[1] == []
+
+        self.execute(db_path, "UPDATE ml_sentiment_watermarks SET last_published_at = '2025-03-05 11:00'")
+
+        assert cache.get_symbol_results(['SBER'], timeframe='1m')[1] == ['SBER']
+
+    def test_sentiment_watermark_defaults_without_table(self, cache):
+        assert cache.get_sentiment_watermark() == 'none'
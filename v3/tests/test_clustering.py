@@ -0,0 +1,87 @@
+"""Tests for warm-started and size-dependent stock clustering."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ml.clustering import ClusteringConfig, StockClusterer, feature_cache
+from core.ml.model_manager import MLModelManager
+
+
+def blobs(sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = np.array([[0.0, 0.0, 0.0], [10.0, 0.0, 5.0], [0.0, 10.0, -5.0]])
+    return np.vstack([centres[i] + rng.normal(0, 0.5, (size, 3)) for i, size in enumerate(sizes)])
+
+
+class TestWarmStart:
+    """Warm-start centroids must be expressed in the scaler space of the new fit."""
+
+    @pytest.mark.parametrize('use_pca', [False, True])
+    def test_seed_is_previous_centroids_in_new_scaler_space(self, use_pca):
+        clusterer = StockClusterer(ClusteringConfig(n_clusters=3, warm_start=True, use_pca=use_pca,
+                                                    pca_components=3 if use_pca else None))
+        first = blobs([30, 30, 30])
+        clusterer.fit(None, features=first)
+        raw_centres = clusterer.scaler.inverse_transform(
+            clusterer.pca.inverse_transform(clusterer.clusterer.cluster_centers_) if use_pca
+            else clusterer.clusterer.cluster_centers_)
+
+        # A much larger second blob moves the scaler's mean and std
+        clusterer.fit(None, features=blobs([30, 30, 300], seed=1))
+
+        expected = clusterer.scaler.transform(raw_centres)
+        if use_pca:
+            expected = clusterer.pca.transform(expected)
+        np.testing.assert_allclose(clusterer.clusterer.init, expected, atol=1e-9)
+        assert clusterer.clusterer.n_init == 1
+
+    def test_labels_stay_stable_when_scaler_shifts(self):
+        clusterer = StockClusterer(ClusteringConfig(n_clusters=3, warm_start=True))
+        first = blobs([30, 30, 30])
+        labels = clusterer.fit(None, features=first).labels
+
+        second = np.vstack([first, blobs([0, 0, 300], seed=1)])
+        relabelled = clusterer.fit(None, features=second).labels
+
+        np.testing.assert_array_equal(relabelled[:len(first)], labels)
+
+    def test_cold_start_without_previous_fit(self):
+        clusterer = StockClusterer(ClusteringConfig(n_clusters=3, warm_start=True, n_init=4))
+
+        clusterer.fit(None, features=blobs([20, 20, 20]))
+
+        assert clusterer.clusterer.init == 'k-means++'
+        assert clusterer.clusterer.n_init == 4
+
+
+class TestClusterStocksAlgorithm:
+    """The k-means variant follows the size of each call's symbol set."""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        feature_cache.clear()
+        manager = MLModelManager(db_path=str(tmp_path / 'stocks.db'))
+        manager.minibatch_clustering_threshold = 40
+        rng = np.random.default_rng(0)
+
+        def frame(symbol):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 60)))
+            return pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99,
+                                 'close': close, 'volume': rng.integers(100, 1000, 60).astype(float)})
+
+        monkeypatch.setattr(manager, '_get_stock_data_from_db', lambda symbol, timeframe='1d': frame(symbol))
+        yield manager
+        feature_cache.clear()
+
+    def test_algorithm_switches_with_universe_size(self, manager):
+        small = manager.cluster_stocks([f'S{i}' for i in range(10)], n_clusters=3)
+        clusterer = manager._clusterers[('1d', 3)]
+        assert type(clusterer.clusterer).__name__ == 'KMeans'
+
+        large = manager.cluster_stocks([f'S{i}' for i in range(50)], n_clusters=3)
+        assert type(clusterer.clusterer).__name__ == 'MiniBatchKMeans'
+
+        manager.cluster_stocks([f'S{i}' for i in range(12)], n_clusters=3)
+        assert type(clusterer.clusterer).__name__ == 'KMeans'
+        assert small['symbols_processed'] == 10 and large['symbols_processed'] == 50
@@ -0,0 +1,117 @@
+"""Tests for the incrementally updated return correlation matrix."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analytics.correlation import CorrelationConfig, CorrelationService, complete_through
+from core.database import create_correlation_state_table, create_tables
+
+SYMBOLS = ['SBER', 'GAZP', 'LKOH', 'ROSN']
+CONFIG = CorrelationConfig(halflife=10, min_periods=5, warmup_bars=1000)
+
+
+def make_closes(days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2025-01-01', periods=days).strftime('%Y-%m-%d')
+    factor = rng.normal(0, 0.01, (days, 1))
+    returns = factor * np.array([1.0, 0.8, -0.5, 0.3]) + rng.normal(0, 0.006, (days, len(SYMBOLS)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=SYMBOLS)
+
+
+def write_bar(conn, contract_code, date, close):
+    row = conn.execute("SELECT id FROM companies WHERE contract_code = ?", (contract_code,)).fetchone()
+    company_id = row[0] if row else conn.execute(
+        "INSERT INTO companies (contract_code) VALUES (?)", (contract_code,)).lastrowid
+    conn.execute("INSERT OR REPLACE INTO daily_data (company_id, date, open, low, high, close, volume)"
+                 " VALUES (?, ?, ?, ?, ?, ?, 1000)", (company_id, date, close, close, close, close))
+
+
+def batch_correlation(closes):
+    """Correlation at the last bar recomputed from the whole history with pandas."""
+    returns = closes.pct_change().iloc[1:]
+    corr = returns.ewm(alpha=1 - CONFIG.decay, adjust=False).corr()
+    return corr.loc[returns.index[-1]].to_numpy()
+
+
+class TestCorrelationCatchUp:
+    """Catch-up over bars synced contract by contract must equal a batch EWMA recompute."""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+        create_tables(conn)
+        create_correlation_state_table(conn)
+        yield conn
+        conn.close()
+
+    def test_partial_syncs_match_batch_recompute(self, conn):
+        closes = make_closes()
+        for date, row in closes.iloc[:40].iterrows():
+            for symbol in SYMBOLS:
+                write_bar(conn, symbol, date, row[symbol])
+        service = CorrelationService(SYMBOLS, CONFIG)
+        service.catch_up(conn)
+
+        for date, row in closes.iloc[40:].iterrows():
+            # The forming session is written first and corrected by the final close
+            write_bar(conn, 'SBER', date, row['SBER'] * 1.05)
+            service.catch_up(conn)
+            for symbol in SYMBOLS:
+                write_bar(conn, symbol, date, row[symbol])
+                service.catch_up(conn)
+
+        # The newest date is held back until a newer one appears
+        assert service.last_date == closes.index[-2]
+        np.testing.assert_allclose(service.correlation_matrix().to_numpy(), batch_correlation(closes.iloc[:-1]),
+                                   rtol=1e-10, atol=1e-12)
+
+    def test_lagging_contract_holds_back_the_matrix(self, conn):
+        closes = make_closes(days=30)
+        for date, row in closes.iterrows():
+            for symbol in SYMBOLS:
+                if symbol != 'ROSN' or date <= closes.index[25]:
+                    write_bar(conn, symbol, date, row[symbol])
+        service = CorrelationService(SYMBOLS, CONFIG)
+        service.catch_up(conn)
+        assert service.last_date == closes.index[25]
+
+        # ROSN's bars arrive three days late and are still added in order
+        for date in closes.index[26:]:
+            write_bar(conn, 'ROSN', date, closes.loc[date, 'ROSN'])
+        service.catch_up(conn)
+
+        assert service.last_date == closes.index[-2]
+        np.testing.assert_allclose(service.correlation_matrix().to_numpy(), batch_correlation(closes.iloc[:-1]),
+                                   rtol=1e-10, atol=1e-12)
+
+    def test_stale_contract_stops_holding_back(self, conn):
+        closes = make_closes(days=30)
+        for date, row in closes.iterrows():
+            for symbol in SYMBOLS:
+                if symbol != 'ROSN' or date <= closes.index[20]:
+                    write_bar(conn, symbol, date, row[symbol])
+
+        assert complete_through(conn, SYMBOLS, stale_bars=5) == closes.index[-2]
+        assert complete_through(conn, SYMBOLS, stale_bars=10) == closes.index[20]
+
+    def test_restored_state_continues_like_an_uninterrupted_run(self, conn):
+        closes = make_closes(days=60)
+        for date, row in closes.iloc[:30].iterrows():
+            for symbol in SYMBOLS:
+                write_bar(conn, symbol, date, row[symbol])
+        CorrelationService.from_database(conn, CONFIG)
+
+        for date, row in closes.iloc[30:].iterrows():
+            for symbol in SYMBOLS:
+                write_bar(conn, symbol, date, row[symbol])
+        restored = CorrelationService.load(conn, CONFIG)
+        added = restored.catch_up(conn)
+
+        assert added == 30
+        assert sorted(restored.symbols) == sorted(SYMBOLS)
+        assert restored.last_date == closes.index[-2]
+        np.testing.assert_allclose(restored.correlation_matrix(SYMBOLS).to_numpy(),
+                                   batch_correlation(closes.iloc[:-1]), rtol=1e-10, atol=1e-12)
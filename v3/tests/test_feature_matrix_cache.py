@@ -0,0 +1,79 @@
+"""Tests for the shared scaled feature matrix cache of the price predictors."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ml.predictive_models import (
+    ModelConfig, PricePredictor, data_fingerprint, feature_matrix_cache, make_sequence_windows,
+)
+
+
+def make_prices(rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    return pd.DataFrame({
+        'open': close - 0.5, 'high': close + 1, 'low': close - 1,
+        'close': close, 'volume': rng.integers(100, 1000, rows).astype(float),
+    }, index=pd.date_range('2025-01-01', periods=rows, freq='D'))
+
+
+class TestFeatureMatrixCache:
+    """Cached matrices must be reused only while the underlying data is unchanged."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        feature_matrix_cache.clear()
+        yield
+        feature_matrix_cache.clear()
+
+    @pytest.fixture
+    def predictor(self):
+        return PricePredictor(ModelConfig(sequence_length=10))
+
+    def test_same_data_reuses_matrix(self, predictor):
+        data = make_prices()
+
+        first = predictor.build_feature_matrix(data, cache_key=('SBER', '1d'))
+        second = PricePredictor(ModelConfig()).build_feature_matrix(data.copy(), cache_key=('SBER', '1d'))
+
+        assert second is first
+
+    def test_edit_to_earlier_history_invalidates(self, predictor):
+        data = make_prices()
+        first = predictor.build_feature_matrix(data, cache_key=('SBER', '1d'))
+
+        edited = data.copy()
+        edited.iloc[5, edited.columns.get_loc('high')] += 10  # Same length, last bar and last close
+
+        second = predictor.build_feature_matrix(edited, cache_key=('SBER', '1d'))
+
+        assert second is not first
+        expected = PricePredictor(ModelConfig()).build_feature_matrix(edited)
+        np.testing.assert_array_equal(second.features, expected.features)
+
+    def test_shifted_index_invalidates(self, predictor):
+        data = make_prices()
+        first = predictor.build_feature_matrix(data, cache_key=('SBER', '1d'))
+
+        shifted = data.copy()
+        shifted.index = shifted.index[:-1].append(pd.DatetimeIndex([shifted.index[-1] + pd.Timedelta(days=1)]))
+
+        assert predictor.build_feature_matrix(shifted, cache_key=('SBER', '1d')) is not first
+
+    def test_fingerprint_depends_on_every_row(self):
+        values = np.arange(20, dtype=np.float64)
+        edited = values.copy()
+        edited[0] = -1
+
+        assert data_fingerprint(values) == data_fingerprint(values.copy())
+        assert data_fingerprint(values) != data_fingerprint(edited)
+        assert data_fingerprint(np.array(['a', 'b'], dtype=object)) != data_fingerprint(np.array(['a', 'c'], dtype=object))
+
+    def test_windows_match_legacy_loop(self, predictor):
+        features = np.random.default_rng(1).random((30, 4)).astype(np.float32)
+
+        windows = make_sequence_windows(features, 10)
+
+        legacy = np.array([features[i - 10:i] for i in range(10, len(features))])
+        np.testing.assert_array_equal(windows, legacy)
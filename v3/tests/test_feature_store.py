@@ -0,0 +1,238 @@
+"""Tests for the memory-mapped feature store and the timeframe-aware SQL fallbacks."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.ml.model_manager as model_manager
+from core.ml.feature_store import (
+    FeatureStore, FeatureStoreConfig, STORE_COLUMNS, compute_ml_features, default_store_root,
+    get_feature_store,
+)
+from core.settings import get_settings
+
+
+def make_bars(n, start='2025-03-03 07:00', freq='h', seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    stamps = pd.date_range(start, periods=n, freq=freq, tz='UTC')
+    return pd.DataFrame({
+        'datetime': [stamp.isoformat() for stamp in stamps],
+        'open': close - 0.5, 'high': close + 1, 'low': close - 1,
+        'close': close, 'volume': rng.integers(1, 1000, n).astype(float),
+    })
+
+
+def expected_features(bars):
+    features = compute_ml_features(bars.reset_index(drop=True))
+    return features[STORE_COLUMNS].astype(np.float64).ffill().fillna(0)
+
+
+def assert_view_matches(view, bars):
+    expected = expected_features(bars)
+    assert len(view) == len(bars)
+    assert view.watermark == bars['datetime'].iloc[-1]
+    stamps = pd.DatetimeIndex(pd.to_datetime(bars['datetime'], utc=True)).tz_convert(None)
+    np.testing.assert_array_equal(view.index, stamps.to_numpy())
+    for name in STORE_COLUMNS:
+        np.testing.assert_allclose(view[name], expected[name].to_numpy(), rtol=1e-10, atol=1e-10)
+
+
+def hourly_db(path, symbol, bars):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE data_1hour (
+            symbol TEXT, datetime TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL
+        )
+    """)
+    write_candles(conn, 'data_1hour', symbol, bars)
+    conn.commit()
+    conn.close()
+
+
+def write_candles(conn, table, symbol, bars):
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} (symbol, datetime, open, high, low, close, volume)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(symbol, *row) for row in bars[['datetime', 'open', 'high', 'low', 'close', 'volume']].itertuples(index=False)],
+    )
+
+
+class TestFeatureStore:
+    """Appends, tail rewrites, refreshes and reopens must equal a full recompute."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        path = tmp_path / 'stocks.db'
+        conn = sqlite3.connect(path)
+        for table in ('data_1d', 'data_1hour'):
+            conn.execute(f"""
+                CREATE TABLE {table} (
+                    symbol TEXT, datetime TEXT, open REAL, high REAL, low REAL,
+                    close REAL, volume REAL, PRIMARY KEY (symbol, datetime)
+                )
+            """)
+        conn.commit()
+        conn.close()
+        return path
+
+    @pytest.fixture
+    def store(self, tmp_path, db_path):
+        return FeatureStore(FeatureStoreConfig(root=tmp_path / 'features', db_path=str(db_path)))
+
+    def test_append_equals_full_recompute(self, store):
+        bars = make_bars(120)
+        store.materialize('SBER', '1h', bars.iloc[:100])
+
+        written = store.append('SBER', '1h', bars.iloc[100:])
+
+        assert written == 20
+        assert store.read_manifest('SBER', '1h')['rows'] == 120
+        assert_view_matches(store.get_view('SBER', '1h'), bars)
+
+    def test_append_rewrites_forming_bar_in_place(self, store):
+        bars = make_bars(80)
+        store.materialize('SBER', '1h', bars)
+        updated = bars.copy()
+        updated.loc[updated.index[-1], ['close', 'high']] += 3.0
+
+        written = store.append('SBER', '1h', updated.iloc[-1:])
+
+        assert written == 1
+        directory = store._symbol_dir('SBER', '1h')
+        assert (directory / 'close.f64').stat().st_size == 80 * 8
+        assert_view_matches(store.get_view('SBER', '1h'), updated)
+
+    def test_write_at_keeps_rows_before_offset(self, store):
+        bars = make_bars(10)
+        store.materialize('SBER', '1h', bars)
+        path = store._symbol_dir('SBER', '1h') / 'close.f64'
+
+        store._write_at(path, 8, np.array([1.0, 2.0, 3.0], dtype='<f8').tobytes())
+
+        values = np.fromfile(path, dtype='<f8')
+        assert len(values) == 11
+        np.testing.assert_array_equal(values[:8], bars['close'].to_numpy()[:8])
+        np.testing.assert_array_equal(values[8:], [1.0, 2.0, 3.0])
+
+    def test_shorter_rewrite_is_bounded_by_manifest(self, store):
+        bars = make_bars(60)
+        store.materialize('SBER', '1h', bars)
+        # A replayed bar range that ends before the stored tail: the file keeps
+        # its length, but only manifest rows are exposed
+        rewritten = bars.iloc[50:55].copy()
+
+        store.append('SBER', '1h', rewritten)
+
+        view = store.get_view('SBER', '1h')
+        assert len(view) == 55
+        assert_view_matches(view, bars.iloc[:55])
+
+    def test_refresh_reads_timeframe_table_after_watermark(self, store, db_path):
+        bars = make_bars(90)
+        conn = sqlite3.connect(db_path)
+        write_candles(conn, 'data_1hour', 'SBER', bars.iloc[:70])
+        conn.commit()
+
+        assert store.refresh(['SBER'], '1h', conn=conn) == {'SBER': 70}
+        write_candles(conn, 'data_1hour', 'SBER', bars.iloc[69:])
+        conn.commit()
+        written = store.refresh(['SBER'], '1h', conn=conn)
+        conn.close()
+
+        # The watermark bar is reread together with the new ones
+        assert written == {'SBER': 21}
+        assert store.get_view('SBER', '1d') is None
+        assert_view_matches(store.get_view('SBER', '1h'), bars)
+
+    def test_reopen_serves_same_view(self, store, tmp_path, db_path):
+        bars = make_bars(50, freq='D', start='2025-01-01')
+        store.materialize('GAZP', '1d', bars.iloc[:40])
+        store.append('GAZP', '1d', bars.iloc[40:])
+
+        reopened = FeatureStore(FeatureStoreConfig(root=tmp_path / 'features', db_path=str(db_path)))
+
+        view = reopened.get_view('GAZP', '1d')
+        assert_view_matches(view, bars)
+        assert len(reopened.get_view('GAZP', '1d', tail=5)) == 5
+
+    def test_invalidate_forces_full_rebuild(self, store, db_path):
+        bars = make_bars(30, freq='D', start='2025-01-01')
+        conn = sqlite3.connect(db_path)
+        write_candles(conn, 'data_1d', 'GAZP', bars)
+        conn.commit()
+        store.refresh(['GAZP'], '1d', conn=conn)
+
+        store.invalidate('GAZP', '1d')
+        store.refresh(['GAZP'], '1d', conn=conn)
+        conn.close()
+
+        assert store.get_stats()['full_builds'] == 2
+        assert_view_matches(store.get_view('GAZP', '1d'), bars)
+
+
+class TestTimeframeFallback:
+    """SQL fallbacks must read the table of the requested timeframe."""
+
+    def test_model_manager_fallback_reads_hourly_table(self, tmp_path, monkeypatch):
+        db_path = tmp_path / 'stocks.db'
+        bars = make_bars(40)
+        hourly_db(db_path, 'SBER', bars)
+
+        def unavailable(db_path=None):
+            raise OSError('feature store is not writable')
+
+        monkeypatch.setattr(model_manager, 'get_feature_store', unavailable)
+
+        df = model_manager.MLModelManager(str(db_path))._get_stock_data_from_db('SBER', '1h')
+
+        assert len(df) == 40
+        assert df['close'].tolist() == pytest.approx(bars['close'].tolist())
+
+
+class TestStorePerDatabase:
+    """A store serves and refreshes features of its own database only."""
+
+    @pytest.fixture
+    def settings_db(self, tmp_path, monkeypatch):
+        path = tmp_path / 'settings' / 'stock_data.db'
+        path.parent.mkdir()
+        monkeypatch.setenv('STOCKS_DB_PATH', str(path))
+        get_settings.cache_clear()
+        yield path
+        get_settings.cache_clear()
+
+    def test_manager_reads_its_own_database(self, tmp_path, monkeypatch, settings_db):
+        own = make_bars(40, seed=1)
+        hourly_db(tmp_path / 'manager.db', 'SBER', own)
+        # Decoys in the working directory and in the settings database
+        workdir = tmp_path / 'cwd'
+        workdir.mkdir()
+        hourly_db(workdir / 'stock_data.db', 'SBER', make_bars(40, seed=2))
+        hourly_db(settings_db, 'SBER', make_bars(40, seed=3))
+        monkeypatch.chdir(workdir)
+        get_feature_store().refresh(['SBER'], '1h')
+
+        df = model_manager.MLModelManager(str(tmp_path / 'manager.db'))._get_stock_data_from_db('SBER', '1h')
+
+        assert df['close'].tolist() == pytest.approx(own['close'].tolist())
+        store = get_feature_store(tmp_path / 'manager.db')
+        assert store.stats['full_builds'] == 1
+        assert (tmp_path / 'feature_store' / 'manager' / '1h' / 'SBER' / 'manifest.json').exists()
+        assert not (workdir / 'feature_store').exists()
+
+    def test_one_store_per_database(self, tmp_path, settings_db):
+        store = get_feature_store(tmp_path / 'a.db')
+
+        assert get_feature_store(str(tmp_path / 'x' / '..' / 'a.db')) is store
+        assert get_feature_store(tmp_path / 'b.db') is not store
+        assert get_feature_store() is get_feature_store(settings_db)
+        assert store.root == default_store_root(tmp_path / 'a.db') == tmp_path / 'feature_store' / 'a'
+
+    def test_default_config_follows_settings(self, settings_db):
+        config = FeatureStoreConfig()
+
+        assert config.db_path == str(settings_db)
+        assert config.root == settings_db.parent / 'feature_store' / 'stock_data'
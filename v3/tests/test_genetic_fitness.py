@@ -0,0 +1,92 @@
+"""Tests for vectorised fitness evaluation of the genetic optimizer."""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ml.genetic_optimization import (
+    GeneticConfig, GeneticOptimizer, Individual, TradingStrategyFitness, create_parameter_space,
+)
+
+METRICS = ['sharpe_ratio', 'max_drawdown', 'profit_factor', 'total_return']
+
+
+def make_data(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({
+        'close': close,
+        'rsi': rng.uniform(10, 90, rows),
+        'macd': rng.normal(0, 0.01, rows),
+    }, index=pd.date_range('2024-01-01', periods=rows, freq='D'))
+
+
+def make_population(size=40, seed=0):
+    random.seed(seed)
+    parameters = create_parameter_space('combined')
+    return [Individual(parameters) for _ in range(size)]
+
+
+class TestVectorisedFitnessParity:
+    """evaluate_population must return exactly what evaluate returns per individual."""
+
+    def assert_parity(self, fitness_function, population, data):
+        vector = fitness_function.evaluate_population(population, data)
+        scalar = np.array([fitness_function.evaluate(individual, data) for individual in population])
+        np.testing.assert_allclose(vector, scalar, rtol=1e-9, atol=1e-12)
+
+    @pytest.mark.parametrize('metric', METRICS)
+    def test_random_population(self, metric):
+        data = make_data()
+        self.assert_parity(TradingStrategyFitness(data, metric), make_population(), data)
+
+    @pytest.mark.parametrize('metric', METRICS)
+    def test_windows_longer_than_history(self, metric):
+        data = make_data(rows=30)
+        self.assert_parity(TradingStrategyFitness(data, metric), make_population(seed=1), data)
+
+    @pytest.mark.parametrize('rows', [0, 1, 2])
+    def test_sharpe_with_fewer_than_two_returns(self, rows):
+        data = make_data(rows=rows)
+        fitness = TradingStrategyFitness(data, 'sharpe_ratio')
+        population = make_population(size=5)
+
+        self.assert_parity(fitness, population, data)
+        if rows < 2:
+            assert fitness.evaluate(population[0], data) == 0
+
+    @pytest.mark.parametrize('metric', METRICS)
+    def test_nan_fitness_ranks_last_in_both_paths(self, metric):
+        data = make_data(rows=120, seed=3)
+        data.iloc[40:45, data.columns.get_loc('close')] = 0.0  # 0/0 and x/0 price changes
+        fitness = TradingStrategyFitness(data, metric)
+        population = make_population(seed=2)
+
+        self.assert_parity(fitness, population, data)
+        assert not np.isnan(fitness.evaluate_population(population, data)).any()
+
+
+class TestPoolFallback:
+    """A failing process pool must not rewrite the caller's configuration."""
+
+    def test_pool_failure_keeps_config(self, monkeypatch):
+        data = make_data(rows=120)
+        config = GeneticConfig(population_size=10, generations=2, elite_size=2, n_jobs=4, random_state=0)
+        optimizer = GeneticOptimizer(config, TradingStrategyFitness(data))
+        attempts = []
+
+        def broken_pool(data):
+            attempts.append(1)
+            raise OSError('no /dev/shm')
+
+        monkeypatch.setattr(optimizer, '_evaluate_in_pool', broken_pool)
+        result = optimizer.optimize(create_parameter_space('sma_crossover'), data)
+
+        assert config.n_jobs == 4
+        assert attempts == [1]  # Later generations of the same run stay in-process
+        assert np.isfinite(result.best_fitness)
+
+        optimizer.optimize(create_parameter_space('sma_crossover'), data)
+        assert attempts == [1, 1]  # A new run tries the pool again
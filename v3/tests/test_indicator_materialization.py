@@ -0,0 +1,142 @@
+"""Tests for the incremental materialisation of technical_indicators."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.database import TECHNICAL_INDICATOR_COLUMNS, create_tables
+from core.indicators import calculate_technical_indicators, materialize
+from core.indicators.materialize import COLUMN_MAP, materialize_technical_indicators
+
+
+def insert_bars(conn, contract_code, dates, seed=0, start_price=100.0):
+    row = conn.execute("SELECT id FROM companies WHERE contract_code = ?", (contract_code,)).fetchone()
+    company_id = row[0] if row else conn.execute(
+        "INSERT INTO companies (contract_code) VALUES (?)", (contract_code,)).lastrowid
+    rng = np.random.default_rng(seed)
+    close = start_price + np.cumsum(rng.normal(0, 1, len(dates)))
+    conn.executemany(
+        "INSERT OR REPLACE INTO daily_data (company_id, date, open, low, high, close, volume)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(company_id, date, c - 0.5, c - 1.5, c + 1.5, c, float(v))
+         for date, c, v in zip(dates, close, rng.integers(100, 10_000, len(dates)))],
+    )
+    return company_id
+
+
+def trading_days(start, periods):
+    return [day.strftime('%Y-%m-%d') for day in pd.bdate_range(start, periods=periods)]
+
+
+def stored_indicators(conn, company_id):
+    return pd.read_sql_query(
+        f"SELECT date, {', '.join(TECHNICAL_INDICATOR_COLUMNS)} FROM technical_indicators"
+        " WHERE company_id = ? ORDER BY date", conn, params=(company_id,))
+
+
+def expected_indicators(conn, company_id, contract_code):
+    bars = pd.read_sql_query(
+        "SELECT date, open, high, low, close, volume FROM daily_data WHERE company_id = ? ORDER BY date",
+        conn, params=(company_id,))
+    result = calculate_technical_indicators(bars, contract_code=contract_code,
+                                            volatility=materialize.MATERIALIZED_VOLATILITY,
+                                            risk_management=False)
+    return result[['date'] + list(COLUMN_MAP.values())].rename(
+        columns={value: key for key, value in COLUMN_MAP.items()})
+
+
+def assert_matches_service(conn, company_id, contract_code):
+    stored = stored_indicators(conn, company_id)
+    expected = expected_indicators(conn, company_id, contract_code)
+    assert stored['date'].tolist() == expected['date'].tolist()
+    for column in TECHNICAL_INDICATOR_COLUMNS:
+        np.testing.assert_allclose(stored[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                   rtol=1e-8, atol=1e-8, err_msg=column)
+
+
+class TestIndicatorMaterialization:
+    """Materialised rows must equal calculate_technical_indicators and reruns must write only new dates."""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+        create_tables(conn)
+        yield conn
+        conn.close()
+
+    @pytest.fixture
+    def touched(self, conn):
+        """Dates written to technical_indicators after the fixture is requested."""
+        conn.execute("CREATE TABLE touched (date TEXT)")
+        for event in ('INSERT', 'UPDATE'):
+            conn.execute(f"""
+                CREATE TRIGGER log_{event.lower()} AFTER {event} ON technical_indicators
+                BEGIN INSERT INTO touched (date) VALUES (NEW.date); END
+            """)
+
+        def dates():
+            return [row[0] for row in conn.execute("SELECT date FROM touched ORDER BY date")]
+        return dates
+
+    def test_values_equal_calculate_technical_indicators(self, conn):
+        ids = {code: insert_bars(conn, code, trading_days('2024-01-01', 320), seed=seed)
+               for seed, code in enumerate(['SBER', 'GAZP'])}
+
+        stats = materialize_technical_indicators(conn)
+
+        assert stats.companies == 2
+        assert stats.full_recomputes == 2
+        for code, company_id in ids.items():
+            assert_matches_service(conn, company_id, code)
+
+    def test_incremental_rerun_touches_only_new_dates(self, conn, touched):
+        company_id = insert_bars(conn, 'SBER', trading_days('2022-01-03', 1200), seed=1)
+        materialize_technical_indicators(conn)
+        conn.execute("DELETE FROM touched")
+        new_dates = trading_days('2026-08-10', 3)
+        insert_bars(conn, 'SBER', new_dates, seed=2, start_price=110.0)
+
+        stats = materialize_technical_indicators(conn)
+
+        assert touched() == new_dates
+        assert stats.full_recomputes == 0
+        # Warm-up window before the watermark, the watermark bar and the new bars
+        assert stats.bars_read == materialize.warmup_bars(materialize.indicator_parameters('SBER')) + 1 + 3
+        assert_matches_service(conn, company_id, 'SBER')
+
+    def test_up_to_date_rerun_writes_nothing(self, conn, touched):
+        insert_bars(conn, 'SBER', trading_days('2024-01-01', 300), seed=1)
+        materialize_technical_indicators(conn)
+        conn.execute("DELETE FROM touched")
+
+        stats = materialize_technical_indicators(conn)
+
+        assert touched() == []
+        assert stats.up_to_date == 1
+        assert stats.companies == 0
+
+    def test_indicators_are_computed_outside_write_transaction(self, conn, monkeypatch):
+        for seed, code in enumerate(['SBER', 'GAZP', 'LKOH']):
+            insert_bars(conn, code, trading_days('2024-01-01', 260), seed=seed)
+        compute = materialize.compute_indicator_rows
+        in_transaction = []
+        commits = []
+
+        def tracked_compute(*args, **kwargs):
+            in_transaction.append(conn.in_transaction)
+            return compute(*args, **kwargs)
+
+        monkeypatch.setattr(materialize, 'compute_indicator_rows', tracked_compute)
+        write_chunk = materialize._write_chunk
+        monkeypatch.setattr(materialize, '_write_chunk',
+                            lambda conn, pending, *args: (commits.append(len(pending)),
+                                                          write_chunk(conn, pending, *args)))
+
+        stats = materialize_technical_indicators(conn, chunk_size=2)
+
+        assert in_transaction == [False, False, False]
+        assert commits == [2, 1]
+        assert stats.companies == 3
+        assert conn.execute("SELECT COUNT(*) FROM technical_indicators_state").fetchone()[0] == 3
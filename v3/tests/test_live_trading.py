@@ -0,0 +1,107 @@
+"""Tests for the live-mode bar pipeline of the trading engine."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analytics.trading_engine import LiveTickerState, TradingEngine
+from core.database import create_tables
+
+
+def insert_bars(conn, contract_code, dates, seed=0):
+    company_id = conn.execute("SELECT id FROM companies WHERE contract_code = ?", (contract_code,)).fetchone()
+    if company_id is None:
+        company_id = conn.execute("INSERT INTO companies (contract_code) VALUES (?)", (contract_code,)).lastrowid
+    else:
+        company_id = company_id[0]
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    conn.executemany(
+        "INSERT OR REPLACE INTO daily_data (company_id, date, open, low, high, close, volume)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(company_id, date, c - 0.5, c - 1, c + 1, c, 1000.0) for date, c in zip(dates, close)],
+    )
+
+
+def trading_days(start, periods):
+    return [day.strftime('%Y-%m-%d') for day in pd.bdate_range(start, periods=periods)]
+
+
+class TestLiveMode:
+    """Each closed bar is evaluated exactly once; bars at or before the watermark are ignored."""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+        create_tables(conn)
+        insert_bars(conn, 'SBER', trading_days('2025-01-01', 80), seed=1)
+        insert_bars(conn, 'GAZP', trading_days('2025-01-01', 80), seed=2)
+        yield conn
+        conn.close()
+
+    @pytest.fixture
+    def engine(self, conn, monkeypatch):
+        engine = TradingEngine(None, conn, live_mode=True, live_window=60)
+        engine.passes = []
+
+        def record(data, contract_code, new_bars=None, batch=None):
+            engine.passes.append((contract_code, new_bars, data['date'].iloc[-1].strftime('%Y-%m-%d')))
+            return []
+
+        monkeypatch.setattr(engine.auto_trader, 'process_signals', record)
+        return engine
+
+    def test_first_cycle_warms_up_and_evaluates_latest_bar(self, engine):
+        engine._process_new_bars()
+
+        assert sorted(engine.passes) == [('GAZP', 1, '2025-04-22'), ('SBER', 1, '2025-04-22')]
+        state = engine.live_state['SBER']
+        assert isinstance(state, LiveTickerState)
+        assert state.watermark == '2025-04-22'
+        assert len(state.bars) == 60
+
+    def test_one_bar_close_gives_one_signal_pass(self, engine, conn):
+        engine._process_new_bars()
+        engine.passes.clear()
+        insert_bars(conn, 'SBER', ['2025-04-23'], seed=3)
+
+        results = engine._process_new_bars()
+
+        assert engine.passes == [('SBER', 1, '2025-04-23')]
+        assert list(results) == ['SBER']
+        assert engine.live_state['SBER'].watermark == '2025-04-23'
+        assert engine.live_state['GAZP'].watermark == '2025-04-22'
+
+    def test_cycle_without_new_bars_is_a_no_op(self, engine):
+        engine._process_new_bars()
+        engine.passes.clear()
+
+        assert engine._process_new_bars() == {}
+        assert engine.passes == []
+
+    def test_replayed_bar_is_ignored(self, engine, conn):
+        engine._process_new_bars()
+        insert_bars(conn, 'SBER', ['2025-04-23'], seed=3)
+        engine._process_new_bars()
+        engine.passes.clear()
+
+        # The feed re-sends SBER's last bar and a late GAZP bar older than its watermark
+        insert_bars(conn, 'SBER', ['2025-04-23'], seed=4)
+        insert_bars(conn, 'GAZP', ['2025-04-20'], seed=5)
+        results = engine._process_new_bars()
+
+        assert engine.passes == []
+        assert results == {}
+        assert engine.live_state['SBER'].watermark == '2025-04-23'
+
+    def test_several_new_bars_are_evaluated_in_one_pass(self, engine, conn):
+        engine._process_new_bars()
+        engine.passes.clear()
+        insert_bars(conn, 'GAZP', ['2025-04-23', '2025-04-24'], seed=6)
+
+        engine._process_new_bars()
+
+        assert engine.passes == [('GAZP', 2, '2025-04-24')]
+        assert len(engine.live_state['GAZP'].bars) == 60
@@ -0,0 +1,228 @@
+"""Tests for safetensors model artifacts and the byte-budgeted model cache."""
+
+import json
+import sqlite3
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from core.database import create_tables
+from core.ml.artifacts import load_predictor_artifact, save_predictor_artifact, weights_files
+from core.ml.predictive_models import LSTMPredictor, ModelConfig
+from core.ml.storage import MLModelStorage
+
+SCALER_ATTRIBUTES = ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_')
+
+
+def make_bars(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close - 0.2, 'high': close + 1.0, 'low': close - 1.0, 'close': close,
+        'volume': rng.integers(100, 1000, n).astype(float),
+    })
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return make_bars()
+
+
+@pytest.fixture(scope='module')
+def predictor(bars):
+    torch.manual_seed(0)
+    model = LSTMPredictor(ModelConfig(sequence_length=10, hidden_size=8, num_layers=1, epochs=2, batch_size=16))
+    model.train(bars)
+    return model
+
+
+@pytest.fixture
+def storage(tmp_path):
+    db_path = tmp_path / 'stocks.db'
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    conn.close()
+    return MLModelStorage(db_path=str(db_path), cache_dir=str(tmp_path / 'models'))
+
+
+def assert_same_predictor(restored, original, bars):
+    assert restored.config == original.config
+    original_state = original.model.state_dict()
+    restored_state = restored.model.state_dict()
+    assert restored_state.keys() == original_state.keys()
+    for name, tensor in original_state.items():
+        assert torch.equal(restored_state[name], tensor), name
+    for attr in SCALER_ATTRIBUTES:
+        np.testing.assert_array_equal(getattr(restored.scaler, attr), getattr(original.scaler, attr))
+    expected = original.predict(bars).predictions
+    assert len(expected) == len(bars) - original.config.sequence_length
+    np.testing.assert_array_equal(restored.predict(bars).predictions, expected)
+
+
+def manifest_weights(base_path):
+    return json.loads(base_path.with_suffix('.json').read_text(encoding='utf-8'))['weights_file']
+
+
+def sized_model(n):
+    """Model stand-in whose weights take n * n * 4 bytes."""
+    return SimpleNamespace(model=torch.nn.Linear(n, n, bias=False))
+
+
+def fresh_metadata():
+    return {'training_date': datetime.now().isoformat()}
+
+
+class TestPredictorArtifact:
+    """A saved predictor must reload with identical weights, scaler, config and predictions."""
+
+    def test_round_trip(self, predictor, bars, tmp_path):
+        manifest = save_predictor_artifact(predictor, tmp_path / 'SBER_lstm_1d')
+
+        restored, loaded_manifest = load_predictor_artifact(tmp_path / 'SBER_lstm_1d.json')
+
+        assert loaded_manifest == manifest
+        assert manifest['config'] == asdict(predictor.config)
+        assert [path.name for path in weights_files(tmp_path / 'SBER_lstm_1d')] == [manifest['weights_file']]
+        assert_same_predictor(restored, predictor, bars)
+
+    def test_round_trip_through_storage(self, predictor, bars, storage):
+        storage.save_model('SBER', predictor, training_metrics={'accuracy': 0.7})
+
+        reopened = MLModelStorage(db_path=storage.db_path, cache_dir=str(storage.cache_dir))
+        model, metadata = reopened.get_model('SBER')
+
+        assert reopened.cache_stats['file_loads'] == 1
+        assert metadata['model_path'].endswith('SBER_lstm_1d.json')
+        assert_same_predictor(model, predictor, bars)
+
+    def test_resave_writes_new_weights_file(self, predictor, bars, tmp_path):
+        base_path = tmp_path / 'SBER_lstm_1d'
+        first = save_predictor_artifact(predictor, base_path)
+        loaded, _ = load_predictor_artifact(base_path.with_suffix('.json'))
+
+        second = save_predictor_artifact(predictor, base_path)
+
+        assert second['weights_file'] != first['weights_file']
+        assert [path.name for path in weights_files(base_path)] == [second['weights_file']]
+        # The loaded model keeps its own mapping of the replaced file
+        assert_same_predictor(loaded, predictor, bars)
+
+    def test_weights_still_mapped_are_removed_by_later_cleanup(self, predictor, storage, monkeypatch):
+        storage.save_model('SBER', predictor)
+        base_path = storage.cache_dir / 'SBER_lstm_1d'
+        mapped = weights_files(base_path)[0]
+        unlink = Path.unlink
+
+        def windows_unlink(path, *args, **kwargs):
+            # Windows refuses to delete a file that is still memory-mapped
+            if path == mapped:
+                raise PermissionError(13, 'The process cannot access the file', str(path))
+            return unlink(path, *args, **kwargs)
+
+        monkeypatch.setattr(Path, 'unlink', windows_unlink)
+        storage.save_model('SBER', predictor)
+        assert mapped.exists()
+        assert manifest_weights(base_path) != mapped.name
+
+        monkeypatch.setattr(Path, 'unlink', unlink)
+        storage.cleanup_expired_models()
+
+        assert [path.name for path in weights_files(base_path)] == [manifest_weights(base_path)]
+
+    def test_removing_model_files_drops_cached_model(self, predictor, storage):
+        storage.save_model('SBER', predictor)
+        assert 'SBER_lstm_1d' in storage.memory_cache
+
+        storage._remove_model_files(storage.cache_dir / 'SBER_lstm_1d')
+
+        assert 'SBER_lstm_1d' not in storage.memory_cache
+        assert list(storage.cache_dir.iterdir()) == []
+
+
+class TestModelMemoryCache:
+    """The LRU is bounded by the weights' bytes and reports hits, misses and evictions."""
+
+    def test_least_recently_used_model_is_evicted_by_bytes(self, storage):
+        storage.cache_max_bytes = 2 * 16 * 16 * 4
+        storage._add_to_memory_cache('SBER_lstm_1d', sized_model(16), fresh_metadata())
+        storage._add_to_memory_cache('GAZP_lstm_1d', sized_model(16), fresh_metadata())
+        storage.get_model('SBER')  # GAZP becomes the least recently used
+
+        storage._add_to_memory_cache('LKOH_lstm_1d', sized_model(16), fresh_metadata())
+
+        assert list(storage.memory_cache) == ['SBER_lstm_1d', 'LKOH_lstm_1d']
+        assert storage.get_cache_stats()['bytes'] == 2 * 16 * 16 * 4
+
+    def test_model_larger_than_budget_is_still_cached_alone(self, storage):
+        storage.cache_max_bytes = 1000
+        storage._add_to_memory_cache('SBER_lstm_1d', sized_model(8), fresh_metadata())
+
+        storage._add_to_memory_cache('GAZP_lstm_1d', sized_model(32), fresh_metadata())
+
+        assert list(storage.memory_cache) == ['GAZP_lstm_1d']
+
+    def test_cache_stats_count_hits_misses_and_evictions(self, storage):
+        storage.cache_max_bytes = 16 * 16 * 4
+        storage._add_to_memory_cache('SBER_lstm_1d', sized_model(16), fresh_metadata())
+        storage.get_model('SBER')
+        storage.get_model('SBER')
+        storage.get_model('GAZP')
+        storage._add_to_memory_cache('GAZP_lstm_1d', sized_model(16), fresh_metadata())
+
+        stats = storage.get_cache_stats()
+
+        assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 1)
+        assert stats['hit_rate'] == pytest.approx(2 / 3)
+        assert (stats['models'], stats['bytes'], stats['max_bytes']) == (1, 16 * 16 * 4, 16 * 16 * 4)
+
+    def test_expired_model_is_a_miss(self, storage):
+        storage._add_to_memory_cache('SBER_lstm_1d', sized_model(4), {'training_date': '2020-01-01T00:00:00'})
+
+        assert storage.get_model('SBER') == (None, None)
+        assert storage.get_cache_stats()['misses'] == 1
+        assert storage.get_cache_stats()['models'] == 0
+
+
+class TestLegacyMigration:
+    """A pickled predictor is rewritten as manifest + safetensors and the .pkl is removed."""
+
+    def test_migrate_legacy_file(self, predictor, bars, storage):
+        legacy_path = storage.cache_dir / 'SBER_lstm_1d.pkl'
+        joblib.dump(predictor, legacy_path)
+        metadata = storage.save_model('SBER', object())  # Registers metadata, writes a pickle
+        joblib.dump(predictor, legacy_path)
+
+        assert storage._migrate_legacy_file(legacy_path, joblib.load(legacy_path), metadata)
+
+        base_path = storage.cache_dir / 'SBER_lstm_1d'
+        assert not legacy_path.exists()
+        assert [path.name for path in weights_files(base_path)] == [manifest_weights(base_path)]
+        assert storage.cache_stats['migrations'] == 1
+        stored = storage._get_model_metadata('SBER', 'lstm', '1d')
+        assert (stored['model_path'], stored['model_version']) == (str(base_path.with_suffix('.json')), '2')
+        restored, _ = load_predictor_artifact(base_path.with_suffix('.json'))
+        assert_same_predictor(restored, predictor, bars)
+
+    def test_get_model_migrates_on_load(self, predictor, bars, storage):
+        storage.save_model('SBER', object())
+        joblib.dump(predictor, storage.cache_dir / 'SBER_lstm_1d.pkl')
+        storage.invalidate_memory_cache('SBER')
+
+        model, _ = storage.get_model('SBER')
+
+        assert_same_predictor(model, predictor, bars)
+        assert not (storage.cache_dir / 'SBER_lstm_1d.pkl').exists()
+        assert (storage.cache_dir / 'SBER_lstm_1d.json').exists()
+
+    def test_non_torch_model_is_skipped(self, storage):
+        storage.save_model('SBER', {'weights': [1, 2, 3]})
+
+        assert storage.migrate_legacy_models() == {'migrated': 0, 'skipped': 1, 'failed': 0}
+        assert (storage.cache_dir / 'SBER_lstm_1d.pkl').exists()
@@ -0,0 +1,87 @@
+"""Tests for thread-safe model lookup used by batch ML signal generation."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from core.ml.model_manager import MLModelManager
+from core.ml.storage import MLModelStorage
+
+
+class FakeStorage:
+    """Model storage double: remembers what _train_model 'saved'."""
+
+    def __init__(self):
+        self.models = {}
+
+    def get_model(self, symbol, model_type='lstm', timeframe='1d'):
+        return self.models.get((symbol, model_type, timeframe), (None, None))
+
+
+class TestGetOrTrainModelConcurrency:
+    """Concurrent callers must train a model once and share the result."""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        manager = MLModelManager(db_path=str(tmp_path / 'stocks.db'))
+        manager.storage = FakeStorage()
+        manager.trainings = []
+        trainings_lock = threading.Lock()
+
+        def fake_train(symbol, model_type, timeframe, epochs=None):
+            with trainings_lock:
+                manager.trainings.append(symbol)
+            time.sleep(0.2)
+            model = object()
+            manager.storage.models[(symbol, model_type, timeframe)] = (model, {'symbol': symbol})
+            return model, {'symbol': symbol}
+
+        monkeypatch.setattr(manager, '_train_model', fake_train)
+        return manager
+
+    def test_same_key_is_trained_once(self, manager):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            models = list(executor.map(lambda _: manager.get_or_train_model('SBER')[0], range(8)))
+
+        assert manager.trainings == ['SBER']
+        assert all(model is models[0] for model in models)
+
+    def test_different_keys_train_in_parallel(self, manager):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(manager.get_or_train_model, ['SBER', 'GAZP', 'LKOH', 'ROSN']))
+
+        assert sorted(manager.trainings) == ['GAZP', 'LKOH', 'ROSN', 'SBER']
+        assert time.perf_counter() - started < 0.6  # Four 0.2 s trainings did not serialise
+
+    def test_force_retrain_trains_again(self, manager):
+        manager.get_or_train_model('SBER')
+
+        manager.get_or_train_model('SBER', force_retrain=True)
+
+        assert manager.trainings == ['SBER', 'SBER']
+
+
+class TestModelStorageCacheConcurrency:
+    """The in-memory LRU must stay consistent under concurrent reads and writes."""
+
+    def test_budget_holds_under_concurrent_access(self, tmp_path):
+        storage = MLModelStorage(db_path=str(tmp_path / 'stocks.db'), cache_dir=str(tmp_path / 'models'))
+        storage.cache_max_size = 5
+        metadata = {'training_date': datetime.now().isoformat()}
+
+        def worker(offset):
+            for i in range(200):
+                key = f"SYM{(offset + i) % 12}_lstm_1d"
+                storage._add_to_memory_cache(key, object(), metadata)
+                storage.get_model(f"SYM{(offset + i + 3) % 12}")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(8)))
+
+        stats = storage.get_cache_stats()
+        assert stats['models'] == len(storage.memory_cache) <= 5
+        assert stats['bytes'] == sum(entry[2] for entry in storage.memory_cache.values())
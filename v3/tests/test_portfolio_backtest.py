@@ -0,0 +1,134 @@
+"""Tests for the vectorised multi-symbol portfolio backtest."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analytics import RiskProfile, TradingCosts, simulate_trades
+from core.analytics.portfolio_backtest import PortfolioBacktester, PortfolioPanel
+from core.indicators.calculations import ATR_COL
+
+COSTS = TradingCosts(commission_pct=0.0005, slippage_pct=0.0005, tax_pct=0.13)
+
+# Portfolio limits switched off: every signal trades as if alone
+UNCONSTRAINED = RiskProfile(max_positions=1000, max_position_size=10000, max_portfolio_risk=np.inf,
+                            max_daily_loss=np.inf, max_drawdown=np.inf, max_correlation=np.inf)
+
+
+def make_universe(symbols=12, days=160, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=days)
+    factors = rng.normal(0, 0.01, (days, 3))
+    frames = []
+    for k in range(symbols):
+        close = 100 * np.exp(np.cumsum(factors[:, k % 3] + rng.normal(0, 0.015, days)))
+        high = close * (1 + np.abs(rng.normal(0, 0.01, days)))
+        low = close * (1 - np.abs(rng.normal(0, 0.01, days)))
+        frames.append(pd.DataFrame({
+            'date': dates, 'contract_code': f'T{k:02d}', 'close': close, 'high': high, 'low': low,
+            ATR_COL: pd.Series(high - low).rolling(14, min_periods=1).mean(),
+            'long_signal': (rng.random(days) < 0.05).astype(int),
+            'short_signal': (rng.random(days) < 0.04).astype(int),
+            'long_probability': rng.random(days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def per_symbol_trades(data, profile, direction):
+    """Completed trades of simulate_trades run contract by contract."""
+    params = SimpleNamespace(
+        atr_stop_multiplier=profile.stop_loss_atr_multiplier,
+        atr_target_multiplier=profile.take_profit_atr_multiplier,
+        trailing_stop_multiplier=profile.trailing_stop_multiplier,
+        max_holding_days=profile.max_holding_days,
+    )
+    trades = []
+    for code, frame in data.groupby('contract_code', sort=True):
+        for trade in simulate_trades(frame, signal_col=f'{direction}_signal', direction=direction,
+                                     atr_col=ATR_COL, risk_params=params, costs=COSTS):
+            # A trade cut off by the end of data is booked at its entry bar
+            if trade.exit_date != trade.entry_date:
+                trades.append((code, trade.entry_date, trade.exit_date, trade.net_return))
+    return sorted(trades)
+
+
+def one_symbol_panel(close, high, low, atr=1.0, long_signal=(), score=None):
+    n = len(close)
+    signal = np.zeros((n, 1), dtype=bool)
+    signal[list(long_signal), 0] = True
+    return PortfolioPanel(
+        dates=pd.bdate_range('2024-01-01', periods=n), symbols=pd.Index(['SBER']),
+        close=np.array(close, dtype=float)[:, None], high=np.array(high, dtype=float)[:, None],
+        low=np.array(low, dtype=float)[:, None], atr=np.full((n, 1), atr),
+        long_signal=signal, short_signal=np.zeros((n, 1), dtype=bool),
+        score=np.zeros((n, 1)) if score is None else score,
+    )
+
+
+class TestPortfolioBacktest:
+    """Without limits the engine must equal the per-symbol loop; limits must bind as documented."""
+
+    @pytest.mark.parametrize('direction', ['long', 'short'])
+    def test_unconstrained_run_matches_per_symbol_simulation(self, direction):
+        data = make_universe()
+        subset = data.assign(**{f'{other}_signal': 0 for other in ('long', 'short') if other != direction})
+
+        result = PortfolioBacktester(UNCONSTRAINED, COSTS, initial_capital=1e12).run(
+            PortfolioPanel.from_frame(subset))
+
+        completed = result.trades[result.trades['exit_reason'] != 'end']
+        engine = sorted(zip(completed['contract_code'], completed['entry_date'], completed['exit_date'],
+                            completed['net_return']))
+        expected = per_symbol_trades(subset, UNCONSTRAINED, direction)
+        assert [trade[:3] for trade in engine] == [trade[:3] for trade in expected]
+        np.testing.assert_allclose([trade[3] for trade in engine], [trade[3] for trade in expected], rtol=1e-12)
+        assert len(completed) > 20
+
+    def test_equity_equals_capital_plus_realised_pnl(self):
+        data = make_universe(seed=1)
+        profile = RiskProfile(max_positions=5, max_position_size=50000, max_correlation=0.5)
+
+        result = PortfolioBacktester(profile, COSTS).run(PortfolioPanel.from_frame(data, score_col='long_probability'))
+
+        equity = result.equity
+        assert equity['positions'].iloc[-1] == 0
+        assert equity['equity'].iloc[-1] == pytest.approx(1_000_000 + result.trades['pnl'].sum())
+        assert equity['positions'].max() <= 5
+        assert result.rejections.get('max_positions', 0) > 0
+
+    def test_best_score_is_admitted_first(self):
+        data = make_universe(symbols=4, days=30, seed=2)
+        data['long_signal'] = 0
+        data['short_signal'] = 0
+        first_day = data['date'] == data['date'].min()
+        data.loc[first_day, 'long_signal'] = 1
+        data.loc[first_day, 'long_probability'] = [0.1, 0.9, 0.5, 0.3]
+        profile = RiskProfile(max_positions=1, max_position_size=10000, max_portfolio_risk=np.inf)
+
+        result = PortfolioBacktester(profile, COSTS).run(PortfolioPanel.from_frame(data, score_col='long_probability'))
+
+        assert result.trades['contract_code'].tolist() == ['T01']
+        assert result.rejections == {'max_positions': 3}
+
+    def test_bar_touching_stop_and_target_exits_at_stop(self):
+        # Entry at 100 with ATR 1: stop 98, target 103; bar 1 spans both
+        panel = one_symbol_panel(close=[100, 100, 100], high=[100, 104, 100], low=[100, 97, 100],
+                                 long_signal=[0])
+
+        trades = PortfolioBacktester(UNCONSTRAINED, TradingCosts()).run(panel).trades
+
+        assert trades['exit_reason'].tolist() == ['stop']
+        assert trades['exit_price'].tolist() == [98.0]
+
+    def test_position_exits_after_max_holding_days(self):
+        n = 10
+        panel = one_symbol_panel(close=np.full(n, 100.0), high=np.full(n, 100.5), low=np.full(n, 99.5),
+                                 long_signal=[0])
+        profile = RiskProfile(max_holding_days=3, trailing_stop_multiplier=0, max_portfolio_risk=np.inf)
+
+        trades = PortfolioBacktester(profile, TradingCosts()).run(panel).trades
+
+        assert trades['exit_reason'].tolist() == ['time']
+        assert trades['holding_days'].tolist() == [3]
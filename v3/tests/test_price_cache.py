@@ -0,0 +1,154 @@
+"""Tests for the last-price cache and the demo valuation that reads it."""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import core.demo_trading as demo_trading
+from core.database import create_tables
+from core.price_cache import LastPriceCache, PriceQuote, fresher
+
+
+def insert_close(conn, contract_code, date, close, figi=None):
+    row = conn.execute("SELECT id FROM companies WHERE contract_code = ?", (contract_code,)).fetchone()
+    company_id = row[0] if row else conn.execute(
+        "INSERT INTO companies (contract_code, figi) VALUES (?, ?)", (contract_code, figi)).lastrowid
+    conn.execute("INSERT OR REPLACE INTO daily_data (company_id, date, open, low, high, close, volume)"
+                 " VALUES (?, ?, ?, ?, ?, ?, 1000)", (company_id, date, close, close, close, close))
+
+
+class TestLastPriceCache:
+    """Newer quotes replace older ones; stale updates never overwrite a fresher quote."""
+
+    def test_newer_quote_replaces_older(self):
+        cache = LastPriceCache()
+        assert cache.update('SBER', 250.0, '2025-03-05 10:00', 'tick')
+
+        assert cache.update('SBER', 251.0, '2025-03-05 10:01', 'tick')
+
+        assert cache.get('SBER') == PriceQuote(251.0, pd.Timestamp('2025-03-05 10:01'), 'tick')
+
+    def test_stale_update_is_rejected(self):
+        cache = LastPriceCache()
+        cache.update('SBER', 251.0, '2025-03-05 10:01', 'tick')
+
+        assert not cache.update('SBER', 240.0, '2025-03-04', 'daily_data')
+
+        assert cache.get('SBER').price == 251.0
+
+    def test_same_timestamp_overwrites(self):
+        # The forming candle is re-sent with the same open time and a new close
+        cache = LastPriceCache()
+        cache.update('SBER', 250.0, '2025-03-05 10:00', 'candle')
+
+        assert cache.update('SBER', 250.5, '2025-03-05 10:00', 'candle')
+        assert cache.get('SBER').price == 250.5
+
+    @pytest.mark.parametrize('price', [None, 0, -1.0, float('nan')])
+    def test_invalid_prices_are_ignored(self, price):
+        cache = LastPriceCache()
+        cache.update('SBER', 250.0, '2025-03-05 10:00')
+
+        assert not cache.update('SBER', price, '2025-03-05 11:00')
+        assert cache.get('SBER').price == 250.0
+
+    def test_timezones_are_normalised_to_utc(self):
+        cache = LastPriceCache()
+        cache.update('SBER', 250.0, pd.Timestamp('2025-03-05 13:00', tz='Europe/Moscow'))
+
+        # 10:30 UTC is newer than 13:00 Moscow (10:00 UTC)
+        assert cache.update('SBER', 251.0, pd.Timestamp('2025-03-05 10:30', tz='UTC'))
+        assert cache.get('SBER').as_of == pd.Timestamp('2025-03-05 10:30')
+
+    def test_update_from_candles_takes_newest_row(self):
+        cache = LastPriceCache()
+        candles = pd.DataFrame({
+            'time': ['2025-03-05T11:00:00+00:00', '2025-03-05T12:00:00+00:00', '2025-03-05T10:00:00+00:00'],
+            'close': [101.0, 102.0, 100.0],
+        })
+
+        assert cache.update_from_candles('SBER', candles, source='1h')
+        assert cache.get('SBER') == PriceQuote(102.0, pd.Timestamp('2025-03-05 12:00'), '1h')
+
+    def test_figi_quotes_move_to_contract_code(self):
+        cache = LastPriceCache()
+        cache.update('BBG004730N88', 250.0, '2025-03-05 10:00', 'tick')
+        cache.update('SBER', 249.0, '2025-03-05 09:00', 'daily_data')
+
+        cache.register_figis({'BBG004730N88': 'SBER'})
+        cache.update('BBG004730N88', 252.0, '2025-03-05 10:05', 'tick')
+
+        assert cache.get('BBG004730N88') is None
+        assert cache.get('SBER') == PriceQuote(252.0, pd.Timestamp('2025-03-05 10:05'), 'tick')
+        assert len(cache) == 1
+
+    def test_clear_drops_quotes_and_aliases(self):
+        cache = LastPriceCache()
+        cache.register_figis({'BBG004730N88': 'SBER'})
+        cache.update('BBG004730N88', 250.0, '2025-03-05 10:00')
+
+        cache.clear()
+        cache.update('BBG004730N88', 251.0, '2025-03-05 10:01')
+
+        assert cache.get('SBER') is None
+        assert cache.get('BBG004730N88').price == 251.0
+
+    def test_fresher_prefers_first_on_ties(self):
+        first = PriceQuote(1.0, pd.Timestamp('2025-03-05'), 'a')
+        second = PriceQuote(2.0, pd.Timestamp('2025-03-05'), 'b')
+
+        assert fresher(first, second) is first
+        assert fresher(None, second) is second
+
+
+class TestDemoValuation:
+    """A cached quote is used only while it is not older than the database close."""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+        create_tables(conn)
+        insert_close(conn, 'SBER', '2025-03-04', 240.0, figi='BBG004730N88')
+        insert_close(conn, 'GAZP', '2025-03-04', 130.0)
+        yield conn
+        conn.close()
+
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        cache = LastPriceCache()
+        monkeypatch.setattr(demo_trading, 'get_price_cache', lambda: cache)
+        return cache
+
+    def test_database_close_without_quotes(self, conn, cache):
+        prices, as_of, sources = demo_trading._market_prices(conn, ['SBER', 'GAZP', 'LKOH'])
+
+        assert prices == [240.0, 130.0, None]
+        assert as_of == ['2025-03-04', '2025-03-04', None]
+        assert sources == ['daily_data', 'daily_data', None]
+
+    def test_intraday_tick_wins_over_close_of_same_day(self, conn, cache):
+        cache.update('BBG004730N88', 245.0, '2025-03-04 12:00', 'tick')
+
+        prices, _, sources = demo_trading._market_prices(conn, ['SBER'])
+
+        assert prices == [245.0]
+        assert sources == ['tick']
+
+    def test_newer_close_invalidates_cached_quote(self, conn, cache):
+        cache.update('SBER', 245.0, '2025-03-04 12:00', 'tick')
+        insert_close(conn, 'SBER', '2025-03-05', 250.0)
+
+        prices, as_of, sources = demo_trading._market_prices(conn, ['SBER'])
+
+        assert prices == [250.0]
+        assert as_of == ['2025-03-05']
+        assert sources == ['daily_data']
+
+    def test_quote_for_contract_without_candles(self, conn, cache):
+        cache.update('LKOH', 7000.0, '2025-03-05 10:00', 'tick')
+
+        prices, _, sources = demo_trading._market_prices(conn, ['LKOH'])
+
+        assert prices == [7000.0]
+        assert sources == ['tick']
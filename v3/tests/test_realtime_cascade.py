@@ -0,0 +1,173 @@
+"""Tests for bar-close aggregation and the event-driven cascade."""
+
+import contextlib
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.bar_events import BarAggregator, BarCloseEvent
+from core.cascade_analyzer import CascadeAnalyzer
+from core.cascade_realtime import RealtimeCascade
+
+START = pd.Timestamp('2025-03-03 10:00:00')
+ML_RESULT = {'ml_ensemble_signal': 'BUY', 'ml_price_confidence': 0.8}
+WINDOW_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+def candle(time, open_, high, low, close, volume):
+    return {'time': time, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+
+def make_history(seed=0):
+    """Closed bars before START: 48 hours, 120 minutes, 120 seconds."""
+    rng = np.random.default_rng(seed)
+    history = {}
+    for timeframe, freq, count in (('1h', 'h', 48), ('1m', 'min', 120), ('1s', 's', 120)):
+        times = pd.date_range(end=START - pd.Timedelta(1, freq), periods=count, freq=freq)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+        spread = np.abs(rng.normal(0, 0.001, count)) * close
+        volume = rng.integers(100, 1000, count).astype(float)
+        volume[-4:] *= 2  # Rising volume confirms the hourly trend
+        history[timeframe] = pd.DataFrame(
+            [(t, c, c + s, c - s, c, v) for t, c, s, v in zip(times, close, spread, volume)], columns=WINDOW_COLUMNS)
+    return history
+
+
+def bar(timeframe, time, close, volume=10.0, symbol='SBER'):
+    return BarCloseEvent(symbol, timeframe, pd.Timestamp(time), close, close * 1.001, close * 0.999, close, volume)
+
+
+def decision(result):
+    return (result.rejected_at_stage, result.final_signal, result.confidence, result.entry_price, result.stop_loss)
+
+
+class TestBarAggregator:
+    """A bar is emitted once, with its final values, when a later bar starts."""
+
+    def test_candle_updates_emit_previous_bar_once(self):
+        aggregator = BarAggregator()
+
+        assert aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:00:00Z', 100, 101, 99, 100.5, 10)) is None
+        assert aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:00:00Z', 100, 102, 99, 101.5, 25)) is None
+        closed = aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:01:00Z', 101.5, 102, 101, 101.8, 3))
+
+        assert closed.as_row() == (pd.Timestamp('2025-03-03 10:00'), 100.0, 102.0, 99.0, 101.5, 25.0)
+        assert (closed.symbol, closed.timeframe) == ('SBER', '1m')
+        assert closed.close_time == pd.Timestamp('2025-03-03 10:01')
+        assert aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:01:00Z', 101.5, 102, 101, 101.9, 4)) is None
+
+    def test_late_candle_update_is_ignored(self):
+        aggregator = BarAggregator()
+        aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:01:00Z', 100, 100, 100, 100, 1))
+
+        assert aggregator.add_candle('SBER', '1m', candle('2025-03-03T10:00:00Z', 90, 90, 90, 90, 1)) is None
+        assert aggregator.flush()[0].close == 100.0
+
+    def test_ticks_build_ohlcv_per_timeframe(self):
+        aggregator = BarAggregator()
+        ticks = [('10:00:00.2', 100.0, 5), ('10:00:00.7', 101.0, 1), ('10:00:01.1', 99.5, 2),
+                 ('10:00:59.9', 100.5, 3), ('10:01:00.0', 102.0, 4)]
+        closed = {'1s': [], '1m': []}
+        for when, price, volume in ticks:
+            for timeframe in closed:
+                event = aggregator.add_tick('SBER', timeframe, f'2025-03-03 {when}', price, volume)
+                if event is not None:
+                    closed[timeframe].append(event.as_row())
+
+        assert closed['1s'] == [(pd.Timestamp('2025-03-03 10:00:00'), 100.0, 101.0, 100.0, 101.0, 6.0),
+                                (pd.Timestamp('2025-03-03 10:00:01'), 99.5, 99.5, 99.5, 99.5, 2.0),
+                                (pd.Timestamp('2025-03-03 10:00:59'), 100.5, 100.5, 100.5, 100.5, 3.0)]
+        assert closed['1m'] == [(pd.Timestamp('2025-03-03 10:00'), 100.0, 101.0, 99.5, 100.5, 11.0)]
+
+    def test_times_are_utc_naive(self):
+        aggregator = BarAggregator()
+        aggregator.add_tick('SBER', '1s', pd.Timestamp('2025-03-03 13:00:00', tz='Europe/Moscow'), 100.0)
+
+        closed = aggregator.add_tick('SBER', '1s', '2025-03-03T10:00:01+00:00', 101.0)
+
+        assert closed.time == pd.Timestamp('2025-03-03 10:00:00')
+        assert closed.close_time == pd.Timestamp('2025-03-03 10:00:01')
+
+    def test_flush_closes_forming_bars_of_one_symbol(self):
+        aggregator = BarAggregator()
+        aggregator.add_tick('SBER', '1m', '2025-03-03 10:00:10', 100.0)
+        aggregator.add_tick('GAZP', '1m', '2025-03-03 10:00:20', 130.0)
+
+        assert [event.symbol for event in aggregator.flush('SBER')] == ['SBER']
+        assert [event.symbol for event in aggregator.flush()] == ['GAZP']
+        assert aggregator.flush() == []
+
+
+class TestRealtimeCascade:
+    """Incremental re-evaluation must equal a full cascade over the same windows."""
+
+    @pytest.fixture
+    def analyzer(self):
+        multi_analyzer = SimpleNamespace(get_figi_for_symbol=lambda symbol: f'FIGI_{symbol}', base_analyzer=None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CascadeAnalyzer(multi_analyzer)
+
+    @staticmethod
+    async def full_cascade(analyzer, cascade):
+        """A fresh cascade evaluated from scratch on the incremental cascade's windows."""
+        windows = {tf: pd.DataFrame(list(window), columns=WINDOW_COLUMNS)
+                   for tf, window in cascade.states['SBER'].windows.items()}
+        return await RealtimeCascade(analyzer).add_symbol('SBER', ML_RESULT, windows=windows)
+
+    @pytest.mark.asyncio
+    async def test_minute_bars_roll_up_into_hourly_bar(self, analyzer):
+        cascade = RealtimeCascade(analyzer)
+        await cascade.add_symbol('SBER', ML_RESULT, windows=make_history())
+        closes = [100.0, 103.0, 97.0, 101.0]
+
+        for k, close in enumerate(closes[:3]):
+            await cascade.on_bar_close(bar('1m', START + pd.Timedelta(minutes=20 * k), close, volume=10.0 + k))
+        assert cascade.states['SBER'].windows['1h'][-1][0] == START - pd.Timedelta(hours=1)
+
+        await cascade.on_bar_close(bar('1m', START + pd.Timedelta(hours=1), closes[3]))
+
+        hourly = cascade.states['SBER'].windows['1h'][-1]
+        assert hourly == (START, 100.0, 103.0 * 1.001, 97.0 * 0.999, 97.0, 33.0)
+        assert cascade.states['SBER'].forming_hour[0] == START + pd.Timedelta(hours=1)
+
+    @pytest.mark.asyncio
+    async def test_incremental_decisions_match_full_cascade(self, analyzer):
+        cascade = RealtimeCascade(analyzer)
+        await cascade.add_symbol('SBER', ML_RESULT, windows=make_history())
+        rng = np.random.default_rng(3)
+        price = 100.0
+        for second in range(1, 150):
+            price *= np.exp(rng.normal(0, 0.0005))
+            stamp = START + pd.Timedelta(seconds=second)
+            result = await cascade.on_bar_close(bar('1s', stamp - pd.Timedelta(seconds=1), price))
+            if second % 60 == 0:
+                result = await cascade.on_bar_close(bar('1m', stamp - pd.Timedelta(minutes=1), price, volume=600))
+            if second % 25 == 0:
+                assert decision(result) == decision(await self.full_cascade(analyzer, cascade))
+
+        runs = cascade.get_stage_runs()
+        assert runs['1s'] > runs['1m'] >= 1
+        assert runs['1h'] == 1  # Only the initial full evaluation; no hour has closed
+
+    @pytest.mark.asyncio
+    async def test_latency_is_measured_from_bar_close_time(self, analyzer):
+        now = {'time': 0.0}
+        cascade = RealtimeCascade(analyzer, clock=lambda: now['time'])
+        await cascade.add_symbol('SBER', ML_RESULT, windows=make_history())
+
+        second = bar('1s', START, 100.0)
+        now['time'] = second.close_time.timestamp() + 0.25
+        await cascade.on_bar_close(second)
+        await cascade.on_bar_close(bar('1m', START, 100.0))
+        now['time'] = (START + pd.Timedelta(hours=1, minutes=1)).timestamp() + 0.5
+        await cascade.on_bar_close(bar('1m', START + pd.Timedelta(hours=1), 100.0))
+
+        stats = cascade.get_latency_stats()
+        assert stats['1s']['last'] == pytest.approx(0.25)
+        # The minute bar 11:00 closes at 11:01; the hour 10:00 closed at 11:00
+        assert stats['1m']['last'] == pytest.approx(0.5)
+        assert stats['1h'] == {'events': 1, 'last': pytest.approx(60.5), 'mean': pytest.approx(60.5),
+                               'p50': pytest.approx(60.5), 'p95': pytest.approx(60.5), 'max': pytest.approx(60.5)}
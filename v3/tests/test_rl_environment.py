@@ -0,0 +1,87 @@
+"""Tests for the vectorised RL trading environment and the array replay buffer."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('torch')
+
+from core.ml.reinforcement_learning import (  # noqa: E402
+    ReplayBuffer, TradingEnvironment, VectorizedTradingEnvironment,
+)
+
+
+def make_frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({
+        'open': close * 0.999, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+        'volume': rng.integers(100, 1000, rows).astype(float),
+        'rsi': rng.uniform(20, 80, rows), 'macd': rng.normal(0, 0.01, rows),
+        'sma_20': close * rng.uniform(0.95, 1.05, rows),
+    })
+
+
+class TestVectorizedTradingEnvironment:
+    """Every lane must follow exactly the trajectory of a scalar TradingEnvironment."""
+
+    def test_lanes_match_scalar_environments(self):
+        frames = [make_frame(40, 0), make_frame(25, 1), make_frame(40, 2)]
+        offsets = [0, 0, 15]
+        vector_env = VectorizedTradingEnvironment(frames, offsets=offsets)
+        scalar_envs = [TradingEnvironment(frame.iloc[offset:]) for frame, offset in zip(frames, offsets)]
+        scalar_states = [env.reset() for env in scalar_envs]
+        states = vector_env.reset()
+        rng = np.random.default_rng(3)
+
+        for _ in range(45):
+            np.testing.assert_allclose(states, np.array(scalar_states), rtol=1e-6, atol=1e-6)
+            actions = rng.integers(0, 3, len(frames))
+            states, rewards, dones, info = vector_env.step(actions)
+            for k, env in enumerate(scalar_envs):
+                was_done = env.done
+                scalar_states[k], reward, done, _ = env.step(int(actions[k]))
+                assert rewards[k] == pytest.approx(0.0 if was_done else reward, abs=1e-12)
+                assert dones[k] == done
+                assert info['portfolio_value'][k] == pytest.approx(env.portfolio_value, rel=1e-12)
+
+        assert dones.all()
+
+    def test_reset_mask_restarts_only_selected_lanes(self):
+        env = VectorizedTradingEnvironment([make_frame(10, 0), make_frame(10, 1)])
+        for _ in range(4):
+            env.step(np.array([0, 2]))
+
+        env.reset(np.array([True, False]))
+
+        assert env.current_step.tolist() == [0, 4]
+        assert env.portfolio_value[0] == env.initial_balance
+        assert env.position[1] == pytest.approx(-0.4)
+
+
+class TestReplayBuffer:
+    """The ring buffer keeps the newest ``capacity`` experiences."""
+
+    def test_wraps_and_keeps_newest(self):
+        buffer = ReplayBuffer(capacity=5)
+        for i in range(4):
+            buffer.push(np.full(3, i), i, float(i), np.full(3, i + 1), False)
+        buffer.push_batch(np.arange(9).reshape(3, 3), [4, 5, 6], [4.0, 5.0, 6.0], np.zeros((3, 3)), [True] * 3)
+
+        assert len(buffer) == 5
+        assert sorted(buffer.actions.tolist()) == [2, 3, 4, 5, 6]
+        assert buffer.position == 2
+
+    def test_sample_returns_aligned_rows(self):
+        buffer = ReplayBuffer(capacity=50)
+        for i in range(20):
+            buffer.push(np.full(4, i), i % 3, float(i), np.full(4, i + 1), i % 2 == 0)
+
+        states, actions, rewards, next_states, dones = buffer.sample(8)
+
+        assert states.shape == (8, 4)
+        assert len(set(rewards.tolist())) == 8  # Without replacement
+        np.testing.assert_array_equal(states[:, 0], rewards)
+        np.testing.assert_array_equal(next_states[:, 0], rewards + 1)
+        np.testing.assert_array_equal(actions, rewards.astype(int) % 3)
+        np.testing.assert_array_equal(dones, rewards.astype(int) % 2 == 0)
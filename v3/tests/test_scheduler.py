@@ -219,6 +219,200 @@ class TestTaskScheduler:
         assert status["running_tasks"] == 0
         assert status["failed_tasks"] == 0
 
+    @pytest.mark.asyncio
+    async def test_sync_task_runs_off_event_loop(self):
+        """Test that a blocking sync task does not freeze the event loop."""
+        import time
+
+        self.scheduler.add_task(
+            name="blocking_task",
+            func=lambda: time.sleep(0.3),
+            interval=timedelta(minutes=5)
+        )
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        await asyncio.gather(
+            self.scheduler._execute_task(self.scheduler.tasks["blocking_task"]),
+            ticker()
+        )
+
+        assert ticks == 5
+        assert self.scheduler.tasks["blocking_task"].status == TaskStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_execute_task_timeout(self):
+        """Test that a task exceeding its timeout fails."""
+        import time
+
+        self.scheduler.add_task(
+            name="slow_task",
+            func=lambda: time.sleep(0.3),
+            interval=timedelta(minutes=5),
+            timeout=0.05
+        )
+
+        task = self.scheduler.tasks["slow_task"]
+        await self.scheduler._execute_task(task)
+
+        assert task.status == TaskStatus.FAILED
+        assert task.error_count == 1
+        metrics = self.scheduler.get_task_metrics("slow_task")["slow_task"]
+        assert metrics["outcomes"]["timeout"] == 1
+
+    @pytest.mark.asyncio
+    async def test_priority_admission(self):
+        """Test that higher priority tasks are admitted first."""
+        scheduler = TaskScheduler(max_concurrent_tasks=1)
+        scheduler.add_task(name="low", func=Mock(), interval=timedelta(minutes=5), priority=1)
+        scheduler.add_task(name="high", func=Mock(), interval=timedelta(minutes=5), priority=10)
+        for task in scheduler.tasks.values():
+            task.next_run = datetime.now() - timedelta(seconds=1)
+
+        admitted = scheduler._admit_ready_tasks()
+        assert [task.name for task in admitted] == ["high"]
+
+        await asyncio.gather(*scheduler._active.values())
+        admitted = scheduler._admit_ready_tasks()
+        assert [task.name for task in admitted] == ["low"]
+        await asyncio.gather(*scheduler._active.values())
+
+    @pytest.mark.asyncio
+    async def test_resource_class_limits(self):
+        """Test per resource class concurrency limits."""
+        scheduler = TaskScheduler(cpu_workers=1)
+        scheduler.add_task(name="cpu1", func=Mock(), interval=timedelta(minutes=5),
+                           priority=5, resource_class="cpu")
+        scheduler.add_task(name="cpu2", func=Mock(), interval=timedelta(minutes=5),
+                           priority=3, resource_class="cpu")
+        scheduler.add_task(name="io1", func=Mock(), interval=timedelta(minutes=5), priority=1)
+        for task in scheduler.tasks.values():
+            task.next_run = datetime.now() - timedelta(seconds=1)
+
+        admitted = scheduler._admit_ready_tasks()
+        assert sorted(task.name for task in admitted) == ["cpu1", "io1"]
+        await asyncio.gather(*scheduler._active.values())
+
+    @pytest.mark.asyncio
+    async def test_cancel_task(self):
+        """Test cancelling a running coroutine task."""
+        async def long_task():
+            await asyncio.sleep(10)
+
+        scheduler = TaskScheduler()
+        scheduler.add_task(name="long", func=long_task, interval=timedelta(minutes=5))
+        scheduler.tasks["long"].next_run = datetime.now()
+        scheduler._admit_ready_tasks()
+        await asyncio.sleep(0)
+
+        assert scheduler.cancel_task("long")
+        await asyncio.gather(*scheduler._active.values(), return_exceptions=True)
+        assert scheduler.tasks["long"].status == TaskStatus.CANCELLED
+        assert not scheduler._active
+
+    @pytest.mark.asyncio
+    async def test_metrics_persisted(self, tmp_path):
+        """Test that timing histograms are written to scheduler_task_metrics."""
+        import sqlite3
+
+        db_path = str(tmp_path / "scheduler.db")
+        scheduler = TaskScheduler(metrics_db_path=db_path)
+        scheduler.add_task(name="test_task", func=self.mock_func, interval=timedelta(minutes=5))
+        await scheduler._execute_task(scheduler.tasks["test_task"])
+
+        assert scheduler.flush_metrics() > 0
+        with sqlite3.connect(db_path) as conn:
+            rows = dict(conn.execute("""
+                SELECT m.metric_name, m.metric_value
+                FROM scheduler_task_metrics m
+                JOIN scheduler_tasks t ON t.id = m.task_id
+                WHERE t.name = 'test_task'
+            """).fetchall())
+        assert rows["duration_count"] == 1
+        assert rows["outcome_completed"] == 1
+
+        # Nothing new to write
+        assert scheduler.flush_metrics() == 0
+
+    def test_aligned_next_run(self):
+        """Test wall-clock aligned run times."""
+        self.scheduler.add_task(
+            name="daily",
+            func=self.mock_func,
+            interval=timedelta(days=1),
+            align_offset=timedelta(hours=18)
+        )
+        task = self.scheduler.tasks["daily"]
+
+        assert task.compute_next_run(datetime(2024, 1, 10, 9, 30)) == datetime(2024, 1, 10, 18, 0)
+        assert task.compute_next_run(datetime(2024, 1, 10, 18, 0)) == datetime(2024, 1, 11, 18, 0)
+
+        task.interval = timedelta(minutes=15)
+        task.align_offset = timedelta(0)
+        assert task.compute_next_run(datetime(2024, 1, 10, 9, 31, 5)) == datetime(2024, 1, 10, 9, 45)
+
+    @pytest.mark.asyncio
+    async def test_run_on_dependencies(self):
+        """Test that a dependent task runs as soon as its dependencies complete."""
+        self.scheduler.add_task(name="fetch", func=Mock(), interval=timedelta(hours=1))
+        self.scheduler.add_task(
+            name="process",
+            func=Mock(),
+            interval=timedelta(hours=2),
+            dependencies=["fetch"],
+            run_on_dependencies=True
+        )
+        process = self.scheduler.tasks["process"]
+        process.next_run = datetime.now() + timedelta(hours=2)
+
+        await self.scheduler._execute_task(self.scheduler.tasks["fetch"])
+
+        assert process.next_run <= datetime.now()
+        assert [task.name for task in self.scheduler._get_ready_tasks()] == ["process"]
+
+    def test_notify_event(self):
+        """Test that notify makes subscribed tasks due."""
+        self.scheduler.add_task(
+            name="recalc",
+            func=self.mock_func,
+            interval=timedelta(hours=1),
+            events=["data_updated:1d"]
+        )
+        self.scheduler.tasks["recalc"].next_run = datetime.now() + timedelta(hours=1)
+
+        assert self.scheduler.notify("data_updated:1h") == []
+        assert self.scheduler.notify("data_updated:1d") == ["recalc"]
+        assert self.scheduler.tasks["recalc"].next_run <= datetime.now()
+
+    @pytest.mark.asyncio
+    async def test_event_driven_wakeup(self):
+        """Test that the loop sleeps until the next run and wakes on a trigger."""
+        import time
+
+        done = asyncio.Event()
+        scheduler = TaskScheduler()
+        scheduler.add_task(name="idle", func=lambda: done.set(), interval=timedelta(hours=1))
+        scheduler.tasks["idle"].next_run = datetime.now() + timedelta(hours=1)
+
+        runner = asyncio.create_task(scheduler.start())
+        await asyncio.sleep(0.3)
+        # No polling while nothing is due
+        assert scheduler.wakeups <= 1
+
+        started = time.monotonic()
+        assert scheduler.trigger_task("idle")
+        await asyncio.wait_for(done.wait(), timeout=2)
+        assert time.monotonic() - started < 0.5
+
+        await scheduler.stop()
+        await asyncio.wait_for(runner, timeout=2)
+
 
 class TestTradingCalendar:
     """Test cases for TradingCalendar class."""
@@ -345,6 +539,7 @@ class TestSchedulerIntegration:
         indicators_task = self.scheduler.tasks["calculate_indicators"]
         assert indicators_task.func == mock_indicators
         assert "update_market_data" in indicators_task.dependencies
+        assert indicators_task.run_on_dependencies
         
         signals_task = self.scheduler.tasks["generate_signals"]
         assert signals_task.func == mock_signals
@@ -0,0 +1,111 @@
+"""Tests for batched, cached and incremental news sentiment scoring."""
+
+import pandas as pd
+import pytest
+
+import core.ml.sentiment_analysis as sentiment_analysis
+from core.ml.sentiment_analysis import NewsSentimentAnalyzer, SentimentConfig
+
+
+class FakePipeline:
+    """Transformer pipeline double: 'рост' is positive, everything else negative."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None, truncation=True, max_length=128):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        self.calls.append(texts)
+        return [
+            [{'label': 'positive', 'score': 0.9 if 'рост' in text else 0.1},
+             {'label': 'negative', 'score': 0.1 if 'рост' in text else 0.9}]
+            for text in texts
+        ]
+
+    @property
+    def texts_scored(self):
+        return sum(len(call) for call in self.calls)
+
+
+def make_news(n, start='2025-03-03 10:00'):
+    return pd.DataFrame({
+        'id': range(1, n + 1),
+        'title': [f'Новость {i}: {"рост" if i % 2 else "падение"}' for i in range(n)],
+        'content': [f'Текст новости номер {i}' for i in range(n)],
+        'date': pd.date_range(start, periods=n, freq='h').astype(str),
+    })
+
+
+class TestSentimentBatching:
+    """Batched scoring must cover every text, reuse cached scores and skip old articles."""
+
+    @pytest.fixture
+    def analyzer_factory(self, tmp_path, monkeypatch):
+        # No model download: the pipeline is injected directly
+        monkeypatch.setattr(sentiment_analysis, 'TRANSFORMERS_AVAILABLE', False)
+
+        def make(batch_size=4, cache=True):
+            config = SentimentConfig(batch_size=batch_size,
+                                     cache_db_path=str(tmp_path / 'stocks.db') if cache else None)
+            analyzer = NewsSentimentAnalyzer(config)
+            analyzer.transformer_pipeline = FakePipeline()
+            return analyzer
+
+        return make
+
+    def test_batches_every_text(self, analyzer_factory):
+        analyzer = analyzer_factory(batch_size=4, cache=False)
+        texts = [f'рост {i}' if i % 3 else f'падение {i}' for i in range(11)]
+
+        results = analyzer.analyze_batch(texts)
+
+        assert len(results) == 11
+        assert [len(call) for call in analyzer.transformer_pipeline.calls] == [4, 4, 3]
+        assert [r.sentiment for r in results] == ['positive' if i % 3 else 'negative' for i in range(11)]
+
+    def test_cached_scores_are_not_recomputed(self, analyzer_factory):
+        analyzer = analyzer_factory()
+        first = analyzer.analyze_batch(['рост прибыли', 'падение выручки'])
+
+        second = analyzer_factory().analyze_batch(['падение выручки', 'рост прибыли', 'рост добычи'])
+
+        assert analyzer.transformer_pipeline.texts_scored == 2
+        assert [r.sentiment for r in second] == ['negative', 'positive', 'positive']
+        assert second[1].confidence == pytest.approx(first[0].confidence)
+
+    def test_text_empty_after_cleaning_is_not_sent_to_model(self, analyzer_factory):
+        analyzer = analyzer_factory(cache=False)
+
+        results = analyzer.analyze_batch(['рост', '@@@ ###', 'падение'])
+
+        assert results[1].method == 'transformer_empty'
+        assert analyzer.transformer_pipeline.calls == [['рост', 'падение']]
+
+    def test_incremental_mode_scores_only_new_articles(self, analyzer_factory):
+        analyzer = analyzer_factory()
+        news = make_news(6)
+        analyzer.analyze_new_articles(news.iloc[:4], time_column='date', title_column='title', id_column='id')
+        scored_before = analyzer.transformer_pipeline.texts_scored
+
+        result = analyzer.analyze_new_articles(news, time_column='date', title_column='title', id_column='id')
+
+        assert scored_before == 4
+        assert analyzer.transformer_pipeline.texts_scored == 6
+        assert result['index'].tolist() == [4, 5]
+        assert analyzer.cache.get_watermark('market') == news['date'].iloc[-1]
+
+    def test_incremental_mode_requires_time_column(self, analyzer_factory):
+        analyzer = analyzer_factory()
+
+        with pytest.raises(ValueError, match='published_at'):
+            analyzer.analyze_new_articles(make_news(2), time_column='published_at')
+
+    def test_dataframe_matches_single_text_analysis(self, analyzer_factory):
+        analyzer = analyzer_factory(cache=False)
+        news = make_news(5)
+
+        frame = analyzer.analyze_news_dataframe(news, title_column='title')
+
+        combined = (news['title'] + ' ' + news['content']).tolist()
+        expected = [analyzer.analyze_text(text).sentiment for text in combined]
+        assert frame['sentiment'].tolist() == expected
@@ -0,0 +1,163 @@
+"""Tests for the shared rolling statistics and the single-pass signal filters."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analytics.signal_filters import (
+    FILTER_NAMES, FilterConfig, SignalFilter, create_adaptive_filter,
+)
+from core.indicators import calculate_technical_indicators
+from core.indicators.calculations import ATR_COL, BB_MID_COL, BB_STD_COL, RSI_COL
+from core.indicators.rolling import ROLLING_STATS_ATTR, RollingStats, rolling_stats
+
+
+def make_bars(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, n))
+    return pd.DataFrame({
+        'date': pd.bdate_range('2023-01-02', periods=n),
+        'open': close - 0.3, 'high': close + rng.uniform(0.5, 3, n), 'low': close - rng.uniform(0.5, 3, n),
+        'close': close, 'volume': rng.integers(100, 10_000, n).astype(float),
+    })
+
+
+def baseline_mask(data, signals, config):
+    """Filter columns as computed by the per-filter pandas implementation."""
+    out = pd.DataFrame(index=signals.index)
+    if 'volume' in data.columns:
+        volume_ma = data['volume'].rolling(window=20, min_periods=5).mean()
+        out['volume_filter'] = data['volume'] / (volume_ma + 1e-9) >= config.min_volume_ratio
+    else:
+        out['volume_filter'] = True
+    if ATR_COL in data.columns:
+        atr_percentiles = data[ATR_COL].rolling(window=50, min_periods=10).quantile(config.max_volatility_percentile)
+        out['volatility_filter'] = data[ATR_COL] <= atr_percentiles
+    else:
+        out['volatility_filter'] = True
+    out['price_filter'] = (data['close'] >= config.min_price) & (data['close'] <= config.max_price)
+    technical = pd.Series(True, index=signals.index)
+    if RSI_COL in data.columns:
+        technical &= (signals['long_signal'] == 0) | (data[RSI_COL] <= config.rsi_overbought)
+        technical &= (signals['short_signal'] == 0) | (data[RSI_COL] >= config.rsi_oversold)
+    if BB_MID_COL in data.columns and BB_STD_COL in data.columns:
+        bb_position = (data['close'] - data[BB_MID_COL]) / (data[BB_STD_COL] + 1e-9)
+        technical &= (signals['long_signal'] == 0) | (bb_position >= config.bb_oversold)
+        technical &= (signals['short_signal'] == 0) | (bb_position <= config.bb_overbought)
+    out['technical_filter'] = technical
+    strength = pd.Series(True, index=signals.index)
+    for column in ('long_probability', 'short_probability', 'composite_signal'):
+        if column in signals.columns:
+            values = signals[column].abs() if column == 'composite_signal' else signals[column]
+            strength &= (values >= config.min_signal_strength) | signals[column].isna()
+    out['strength_filter'] = strength
+    atr_ratio = data[ATR_COL] / (data['close'] + 1e-9)
+    out['atr_filter'] = (atr_ratio >= config.min_atr_ratio) & (atr_ratio <= config.max_atr_ratio)
+    return out[list(FILTER_NAMES)].to_numpy(dtype=bool)
+
+
+class TestRollingStats:
+    """Cached statistics must equal pandas rolling windows, NaN gaps included."""
+
+    @pytest.fixture
+    def frame(self):
+        rng = np.random.default_rng(1)
+        values = rng.normal(10, 3, 300)
+        values[[0, 5, 6, 7, 100, 101, 250]] = np.nan
+        return pd.DataFrame({'x': values})
+
+    @pytest.mark.parametrize('window,min_periods', [(5, 1), (10, 5), (20, 20), (50, 10)])
+    def test_window_statistics_match_pandas(self, frame, window, min_periods):
+        stats = RollingStats()
+        rolling = frame['x'].rolling(window=window, min_periods=min_periods)
+
+        np.testing.assert_array_equal(stats.mean(frame, 'x', window, min_periods), rolling.mean().to_numpy())
+        np.testing.assert_array_equal(stats.std(frame, 'x', window, min_periods), rolling.std().to_numpy())
+        np.testing.assert_array_equal(stats.min(frame, 'x', window, min_periods), rolling.min().to_numpy())
+        np.testing.assert_array_equal(stats.max(frame, 'x', window, min_periods), rolling.max().to_numpy())
+        np.testing.assert_array_equal(stats.quantile(frame, 'x', window, 0.8, min_periods),
+                                      rolling.quantile(0.8).to_numpy())
+        np.testing.assert_array_equal(stats.count(frame, 'x', window),
+                                      frame['x'].rolling(window=window, min_periods=0).count().to_numpy())
+
+    def test_column_quantile_matches_pandas(self, frame):
+        assert RollingStats().column_quantile(frame, 'x', 0.8) == frame['x'].quantile(0.8)
+
+    def test_cache_is_shared_by_frame_copies(self, frame):
+        stats = rolling_stats(frame)
+        first = stats.mean(frame, 'x', 20)
+
+        copy = frame.copy()
+        second = rolling_stats(copy).mean(copy, 'x', 20)
+        rolling_stats(copy).mean(copy, 'x', 20, min_periods=5)
+
+        assert copy.attrs[ROLLING_STATS_ATTR] is stats
+        assert second is first
+        assert not first.flags.writeable
+        # The min_periods variant reuses the mean and adds only the window count
+        assert (stats.misses, stats.hits) == (2, 2)
+
+    def test_changed_column_is_recomputed(self, frame):
+        stats = rolling_stats(frame)
+        stats.mean(frame, 'x', 10)
+
+        changed = frame.copy()
+        changed.loc[150, 'x'] += 100.0
+        result = rolling_stats(changed).mean(changed, 'x', 10)
+
+        np.testing.assert_array_equal(result, changed['x'].rolling(10, min_periods=1).mean().to_numpy())
+
+
+class TestSignalFilter:
+    """The single-pass mask must equal the per-filter pandas formulas."""
+
+    @pytest.fixture
+    def scored(self):
+        return calculate_technical_indicators(make_bars(), contract_code='SBER', risk_management=False)
+
+    @pytest.mark.parametrize('config', [
+        FilterConfig(),
+        FilterConfig(min_volume_ratio=0.8, min_atr_ratio=0.005, max_atr_ratio=0.05, min_signal_strength=0.3),
+    ])
+    def test_filter_mask_matches_baseline(self, scored, config):
+        mask = SignalFilter(config).filter_mask(scored, scored)
+
+        np.testing.assert_array_equal(mask, baseline_mask(scored, scored, config))
+
+    def test_filter_mask_handles_nan_gaps(self, scored):
+        data = scored.copy()
+        data.loc[data.index[200:210], ['volume', ATR_COL]] = np.nan
+        data.attrs = {}
+        config = FilterConfig(min_volume_ratio=0.8, min_atr_ratio=0.005, max_atr_ratio=0.05)
+
+        mask = SignalFilter(config).filter_mask(data, data)
+
+        np.testing.assert_array_equal(mask, baseline_mask(data, data, config))
+
+    def test_filter_signals_applies_final_filter(self, scored):
+        config = FilterConfig(min_volume_ratio=0.8, min_atr_ratio=0.005, max_atr_ratio=0.05, min_signal_strength=0.3)
+
+        filtered = SignalFilter(config).filter_signals(scored, scored)
+
+        final = baseline_mask(scored, scored, config).all(axis=1)
+        np.testing.assert_array_equal(filtered['final_filter'].to_numpy(), final)
+        expected = scored['long_signal'].where(final, 0)
+        np.testing.assert_array_equal(filtered['filtered_long_signal'].to_numpy(), expected.to_numpy())
+
+    def test_adaptive_filter_uses_recent_window_only(self):
+        data = make_bars(200)
+        rng = np.random.default_rng(7)
+        data.loc[170:, 'volume'] = 1000 * 1.15 ** np.arange(30) * rng.uniform(0.7, 1.3, 30)
+        data.loc[:169, 'volume'] = 1e6  # Old history must not move the recent moving average
+
+        config = create_adaptive_filter(data, lookback_days=30).config
+
+        recent = data.tail(30)['volume']
+        ratios = recent / (recent.rolling(window=10, min_periods=5).mean() + 1e-9)
+        full_history_ma = data['volume'].rolling(window=10, min_periods=5).mean().tail(30)
+        assert ratios.median() > 1.1
+        assert config.min_volume_ratio == ratios.median()
+        assert config.min_volume_ratio != pytest.approx((recent / (full_history_ma + 1e-9)).median())
+
+    def test_adaptive_filter_defaults_without_enough_data(self):
+        assert create_adaptive_filter(make_bars(20), lookback_days=30).config == FilterConfig()
@@ -0,0 +1,140 @@
+"""Tests for 5m/15m/1h bars resampled from stored 1m bars."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.multi_timeframe_db import add_multi_timeframe_tables, get_timeframe_data
+from core.timeframe_resampler import TimeframeResampler, get_resampler, resample_frame
+
+FREQ = {'1m': 'min', '5m': '5min', '15m': '15min', '1h': 'h'}
+TABLES = {'1m': 'data_1min', '5m': 'data_5min', '15m': 'data_15min', '1h': 'data_1hour'}
+
+
+def make_trades(start: str, days: int, seed: int = 0) -> pd.DataFrame:
+    """Sparse trades in the main MOEX session (07:00-15:40 UTC) with quiet minutes."""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for day in pd.bdate_range(start, periods=days, tz='UTC'):
+        offsets = np.sort(rng.uniform(0, 520 * 60, 3000))
+        offsets = offsets[(offsets < 200 * 60) | (offsets > 230 * 60)]  # No trades for half an hour
+        chunks.append(day + pd.Timedelta(hours=7) + pd.to_timedelta(offsets, unit='s'))
+    times = pd.DatetimeIndex(np.concatenate(chunks))
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(times))))
+    return pd.DataFrame({'price': price, 'qty': rng.integers(1, 50, len(times))}, index=times)
+
+
+def api_candles(trades: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """Candles as the broker API builds them: trades grouped by interval start."""
+    grouped = trades.groupby(trades.index.floor(FREQ[timeframe]))
+    candles = pd.DataFrame({
+        'open': grouped['price'].first(),
+        'high': grouped['price'].max(),
+        'low': grouped['price'].min(),
+        'close': grouped['price'].last(),
+        'volume': grouped['qty'].sum(),
+    })
+    return candles.rename_axis('time').reset_index()
+
+
+def save(conn: sqlite3.Connection, symbol: str, timeframe: str, candles: pd.DataFrame) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLES[timeframe]} (symbol, datetime, open, high, low, close, volume) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(symbol, row.time.isoformat(), row.open, row.high, row.low, row.close, int(row.volume))
+         for row in candles.itertuples()])
+    conn.commit()
+
+
+def assert_same_bars(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert len(actual) == len(expected)
+    assert (actual['datetime'].to_numpy() == expected['time'].to_numpy()).all()
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_allclose(actual[column].to_numpy(float), expected[column].to_numpy(float))
+
+
+class TestTimeframeResampler:
+    """Resampled bars must equal the candles the API returns for the timeframe."""
+
+    def setup_method(self):
+        get_resampler().clear()
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / 'stocks.db')
+        add_multi_timeframe_tables(conn)
+        yield conn
+        conn.close()
+
+    @pytest.mark.parametrize('timeframe', ['5m', '15m', '1h'])
+    def test_matches_api_candles(self, conn, timeframe):
+        trades = make_trades('2025-03-03', days=3)
+        save(conn, 'SBER', '1m', api_candles(trades, '1m'))
+
+        data = get_timeframe_data(conn, 'SBER', timeframe, limit=10000)
+
+        assert_same_bars(data, api_candles(trades, timeframe))
+        assert str(data['datetime'].dt.tz) == 'UTC'
+
+    @pytest.mark.parametrize('timeframe', ['5m', '15m', '1h'])
+    def test_limit_returns_complete_latest_bars(self, conn, timeframe):
+        trades = make_trades('2025-03-03', days=2)
+        save(conn, 'SBER', '1m', api_candles(trades, '1m'))
+
+        data = get_timeframe_data(conn, 'SBER', timeframe, limit=7)
+
+        assert_same_bars(data, api_candles(trades, timeframe).tail(7))
+
+    def test_incremental_refresh_follows_new_and_updated_minutes(self, conn):
+        trades = make_trades('2025-03-03', days=2, seed=1)
+        minutes = api_candles(trades, '1m')
+        cut = trades.index[-1] - pd.Timedelta(minutes=37, seconds=20)
+        save(conn, 'SBER', '1m', api_candles(trades[trades.index <= cut], '1m'))
+        get_timeframe_data(conn, 'SBER', '15m', limit=100)
+        rows_before = get_resampler().get_stats()['base_rows_read']
+
+        # The forming minute is rewritten and later minutes arrive
+        save(conn, 'SBER', '1m', minutes[minutes['time'] >= cut.floor('min')])
+        data = get_timeframe_data(conn, 'SBER', '15m', limit=100)
+
+        assert_same_bars(data, api_candles(trades, '15m').tail(100))
+        assert get_resampler().get_stats()['base_rows_read'] - rows_before <= 40 + 15
+
+    def test_backfilled_gap_after_invalidate(self, conn):
+        trades = make_trades('2025-03-03', days=2, seed=2)
+        minutes = api_candles(trades, '1m')
+        gap = (minutes['time'] >= '2025-03-03 09:00') & (minutes['time'] < '2025-03-03 10:30')
+        save(conn, 'SBER', '1m', minutes[~gap])
+        get_timeframe_data(conn, 'SBER', '1h', limit=100)
+
+        save(conn, 'SBER', '1m', minutes[gap])
+        get_resampler().invalidate_from_candles('SBER', '1m', minutes[gap])
+
+        assert_same_bars(get_timeframe_data(conn, 'SBER', '1h', limit=100), api_candles(trades, '1h'))
+
+    def test_stored_bars_fill_older_history(self, conn):
+        trades = make_trades('2025-03-03', days=4, seed=3)
+        hours = api_candles(trades, '1h')
+        minutes = api_candles(trades, '1m')
+        save(conn, 'SBER', '1h', hours[hours['time'] < '2025-03-05'])
+        save(conn, 'SBER', '1m', minutes[minutes['time'] >= '2025-03-05'])
+
+        assert_same_bars(get_timeframe_data(conn, 'SBER', '1h', limit=1000), hours)
+
+    def test_falls_back_to_stored_table_without_minutes(self, conn):
+        trades = make_trades('2025-03-03', days=1, seed=4)
+        save(conn, 'GAZP', '5m', api_candles(trades, '5m'))
+
+        assert_same_bars(get_timeframe_data(conn, 'GAZP', '5m', limit=1000), api_candles(trades, '5m'))
+
+    def test_resample_frame_matches_cache(self, conn):
+        trades = make_trades('2025-03-03', days=1, seed=5)
+        minutes = api_candles(trades, '1m')
+        save(conn, 'SBER', '1m', minutes)
+
+        cached = TimeframeResampler().get(conn, 'SBER', '15m', limit=1000)
+        in_memory = resample_frame(minutes.rename(columns={'time': 'datetime'}), '15m')
+
+        pd.testing.assert_frame_equal(cached, in_memory, check_dtype=False)
@@ -0,0 +1,203 @@
+"""Tests for TradingBatchWriter and the two-phase order execution of AutoTrader."""
+
+import sqlite3
+
+import pytest
+
+import core.analytics.auto_trader as auto_trader
+from core.analytics.auto_trader import AutoTrader
+from core.database import TradingBatchWriter, create_tables, save_trading_signal
+
+FAIL_TRADES = """
+    CREATE TRIGGER fail_trades BEFORE INSERT ON auto_trade_history
+    BEGIN SELECT RAISE(ABORT, 'database is locked'); END
+"""
+
+
+def make_signal(contract_code='SBER', date='2025-03-03', signal_type='long', price=100.0):
+    return {
+        'contract_code': contract_code, 'date': date, 'signal_type': signal_type,
+        'signal_strength': 0.9, 'signal_score': 3.0, 'price': price, 'volume': 1000,
+        'atr': 2.0, 'stop_loss': price - 4, 'take_profit': price + 6, 'processed': False,
+    }
+
+
+def make_order(signal_id, company_id=1, contract_code='SBER', quantity=10):
+    return {
+        'signal_id': signal_id, 'company_id': company_id, 'contract_code': contract_code,
+        'order_type': 'market', 'side': 'BUY', 'quantity': quantity, 'price': 100.0,
+    }
+
+
+def make_trade(signal_id, order_id, company_id=1):
+    return {
+        'signal_id': signal_id, 'order_id': order_id, 'company_id': company_id,
+        'contract_code': 'SBER', 'side': 'BUY', 'quantity': 10, 'entry_price': 100.0,
+        'entry_date': '2025-03-03',
+    }
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'stocks.db', isolation_level=None)
+    create_tables(conn)
+    yield conn
+    conn.close()
+
+
+class TestTradingBatchWriter:
+    """Flush must return exact ids in order and keep staged items when it fails."""
+
+    def test_ids_follow_insertion_order(self, conn):
+        batch = TradingBatchWriter(conn)
+        signals = [make_signal(code, '2025-03-03') for code in ('SBER', 'GAZP', 'LKOH')]
+        for signal in signals:
+            batch.add_signal(signal)
+
+        result = batch.flush()
+
+        assert [signal['signal_id'] for signal in signals] == result.signal_ids
+        stored = [conn.execute("SELECT c.contract_code FROM trading_signals ts JOIN companies c"
+                               " ON ts.company_id = c.id WHERE ts.id = ?", (signal_id,)).fetchone()[0]
+                  for signal_id in result.signal_ids]
+        assert stored == ['SBER', 'GAZP', 'LKOH']
+
+    def test_order_ids_are_exact_when_rowids_are_not_consecutive(self, conn):
+        # Every order insert is followed by an audit row in the same table
+        conn.execute("""
+            CREATE TRIGGER audit_orders AFTER INSERT ON auto_orders WHEN NEW.order_type = 'market'
+            BEGIN
+                INSERT INTO auto_orders (signal_id, company_id, contract_code, order_type, side, quantity)
+                VALUES (NEW.signal_id, NEW.company_id, NEW.contract_code, 'audit', NEW.side, NEW.quantity);
+            END
+        """)
+        batch = TradingBatchWriter(conn)
+        orders = [make_order(signal_id, quantity=quantity) for signal_id, quantity in ((1, 10), (2, 20), (3, 30))]
+        for order in orders:
+            batch.add_order(order)
+
+        result = batch.flush()
+
+        assert result.order_ids == [order['order_id'] for order in orders]
+        stored = [conn.execute("SELECT order_type, quantity FROM auto_orders WHERE id = ?", (order_id,)).fetchone()
+                  for order_id in result.order_ids]
+        assert stored == [('market', 10), ('market', 20), ('market', 30)]
+
+    def test_failed_flush_rolls_back_and_keeps_staged_items(self, conn):
+        conn.execute(FAIL_TRADES)
+        batch = TradingBatchWriter(conn)
+        order = make_order(1)
+        batch.add_order(order)
+        batch.add_trade(make_trade(1, 1))
+
+        with pytest.raises(sqlite3.DatabaseError, match='locked'):
+            batch.flush()
+
+        assert len(batch) == 2
+        assert 'order_id' not in order
+        assert count(conn, 'auto_orders') == 0
+        assert not conn.in_transaction
+
+        conn.execute("DROP TRIGGER fail_trades")
+        result = batch.flush()
+
+        assert len(batch) == 0
+        assert result.order_ids == [order['order_id']]
+        assert count(conn, 'auto_orders') == 1
+        assert count(conn, 'auto_trade_history') == 1
+
+    def test_context_manager_discards_on_error(self, conn):
+        with pytest.raises(RuntimeError):
+            with TradingBatchWriter(conn) as batch:
+                batch.add_signal(make_signal())
+                raise RuntimeError('boom')
+
+        assert len(batch) == 0
+        assert count(conn, 'trading_signals') == 0
+
+
+class TestExecutePendingOrders:
+    """Orders sent to the broker are never lost when their statuses cannot be saved."""
+
+    @pytest.fixture
+    def trader(self, conn, monkeypatch):
+        monkeypatch.setattr(auto_trader, 'STATUS_FLUSH_RETRY_DELAY', 0)
+        sent = []
+
+        def fake_create_order(ticker, volume, order_price, order_direction, analyzer):
+            sent.append(ticker)
+            return {'status': 'success', 'response': {'id': f'T-{len(sent)}'}, 'message': ''}
+
+        monkeypatch.setattr(auto_trader, 'create_order', fake_create_order)
+        trader = AutoTrader(None, conn)
+        trader.start_trading_session()
+        trader.sent = sent
+        save_trading_signal(conn, make_signal('SBER'))
+        save_trading_signal(conn, make_signal('GAZP'))
+        return trader
+
+    def order_statuses(self, conn):
+        return [row[0] for row in conn.execute("SELECT status FROM auto_orders ORDER BY id")]
+
+    def test_statuses_and_trades_are_saved(self, trader, conn):
+        results = trader.execute_pending_orders()
+
+        assert [result['status'] for result in results] == ['success', 'success']
+        assert self.order_statuses(conn) == ['submitted', 'submitted']
+        assert count(conn, 'auto_trade_history') == 2
+        assert trader.orders_to_reconcile == []
+
+    def test_failed_status_flush_marks_orders_for_reconciliation(self, trader, conn):
+        conn.execute(FAIL_TRADES)
+
+        results = trader.execute_pending_orders()
+
+        order_ids = [result['order_id'] for result in results]
+        assert trader.sent == ['SBER', 'GAZP']
+        assert all(result['reconcile'] for result in results)
+        assert trader.orders_to_reconcile == order_ids
+        assert len(trader.unsaved_batch) == 4  # Two status updates and two trades
+        # Signals were claimed before submission, the orders are still pending
+        assert self.order_statuses(conn) == ['pending', 'pending']
+        assert count(conn, 'trading_signals WHERE processed = FALSE') == 0
+        assert trader.get_trading_stats()['orders_to_reconcile'] == 2
+
+    def test_nothing_is_submitted_while_statuses_are_unsaved(self, trader, conn):
+        conn.execute(FAIL_TRADES)
+        trader.execute_pending_orders()
+        save_trading_signal(conn, make_signal('LKOH'))
+
+        assert trader.execute_pending_orders() == []
+        assert trader.sent == ['SBER', 'GAZP']
+
+        conn.execute("DROP TRIGGER fail_trades")
+        results = trader.execute_pending_orders()
+
+        assert trader.orders_to_reconcile == []
+        assert trader.unsaved_batch is None
+        assert [result['status'] for result in results] == ['success']
+        assert trader.sent == ['SBER', 'GAZP', 'LKOH']
+        assert self.order_statuses(conn) == ['submitted', 'submitted', 'submitted']
+        assert count(conn, 'auto_trade_history') == 3
+
+    def test_transient_failure_is_retried(self, trader, conn, monkeypatch):
+        flush = TradingBatchWriter.flush
+        calls = []
+
+        def flaky_flush(batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise sqlite3.OperationalError('database is locked')
+            return flush(batch)
+
+        monkeypatch.setattr(TradingBatchWriter, 'flush', flaky_flush)
+
+        results = trader.execute_pending_orders()
+
+        assert len(calls) == 3
+        assert not any(result.get('reconcile') for result in results)
+        assert self.order_statuses(conn) == ['submitted', 'submitted']
@@ -0,0 +1,108 @@
+"""Tests for the process pool that trains models for many symbols."""
+
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from core.ml import training_pool
+from core.ml.training_pool import TrainingJob, TrainingPool, TrainingPoolConfig, estimate_data_points
+
+
+def quick_job(job):
+    return {'symbol': job.symbol, 'success': True, 'worker_pid': os.getpid()}
+
+
+def sleepy_job(job):
+    # SLOW outlives the pool deadline (spawned workers need a few seconds to import core)
+    if job.symbol == 'SLOW':
+        time.sleep(600)
+    return {'symbol': job.symbol, 'success': True}
+
+
+def crashing_job(job):
+    if job.symbol == 'CRASH':
+        os._exit(1)
+    return {'symbol': job.symbol, 'success': True}
+
+
+class TestTrainingPool:
+    """The pool must honour its deadline and close history rows of failed jobs."""
+
+    @pytest.fixture
+    def recorded(self, monkeypatch):
+        from core.ml.model_manager import ml_model_manager
+
+        rows = []
+        monkeypatch.setattr(ml_model_manager, '_record_training_history',
+                            lambda symbol, model_type, timeframe, metrics, status, error=None:
+                            rows.append((symbol, status, metrics.get('training_end'), error)))
+        return rows
+
+    def test_jobs_start_in_cost_order_inline(self):
+        jobs = [TrainingJob('A', data_points=10), TrainingJob('B', data_points=500), TrainingJob('C', data_points=50)]
+
+        report = TrainingPool(TrainingPoolConfig(max_workers=1), job_runner=quick_job).run(jobs)
+
+        assert [r['symbol'] for r in report.results] == ['B', 'C', 'A']
+
+    def test_timeout_terminates_running_workers(self, recorded):
+        pool = TrainingPool(TrainingPoolConfig(max_workers=2, timeout_seconds=40), job_runner=sleepy_job)
+        jobs = [TrainingJob('SLOW', data_points=1000), TrainingJob('FAST', data_points=1)]
+
+        started = time.perf_counter()
+        report = pool.run(jobs)
+
+        assert time.perf_counter() - started < 180  # Would be 600 s if the pool waited for SLOW
+        by_symbol = {r['symbol']: r for r in report.results}
+        assert by_symbol['FAST']['success']
+        assert by_symbol['SLOW']['error'] == 'Training pool timeout'
+        assert [(symbol, status) for symbol, status, _, _ in recorded] == [('SLOW', 'cancelled')]
+        assert recorded[0][2] is not None
+
+    def test_crashed_worker_closes_history_row(self, recorded):
+        pool = TrainingPool(TrainingPoolConfig(max_workers=2, timeout_seconds=60), job_runner=crashing_job)
+
+        report = pool.run([TrainingJob('CRASH', data_points=1000), TrainingJob('OK', data_points=1)])
+
+        failed = [r['symbol'] for r in report.failed]
+        assert 'CRASH' in failed
+        assert {symbol for symbol, status, end, _ in recorded if status == 'failed' and end} == set(failed)
+
+    def test_estimate_uses_job_timeframe(self, tmp_path):
+        db_path = tmp_path / 'stocks.db'
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE data_1d (symbol TEXT, datetime TEXT)")
+        conn.execute("CREATE TABLE data_1hour (symbol TEXT, datetime TEXT)")
+        conn.executemany("INSERT INTO data_1d VALUES ('SBER', ?)", [(str(i),) for i in range(5)])
+        conn.executemany("INSERT INTO data_1hour VALUES ('SBER', ?)", [(str(i),) for i in range(40)])
+        conn.commit()
+        conn.close()
+
+        assert estimate_data_points(['SBER', 'GAZP'], str(db_path)) == {'SBER': 5, 'GAZP': 0}
+        assert estimate_data_points(['SBER'], str(db_path), '1h') == {'SBER': 40}
+
+        jobs = TrainingPool().build_jobs(['SBER'], timeframe='1h', db_path=str(db_path), epochs=3)
+        assert jobs[0].data_points == 40
+
+
+class TestPeakRssMeter:
+    """Peak RSS is reported per training, not as the lifetime peak of the worker."""
+
+    def test_peak_is_reset_between_jobs(self):
+        from core.ml.model_manager import PeakRssMeter
+
+        meter = PeakRssMeter()
+        meter.start()
+        ballast = np.ones(64 * 1024 * 1024 // 8)  # 64 MiB
+        first = meter.peak_mb()
+        del ballast
+
+        meter.start()
+        second = meter.peak_mb()
+
+        if first is None:
+            pytest.skip('RSS accounting unavailable on this platform')
+        assert first - second > 32